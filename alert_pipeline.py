@@ -0,0 +1,146 @@
+"""
+Alert Pipeline - Aggregated, deduplicated alerting
+Groups matching events by (source_ip, alert_type, rule) over a sliding window
+"""
+import json
+import os
+import time
+from collections import OrderedDict, deque
+
+
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+# Default rules: every high severity event alerts (grouped per source/type),
+# bursts of brute force attempts alert even though each one is low/medium.
+DEFAULT_ALERT_RULES = [
+    {
+        'name': 'high_severity',
+        'min_severity': 'high',
+        'threshold': 1,
+        'window': 300,
+        'severity': 'high',
+        'message': 'High severity attack from {source_ip}'
+    },
+    {
+        'name': 'brute_force_burst',
+        'alert_types': ['brute_force'],
+        'min_severity': 'low',
+        'threshold': 10,
+        'window': 60,
+        'severity': 'medium',
+        'message': 'Brute force burst from {source_ip}'
+    }
+]
+
+
+class AlertRule:
+    """Threshold rule: fire after `threshold` matching events within `window` seconds"""
+
+    __slots__ = ('name', 'alert_types', 'min_rank', 'threshold', 'window', 'severity', 'message')
+
+    def __init__(self, name, min_severity='high', threshold=1, window=300,
+                 alert_types=None, severity=None, message=None):
+        self.name = name
+        self.alert_types = set(alert_types) if alert_types else None
+        self.min_rank = SEVERITY_RANK.get(min_severity, 2)
+        self.threshold = max(1, int(threshold))
+        self.window = float(window)
+        self.severity = severity or min_severity
+        self.message = message or '{count} {alert_type} events from {source_ip}'
+
+    def matches(self, alert_type, severity):
+        if self.alert_types is not None and alert_type not in self.alert_types:
+            return False
+        return SEVERITY_RANK.get(severity, 0) >= self.min_rank
+
+
+class _AlertGroup:
+    """Open aggregation window for one (source_ip, alert_type, rule name) key"""
+
+    __slots__ = ('rule', 'alert_id', 'count', 'first_seen', 'last_seen', 'recent')
+
+    def __init__(self, rule, now):
+        self.rule = rule
+        self.alert_id = None
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+        # Timestamps of events not yet turned into an alert (bounded by threshold)
+        self.recent = deque(maxlen=rule.threshold)
+
+
+class AlertAggregator:
+    """
+    Sliding-window alert aggregator:
+    - Each event goes to the first rule it matches (rules are in priority
+      order); one alert row per (source_ip, alert_type, rule) while events
+      keep arriving, so a low-severity group never hides later high events
+    - Occurrence counts with first/last timestamps
+    - Rule-based thresholds (N events within W seconds)
+    - Bounded state (least recently seen groups are evicted)
+    """
+
+    def __init__(self, rules=None, max_groups=10000):
+        """Initialize with rule dicts (defaults to DEFAULT_ALERT_RULES)"""
+        self.rules = [AlertRule(**r) for r in (rules or DEFAULT_ALERT_RULES)]
+        self.max_groups = max_groups
+        self.groups = OrderedDict()
+
+    @classmethod
+    def from_env(cls):
+        """Load rules from the JSON file named by SENTINEL_ALERT_RULES, if any"""
+        path = os.environ.get('SENTINEL_ALERT_RULES')
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return cls(rules=json.load(f))
+            except Exception as e:
+                print(f"[!] Invalid alert rules file {path}: {e}")
+        return cls()
+
+    def observe(self, source_ip, alert_type, severity, now=None):
+        """Feed one event; returns ('insert', group), ('update', group) or None"""
+        now = now if now is not None else time.time()
+        rule = next((r for r in self.rules if r.matches(alert_type, severity)), None)
+        if rule is None:
+            return None
+        key = (source_ip, alert_type, rule.name)
+
+        group = self.groups.get(key)
+        if group is not None and now - group.last_seen > group.rule.window:
+            # Window closed - the next occurrence opens a new alert
+            del self.groups[key]
+            group = None
+
+        if group is None:
+            group = _AlertGroup(rule, now)
+            self.groups[key] = group
+            if len(self.groups) > self.max_groups:
+                self.groups.popitem(last=False)
+        else:
+            self.groups.move_to_end(key)
+
+        group.count += 1
+        group.last_seen = now
+
+        if group.alert_id is not None:
+            return ('update', group)
+
+        group.recent.append(now)
+        while group.recent and now - group.recent[0] > group.rule.window:
+            group.recent.popleft()
+        if len(group.recent) >= group.rule.threshold:
+            group.count = len(group.recent)
+            group.first_seen = group.recent[0]
+            group.recent.clear()
+            return ('insert', group)
+        return None
+
+    def forget(self, alert_ids=None):
+        """Close groups whose alerts were acknowledged (all groups if None)"""
+        if alert_ids is None:
+            self.groups.clear()
+            return
+        alert_ids = set(alert_ids)
+        for key in [k for k, g in self.groups.items() if g.alert_id in alert_ids]:
+            del self.groups[key]
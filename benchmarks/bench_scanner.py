@@ -0,0 +1,163 @@
+"""
+Scanner benchmark - asyncio engine vs. the previous thread-pool scanner
+
+Builds a local test network on loopback addresses (127.0.1.x on Linux):
+some hosts accept connections on a few ports, some have "filtered" ports
+(a listener whose accept queue is full, so SYNs go unanswered) and every
+other port is closed. Both scanners sweep the same host/port grid.
+Loopback has no round-trip latency, so blocking threads are not held up
+there; the thread pool's 50 x 1/RTT ceiling only shows on real networks.
+
+Usage:
+    python benchmarks/bench_scanner.py
+    python benchmarks/bench_scanner.py --hosts 254 --ports 20 --filtered-every 16
+"""
+import argparse
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network_scanner import NetworkScanner
+
+
+OPEN_PORTS = (2222, 8000)
+FILTERED_PORT = 33890
+BASE_PORTS = [21, 22, 23, 25, 53, 110, 143, 445, 3306, 3389, 5432, 5900, 8080, 8443, 9000, 9090, 27017, 6379]
+
+
+class TestNetwork:
+    """Loopback hosts with accepting, filtered and closed ports"""
+
+    def __init__(self, hosts, open_every, filtered_every):
+        self.selector = selectors.DefaultSelector()
+        self.listeners = []
+        self.fillers = []
+        self.hosts = []
+        self.expected_open = set()
+        self.expected_filtered = set()
+        self._stop = False
+        for i in range(1, hosts + 1):
+            host = f"127.0.1.{i}" if sys.platform.startswith('linux') else '127.0.0.1'
+            if host in self.hosts:
+                break  # only one loopback address available off Linux
+            self.hosts.append(host)
+            if i % open_every == 0:
+                for port in OPEN_PORTS:
+                    self._listen(host, port)
+                    self.expected_open.add((host, port))
+            if i % filtered_every == 0:
+                self._filtered(host, FILTERED_PORT)
+                self.expected_filtered.add((host, FILTERED_PORT))
+        threading.Thread(target=self._accept_loop, name='bench-accept', daemon=True).start()
+
+    def _listen(self, host, port):
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(1024)
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ)
+        self.listeners.append(sock)
+
+    def _filtered(self, host, port):
+        # Never accepted, backlog filled: further SYNs are dropped like a firewall would
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(0)
+        self.listeners.append(sock)
+        for _ in range(3):
+            filler = socket.socket()
+            filler.setblocking(False)
+            filler.connect_ex((host, port))
+            self.fillers.append(filler)
+
+    def _accept_loop(self):
+        while not self._stop:
+            for key, _ in self.selector.select(timeout=0.2):
+                try:
+                    conn, _ = key.fileobj.accept()
+                    conn.close()
+                except OSError:
+                    pass
+
+    def close(self):
+        self._stop = True
+        for sock in self.listeners + self.fillers:
+            sock.close()
+
+
+class ThreadPoolScanner:
+    """The previous implementation: 50 threads, blocking connect_ex, fixed 1 s timeout"""
+
+    def __init__(self, timeout=1.0, max_workers=50):
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+    def _check_port(self, host, port):
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            result = sock.connect_ex((host, port))
+            sock.close()
+            return result == 0
+        except Exception:
+            return False
+
+    def sweep(self, pairs):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._check_port, h, p): (h, p) for h, p in pairs}
+            return {futures[f] for f in futures if f.result()}
+
+
+def run_async(pairs, **kwargs):
+    scanner = NetworkScanner(**kwargs)
+    states = scanner._run(scanner._probe_all(iter(pairs), {}))
+    return {k for k, v in states.items() if v == 'open'}, scanner
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the network scanner engines')
+    parser.add_argument('--hosts', type=int, default=254)
+    parser.add_argument('--ports', type=int, default=20, help='Ports probed per host')
+    parser.add_argument('--open-every', type=int, default=4, help='Every n-th host has open ports')
+    parser.add_argument('--filtered-every', type=int, default=32, help='Every n-th host has a filtered port')
+    parser.add_argument('--rate', type=float, default=None, help='Rate limit for the asyncio engine (probes/s)')
+    parser.add_argument('--skip-threaded', action='store_true', help='Only run the asyncio engine')
+    args = parser.parse_args()
+
+    net = TestNetwork(args.hosts, args.open_every, args.filtered_every)
+    ports = (list(OPEN_PORTS) + [FILTERED_PORT] + BASE_PORTS)[:max(3, args.ports)]
+    pairs = [(h, p) for p in ports for h in net.hosts]
+    print(f"Test network: {len(net.hosts)} hosts x {len(ports)} ports = {len(pairs):,} probes "
+          f"({len(net.expected_open)} open, {len(net.expected_filtered)} filtered)\n")
+
+    try:
+        results = []
+        if not args.skip_threaded:
+            start = time.perf_counter()
+            found = ThreadPoolScanner().sweep(pairs)
+            results.append(('thread pool (50, 1 s timeout)', time.perf_counter() - start, found, None))
+
+        start = time.perf_counter()
+        found, scanner = run_async(pairs, rate=args.rate)
+        results.append((f"asyncio ({scanner.concurrency} in flight)", time.perf_counter() - start, found, scanner))
+
+        for label, elapsed, found, scanner in results:
+            extra = f", {scanner.stats['retransmits']} retransmits" if scanner else ''
+            correct = 'ok' if found == net.expected_open else f"MISMATCH ({len(found)} open)"
+            print(f"  {label:<34} {elapsed:8.2f} s  {len(pairs) / elapsed:10,.0f} probes/s  {correct}{extra}")
+        if len(results) == 2:
+            print(f"\n  speedup: {results[0][1] / results[1][1]:.1f}x")
+    finally:
+        net.close()
+
+
+if __name__ == '__main__':
+    main()
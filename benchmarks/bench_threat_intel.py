@@ -0,0 +1,98 @@
+"""
+Threat intel benchmark - feed compile time, load time and lookup latency
+
+Generates synthetic feeds (single IPs and CIDR blocks, overlapping across
+feeds, a few IPv6 prefixes), compiles them and times lookups against a
+Python set of strings, the usual first attempt.
+
+Usage:
+    python benchmarks/bench_threat_intel.py
+    python benchmarks/bench_threat_intel.py --entries 5000000 --feeds 8
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from threat_intel import ThreatIntel, compile_feeds
+
+
+def ipv4(value):
+    return f"{value >> 24}.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}"
+
+
+def write_feeds(directory, entries, feeds, seed=1):
+    rng = random.Random(seed)
+    listed = []
+    per_feed = entries // feeds
+    for n in range(feeds):
+        with open(os.path.join(directory, f"feed{n}.txt"), 'w') as f:
+            f.write(f"# synthetic feed {n}\n")
+            for _ in range(per_feed):
+                value = rng.getrandbits(32)
+                if rng.random() < 0.05:
+                    f.write(f"{ipv4(value)}/{rng.randint(16, 28)}\n")
+                else:
+                    f.write(f"{ipv4(value)}\n")
+                    if len(listed) < 100000:
+                        listed.append(ipv4(value))
+            f.write(f"2001:db8:{n:x}::/48\n")
+    return listed
+
+
+def time_lookups(fn, ips):
+    start = time.perf_counter()
+    for ip in ips:
+        fn(ip)
+    return (time.perf_counter() - start) / len(ips) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the threat intel matcher')
+    parser.add_argument('--entries', type=int, default=2000000)
+    parser.add_argument('--feeds', type=int, default=4)
+    parser.add_argument('--lookups', type=int, default=200000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='sentinel-ti-')
+    try:
+        feed_dir = os.path.join(workdir, 'feeds')
+        os.makedirs(feed_dir)
+        listed = write_feeds(feed_dir, args.entries, args.feeds)
+        path = os.path.join(workdir, 'threat_intel.bin')
+
+        meta = compile_feeds(feed_dir, path)
+        size = os.path.getsize(path) / 1048576
+        print(f"compile   {meta['entries']:,} entries -> {meta['intervals_v4']:,} IPv4 + "
+              f"{meta['intervals_v6']:,} IPv6 intervals in {meta['seconds']:.2f}s ({size:.1f} MB)")
+
+        start = time.perf_counter()
+        intel = ThreatIntel(feed_dir, path, auto_compile=False)
+        print(f"load      {(time.perf_counter() - start) * 1000:.2f} ms (mmap)")
+
+        rng = random.Random(2)
+        misses = [ipv4(rng.getrandbits(32)) for _ in range(args.lookups)]
+        hits = [rng.choice(listed) for _ in range(args.lookups)]
+        v6 = [f"2001:db8:{rng.randrange(args.feeds):x}::{rng.getrandbits(16):x}" for _ in range(args.lookups // 10)]
+        print(f"lookup    {time_lookups(intel.match, misses):.2f} us random, "
+              f"{time_lookups(intel.match, hits):.2f} us listed, {time_lookups(intel.match, v6):.2f} us IPv6")
+
+        # Baseline: exact-match set of strings (no CIDR support at all)
+        start = time.perf_counter()
+        naive = set()
+        for name in os.listdir(feed_dir):
+            with open(os.path.join(feed_dir, name)) as f:
+                naive.update(line.strip() for line in f)
+        print(f"set()     built in {time.perf_counter() - start:.2f}s, "
+              f"{time_lookups(naive.__contains__, misses):.2f} us per lookup (exact IPs only)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Trap rule benchmark - lookup cost of the compiled matcher vs. a linear scan
+
+Usage:
+    python benchmarks/bench_trap_rules.py
+    python benchmarks/bench_trap_rules.py --rules 10000 --lookups 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trap_rules import TrapMatcher, TrapRule
+
+
+WORDS = ['admin', 'backup', 'config', 'api', 'wp', 'login', 'panel', 'db', 'old', 'test',
+         'dev', 'shell', 'upload', 'cgi', 'portal', 'manager', 'console', 'private']
+
+
+def generate_rules(n, seed=1):
+    rng = random.Random(seed)
+    rules = []
+    for i in range(n):
+        base = '/' + '/'.join(rng.choice(WORDS) + str(rng.randrange(1000)) for _ in range(rng.randint(1, 3)))
+        kind = rng.random()
+        if kind < 0.5:
+            rules.append({'match': 'exact', 'pattern': base})
+        elif kind < 0.75:
+            rules.append({'match': 'prefix', 'pattern': base + '/'})
+        elif kind < 0.95:
+            rules.append({'match': 'glob', 'pattern': base + '/*.php'})
+        else:
+            rules.append({'match': 'regex', 'pattern': '^' + base + r'/v\d+/'})
+    return rules
+
+
+def generate_paths(rules, n, seed=2):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.3:
+            rule = rng.choice(rules)
+            paths.append(rule['pattern'].lstrip('^').replace('*', 'x').replace(r'\d+', '1'))
+        else:
+            # Ordinary dashboard traffic: must miss quickly
+            paths.append(rng.choice(['/', '/live', '/analytics', '/api/stats', '/api/recent',
+                                     '/static/js/dashboard.js', '/socket.io/', '/admin_portal']))
+    return paths
+
+
+def linear_match(rules, path):
+    for rule in rules:
+        if rule.match == 'exact' and path == rule.pattern:
+            return rule
+        if rule.match == 'prefix' and path.startswith(rule.pattern):
+            return rule
+        if rule.regex is not None and rule.regex.match(path):
+            return rule
+    return None
+
+
+def bench(label, fn, paths):
+    start = time.perf_counter()
+    hits = 0
+    for p in paths:
+        if fn(p) is not None:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<18} {elapsed / len(paths) * 1e6:8.2f} us/lookup  ({hits} hits)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trap rule matcher benchmark')
+    parser.add_argument('--rules', type=int, default=10000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    rules = generate_rules(args.rules)
+    start = time.perf_counter()
+    matcher = TrapMatcher(rules)
+    print(f"\nCompiled {len(matcher)} rules in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    paths = generate_paths(rules, args.lookups)
+    bench('trie matcher', matcher.match, paths)
+
+    linear = [TrapRule(order=i, **r) for i, r in enumerate(rules)]
+    bench('linear scan', lambda p: linear_match(linear, p), paths[:max(1, args.lookups // 100)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+"""
+Load generator - replay captured or synthetic traffic against the honeypot ports
+
+Opens connections at a fixed rate (open loop, bounded concurrency), some of them
+slow clients that trickle their payload, and reports:
+- attempted / accepted / dropped connections (and skipped when the client
+  side itself was saturated)
+- end-to-end capture latency: connect -> attacks row committed (a poller
+  watches the database on its own connection), p50/p90/p99
+- CPU and RSS of the honeypot process over time
+
+By default the honeypot (HoneypotServer + ingest + HoneypotLogger) runs in this
+process on a temporary database. Use --external to load a running app.py or
+capture_daemon.py instead (pass its --db and --pid).
+
+Usage:
+    python benchmarks/load_generator.py --rate 200 --duration 20
+    python benchmarks/load_generator.py --source attacks.json --slow 0.1 --concurrency 500
+    python benchmarks/load_generator.py --external --db database/honeypot.db --pid 1234 --ports 2222,8000
+    python benchmarks/load_generator.py --compare benchmarks/results/load-old.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PORTS = [2222, 2323, 8000, 8443, 33060, 8080, 2121]
+
+# Synthetic mix: (weight, port, payload) - empty payloads are bare probes
+SYNTHETIC = [
+    (30, 2222, b''),
+    (10, 2222, b'SSH-2.0-libssh2_1.9.0\r\n'),
+    (10, 2323, b'root\r\nadmin\r\n'),
+    (15, 8000, b'GET / HTTP/1.1\r\nHost: target\r\nUser-Agent: Mozilla/5.0 zgrab/0.x\r\n\r\n'),
+    (8, 8000, b"GET /products?id=1' OR '1'='1 HTTP/1.1\r\nHost: target\r\nUser-Agent: sqlmap/1.7\r\n\r\n"),
+    (5, 8080, b'GET /search?q=<script>alert(1)</script> HTTP/1.1\r\nHost: target\r\n\r\n'),
+    (5, 8000, b'GET /../../etc/passwd HTTP/1.1\r\nHost: target\r\n\r\n'),
+    (5, 33060, b'\x85\xa6\x03\x00\x00\x00\x00\x01\x21\x00\x00\x00root\x00'),
+    (7, 2121, b'USER anonymous\r\nPASS guest@\r\n'),
+    (5, 8443, b''),
+]
+
+SERVICE_PORTS = {'SSH': 2222, 'Telnet': 2323, 'HTTP': 8000, 'HTTPS': 8443, 'MySQL': 33060,
+                 'HTTP-Alt': 8080, 'FTP': 2121}
+
+
+# ---------- traffic sources ----------
+
+def load_payloads(source, ports):
+    """[(weight, port, payload bytes)] from 'synthetic', a JSON export or db:<path>"""
+    if source == 'synthetic':
+        mix = SYNTHETIC
+    else:
+        if source.startswith('db:'):
+            conn = sqlite3.connect(source[3:])
+            rows = conn.execute('SELECT target_port, service, payload FROM attacks ORDER BY id DESC LIMIT 10000').fetchall()
+            conn.close()
+            records = [{'target_port': p, 'service': s, 'payload': d} for p, s, d in rows]
+        else:
+            with open(source, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        mix = []
+        for record in records:
+            if record.get('service', '').endswith('Trap'):
+                continue  # web-tier trap hits, not honeypot connections
+            port = record.get('target_port')
+            port = port if port in ports else SERVICE_PORTS.get(record.get('service'))
+            mix.append((1, port, (record.get('payload') or '').encode('utf-8', errors='ignore')))
+        if not mix:
+            raise SystemExit(f"No replayable connections in {source}")
+
+    # Remap anything aimed at a port we are not loading
+    return [(w, p if p in ports else random.choice(ports), payload) for w, p, payload in mix]
+
+
+# ---------- honeypot under test ----------
+
+class InProcessHoneypot:
+    """HoneypotServer -> ingest -> HoneypotLogger, wired like app.py, on a temporary database"""
+
+    def __init__(self, ports, sampling):
+        from honeypot_server import HoneypotServer
+        from logger_module import HoneypotLogger
+        from ingest import IngestPipeline, SamplingPolicy
+
+        self.tmpdir = tempfile.mkdtemp(prefix='sentinel-load-')
+        self.db_path = os.path.join(self.tmpdir, 'honeypot.db')
+        self.logger = HoneypotLogger(db_path=self.db_path, log_file=os.path.join(self.tmpdir, 'honeypot.log'))
+        self.ingest = IngestPipeline(
+            lambda event, raw: self.logger.log_attack(event, raw_payload=raw),
+            name='capture-ingest',
+            sampler=SamplingPolicy() if sampling else None,
+            count_handler=self.logger.count_attack
+        )
+        self.server = HoneypotServer(ports=ports, callback=self.on_attack)
+
+    def on_attack(self, attack_data):
+        raw_payload = attack_data.pop('payload_raw', None)
+        self.ingest.submit(attack_data, raw_payload)
+
+    def start(self):
+        self.server.start()
+
+    def stop(self):
+        self.server.stop()
+        self.ingest.join()
+
+
+class CommitWatcher:
+    """Polls the attacks table and matches new rows to pending connections by (source_port, target_port)"""
+
+    def __init__(self, db_path, interval=0.005):
+        self.db_path = db_path
+        self.interval = interval
+        self.pending = {}
+        self.latencies = []
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        conn = sqlite3.connect(db_path)
+        self.last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM attacks').fetchone()[0]
+        conn.close()
+        self._thread = threading.Thread(target=self._run, name='commit-watcher', daemon=True)
+
+    def expect(self, source_port, target_port, connected_at):
+        with self.lock:
+            self.pending[(source_port, target_port)] = connected_at
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        while not self._stop.is_set():
+            rows = conn.execute('SELECT id, source_port, target_port FROM attacks WHERE id > ? ORDER BY id',
+                                (self.last_id,)).fetchall()
+            now = time.perf_counter()
+            if rows:
+                self.last_id = rows[-1][0]
+                with self.lock:
+                    for _, source_port, target_port in rows:
+                        connected_at = self.pending.pop((source_port, target_port), None)
+                        if connected_at is not None:
+                            self.latencies.append(now - connected_at)
+            self._stop.wait(self.interval)
+        conn.close()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, drain=5.0):
+        """Wait up to `drain` seconds for outstanding rows, then stop"""
+        deadline = time.time() + drain
+        while self.pending and time.time() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        self._thread.join()
+
+
+class ResourceSampler:
+    """CPU% and RSS of one process, sampled every interval seconds"""
+
+    def __init__(self, pid, interval=0.5):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+
+    def _run(self):
+        start = time.perf_counter()
+        self.process.cpu_percent(None)
+        while not self._stop.wait(self.interval):
+            with self.process.oneshot():
+                self.samples.append({
+                    't': round(time.perf_counter() - start, 2),
+                    'cpu': self.process.cpu_percent(None),
+                    'rss_mb': round(self.process.memory_info().rss / 1048576, 1),
+                    'threads': self.process.num_threads()
+                })
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# ---------- clients ----------
+
+class LoadStats:
+    def __init__(self):
+        self.attempted = 0
+        self.accepted = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.slow = 0
+        self.errors = {}
+        self.connect_times = []
+
+    def error(self, exc):
+        name = type(exc).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def run_client(host, port, payload, slow, stats, watcher, timeout):
+    """One attacker connection; slow clients trickle their payload"""
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except Exception as e:
+        stats.dropped += 1
+        stats.error(e)
+        return
+    connected = time.perf_counter()
+    stats.connect_times.append(connected - started)
+    if watcher is not None:
+        watcher.expect(writer.get_extra_info('sockname')[1], port, connected)
+    try:
+        if payload:
+            if slow:
+                for i in range(0, len(payload), 8):
+                    writer.write(payload[i:i + 8])
+                    await writer.drain()
+                    await asyncio.sleep(slow)
+            else:
+                writer.write(payload)
+                await writer.drain()
+        # Half-close so the honeypot stops reading and logs the connection
+        writer.write_eof()
+        await asyncio.wait_for(reader.read(), timeout)
+        stats.accepted += 1
+    except Exception as e:
+        stats.dropped += 1
+        stats.error(e)
+    finally:
+        writer.close()
+
+
+async def generate(args, mix, stats, watcher):
+    weights = [w for w, _, _ in mix]
+    rng = random.Random(args.seed)
+    active = set()
+    total = int(args.rate * args.duration)
+    start = time.perf_counter()
+    for i in range(total):
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        stats.attempted += 1
+        if len(active) >= args.concurrency:
+            stats.skipped += 1
+            continue
+        _, port, payload = rng.choices(mix, weights)[0]
+        slow = args.slow_delay if rng.random() < args.slow else 0
+        stats.slow += bool(slow)
+        task = asyncio.ensure_future(run_client(args.host, port, payload, slow, stats, watcher, args.timeout))
+        active.add(task)
+        task.add_done_callback(active.discard)
+    elapsed = time.perf_counter() - start
+    if active:
+        await asyncio.wait(active, timeout=args.timeout * 2)
+    return elapsed
+
+
+# ---------- reporting ----------
+
+def percentiles(values, scale=1000.0):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))] * scale, 2)
+    return {'p50': pct(50), 'p90': pct(90), 'p99': pct(99), 'max': round(ordered[-1] * scale, 2),
+            'mean': round(sum(ordered) / len(ordered) * scale, 2)}
+
+
+def git_version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('version')}):")
+    rows = [
+        ('accepted/s', lambda r: r['results']['accepted_per_sec']),
+        ('dropped', lambda r: r['results']['dropped']),
+        ('capture p50 ms', lambda r: r['results']['capture_latency_ms'].get('p50')),
+        ('capture p99 ms', lambda r: r['results']['capture_latency_ms'].get('p99')),
+        ('cpu avg %', lambda r: r['resources']['cpu_avg']),
+        ('rss max MB', lambda r: r['resources']['rss_max_mb']),
+    ]
+    for label, get in rows:
+        try:
+            old, new = get(baseline), get(current)
+        except (KeyError, TypeError):
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ''
+        print(f"  {label:<16} {old!s:>10} -> {new!s:>10}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Honeypot load generator')
+    parser.add_argument('--rate', type=float, default=100, help='New connections per second')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds to generate load')
+    parser.add_argument('--concurrency', type=int, default=200, help='Max open client connections')
+    parser.add_argument('--slow', type=float, default=0.05, help='Fraction of slow (trickling) clients')
+    parser.add_argument('--slow-delay', type=float, default=0.2, help='Seconds between slow client chunks')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--source', default='synthetic', help="'synthetic', a JSON export (attacks.json) or db:<path>")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--ports', help='Comma-separated honeypot ports (default: the high ports)')
+    parser.add_argument('--external', action='store_true', help='Load an already running honeypot')
+    parser.add_argument('--db', help='Database of the external honeypot (for capture latency)')
+    parser.add_argument('--pid', type=int, help='PID of the external honeypot (for CPU/RSS)')
+    parser.add_argument('--sampling', action='store_true', help='Enable flood sampling in the in-process honeypot')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='Result file (default benchmarks/results/load-<time>.json)')
+    parser.add_argument('--compare', help='Previous result file to compare against')
+    args = parser.parse_args()
+
+    ports = [int(p) for p in args.ports.split(',')] if args.ports else DEFAULT_PORTS
+    mix = load_payloads(args.source, ports)
+
+    honeypot = None
+    db_path, pid = args.db, args.pid
+    if not args.external:
+        with contextlib.redirect_stdout(io.StringIO()):
+            honeypot = InProcessHoneypot(ports, args.sampling)
+            honeypot.start()
+        db_path, pid = honeypot.db_path, os.getpid()
+
+    watcher = CommitWatcher(db_path) if db_path else None
+    sampler = ResourceSampler(pid) if pid else None
+    for part in (watcher, sampler):
+        if part:
+            part.start()
+
+    print(f"Loading {args.host} ports {ports}: {args.rate:g} conn/s for {args.duration:g}s, "
+          f"concurrency {args.concurrency}, {args.slow:.0%} slow clients, source {args.source}")
+    stats = LoadStats()
+    # The honeypot prints every connection; keep the console (and its cost) out of the measurement
+    with contextlib.redirect_stdout(io.StringIO()) if honeypot else contextlib.nullcontext():
+        elapsed = asyncio.run(generate(args, mix, stats, watcher))
+        if watcher:
+            watcher.stop()
+        if honeypot:
+            honeypot.stop()
+    if sampler:
+        sampler.stop()
+
+    latencies = watcher.latencies if watcher else []
+    samples = sampler.samples if sampler else []
+    result = {
+        'version': git_version(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'config': {k: v for k, v in vars(args).items() if k not in ('out', 'compare')},
+        'results': {
+            'attempted': stats.attempted,
+            'accepted': stats.accepted,
+            'dropped': stats.dropped,
+            'skipped': stats.skipped,
+            'slow_clients': stats.slow,
+            'errors': stats.errors,
+            'elapsed': round(elapsed, 2),
+            'accepted_per_sec': round(stats.accepted / elapsed, 1) if elapsed else 0,
+            'committed': len(latencies),
+            'uncommitted': len(watcher.pending) if watcher else None,
+            'connect_ms': percentiles(stats.connect_times),
+            'capture_latency_ms': percentiles(latencies)
+        },
+        'resources': {
+            'cpu_avg': round(sum(s['cpu'] for s in samples) / len(samples), 1) if samples else None,
+            'cpu_max': max((s['cpu'] for s in samples), default=None),
+            'rss_max_mb': max((s['rss_mb'] for s in samples), default=None),
+            'threads_max': max((s['threads'] for s in samples), default=None),
+            'timeline': samples
+        }
+    }
+    if honeypot:
+        result['results']['ingest'] = honeypot.ingest.status()
+
+    r = result['results']
+    print(f"\n  attempted {r['attempted']}, accepted {r['accepted']} ({r['accepted_per_sec']}/s), "
+          f"dropped {r['dropped']}, skipped {r['skipped']}")
+    if r['errors']:
+        print(f"  errors: {r['errors']}")
+    print(f"  connect       {r['connect_ms']}")
+    print(f"  capture (ms)  {r['capture_latency_ms']}  committed {r['committed']}, uncommitted {r['uncommitted']}")
+    res = result['resources']
+    print(f"  cpu avg {res['cpu_avg']}% max {res['cpu_max']}%, rss max {res['rss_max_mb']} MB, "
+          f"threads max {res['threads_max']}")
+
+    out = args.out or os.path.join(ROOT, 'benchmarks', 'results',
+                                   f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n[✓] Results saved to {out}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Capture Daemon - Standalone honeypot capture process
+Runs HoneypotServer + HoneypotLogger and publishes events on the local event bus,
+so the web dashboard can restart (or crash) without interrupting capture.
+
+Usage:
+    python capture_daemon.py                 # default bus address, high ports
+    python capture_daemon.py --bus tcp:127.0.0.1:5055 --ports 2222,8000
+    SENTINEL_EVENT_BUS=unix:/run/sentinel/events.sock python app.py
+    SENTINEL_BUS_TOKEN=<secret> python capture_daemon.py --bus tcp:127.0.0.1:5055
+"""
+import argparse
+import signal
+import threading
+import time
+from datetime import datetime
+
+from logger_module import HoneypotLogger
+from honeypot_server import HoneypotServer
+from event_bus import EventBusPublisher
+from ingest import IngestPipeline, SamplingPolicy
+from scan_detector import ScanDetector
+from threat_intel import ThreatIntel
+from profiler import StartupTimer
+from shipper import EventShipper
+
+
+class CaptureDaemon:
+    """
+    Capture process:
+    - Owns the honeypot listeners and all attack writes to the database
+    - Publishes every attack to bus subscribers before logging it
+    - Publishes a status heartbeat (running, ports, pending alerts)
+    - Answers control commands: start, stop, status, log, ack_alerts, clear
+    """
+
+    def __init__(self, address=None, ports=None, use_high_ports=True, heartbeat=1.0):
+        """Initialize daemon (listeners are started with start_capture())"""
+        self.startup = StartupTimer()
+        self.startup.mark('imports')
+        self.logger = HoneypotLogger()
+        self.startup.mark('database')
+        self.bus = EventBusPublisher(address, command_handler=self.handle_command)
+        self.ingest = IngestPipeline(
+            self._store_attack,
+            name='capture-ingest',
+            sampler=SamplingPolicy.from_env(),
+            count_handler=self.logger.count_attack
+        )
+        self.scan_detector = ScanDetector.from_env(on_scan=self.on_scan_detected)
+        self.threat_intel = ThreatIntel.from_env()
+        self.threat_intel.start()
+        self.shipper = EventShipper.from_env()
+        if self.shipper is not None:
+            self.logger.add_store_hook(self.shipper.submit)
+            self.shipper.start()
+        self.ports = ports
+        self.use_high_ports = use_high_ports
+        self.heartbeat = heartbeat
+        self.honeypot = None
+        self.lock = threading.Lock()
+        self.is_running = False
+        self.startup.mark('components')
+
+    # ---------- capture ----------
+
+    def on_attack_detected(self, attack_data):
+        """HoneypotServer callback: publish first, then persist (sampled under flood)"""
+        raw_payload = attack_data.pop('payload_raw', None)
+        attack_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        scan_id = self.scan_detector.observe(attack_data)
+        if scan_id:
+            attack_data['scan_id'] = scan_id
+        self.bus.publish_event(attack_data)
+        self.ingest.submit(attack_data, raw_payload)
+
+    def on_scan_detected(self, scan_event):
+        self.bus.publish_event(scan_event)
+        self.ingest.submit(scan_event)
+
+    def _store_attack(self, attack_data, raw_payload=None):
+        self.logger.log_attack(attack_data, raw_payload=raw_payload)
+
+    def start_capture(self, ports=None, use_high_ports=None):
+        """Start the honeypot listeners, returns the same payload as /api/start_honeypot"""
+        with self.lock:
+            if self.honeypot and self.honeypot.is_running:
+                return {'status': 'info', 'message': 'Already running', 'ports': self.honeypot.ports}
+
+            if use_high_ports is None:
+                use_high_ports = self.use_high_ports
+            ports = ports or self.ports
+            self.honeypot = HoneypotServer(
+                ports=ports,
+                callback=self.on_attack_detected,
+                use_high_ports=use_high_ports,
+                threat_intel=self.threat_intel
+            )
+            self.honeypot.start()
+            return {'status': 'success', 'message': 'Honeypot started!', 'ports': self.honeypot.ports}
+
+    def stop_capture(self):
+        """Stop the honeypot listeners"""
+        with self.lock:
+            if self.honeypot and self.honeypot.is_running:
+                self.honeypot.stop()
+                return {'status': 'success', 'message': 'Honeypot stopped'}
+            return {'status': 'info', 'message': 'Not running'}
+
+    def status(self):
+        running = bool(self.honeypot and self.honeypot.is_running)
+        return {
+            'kind': 'status',
+            'running': running,
+            'ports': self.honeypot.ports if running else [],
+            'connections': self.honeypot.connection_count if self.honeypot else 0,
+            'pending_alerts': self.logger.get_pending_alert_count(),
+            'ingest': self.ingest.status(),
+            'active_scans': self.scan_detector.active_scans()[:50],
+            'published': self.bus.published,
+            'subscribers': len(self.bus.subscribers),
+            'startup': self.startup.summary(),
+            'shipper': self.shipper.status() if self.shipper is not None else None,
+            'ts': time.time()
+        }
+
+    # ---------- control ----------
+
+    def handle_command(self, cmd, args):
+        """Bus command handler (runs on the subscriber's reader thread)"""
+        if cmd == 'start':
+            return self.start_capture(args.get('ports'), args.get('use_high_ports'))
+        if cmd == 'stop':
+            return self.stop_capture()
+        if cmd == 'status':
+            return self.status()
+        if cmd == 'log':
+            # Events captured by the web tier (trap endpoints) - daemon stays the only writer.
+            # Retries after a timeout carry the same event_id and are not stored twice
+            attack_data = dict(args.get('attack') or {})
+            if attack_data.get('event_id'):
+                existing = self.logger.find_event(attack_data['event_id'])
+                if existing is not None:
+                    return {'id': existing, 'duplicate': True}
+            self.bus.publish_event(attack_data)
+            return {'id': self.logger.log_attack(attack_data)}
+        if cmd == 'count':
+            # Trap hits the web tier could not queue: counters and alerts only, no row
+            attack_data = dict(args.get('attack') or {})
+            self.bus.publish_event(attack_data)
+            self.logger.count_attack(attack_data)
+            return {'counted': True}
+        if cmd == 'ack_alerts':
+            # Acks go through the daemon so its alert aggregator closes the groups
+            count = self.logger.acknowledge_alerts(alert_ids=args.get('alert_ids'), source_ip=args.get('source_ip'),
+                                                   alert_type=args.get('alert_type'))
+            if count is None:
+                raise RuntimeError('Failed to acknowledge alerts')
+            return count
+        if cmd == 'clear':
+            self.scan_detector.clear()
+            self.logger.clear_all_data()
+            return {'status': 'success'}
+        raise ValueError(f"Unknown command: {cmd}")
+
+    # ---------- lifecycle ----------
+
+    def _heartbeat_loop(self):
+        while self.is_running:
+            self.bus.publish(self.status())
+            time.sleep(self.heartbeat)
+
+    def run(self, autostart=True):
+        """Serve until stop() is called"""
+        self.bus.start()
+        self.is_running = True
+        threading.Thread(target=self._heartbeat_loop, name='bus-heartbeat', daemon=True).start()
+        self.scan_detector.start()
+        if autostart:
+            try:
+                self.start_capture()
+            except PermissionError:
+                print("[!] Permission denied. Use high ports or run as Administrator.")
+            self.startup.mark('listeners')
+        self.startup.done()
+
+        while self.is_running:
+            time.sleep(0.5)
+
+        self.stop_capture()
+        self.bus.stop()
+        if self.shipper is not None:
+            self.shipper.close()
+        self.logger.flush_attackers()
+
+    def stop(self, *_):
+        self.is_running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentinel Honeypot capture daemon')
+    parser.add_argument('--bus', help='Event bus address (unix:/path or tcp:host:port), default SENTINEL_EVENT_BUS')
+    parser.add_argument('--ports', help='Comma-separated ports to listen on')
+    parser.add_argument('--standard-ports', action='store_true', help='Use standard ports (requires admin)')
+    parser.add_argument('--no-autostart', action='store_true', help='Wait for a start command from the dashboard')
+    args = parser.parse_args()
+
+    ports = [int(p) for p in args.ports.split(',')] if args.ports else None
+    daemon = CaptureDaemon(address=args.bus, ports=ports, use_high_ports=not args.standard_ports)
+
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+
+    print("\n" + "="*60)
+    print("🛡️  SENTINEL CAPTURE DAEMON")
+    print("="*60)
+    print(f"Event bus: {daemon.bus.address}")
+    print("="*60)
+    print("\nPress CTRL+C to stop\n")
+
+    daemon.run(autostart=not args.no_autostart)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Collector - Central store for events shipped by remote sensors
+Accepts shipper.py frames over TCP, verifies and decompresses them, skips events
+it already holds (per sensor and event id) and bulk-loads the rest into its own
+HoneypotLogger database.
+
+Sensors prove they hold SENTINEL_COLLECTOR_TOKEN with the event bus hello handshake.
+
+Usage:
+    python collector.py                                   # tcp:127.0.0.1:5070 -> database/collector.db
+    SENTINEL_COLLECTOR_TOKEN=secret python collector.py --listen tcp:0.0.0.0:5070 --db database/collector.db
+    SENTINEL_COLLECTOR=tcp:10.0.0.5:5070 SENTINEL_COLLECTOR_TOKEN=secret SENTINEL_SENSOR_ID=sensor-1 python capture_daemon.py
+"""
+import argparse
+import signal
+import socket
+import threading
+import time
+
+from logger_module import HoneypotLogger
+from event_bus import check_hello, encode_frame, parse_address
+from shipper import FrameChecksumError, collector_token, read_batch
+
+DEFAULT_LISTEN = 'tcp:127.0.0.1:5070'
+
+
+class Collector:
+    """
+    Collector server:
+    - With a token, each sensor connection must open with a matching hello
+      frame (as on the event bus); others are closed before any frame is read
+    - One reader thread per connected sensor; frames from a sensor are
+      handled strictly in order
+    - A frame is acknowledged only after its events are committed, so the
+      sensor resends anything that was in flight when the collector died
+    - Damaged frames and failed imports are rejected (the sensor retries);
+      a stream that is not a shipper stream is dropped
+    - Per-sensor counters: frames, events, duplicates, last seen
+    """
+
+    def __init__(self, address=DEFAULT_LISTEN, logger=None, token=None):
+        """Initialize collector (listens once start() is called, token defaults to collector_token())"""
+        self.address = address
+        self.token = token or collector_token()
+        self.logger = logger or HoneypotLogger(db_path='database/collector.db', log_file='logs/collector.log')
+        self.sensors = {}
+        self.lock = threading.Lock()
+        self.sock = None
+        self.is_running = False
+        self.rejected = 0
+        self.refused = 0
+
+    def start(self):
+        """Bind the listen socket and start accepting sensors"""
+        family, sockaddr = parse_address(self.address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(sockaddr)
+        self.sock.listen(64)
+        self.is_running = True
+        threading.Thread(target=self._accept_loop, name='collector-accept', daemon=True).start()
+        print(f"[✓] Collector listening on {self.address}")
+        if not self.token and family == socket.AF_INET and sockaddr[0] not in ('127.0.0.1', 'localhost'):
+            print("[!] No SENTINEL_COLLECTOR_TOKEN set - any host that can reach this port can write events")
+
+    def stop(self, *_):
+        self.is_running = False
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+    def status(self):
+        with self.lock:
+            sensors = {name: dict(s) for name, s in self.sensors.items()}
+        return {'listen': self.address, 'sensors': sensors, 'rejected': self.rejected, 'refused': self.refused}
+
+    def _accept_loop(self):
+        while self.is_running:
+            try:
+                conn, peer = self.sock.accept()
+            except OSError:
+                break
+            peer = f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else 'local'
+            threading.Thread(target=self._serve, args=(conn, peer), name=f"collector-{peer}", daemon=True).start()
+
+    def _serve(self, conn, peer):
+        """Read, import and acknowledge one sensor's frames until it disconnects"""
+        reader = conn.makefile('rb')
+        if self.token and not check_hello(conn, reader, self.token):
+            self.refused += 1
+            print(f"[!] Sensor connection {peer} refused: bad or missing token")
+            conn.close()
+            return
+        try:
+            while self.is_running:
+                try:
+                    batch = read_batch(reader)
+                except FrameChecksumError as e:
+                    self.rejected += 1
+                    conn.sendall(encode_frame({'ok': False, 'error': str(e)}))
+                    continue
+                if batch is None:
+                    break
+                conn.sendall(encode_frame(self._import(batch, peer)))
+        except (OSError, ValueError) as e:
+            print(f"[!] Sensor connection {peer} dropped: {e}")
+        finally:
+            conn.close()
+
+    def _import(self, batch, peer):
+        """Store one batch, returns the ack (or rejection) sent back to the sensor"""
+        sensor_id = batch.get('sensor_id') or peer
+        events = batch.get('events') or []
+        for event in events:
+            event['sensor_id'] = sensor_id  # the frame's sensor is authoritative
+        try:
+            inserted, duplicates = self.logger.import_attacks(events)
+        except Exception as e:
+            self.rejected += 1
+            return {'ok': False, 'batch_id': batch.get('batch_id'), 'error': str(e)}
+
+        with self.lock:
+            stats = self.sensors.get(sensor_id)
+            if stats is None:
+                stats = self.sensors[sensor_id] = {'frames': 0, 'events': 0, 'duplicates': 0}
+                print(f"[✓] New sensor '{sensor_id}' from {peer}")
+            stats['frames'] += 1
+            stats['events'] += inserted
+            stats['duplicates'] += duplicates
+            stats['peer'] = peer
+            stats['last_seen'] = time.time()
+        return {'ok': True, 'batch_id': batch.get('batch_id'), 'inserted': inserted, 'duplicates': duplicates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentinel Honeypot multi-sensor collector')
+    parser.add_argument('--listen', default=DEFAULT_LISTEN, help=f"Listen address (tcp:host:port), default {DEFAULT_LISTEN}")
+    parser.add_argument('--db', default='database/collector.db', help='Collector database path')
+    parser.add_argument('--log', default='logs/collector.log', help='Collector JSON log file')
+    parser.add_argument('--report', type=float, default=60, help='Seconds between per-sensor summaries (0 = off)')
+    args = parser.parse_args()
+
+    collector = Collector(args.listen, HoneypotLogger(db_path=args.db, log_file=args.log))
+    signal.signal(signal.SIGINT, collector.stop)
+    signal.signal(signal.SIGTERM, collector.stop)
+
+    print("\n" + "="*60)
+    print("🛡️  SENTINEL COLLECTOR")
+    print("="*60)
+    print(f"Listening: {args.listen}")
+    print(f"Database:  {args.db}")
+    print("="*60)
+    print("\nPress CTRL+C to stop\n")
+
+    collector.start()
+    last_report = time.monotonic()
+    while collector.is_running:
+        time.sleep(0.5)
+        if args.report and time.monotonic() - last_report >= args.report:
+            last_report = time.monotonic()
+            for sensor_id, s in collector.status()['sensors'].items():
+                print(f"[*] {sensor_id}: {s['events']} events, {s['duplicates']} duplicates, {s['frames']} frames")
+    collector.logger.flush_attackers()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+"""
+Event Bus - Local publish/subscribe link between the capture daemon and the web app
+Length-prefixed JSON frames over a Unix domain socket (TCP on localhost as fallback)
+The Unix socket lives in a private per-user directory; SENTINEL_BUS_TOKEN adds a
+shared-secret handshake, which TCP needs before destructive commands are accepted.
+"""
+import hmac
+import itertools
+import json
+import os
+import queue
+import socket
+import stat
+import struct
+import tempfile
+import threading
+import time
+
+
+HEADER = struct.Struct('!I')
+MAX_FRAME = 16 * 1024 * 1024
+
+# Daemon-side exceptions re-raised as the same type by EventBusSubscriber.request()
+REMOTE_ERRORS = {'PermissionError': PermissionError, 'ValueError': ValueError}
+
+if hasattr(socket, 'AF_UNIX'):
+    DEFAULT_ADDRESS = 'unix:' + os.path.join(tempfile.gettempdir(), f"sentinel-{os.getuid()}", 'events.sock')
+else:
+    DEFAULT_ADDRESS = 'tcp:127.0.0.1:5055'
+
+# Commands refused on a connection that has not proven it holds the bus token,
+# unless it is a Unix socket (already limited to this user by file permissions)
+DESTRUCTIVE_COMMANDS = {'clear'}
+HELLO_TIMEOUT = 5.0
+
+
+def bus_address():
+    """Bus address from SENTINEL_EVENT_BUS (unix:/path or tcp:host:port)"""
+    return os.environ.get('SENTINEL_EVENT_BUS') or DEFAULT_ADDRESS
+
+
+def bus_token():
+    """Shared secret from SENTINEL_BUS_TOKEN (None when unset)"""
+    return os.environ.get('SENTINEL_BUS_TOKEN') or None
+
+
+def _private_socket_dir(path):
+    """Create the socket's directory owner-only (0700) and refuse one others can write to"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"Event bus directory {directory} must be owned by this user and not "
+                              f"group/world writable")
+
+
+def parse_address(address):
+    """Split a bus address into (family, sockaddr)"""
+    kind, _, rest = address.partition(':')
+    if kind == 'unix':
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError('Unix domain sockets are not available on this platform')
+        return socket.AF_UNIX, rest
+    if kind == 'tcp':
+        host, _, port = rest.rpartition(':')
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    raise ValueError(f"Invalid event bus address: {address}")
+
+
+def encode_frame(message):
+    """Serialize one message to a length-prefixed frame"""
+    body = json.dumps(message, default=str, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+
+def read_frame(reader):
+    """Read one message from a buffered reader, None on EOF"""
+    header = reader.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame too large: {length} bytes")
+    body = reader.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+def check_hello(conn, reader, token):
+    """Read the opening hello frame and compare its token in constant time"""
+    try:
+        conn.settimeout(HELLO_TIMEOUT)
+        hello = read_frame(reader)
+        conn.settimeout(None)
+    except (OSError, ValueError):
+        return False
+    offered = hello.get('token') if isinstance(hello, dict) and hello.get('kind') == 'hello' else None
+    return isinstance(offered, str) and hmac.compare_digest(offered.encode(), token.encode())
+
+
+class _Subscriber:
+    """Publisher-side state for one connected subscriber"""
+
+    def __init__(self, sock, max_queue):
+        self.sock = sock
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.alive = True
+        self.trusted = False  # token checked, or a Unix socket
+
+
+class EventBusPublisher:
+    """
+    Capture-side end of the bus:
+    - Accepts any number of subscribers (web app, shippers, benchmarks)
+    - Each event is serialized once and queued to every subscriber
+    - Bounded per-subscriber queues: slow subscribers drop events
+      instead of stalling capture
+    - Optional command handler for control requests (start/stop/status)
+    - Unix socket is 0600 in an owner-only directory; with a token every
+      connection must open with a matching hello frame, and without one
+      destructive commands are refused over TCP
+    """
+
+    def __init__(self, address=None, command_handler=None, max_queue=10000, token=None):
+        """Initialize publisher on address (defaults to bus_address(), token to bus_token())"""
+        self.address = address or bus_address()
+        self.token = token or bus_token()
+        self.command_handler = command_handler
+        self.max_queue = max_queue
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.sock = None
+        self.is_running = False
+        self.published = 0
+
+    def start(self):
+        """Bind the bus socket and start accepting subscribers"""
+        family, sockaddr = parse_address(self.address)
+        self.unix = family == getattr(socket, 'AF_UNIX', None)
+        if self.unix:
+            _private_socket_dir(sockaddr)
+            if os.path.exists(sockaddr):
+                os.unlink(sockaddr)
+
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.unix:
+            umask = os.umask(0o177)  # socket file created 0600
+            try:
+                self.sock.bind(sockaddr)
+            finally:
+                os.umask(umask)
+            os.chmod(sockaddr, 0o600)
+        else:
+            self.sock.bind(sockaddr)
+        self.sock.listen(16)
+        self.is_running = True
+
+        threading.Thread(target=self._accept_loop, name='bus-accept', daemon=True).start()
+        print(f"[✓] Event bus publishing on {self.address}")
+
+    def stop(self):
+        """Close the bus socket and all subscribers"""
+        self.is_running = False
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+        with self.lock:
+            for sub in self.subscribers:
+                sub.alive = False
+                try:
+                    sub.sock.close()
+                except Exception:
+                    pass
+            self.subscribers.clear()
+        family, sockaddr = parse_address(self.address)
+        if family == getattr(socket, 'AF_UNIX', None) and os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+
+    def publish(self, message):
+        """Queue a message for every subscriber (never blocks)"""
+        frame = encode_frame(message)
+        self.published += 1
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(frame)
+            except queue.Full:
+                sub.dropped += 1
+
+    def publish_event(self, event):
+        self.publish({'kind': 'event', 'data': event})
+
+    def _accept_loop(self):
+        while self.is_running:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._admit, args=(conn,), name='bus-reader', daemon=True).start()
+
+    def _admit(self, conn):
+        """Check the hello frame (when a token is set), then serve the subscriber"""
+        sub = _Subscriber(conn, self.max_queue)
+        reader = conn.makefile('rb')
+        if self.token:
+            if not check_hello(conn, reader, self.token):
+                print("[!] Event bus connection rejected: bad or missing token")
+                conn.close()
+                return
+            sub.trusted = True
+        else:
+            sub.trusted = self.unix
+        with self.lock:
+            self.subscribers.append(sub)
+        threading.Thread(target=self._writer, args=(sub,), name='bus-writer', daemon=True).start()
+        self._reader(sub, reader)
+
+    def _drop(self, sub):
+        sub.alive = False
+        with self.lock:
+            if sub in self.subscribers:
+                self.subscribers.remove(sub)
+        try:
+            sub.sock.close()
+        except Exception:
+            pass
+
+    def _writer(self, sub):
+        """Send queued frames, coalescing whatever is already waiting into one write"""
+        while sub.alive:
+            try:
+                frames = [sub.queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+            try:
+                while len(frames) < 256:
+                    frames.append(sub.queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                sub.sock.sendall(b''.join(frames))
+            except OSError:
+                self._drop(sub)
+
+    def _reader(self, sub, reader):
+        """Handle command requests from a subscriber"""
+        try:
+            while sub.alive:
+                msg = read_frame(reader)
+                if msg is None:
+                    break
+                if msg.get('kind') != 'cmd':
+                    continue
+                try:
+                    if self.command_handler is None:
+                        raise RuntimeError('No command handler')
+                    if msg.get('cmd') in DESTRUCTIVE_COMMANDS and not sub.trusted:
+                        raise PermissionError(f"'{msg.get('cmd')}' over TCP requires SENTINEL_BUS_TOKEN")
+                    result = self.command_handler(msg.get('cmd'), msg.get('args') or {})
+                    reply = {'kind': 'reply', 'id': msg.get('id'), 'ok': True, 'result': result}
+                except Exception as e:
+                    reply = {'kind': 'reply', 'id': msg.get('id'), 'ok': False,
+                             'error': str(e), 'error_type': type(e).__name__}
+                try:
+                    sub.queue.put(encode_frame(reply), timeout=1)
+                except queue.Full:
+                    sub.dropped += 1
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._drop(sub)
+
+
+class EventBusSubscriber:
+    """
+    Web-side end of the bus:
+    - Connects in the background and reconnects with backoff, so either
+      process can restart independently
+    - Dispatches events and status heartbeats to callbacks
+    - request() sends a control command and waits for the reply
+    - Opens with a hello frame carrying the bus token, when one is set
+    """
+
+    def __init__(self, address=None, on_event=None, on_status=None, on_connect=None, token=None):
+        """Initialize subscriber for address (defaults to bus_address(), token to bus_token())"""
+        self.address = address or bus_address()
+        self.token = token or bus_token()
+        self.on_event = on_event
+        self.on_status = on_status
+        self.on_connect = on_connect
+        self.sock = None
+        self.connected = False
+        self.last_status = {}
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        """Start the background connect/read loop"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='bus-subscriber', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        if self.sock:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+
+    def wait_connected(self, timeout=5.0):
+        """Block until connected (True) or timeout (False)"""
+        deadline = time.time() + timeout
+        while not self.connected and time.time() < deadline:
+            time.sleep(0.01)
+        return self.connected
+
+    def _run(self):
+        backoff = 0.2
+        while not self._stopped:
+            family, sockaddr = parse_address(self.address)
+            try:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.connect(sockaddr)
+                if self.token:
+                    sock.sendall(encode_frame({'kind': 'hello', 'token': self.token}))
+            except OSError:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+
+            backoff = 0.2
+            self.sock = sock
+            self.connected = True
+            print(f"[✓] Connected to capture daemon at {self.address}")
+            if self.on_connect:
+                self.on_connect()
+            try:
+                self._read_loop(sock.makefile('rb'))
+            except (OSError, ValueError) as e:
+                if not self._stopped:
+                    print(f"[!] Event bus error: {e}")
+            finally:
+                self.connected = False
+                self.sock = None
+                try:
+                    sock.close()
+                except Exception:
+                    pass
+                for waiter in list(self._pending.values()):
+                    waiter['reply'] = {'ok': False, 'error': 'Capture daemon disconnected'}
+                    waiter['event'].set()
+            if not self._stopped:
+                print("[!] Capture daemon connection lost - reconnecting")
+
+    def _read_loop(self, reader):
+        while not self._stopped:
+            msg = read_frame(reader)
+            if msg is None:
+                return
+            kind = msg.get('kind')
+            if kind == 'event':
+                if self.on_event:
+                    try:
+                        self.on_event(msg.get('data') or {})
+                    except Exception as e:
+                        print(f"[!] Event handler error: {e}")
+            elif kind == 'status':
+                self.last_status = msg
+                if self.on_status:
+                    self.on_status(msg)
+            elif kind == 'reply':
+                waiter = self._pending.get(msg.get('id'))
+                if waiter:
+                    waiter['reply'] = msg
+                    waiter['event'].set()
+
+    def request(self, cmd, args=None, timeout=10.0):
+        """Send a control command to the daemon and wait for its reply"""
+        sock = self.sock
+        if sock is None:
+            raise ConnectionError('Capture daemon is not connected')
+        req_id = next(self._ids)
+        waiter = {'event': threading.Event(), 'reply': None}
+        self._pending[req_id] = waiter
+        try:
+            with self._send_lock:
+                sock.sendall(encode_frame({'kind': 'cmd', 'id': req_id, 'cmd': cmd, 'args': args or {}}))
+            if not waiter['event'].wait(timeout):
+                raise TimeoutError(f"No reply to '{cmd}' from capture daemon")
+            reply = waiter['reply']
+            if not reply.get('ok'):
+                error = REMOTE_ERRORS.get(reply.get('error_type'), RuntimeError)
+                raise error(reply.get('error', 'Command failed'))
+            return reply.get('result')
+        finally:
+            self._pending.pop(req_id, None)
@@ -0,0 +1,129 @@
+"""
+Event Emitter - Batched, coalesced Socket.IO push for the dashboard
+Turns a flood of per-attack events into a few bounded frames per second
+"""
+import os
+import threading
+import time
+from collections import deque
+
+
+class BatchEmitter:
+    """
+    Coalescing Socket.IO emitter:
+    - Events are buffered and emitted as one batch frame per interval
+    - Batch size is capped; excess events are reported as an overflow count
+    - Each frame is broadcast once (encoded once for all clients)
+    - Clients ack frames; a client with max_lag frames sent but not acked
+      is skipped until it acks the last frame it was sent (it then sees a
+      seq gap and catches up from /api/recent) instead of buffering without bound
+    """
+
+    def __init__(self, socketio, event='attack_batch', interval=None, max_batch=200, max_lag=8):
+        """Initialize emitter (interval in seconds, default SENTINEL_EMIT_INTERVAL_MS or 250 ms)"""
+        if interval is None:
+            interval = float(os.environ.get('SENTINEL_EMIT_INTERVAL_MS', 250)) / 1000.0
+        self.socketio = socketio
+        self.event = event
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_lag = max_lag
+
+        self.lock = threading.Lock()
+        self._pending = deque(maxlen=max_batch)
+        self._received = 0
+        self._clients = {}  # sid -> [last acked seq, last sent seq]
+        self._hooks = []
+        self._started = False
+
+        self.seq = 0
+        self.stats = {'events': 0, 'frames': 0, 'overflow': 0, 'skipped_frames': 0}
+
+    # ---------- producer side ----------
+
+    def push(self, event):
+        """Queue one event for the next batch (O(1), never blocks on clients)"""
+        with self.lock:
+            self._pending.append(event)
+            self._received += 1
+
+    def add_flush_hook(self, hook):
+        """Call hook() on every tick after the batch is sent (e.g. stats deltas)"""
+        self._hooks.append(hook)
+
+    # ---------- client tracking ----------
+
+    def add_client(self, sid):
+        with self.lock:
+            self._clients[sid] = [self.seq, self.seq]
+
+    def remove_client(self, sid):
+        with self.lock:
+            self._clients.pop(sid, None)
+
+    def ack(self, sid, seq):
+        """Record that client sid finished rendering frame seq"""
+        with self.lock:
+            client = self._clients.get(sid)
+            if client is not None and isinstance(seq, int):
+                client[0] = max(client[0], min(seq, client[1]))
+
+    # ---------- flushing ----------
+
+    def start(self):
+        """Start the background flush loop (idempotent)"""
+        with self.lock:
+            if self._started:
+                return
+            self._started = True
+        self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[!] Emitter flush error: {e}")
+
+    def flush(self):
+        """Emit pending events as a single frame, returns the frame or None"""
+        with self.lock:
+            if self._received:
+                events = list(self._pending)
+                overflow = self._received - len(events)
+                self._pending.clear()
+                self._received = 0
+
+                self.seq += 1
+                frame = {
+                    'seq': self.seq,
+                    'events': events,
+                    'count': len(events) + overflow,
+                    'overflow': overflow,
+                    'ts': time.time()
+                }
+                # Lag counts frames actually sent, so a skipped client resumes once it acks them
+                slow = []
+                for sid, client in self._clients.items():
+                    if client[1] - client[0] >= self.max_lag:
+                        slow.append(sid)
+                    else:
+                        client[1] = self.seq
+            else:
+                frame = None
+
+        if frame is not None:
+            self.stats['events'] += frame['count']
+            self.stats['frames'] += 1
+            self.stats['overflow'] += frame['overflow']
+            self.stats['skipped_frames'] += len(slow)
+            self.socketio.emit(self.event, frame, skip_sid=slow or None)
+
+        for hook in self._hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"[!] Emitter hook error: {e}")
+
+        return frame
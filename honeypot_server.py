@@ -1,25 +1,58 @@
 """
 Honeypot Server - Enhanced Vulnerable Service Simulator
-Listens on multiple ports and logs connection attempts with detailed analysis
+Listens on multiple ports and logs connection attempts with detailed analysis;
+every connection is a protocol_handlers emulator driven by one event loop thread;
+finished connections are reported to the callback from a separate thread
 """
+import errno
+import queue
+import selectors
 import socket
+import sys
 import threading
 import time
 from datetime import datetime
 import re
 
+from protocol_handlers import create_handler
+
+
+class _Connection:
+    """State of one open client connection (the handler holds the protocol state)"""
+    __slots__ = ('sock', 'port', 'handler', 'attack_data', 'received', 'out', 'events', 'deadline', 'started')
+
+    def __init__(self, sock, port, handler, attack_data, deadline):
+        self.sock = sock
+        self.port = port
+        self.handler = handler
+        self.attack_data = attack_data
+        self.received = bytearray()
+        self.out = bytearray()
+        self.events = selectors.EVENT_READ
+        self.deadline = deadline
+        self.started = time.monotonic()
+
 
 class HoneypotServer:
     """
     Enhanced Honeypot Server with:
     - High port support (no admin needed)
-    - Multiple service simulation
+    - Multiple service simulation (stateful emulators, see protocol_handlers)
+    - Non-blocking: one selector thread serves every port and connection
+    - Captured credentials and commands
     - Payload analysis and attack classification
     - Severity detection
     - User-agent extraction
+    - Known-bad source tagging (threat intel feeds)
     """
     
-    def __init__(self, ports=None, callback=None, use_high_ports=True):
+    IDLE_TIMEOUT = 5       # seconds without client data before the connection is logged
+    SESSION_LIMIT = 60     # longest a single connection is kept open
+    MAX_CAPTURE = 10000    # bytes of client data kept as the payload
+    REPORT_QUEUE = 10000   # finished connections waiting for the callback
+    
+    def __init__(self, ports=None, callback=None, use_high_ports=True, threat_intel=None, handlers=None,
+                 max_connections=None):
         """Initialize honeypot server"""
         
         # Port mapping (high port -> standard port it simulates)
@@ -45,39 +78,20 @@ class HoneypotServer:
             self.ports = ports
             
         self.callback = callback
+        self.threat_intel = threat_intel
+        self.handlers = handlers  # service -> ProtocolHandler class (default protocol_handlers.HANDLERS)
         self.is_running = False
-        self.threads = []
+        self.thread = None
+        self.reporter = None
+        self.reports = queue.Queue(maxsize=self.REPORT_QUEUE)
+        self.reports_dropped = 0
+        self.selector = None
         self.sockets = []
+        self.connections = {}  # fd -> _Connection, oldest first
+        # select() on Windows is limited to 512 sockets
+        self.max_connections = max_connections or (448 if sys.platform == 'win32' else 10000)
         self.connection_count = 0
-        self.lock = threading.Lock()
-        
-        # Service banners
-        self.banners = {
-            # SSH
-            22: b"SSH-2.0-OpenSSH_7.4p1 Ubuntu-10\r\n",
-            2222: b"SSH-2.0-OpenSSH_7.4p1 Ubuntu-10\r\n",
-            # Telnet
-            23: b"\r\n\r\nWelcome to Microsoft Telnet Service\r\n\r\nlogin: ",
-            2323: b"\r\n\r\nWelcome to Microsoft Telnet Service\r\n\r\nlogin: ",
-            # HTTP
-            80: b"HTTP/1.1 200 OK\r\nServer: Apache/2.4.41 (Ubuntu)\r\nContent-Type: text/html\r\n\r\n<html><head><title>Welcome</title></head><body><h1>It works!</h1></body></html>",
-            8000: b"HTTP/1.1 200 OK\r\nServer: Apache/2.4.41 (Ubuntu)\r\nContent-Type: text/html\r\n\r\n<html><head><title>Welcome</title></head><body><h1>It works!</h1></body></html>",
-            # HTTPS
-            443: b"HTTP/1.1 200 OK\r\nServer: nginx/1.18.0\r\n\r\n",
-            8443: b"HTTP/1.1 200 OK\r\nServer: nginx/1.18.0\r\n\r\n",
-            # MySQL
-            3306: b"J\x00\x00\x00\x0a5.7.32-0ubuntu0.18.04.1\x00",
-            33060: b"J\x00\x00\x00\x0a5.7.32-0ubuntu0.18.04.1\x00",
-            # FTP
-            21: b"220 Microsoft FTP Service\r\n",
-            2121: b"220 Microsoft FTP Service\r\n",
-            # HTTP Proxy / Tomcat
-            8080: b"HTTP/1.1 200 OK\r\nServer: Apache-Coyote/1.1\r\nContent-Type: text/html\r\n\r\n<html><body><h1>Apache Tomcat</h1></body></html>",
-            # Redis
-            6379: b"-ERR unknown command\r\n",
-            # MongoDB
-            27017: b""
-        }
+        self.listen_ms = None
     
     def start(self):
         """Start honeypot on all configured ports"""
@@ -87,19 +101,41 @@ class HoneypotServer:
         print(f"Ports: {self.ports}")
         print(f"{'='*60}\n")
         
+        started = time.perf_counter()
         self.is_running = True
+        self.selector = selectors.DefaultSelector()
         
+        # Bind every port up front (no per-port stagger), then one event loop serves them all
         for port in self.ports:
-            thread = threading.Thread(target=self._listen_on_port, args=(port,), daemon=True)
-            thread.start()
-            self.threads.append(thread)
-            time.sleep(0.1)
+            sock = self._bind(port)
+            if sock is not None:
+                self.selector.register(sock, selectors.EVENT_READ, port)
+        
+        # The callback runs on its own thread so a slow one cannot stall the event loop
+        if self.callback:
+            self.reporter = threading.Thread(target=self._report_loop, name='listener-callback', daemon=True)
+            self.reporter.start()
+        self.thread = threading.Thread(target=self._event_loop, name='listener-loop', daemon=True)
+        self.thread.start()
+        
+        self.listen_ms = round((time.perf_counter() - started) * 1000, 1)
+        print(f"[✓] {len(self.sockets)}/{len(self.ports)} ports accepting after {self.listen_ms:g} ms")
     
     def stop(self):
-        """Stop all honeypot listeners"""
+        """Stop all honeypot listeners (open connections are logged first)"""
         print("\n[*] Stopping Honeypot...")
         self.is_running = False
         
+        if self.thread is not None:
+            self.thread.join(5)
+            self.thread = None
+        if self.reporter is not None:
+            try:
+                self.reports.put(None, timeout=5)
+            except queue.Full:
+                pass
+            self.reporter.join(5)
+            self.reporter = None
         for sock in self.sockets:
             try:
                 sock.close()
@@ -107,126 +143,253 @@ class HoneypotServer:
                 pass
         
         self.sockets.clear()
-        self.threads.clear()
         print("[✓] Honeypot stopped")
     
-    def _listen_on_port(self, port):
-        """Listen on a specific port"""
+    def _bind(self, port):
+        """Non-blocking listening socket for port, or None if it cannot be bound"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock.settimeout(1)
+            sock.setblocking(False)
             sock.bind(('0.0.0.0', port))
-            sock.listen(10)
+            sock.listen(128)
             self.sockets.append(sock)
-            
-            service = self._get_service_name(port)
-            print(f"[✓] Listening on port {port} ({service})")
-            
-            while self.is_running:
-                try:
-                    client_socket, address = sock.accept()
-                    thread = threading.Thread(
-                        target=self._handle_connection,
-                        args=(client_socket, address, port),
-                        daemon=True
-                    )
-                    thread.start()
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self.is_running:
-                        print(f"[!] Error on port {port}: {e}")
-                    break
-        
+            print(f"[✓] Listening on port {port} ({self._get_service_name(port)})")
+            return sock
         except OSError as e:
+            sock.close()
             if "Address already in use" in str(e) or "10048" in str(e):
                 print(f"[!] Port {port} already in use - skipping")
             else:
                 print(f"[!] Failed to bind port {port}: {e}")
         except Exception as e:
+            sock.close()
             print(f"[!] Failed to bind port {port}: {e}")
+        return None
     
-    def _handle_connection(self, client_socket, address, port):
-        """Handle incoming connection"""
-        try:
-            with self.lock:
-                self.connection_count += 1
-                conn_id = self.connection_count
-            
-            source_ip = address[0]
-            source_port = address[1]
-            service = self._get_service_name(port)
-            simulated = self.high_port_map.get(port, port)
-            
-            # Initialize attack data
-            attack_data = {
-                'type': 'connection_attempt',
-                'source_ip': source_ip,
-                'source_port': source_port,
-                'target_port': port,
-                'simulated_port': simulated,
-                'service': service,
-                'timestamp': datetime.now().isoformat(),
-                'severity': 'low',
-                'payload': '',
-                'payload_size': 0,
-                'user_agent': '',
-                'connection_id': conn_id
-            }
-            
-            # Print detection
-            print(f"\n{'='*60}")
-            print(f"🚨 ATTACK #{conn_id} DETECTED")
-            print(f"   From: {source_ip}:{source_port}")
-            print(f"   To: Port {port} ({service})")
-            print(f"   Time: {attack_data['timestamp']}")
-            
-            # Send banner
-            if port in self.banners:
-                try:
-                    client_socket.send(self.banners[port])
-                except:
-                    pass
+    def _event_loop(self):
+        """Single thread multiplexing every listener and connection"""
+        last_sweep = time.monotonic()
+        while self.is_running:
+            try:
+                events = self.selector.select(timeout=0.5)
+            except OSError as e:
+                print(f"[!] Event loop error: {e}")
+                time.sleep(0.1)
+                continue
+            for key, mask in events:
+                if isinstance(key.data, _Connection):
+                    if mask & selectors.EVENT_READ:
+                        self._on_readable(key.data)
+                    if mask & selectors.EVENT_WRITE and key.data.sock is not None:
+                        self._flush(key.data)
+                else:
+                    self._accept(key.fileobj, key.data)
             
-            # Receive data
-            client_socket.settimeout(5)
-            received = b''
+            now = time.monotonic()
+            if now - last_sweep >= 0.5:
+                last_sweep = now
+                for conn in [c for c in self.connections.values() if now >= c.deadline or now - c.started >= self.SESSION_LIMIT]:
+                    self._finish(conn)
+        
+        # Shutdown: log whatever is still open, release the sockets
+        for conn in list(self.connections.values()):
+            self._finish(conn)
+        for sock in self.sockets:
             try:
-                while len(received) < 10000:
-                    chunk = client_socket.recv(4096)
-                    if not chunk:
-                        break
-                    received += chunk
-            except socket.timeout:
+                self.selector.unregister(sock)
+            except (KeyError, ValueError):
                 pass
-            except:
+        self.selector.close()
+    
+    def _accept(self, sock, port):
+        """Accept every pending connection on a listener"""
+        while True:
+            try:
+                client_socket, address = sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # Out of descriptors: make room by dropping the oldest connection
+                if e.errno in (errno.EMFILE, errno.ENFILE) and self.connections:
+                    self._finish(next(iter(self.connections.values())))
+                    continue
+                if self.is_running:
+                    print(f"[!] Error on port {port}: {e}")
+                return
+            
+            if len(self.connections) >= self.max_connections:
+                self._finish(next(iter(self.connections.values())))
+            self._open(client_socket, address, port)
+    
+    def _open(self, client_socket, address, port):
+        """Register a new connection and queue its greeting"""
+        self.connection_count += 1
+        conn_id = self.connection_count
+        client_socket.setblocking(False)
+        
+        source_ip = address[0]
+        source_port = address[1]
+        try:
+            target_ip = client_socket.getsockname()[0]
+        except OSError:
+            target_ip = None
+        service = self._get_service_name(port)
+        simulated = self.high_port_map.get(port, port)
+        
+        # Initialize attack data
+        attack_data = {
+            'type': 'connection_attempt',
+            'source_ip': source_ip,
+            'source_port': source_port,
+            'target_ip': target_ip,
+            'target_port': port,
+            'simulated_port': simulated,
+            'service': service,
+            'timestamp': datetime.now().isoformat(),
+            'severity': 'low',
+            'payload': '',
+            'payload_size': 0,
+            'user_agent': '',
+            'connection_id': conn_id
+        }
+        
+        # Print detection
+        print(f"\n{'='*60}")
+        print(f"🚨 ATTACK #{conn_id} DETECTED")
+        print(f"   From: {source_ip}:{source_port}")
+        print(f"   To: Port {port} ({service})")
+        print(f"   Time: {attack_data['timestamp']}")
+        
+        handler = create_handler(service, simulated, source_ip, self.handlers)
+        conn = _Connection(client_socket, port, handler, attack_data, time.monotonic() + self.IDLE_TIMEOUT)
+        self.connections[client_socket.fileno()] = conn
+        self.selector.register(client_socket, selectors.EVENT_READ, conn)
+        try:
+            conn.out += handler.greeting()
+        except Exception as e:
+            print(f"[!] {service} handler error: {e}")
+        self._flush(conn)
+    
+    def _on_readable(self, conn):
+        """Read what the client sent and let the protocol handler answer"""
+        try:
+            chunk = conn.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            chunk = b''
+        if not chunk:
+            self._finish(conn)
+            return
+        
+        conn.deadline = time.monotonic() + self.IDLE_TIMEOUT
+        if len(conn.received) < self.MAX_CAPTURE:
+            conn.received += chunk[:self.MAX_CAPTURE - len(conn.received)]
+        try:
+            conn.out += conn.handler.feed(chunk)
+        except Exception as e:
+            print(f"[!] {conn.attack_data['service']} handler error: {e}")
+            conn.handler.done = True
+        self._flush(conn)
+    
+    def _flush(self, conn):
+        """Send pending replies without blocking; close once a finished handler is flushed"""
+        if conn.out:
+            try:
+                sent = conn.sock.send(conn.out)
+                del conn.out[:sent]
+            except (BlockingIOError, InterruptedError):
                 pass
+            except OSError:
+                self._finish(conn)
+                return
+        
+        if not conn.out and conn.handler.done:
+            self._finish(conn)
+            return
+        # Write interest only while replies are pending
+        wanted = selectors.EVENT_READ | (selectors.EVENT_WRITE if conn.out else 0)
+        if wanted != conn.events:
+            conn.events = wanted
+            self.selector.modify(conn.sock, wanted, conn)
+    
+    def _finish(self, conn):
+        """Close a connection and report it"""
+        if conn.sock is None:
+            return
+        self.connections.pop(conn.sock.fileno(), None)
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+        conn.sock = None
+        
+        try:
+            attack_data = conn.attack_data
+            port = conn.port
+            received = bytes(conn.received)
             
             # Analyze payload
             if received:
                 payload = received.decode('utf-8', errors='ignore')[:2000]
                 attack_data['payload'] = payload
                 attack_data['payload_size'] = len(received)
+                # Original bytes for lossless (compressed) storage by the logger
+                attack_data['payload_raw'] = received
                 attack_data['user_agent'] = self._extract_user_agent(payload)
                 attack_data['severity'] = self._analyze_severity(payload, port)
                 attack_data['type'] = self._detect_attack_type(payload, port)
                 
                 print(f"   Payload: {payload[:80]}..." if len(payload) > 80 else f"   Payload: {payload}")
             
+            # What the service emulator captured
+            captured = conn.handler.summary()
+            attack_data['credentials'] = captured['credentials']
+            attack_data['commands'] = captured['commands']
+            if captured['credentials']:
+                if attack_data['type'] == 'connection_attempt':
+                    attack_data['type'] = 'brute_force'
+                logins = ', '.join(f"{c.get('username')}:{c.get('password') or c.get('auth_hash') or ''}"
+                                   for c in captured['credentials'][:3])
+                print(f"   Credentials: {logins}")
+            
+            # Listed sources: record the feeds and raise the severity
+            if self.threat_intel:
+                feeds = self.threat_intel.tag(attack_data)
+                if feeds:
+                    print(f"   Threat intel: {', '.join(feeds)}")
+            
             print(f"   Type: {attack_data['type']}")
             print(f"   Severity: {attack_data['severity'].upper()}")
             print(f"{'='*60}")
             
-            # Callback
+            # Callback (on the reporter thread, never waited for here)
             if self.callback:
-                self.callback(attack_data)
-            
-            client_socket.close()
+                try:
+                    self.reports.put_nowait(attack_data)
+                except queue.Full:
+                    self.reports_dropped += 1
+                    print(f"[!] Report queue full - connection #{attack_data['connection_id']} not reported")
         
         except Exception as e:
             print(f"[!] Connection error: {e}")
     
+    def _report_loop(self):
+        """Pass finished connections to the callback until stop() queues None"""
+        while True:
+            attack_data = self.reports.get()
+            if attack_data is None:
+                return
+            try:
+                self.callback(attack_data)
+            except Exception as e:
+                print(f"[!] Callback error: {e}")
+    
     def _extract_user_agent(self, payload):
         """Extract User-Agent from HTTP payload"""
         match = re.search(r'User-Agent:\s*([^\r\n]+)', payload, re.IGNORECASE)
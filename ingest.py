@@ -0,0 +1,236 @@
+"""
+Ingest - Asynchronous hand-off of captured events to storage
+Request and connection threads enqueue and return immediately;
+a writer thread does the database work (and IP enrichment)
+"""
+import collections
+import os
+import queue
+import random
+import threading
+import time
+
+from alert_pipeline import SEVERITY_RANK
+
+
+# Queue marker for events that are only counted, not stored
+_COUNT_ONLY = object()
+
+
+class SamplingPolicy:
+    """
+    Flood-time persistence policy:
+    - High/critical events and the first event of each (source, type, port)
+      are always stored in full
+    - Empty probes belonging to a detected port scan are only counted; the
+      sweep's port_scan summary is stored with one weight per probe
+    - Other events are stored with probability `rate`; stored rows carry
+      the rate so counts can be re-weighted (1 / rate events per row)
+    - The rate adapts to the writer queue: halved while the queue is above
+      high_water, grown back while it is below low_water
+    """
+
+    def __init__(self, min_rate=0.01, low_water=0.05, high_water=0.25, interval=0.5, max_keys=100000):
+        """Initialize policy (watermarks are fractions of the queue size)"""
+        self.min_rate = min_rate
+        self.low_water = low_water
+        self.high_water = high_water
+        self.interval = interval
+        self.max_keys = max_keys
+        self.rate = 1.0
+        self._seen = {}
+        self._lock = threading.Lock()  # submit() runs on every connection thread
+        self._last_adjust = time.monotonic()
+        self.stats = {'full': 0, 'sampled': 0, 'counted_only': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Policy from SENTINEL_SAMPLING / SENTINEL_SAMPLING_MIN_RATE, or None when disabled"""
+        if os.environ.get('SENTINEL_SAMPLING', '1').lower() in ('0', 'false', 'off', 'no'):
+            return None
+        return cls(min_rate=float(os.environ.get('SENTINEL_SAMPLING_MIN_RATE', 0.01)))
+
+    def _adjust(self, fill):
+        if fill > self.high_water:
+            self.rate = max(self.min_rate, self.rate / 2)
+        elif fill < self.low_water and self.rate < 1.0:
+            self.rate = min(1.0, self.rate * 1.25)
+
+    def decide(self, event, depth=0, capacity=1):
+        """Return (rate, priority): the sample rate to store event with (None to
+        count it only), and whether its row must not be dropped (high severity,
+        first of its key, sweep summary)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_adjust >= self.interval:
+                self._last_adjust = now
+                self._adjust(depth / float(capacity or 1))
+
+            if event.get('type') == 'port_scan':
+                # Stands for the sweep's count-only probes: 1 / rate == probe count (the
+                # connections seen before the sweep was detected were stored as they came)
+                self.stats['full'] += 1
+                return 1.0 / max(1, event.get('probes') or 1), True
+
+            if SEVERITY_RANK.get(event.get('severity', 'low'), 0) >= SEVERITY_RANK['high']:
+                self.stats['full'] += 1
+                return 1.0, True
+
+            if event.get('scan_id') and not event.get('payload_size'):
+                # Empty probe of a detected sweep: its port_scan event summarizes it
+                self.stats['counted_only'] += 1
+                return None, False
+
+            key = (event.get('source_ip'), event.get('type'), event.get('target_port'))
+            if key not in self._seen:
+                self._seen[key] = True
+                if len(self._seen) > self.max_keys:
+                    # Forget the oldest key (dicts keep insertion order)
+                    del self._seen[next(iter(self._seen))]
+                self.stats['full'] += 1
+                return 1.0, True
+
+            rate = self.rate
+            if rate >= 1.0:
+                self.stats['full'] += 1
+                return 1.0, False
+            if random.random() < rate:
+                self.stats['sampled'] += 1
+                return rate, False
+            self.stats['counted_only'] += 1
+            return None, False
+
+
+class IngestPipeline:
+    """
+    Bounded ingestion queue:
+    - submit() is O(1) and never blocks the caller or touches storage
+    - One writer thread drains the queue through the handler
+    - When storage falls behind the queue fills up: priority events (see
+      SamplingPolicy.decide) go to a small overflow queue, other rows are
+      counted as dropped instead of piling up in memory
+    - Optional SamplingPolicy: events it samples out go to count_handler
+      (cheap in-memory accounting) instead of handler; events whose row
+      cannot be queued are put on a side queue the writer also passes to
+      count_handler, so counters and alerts still see every event
+    """
+
+    def __init__(self, handler, maxsize=10000, name='ingest-writer', sampler=None, count_handler=None,
+                 overflow_size=None, max_deferred=None):
+        """Initialize pipeline; handler(event, raw_payload) stores one event"""
+        self.handler = handler
+        self.count_handler = count_handler
+        self.sampler = sampler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.name = name
+        # Side queues (deque appends need no lock), drained by the writer after each queued event
+        self.overflow_size = overflow_size or max(1, maxsize // 10)
+        self.max_deferred = max_deferred or maxsize
+        self._overflow = collections.deque()  # priority rows
+        self._counts = collections.deque()    # events to count only
+        self._draining = False
+        self.stats = {'submitted': 0, 'processed': 0, 'dropped': 0, 'overflow': 0, 'deferred': 0,
+                      'uncounted': 0, 'errors': 0}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the writer thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, event, raw_payload=None):
+        """Queue one event, returns False if its row was dropped"""
+        if self._thread is None:
+            self.start()
+        priority = False
+        if self.sampler is not None:
+            rate, priority = self.sampler.decide(event, self.queue.qsize(), self.queue.maxsize)
+            if rate is not None:
+                event['sample_rate'] = rate
+            elif self.count_handler is not None:
+                raw_payload = _COUNT_ONLY
+        try:
+            self.queue.put_nowait((event, raw_payload))
+        except queue.Full:
+            if raw_payload is _COUNT_ONLY:
+                # No row to lose: the writer counts it once it catches up
+                return self._defer(event)
+            if priority and len(self._overflow) < self.overflow_size:
+                self._overflow.append((event, raw_payload))
+                self.stats['overflow'] += 1
+            else:
+                self.stats['dropped'] += 1
+                if self.count_handler is not None:
+                    self._defer(event)
+                return False
+        self.stats['submitted'] += 1
+        return True
+
+    def _defer(self, event):
+        if len(self._counts) >= self.max_deferred:
+            self.stats['uncounted'] += 1
+            return False
+        self._counts.append(event)
+        self.stats['deferred'] += 1
+        return True
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def idle(self):
+        """True once every queued event has been handled (including one the writer is storing)"""
+        return not (self.queue.unfinished_tasks or self._overflow or self._counts or self._draining)
+
+    def status(self):
+        status = dict(self.stats, depth=self.queue.qsize(), capacity=self.queue.maxsize,
+                      backlog=len(self._overflow) + len(self._counts))
+        if self.sampler is not None:
+            status['sample_rate'] = self.sampler.rate
+            status['sampling'] = dict(self.sampler.stats)
+        return status
+
+    def join(self):
+        """Block until everything submitted so far has been processed"""
+        self.queue.join()
+        while not self.idle():
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            try:
+                event, raw_payload = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                # Side entries queued just as the queue emptied
+                self._drain()
+                continue
+            try:
+                self._handle(event, raw_payload)
+                self._drain()
+            finally:
+                self.queue.task_done()
+
+    def _drain(self):
+        """Handle the overflow rows, then the deferred counts"""
+        self._draining = True
+        try:
+            while self._overflow:
+                self._handle(*self._overflow.popleft())
+            while self._counts:
+                self._handle(self._counts.popleft(), _COUNT_ONLY)
+        finally:
+            self._draining = False
+
+    def _handle(self, event, raw_payload):
+        try:
+            if raw_payload is _COUNT_ONLY:
+                self.count_handler(event)
+            else:
+                self.handler(event, raw_payload)
+            self.stats['processed'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"[!] Ingest error: {e}")
@@ -0,0 +1,335 @@
+"""
+Live Stats - In-memory dashboard counters with incremental deltas
+Seeded once from the database, then updated per event and pushed as deltas
+"""
+import os
+import threading
+import time
+
+from sketches import HyperLogLog, CountMinSketch, SpaceSaving, hash64
+
+
+TOP_ATTACKERS = 10
+
+# Above this many distinct sources, per-IP counts switch from an exact dict to sketches
+EXACT_IP_LIMIT = int(os.environ.get('SENTINEL_EXACT_IP_LIMIT', 50000))
+
+
+class LiveStats:
+    """
+    Live dashboard statistics:
+    - Totals, per type / port / severity and hourly counters
+    - Exact incremental top attackers while distinct sources stay under
+      EXACT_IP_LIMIT, then HyperLogLog / Space-Saving / count-min
+      estimates with error bounds (bounded memory during spoofed floods)
+    - snapshot() for newly connected clients and /api/stats
+    - delta() returns only the counters changed since the previous delta
+    """
+
+    TOTALS = ('total_attacks', 'unique_ips', 'port_scans', 'connection_attempts', 'pending_alerts')
+    GROUPS = ('attacks_by_type', 'attacks_by_port', 'attacks_by_severity', 'hourly_attacks')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zero all counters (clients need a fresh snapshot afterwards)"""
+        with self.lock:
+            self.totals = dict.fromkeys(self.TOTALS, 0)
+            self.groups = {g: {} for g in self.GROUPS}
+            self._ip_counts = {}
+            self._top = {}
+            self.exact_ips = True
+            self.distinct_ips = HyperLogLog()
+            self.ip_freq = CountMinSketch()
+            self.heavy_ips = SpaceSaving(k=64)
+            self.heavy_ports = SpaceSaving(k=32)
+            self._unique_dirty = False
+            self._hour_buckets = {}
+            self._dirty_totals = set()
+            self._dirty_groups = {g: set() for g in self.GROUPS}
+            self._top_dirty = False
+            self.seq = 0
+
+    def seed(self, db_stats, ip_counts=None):
+        """Load counters from HoneypotLogger.get_statistics() (one query at startup)
+
+        ip_counts: optional {ip: total} for every known source, so unique IPs
+        and top attackers stay exact as new events arrive.
+        """
+        with self.lock:
+            self.totals['total_attacks'] = db_stats.get('total_attacks', 0)
+            self.totals['unique_ips'] = db_stats.get('unique_ips', 0)
+            self.totals['pending_alerts'] = db_stats.get('pending_alerts', 0)
+            for g in ('attacks_by_type', 'attacks_by_port', 'attacks_by_severity'):
+                self.groups[g] = {str(k): v for k, v in (db_stats.get(g) or {}).items()}
+
+            now_hour = int(time.time() // 3600)
+            for hh, count in (db_stats.get('hourly_attacks') or {}).items():
+                # Map hour-of-day onto the most recent matching hour bucket
+                offset = (time.localtime(now_hour * 3600).tm_hour - int(hh)) % 24
+                self._hour_buckets[now_hour - offset] = count
+            self._rebuild_hourly()
+
+            if ip_counts:
+                self._ip_counts = dict(ip_counts)
+                self.totals['unique_ips'] = max(self.totals['unique_ips'], len(self._ip_counts))
+            else:
+                self._ip_counts = {a['ip']: a['count'] for a in db_stats.get('top_attackers', [])}
+            top = sorted(self._ip_counts.items(), key=lambda kv: kv[1], reverse=True)[:TOP_ATTACKERS]
+            self._top = dict(top)
+
+            for ip, count in self._ip_counts.items():
+                h = hash64(ip)
+                self.distinct_ips.add_hash(h)
+                self.ip_freq.add_hash(h, count)
+            self.heavy_ips.load(self._ip_counts)
+            self.heavy_ports.load({k: v for k, v in self.groups['attacks_by_port'].items()})
+            if len(self._ip_counts) > EXACT_IP_LIMIT:
+                self._use_sketches()
+
+    def state(self):
+        """Counters and sketch state for a warm restart (state_snapshot.py)"""
+        with self.lock:
+            return {
+                'totals': dict(self.totals),
+                'groups': {g: dict(self.groups[g]) for g in self.GROUPS if g != 'hourly_attacks'},
+                'hour_buckets': [[h, c] for h, c in self._hour_buckets.items()],
+                'ip_counts': dict(self._ip_counts) if self.exact_ips else None,
+                'sketches': {
+                    'distinct_ips': self.distinct_ips.to_dict(),
+                    'ip_freq': self.ip_freq.to_dict(),
+                    'heavy_ips': self.heavy_ips.to_dict(),
+                    'heavy_ports': self.heavy_ports.to_dict()
+                }
+            }
+
+    def restore(self, state):
+        """Load counters saved by state(), instead of seed()"""
+        with self.lock:
+            self.totals.update({k: v for k, v in state['totals'].items() if k in self.totals})
+            for g, counters in state['groups'].items():
+                self.groups[g] = dict(counters)
+            self._hour_buckets = {int(h): c for h, c in state['hour_buckets']}
+            self._rebuild_hourly()
+            sketches = state['sketches']
+            self.distinct_ips = HyperLogLog.from_dict(sketches['distinct_ips'])
+            self.ip_freq = CountMinSketch.from_dict(sketches['ip_freq'])
+            self.heavy_ips = SpaceSaving.from_dict(sketches['heavy_ips'])
+            self.heavy_ports = SpaceSaving.from_dict(sketches['heavy_ports'])
+            if state['ip_counts'] is None:
+                self.exact_ips = False
+                self._ip_counts = {}
+                self._top = {}
+                self._unique_dirty = True
+            else:
+                self.exact_ips = True
+                self._ip_counts = state['ip_counts']
+                self._top = dict(sorted(self._ip_counts.items(), key=lambda kv: kv[1], reverse=True)[:TOP_ATTACKERS])
+
+    # ---------- updates ----------
+
+    def _bump(self, group, key, n=1):
+        key = str(key)
+        counters = self.groups[group]
+        counters[key] = counters.get(key, 0) + n
+        self._dirty_groups[group].add(key)
+
+    def _rebuild_hourly(self):
+        """hourly_attacks as {'HH': count} for the last 24 hours"""
+        now_hour = int(time.time() // 3600)
+        for h in [h for h in self._hour_buckets if h <= now_hour - 24]:
+            del self._hour_buckets[h]
+        hourly = {}
+        for h, count in self._hour_buckets.items():
+            hh = f"{time.localtime(h * 3600).tm_hour:02d}"
+            hourly[hh] = hourly.get(hh, 0) + count
+        changed = {k for k in set(hourly) | set(self.groups['hourly_attacks'])
+                   if hourly.get(k) != self.groups['hourly_attacks'].get(k)}
+        self.groups['hourly_attacks'] = hourly
+        self._dirty_groups['hourly_attacks'] |= changed
+
+    def record_scan(self):
+        """Account a port_scan summary: a new sweep, but its probes were already recorded"""
+        with self.lock:
+            self.totals['port_scans'] += 1
+            self._dirty_totals.add('port_scans')
+
+    def record(self, event, n=1, hour=None):
+        """Account one attack event (O(1))
+
+        n: events the row stands for (1 / sample_rate when replaying stored
+        rows); hour: epoch hour it happened in, defaults to now.
+        """
+        etype = event.get('type', 'connection_attempt')
+        ip = event.get('source_ip', 'unknown')
+        with self.lock:
+            self.totals['total_attacks'] += n
+            self._dirty_totals.add('total_attacks')
+            if etype == 'port_scan':
+                self.totals['port_scans'] += n
+                self._dirty_totals.add('port_scans')
+            elif etype != 'trap_access':
+                self.totals['connection_attempts'] += n
+                self._dirty_totals.add('connection_attempts')
+
+            self._bump('attacks_by_type', etype, n)
+            self._bump('attacks_by_port', event.get('target_port'), n)
+            self._bump('attacks_by_severity', event.get('severity', 'low'), n)
+
+            now_hour = int(time.time() // 3600)
+            if hour is None:
+                hour = now_hour
+            if hour > now_hour - 24:
+                self._hour_buckets[hour] = self._hour_buckets.get(hour, 0) + n
+                hh = f"{time.localtime(hour * 3600).tm_hour:02d}"
+                self._bump('hourly_attacks', hh, n)
+
+            h = hash64(ip)
+            new_register = self.distinct_ips.add_hash(h)
+            self.ip_freq.add_hash(h, n)
+            self.heavy_ips.add(ip, n)
+            self.heavy_ports.add(str(event.get('target_port')), n)
+
+            if self.exact_ips:
+                count = self._ip_counts.get(ip, 0) + n
+                self._ip_counts[ip] = count
+                if count == n:
+                    self.totals['unique_ips'] += 1
+                    self._dirty_totals.add('unique_ips')
+                    if len(self._ip_counts) > EXACT_IP_LIMIT:
+                        self._use_sketches()
+                        return
+                self._update_top(ip, count)
+            else:
+                self._unique_dirty = self._unique_dirty or new_register
+                self._top_dirty = True
+
+    def _use_sketches(self):
+        """Drop the exact per-IP dict; estimates take over from here"""
+        print(f"[*] More than {EXACT_IP_LIMIT} distinct sources - switching to sketch-based accounting")
+        self.exact_ips = False
+        self._ip_counts = {}
+        self._top = {}
+        self._unique_dirty = True
+        self._top_dirty = True
+
+    def _refresh_unique(self):
+        if self._unique_dirty:
+            estimate = self.distinct_ips.count()
+            if estimate != self.totals['unique_ips']:
+                self.totals['unique_ips'] = estimate
+                self._dirty_totals.add('unique_ips')
+            self._unique_dirty = False
+
+    def _update_top(self, ip, count):
+        """Counts only grow, so a small candidate dict keeps the top-K exact"""
+        if ip in self._top:
+            self._top[ip] = count
+            self._top_dirty = True
+        elif len(self._top) < TOP_ATTACKERS:
+            self._top[ip] = count
+            self._top_dirty = True
+        else:
+            low_ip = min(self._top, key=self._top.get)
+            if count > self._top[low_ip]:
+                del self._top[low_ip]
+                self._top[ip] = count
+                self._top_dirty = True
+
+    def set_pending_alerts(self, count):
+        with self.lock:
+            if self.totals['pending_alerts'] != count:
+                self.totals['pending_alerts'] = count
+                self._dirty_totals.add('pending_alerts')
+
+    # ---------- views ----------
+
+    def _top_list(self):
+        if not self.exact_ips:
+            return [{'ip': ip, 'count': c, 'error': e} for ip, c, e in self.heavy_ips.top(TOP_ATTACKERS)]
+        return [{'ip': ip, 'count': c} for ip, c in sorted(self._top.items(), key=lambda kv: kv[1], reverse=True)]
+
+    def _estimates(self):
+        """Error bounds for the counters that are no longer exact"""
+        return {
+            'unique_ips': {'std_error': round(self.distinct_ips.std_error, 4)},
+            'top_attackers': {'max_error': self.heavy_ips.min_count()},
+            'ip_frequency': {'max_error': self.ip_freq.error_bound(),
+                             'confidence': round(self.ip_freq.confidence, 4)}
+        }
+
+    def ip_count(self, ip):
+        """Attacks seen from ip: {'count', 'exact'} plus 'max_error' when estimated"""
+        with self.lock:
+            if self.exact_ips:
+                return {'count': self._ip_counts.get(ip, 0), 'exact': True}
+            return {'count': self.ip_freq.estimate(ip), 'exact': False,
+                    'max_error': self.ip_freq.error_bound()}
+
+    def sketches(self):
+        """Sketch summaries for /api/stats/sketches (and state for merging across workers)"""
+        with self.lock:
+            self._refresh_unique()
+            return {
+                'exact_ips': self.exact_ips,
+                'distinct_ips': {'estimate': self.distinct_ips.count(),
+                                 'std_error': round(self.distinct_ips.std_error, 4)},
+                'top_attackers': [{'ip': ip, 'count': c, 'error': e}
+                                  for ip, c, e in self.heavy_ips.top(TOP_ATTACKERS)],
+                'top_ports': [{'port': port, 'count': c, 'error': e}
+                              for port, c, e in self.heavy_ports.top(TOP_ATTACKERS)],
+                'ip_frequency': {'total': self.ip_freq.total, 'max_error': self.ip_freq.error_bound(),
+                                 'confidence': round(self.ip_freq.confidence, 4)},
+                'state': {
+                    'distinct_ips': self.distinct_ips.to_dict(),
+                    'ip_freq': self.ip_freq.to_dict(),
+                    'heavy_ips': self.heavy_ips.to_dict(),
+                    'heavy_ports': self.heavy_ports.to_dict()
+                }
+            }
+
+    def snapshot(self):
+        """Full state, same shape as /api/stats"""
+        with self.lock:
+            self._rebuild_hourly()
+            self._refresh_unique()
+            snap = dict(self.totals)
+            for g in self.GROUPS:
+                snap[g] = dict(self.groups[g])
+            snap['top_attackers'] = self._top_list()
+            snap['unique_ips_exact'] = self.exact_ips
+            if not self.exact_ips:
+                snap['estimates'] = self._estimates()
+            snap['seq'] = self.seq
+            return snap
+
+    def delta(self):
+        """Changed counters since the last call (absolute values), or None"""
+        with self.lock:
+            if self._hour_buckets and min(self._hour_buckets) <= int(time.time() // 3600) - 24:
+                self._rebuild_hourly()
+            self._refresh_unique()
+
+            out = {}
+            if self._dirty_totals:
+                out['totals'] = {k: self.totals[k] for k in self._dirty_totals}
+            for g in self.GROUPS:
+                keys = self._dirty_groups[g]
+                if keys:
+                    out[g] = {k: self.groups[g].get(k, 0) for k in keys}
+            if self._top_dirty:
+                out['top_attackers'] = self._top_list()
+            if out and not self.exact_ips:
+                out['estimates'] = self._estimates()
+
+            self._dirty_totals = set()
+            self._dirty_groups = {g: set() for g in self.GROUPS}
+            self._top_dirty = False
+
+            if not out:
+                return None
+            self.seq += 1
+            out['seq'] = self.seq
+            return out
@@ -2,14 +2,28 @@
 Logger Module - Enhanced Honeypot Event Logger
 Handles logging to SQLite database, JSON files, and provides analytics
 """
+import atexit
 import json
 import sqlite3
 from datetime import datetime, timedelta
 import os
 import threading
+import time
 import urllib.request
 import urllib.parse
 
+from payload_codec import PayloadCodec, decode_payload
+from alert_pipeline import AlertAggregator
+from attacker_table import AttackerTable, ATTACKER_COLUMNS
+from session_builder import SessionBuilder, SESSION_COLUMNS
+from payload_clusters import ClusterIndex, CLUSTER_COLUMNS
+from scan_cache import network_key_range
+from timestamps import format_epoch, parse_timestamp
+
+# Stored in PRAGMA user_version once _init_database() has run; bump it with every
+# table, column or index change so existing databases migrate once, then skip DDL
+SCHEMA_VERSION = 4
+
 
 class HoneypotLogger:
     """
@@ -18,16 +32,54 @@ class HoneypotLogger:
     - JSON file logging
     - Real-time statistics
     - Export capabilities
-    - Alert detection
+    - Aggregated alert detection (deduplicated per source/type)
+    - In-memory attacker table flushed to ip_tracking in batches
+    - Optional compressed BLOB storage of raw payload bytes
     """
-    
-    def __init__(self, db_path='database/honeypot.db', log_file='logs/honeypot.log'):
-        """Initialize logger with database and file paths"""
+
+    # Characters of payload kept as plain TEXT when the raw bytes are compressed
+    PAYLOAD_PREVIEW_CHARS = 256
+
+    def __init__(self, db_path='database/honeypot.db', log_file='logs/honeypot.log',
+                 payload_compression=None, payload_dict=None, track_sessions=True):
+        """Initialize logger with database and file paths
+
+        payload_compression: None/'' (plain TEXT), 'zlib' or 'zstd'.
+        Defaults to the SENTINEL_PAYLOAD_COMPRESSION environment variable.
+        track_sessions: False when another process (capture_daemon.py) owns the
+        sessions table; session queries then only read it.
+        """
         self.db_path = db_path
         self.log_file = log_file
         self.lock = threading.Lock()
+
+        if payload_compression is None:
+            payload_compression = os.environ.get('SENTINEL_PAYLOAD_COMPRESSION', '')
+        if payload_dict is None:
+            payload_dict = os.environ.get('SENTINEL_PAYLOAD_DICT')
+        self.payload_codec = PayloadCodec(payload_compression, dict_path=payload_dict) if payload_compression else None
+        # Reader used for rows written by any codec, even when storage mode is off
+        self._payload_reader = self.payload_codec or PayloadCodec('zlib')
+
+        self.alert_aggregator = AlertAggregator.from_env()
+        self._pending_alerts = 0
+
+        self.attackers = AttackerTable(half_life=float(os.environ.get('SENTINEL_THREAT_HALF_LIFE', 3600)),
+                                       capacity=int(os.environ.get('SENTINEL_ATTACKER_MAX', 100000)),
+                                       loader=self._load_attacker)
+        self.attacker_flush_interval = float(os.environ.get('SENTINEL_ATTACKER_FLUSH', 5))
+        self._flush_thread = None
+        self._store_hooks = []
+        self.sessions = SessionBuilder(gap=float(os.environ.get('SENTINEL_SESSION_GAP', 900)))
+        self.track_sessions = track_sessions
+        # Payload clusters are loaded with the first stored payload (keeps numpy out of startup)
+        self.clusters = ClusterIndex.from_env(loader=self._load_cluster)
+        self._clusters_loaded = False
         self._init_database()
         self._ensure_log_dir()
+        self._load_pending_alerts()
+        self._load_attackers()
+        self._load_open_sessions()
     
     def _ensure_log_dir(self):
         """Ensure log directory exists"""
@@ -39,6 +91,13 @@ class HoneypotLogger:
         
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+
+        # Current schema: no DDL and no write lock (a busy capture daemon would hold us up)
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            conn.close()
+            print(f"[✓] Database schema v{version} current")
+            return
         
         # Main attacks table
         cursor.execute('''
@@ -76,6 +135,23 @@ class HoneypotLogger:
             )
         ''')
         
+        # Ensure ip_tracking columns exist (for older DBs)
+        try:
+            cols = [c[1] for c in cursor.execute("PRAGMA table_info(ip_tracking)").fetchall()]
+            for name, ddl in [('asn', 'TEXT'), ('org', 'TEXT'), ('country', 'TEXT'),
+                              ('is_vpn', 'INTEGER DEFAULT 0'),
+                              ('high_count', 'INTEGER DEFAULT 0'),
+                              ('medium_count', 'INTEGER DEFAULT 0'),
+                              ('low_count', 'INTEGER'),
+                              ('threat_score', 'REAL'),
+                              ('score_updated', 'REAL'),
+                              ('ports', 'TEXT'),
+                              ('services', 'TEXT')]:
+                if name not in cols:
+                    cursor.execute(f'ALTER TABLE ip_tracking ADD COLUMN {name} {ddl}')
+        except Exception:
+            pass
+        
         # Alerts table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS alerts (
@@ -94,6 +170,20 @@ class HoneypotLogger:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_attacks_timestamp ON attacks(timestamp)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_attacks_source_ip ON attacks(source_ip)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_attacks_severity ON attacks(severity)')
+        # Ensure alert aggregation columns exist (for older DBs)
+        try:
+            cols = [c[1] for c in cursor.execute("PRAGMA table_info(alerts)").fetchall()]
+            if 'occurrence_count' not in cols:
+                cursor.execute('ALTER TABLE alerts ADD COLUMN occurrence_count INTEGER DEFAULT 1')
+            if 'first_seen' not in cols:
+                cursor.execute('ALTER TABLE alerts ADD COLUMN first_seen TEXT')
+            if 'last_seen' not in cols:
+                cursor.execute('ALTER TABLE alerts ADD COLUMN last_seen TEXT')
+            if 'rule' not in cols:
+                cursor.execute('ALTER TABLE alerts ADD COLUMN rule TEXT')
+        except Exception:
+            pass
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_pending ON alerts(is_acknowledged, timestamp)')
         # Ensure attack enrichment columns exist (for older DBs)
         try:
             cols = [c[1] for c in cursor.execute("PRAGMA table_info(attacks)").fetchall()]
@@ -105,19 +195,324 @@ class HoneypotLogger:
                 cursor.execute('ALTER TABLE attacks ADD COLUMN country TEXT')
             if 'is_vpn' not in cols:
                 cursor.execute('ALTER TABLE attacks ADD COLUMN is_vpn INTEGER DEFAULT 0')
+            if 'payload_blob' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN payload_blob BLOB')
+            if 'payload_codec' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN payload_codec TEXT')
+            if 'sample_rate' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN sample_rate REAL DEFAULT 1.0')
+            if 'session_id' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN session_id TEXT')
+            if 'threat_feeds' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN threat_feeds TEXT')
+            if 'sensor_id' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN sensor_id TEXT')
+            if 'event_id' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN event_id TEXT')
+            if 'cluster_id' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN cluster_id TEXT')
+            if 'credentials' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN credentials TEXT')
+            if 'commands' not in cols:
+                cursor.execute('ALTER TABLE attacks ADD COLUMN commands TEXT')
         except Exception:
             pass
-        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attacks_session ON attacks(session_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attacks_cluster ON attacks(cluster_id)')
+        # Events shipped from remote sensors (collector.py); local rows leave sensor_id NULL
+        # (event_id is only set on trap hits, so their retries can be recognized)
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_attacks_sensor_event ON attacks(sensor_id, event_id)')
+
+        # Attacker sessions (events from one source separated by less than the inactivity gap)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                source_ip TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                duration REAL DEFAULT 0,
+                event_count INTEGER DEFAULT 0,
+                ports TEXT,
+                services TEXT,
+                types TEXT,
+                max_severity TEXT DEFAULT 'low',
+                is_open INTEGER DEFAULT 1
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_source ON sessions(source_ip, start_time)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions(start_time)')
+
+        # Campaign clusters (payloads grouped by MinHash similarity, payload_clusters.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS payload_clusters (
+                cluster_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                sample TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                event_count INTEGER DEFAULT 0,
+                services TEXT,
+                types TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_clusters_size ON payload_clusters(event_count)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_clusters_last_seen ON payload_clusters(last_seen)')
+
+        # Finished network scan jobs (results as JSON)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_jobs (
+                job_id TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                ports TEXT,
+                status TEXT NOT NULL,
+                created TEXT,
+                started TEXT,
+                finished TEXT,
+                hosts_total INTEGER DEFAULT 0,
+                hosts_done INTEGER DEFAULT 0,
+                active_hosts INTEGER DEFAULT 0,
+                probes INTEGER DEFAULT 0,
+                error TEXT,
+                results TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scan_jobs_created ON scan_jobs(created)')
+        try:
+            cursor.execute("PRAGMA table_info(scan_jobs)")
+            cols = [r[1] for r in cursor.fetchall()]
+            if 'incremental' not in cols:
+                cursor.execute('ALTER TABLE scan_jobs ADD COLUMN incremental INTEGER DEFAULT 0')
+            if 'diff' not in cols:
+                cursor.execute('ALTER TABLE scan_jobs ADD COLUMN diff TEXT')
+        except Exception:
+            pass
+
+        # Last known state per scanned host and port (port 0 = host up/down), keyed for CIDR range queries
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_results (
+                host_key TEXT NOT NULL,
+                port INTEGER NOT NULL,
+                host TEXT NOT NULL,
+                state TEXT NOT NULL,
+                first_seen REAL,
+                last_seen REAL,
+                last_change REAL,
+                PRIMARY KEY (host_key, port)
+            )
+        ''')
+
+        # Dashboard warm-start state (state_snapshot.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                name TEXT PRIMARY KEY,
+                saved_at REAL NOT NULL,
+                attacks_seq INTEGER NOT NULL,
+                data TEXT NOT NULL
+            )
+        ''')
+
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
         conn.commit()
         conn.close()
-        print("[✓] Database initialized")
+        print(f"[✓] Database initialized (schema v{SCHEMA_VERSION})")
     
     def _get_connection(self):
         """Get database connection"""
         return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _load_attackers(self):
+        """Reload the most recently seen attackers (up to the table capacity) from ip_tracking"""
+        try:
+            conn = self._get_connection()
+            rows = conn.execute(f'''
+                SELECT {', '.join(ATTACKER_COLUMNS)} FROM ip_tracking ORDER BY last_seen DESC LIMIT ?
+            ''', (self.attackers.capacity or -1,)).fetchall()
+            conn.close()
+            self.attackers.load_rows(reversed(rows))
+        except Exception as e:
+            print(f"[!] Error loading attacker table: {e}")
+
+    def _load_attacker(self, ip):
+        """ip_tracking row for one attacker evicted from memory (AttackerTable loader)"""
+        conn = self._get_connection()
+        try:
+            return conn.execute(f"SELECT {', '.join(ATTACKER_COLUMNS)} FROM ip_tracking WHERE ip_address = ?",
+                                (ip,)).fetchone()
+        finally:
+            conn.close()
+
+    def _start_attacker_flush(self):
+        """Start the periodic ip_tracking flush thread (once)"""
+        if self._flush_thread is not None:
+            return
+        self._flush_thread = threading.Thread(target=self._attacker_flush_loop, name='attacker-flush', daemon=True)
+        self._flush_thread.start()
+        atexit.register(self.flush_attackers)
+        atexit.register(self.flush_sessions)
+        atexit.register(self.flush_clusters)
+
+    def _attacker_flush_loop(self):
+        while True:
+            time.sleep(self.attacker_flush_interval)
+            self.flush_attackers()
+            self.flush_sessions()
+            self.flush_clusters()
+
+    def flush_attackers(self):
+        """Write changed attacker records to ip_tracking in one batch"""
+        rows = self.attackers.drain_dirty()
+        if not rows:
+            return 0
+        try:
+            conn = self._get_connection()
+            conn.executemany('''
+                INSERT INTO ip_tracking (
+                    ip_address, first_seen, last_seen, total_attacks, high_count, medium_count,
+                    low_count, threat_level, threat_score, score_updated, ports, services,
+                    asn, org, country, is_vpn
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(ip_address) DO UPDATE SET
+                    last_seen = excluded.last_seen,
+                    total_attacks = excluded.total_attacks,
+                    high_count = excluded.high_count,
+                    medium_count = excluded.medium_count,
+                    low_count = excluded.low_count,
+                    threat_level = excluded.threat_level,
+                    threat_score = excluded.threat_score,
+                    score_updated = excluded.score_updated,
+                    ports = excluded.ports,
+                    services = excluded.services,
+                    asn = COALESCE(excluded.asn, ip_tracking.asn),
+                    org = COALESCE(excluded.org, ip_tracking.org),
+                    country = COALESCE(excluded.country, ip_tracking.country),
+                    is_vpn = excluded.is_vpn
+            ''', rows)
+            conn.commit()
+            conn.close()
+            return len(rows)
+        except Exception as e:
+            print(f"[!] Attacker flush error: {e}")
+            self.attackers.mark_dirty(rows)
+            return 0
+
+    def _load_open_sessions(self):
+        """Resume sessions that were still open when the process stopped"""
+        if not self.track_sessions:
+            return
+        try:
+            conn = self._get_connection()
+            rows = conn.execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE is_open = 1").fetchall()
+            conn.close()
+            self.sessions.load_rows(rows)
+        except Exception as e:
+            print(f"[!] Error loading open sessions: {e}")
+
+    def flush_sessions(self):
+        """Close idle sessions and upsert changed session summaries in one batch"""
+        if not self.track_sessions:
+            return 0
+        self.sessions.expire()
+        rows = self.sessions.drain_dirty()
+        if not rows:
+            return 0
+        try:
+            conn = self._get_connection()
+            self._upsert_sessions(conn, rows)
+            conn.commit()
+            conn.close()
+            return len(rows)
+        except Exception as e:
+            print(f"[!] Session flush error: {e}")
+            return 0
+
+    def _upsert_sessions(self, conn, rows):
+        updates = ', '.join(f"{c} = excluded.{c}" for c in SESSION_COLUMNS[1:])
+        conn.executemany(f'''
+            INSERT INTO sessions ({', '.join(SESSION_COLUMNS)})
+            VALUES ({', '.join('?' * len(SESSION_COLUMNS))})
+            ON CONFLICT(session_id) DO UPDATE SET {updates}
+        ''', rows)
+
+    def _load_clusters(self):
+        """Index the most recently seen payload clusters (first stored payload)"""
+        self._clusters_loaded = True
+        try:
+            conn = self._get_connection()
+            rows = conn.execute(
+                f"SELECT {', '.join(CLUSTER_COLUMNS)} FROM payload_clusters ORDER BY last_seen DESC LIMIT ?",
+                (self.clusters.max_clusters,)).fetchall()
+            conn.close()
+            self.clusters.load_rows(rows)
+        except Exception as e:
+            print(f"[!] Error loading payload clusters: {e}")
+
+    def _load_cluster(self, cluster_id):
+        """payload_clusters row of a cluster dropped from memory (ClusterIndex loader)"""
+        conn = self._get_connection()
+        try:
+            return conn.execute(f"SELECT {', '.join(CLUSTER_COLUMNS)} FROM payload_clusters WHERE cluster_id = ?",
+                                (cluster_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def flush_clusters(self):
+        """Upsert changed cluster summaries in one batch"""
+        rows = self.clusters.drain_dirty()
+        if not rows:
+            return 0
+        try:
+            conn = self._get_connection()
+            self._upsert_clusters(conn, rows)
+            conn.commit()
+            conn.close()
+            return len(rows)
+        except Exception as e:
+            print(f"[!] Cluster flush error: {e}")
+            return 0
+
+    def _upsert_clusters(self, conn, rows):
+        updates = ', '.join(f"{c} = excluded.{c}" for c in CLUSTER_COLUMNS[4:])
+        conn.executemany(f'''
+            INSERT INTO payload_clusters ({', '.join(CLUSTER_COLUMNS)})
+            VALUES ({', '.join('?' * len(CLUSTER_COLUMNS))})
+            ON CONFLICT(cluster_id) DO UPDATE SET {updates}
+        ''', rows)
+
+    def _assign_cluster(self, attack_data, payload, now=None):
+        """Campaign cluster of the event's payload, None without one (caller holds self.lock)"""
+        if not payload:
+            return None
+        if not self._clusters_loaded:
+            self._load_clusters()
+        try:
+            weight = max(1, int(round(1.0 / (attack_data.get('sample_rate') or 1.0))))
+            return self.clusters.assign(attack_data, payload, now=now, weight=weight)
+        except Exception as e:
+            print(f"[!] Clustering error: {e}")
+            return None
+
+    def _load_pending_alerts(self):
+        """Seed the pending alert counter (kept up to date in memory afterwards)"""
+        try:
+            conn = self._get_connection()
+            self._pending_alerts = conn.execute(
+                'SELECT COUNT(*) FROM alerts WHERE is_acknowledged = 0').fetchone()[0]
+            conn.close()
+        except Exception as e:
+            print(f"[!] Error counting pending alerts: {e}")
+            self._pending_alerts = 0
     
-    def log_attack(self, attack_data):
-        """Log attack to database and file"""
+    def add_store_hook(self, hook):
+        """Call hook(attack_data, enrichment) after every stored attack (e.g. shipper.EventShipper)"""
+        self._store_hooks.append(hook)
+
+    def log_attack(self, attack_data, raw_payload=None):
+        """Log attack to database and file
+
+        raw_payload: original payload bytes; stored compressed when the
+        BLOB storage mode is enabled.
+        """
         with self.lock:
             try:
                 conn = self._get_connection()
@@ -125,85 +520,225 @@ class HoneypotLogger:
                 
                 timestamp = attack_data.get('timestamp', datetime.now().isoformat())
                 source_ip = attack_data.get('source_ip', 'unknown')
-                
-                cursor.execute('''
-                    INSERT INTO attacks (
-                        timestamp, type, source_ip, source_port, target_port,
-                        simulated_port, service, payload, payload_size, severity,
-                        user_agent, connection_id
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    timestamp,
-                    attack_data.get('type', 'connection_attempt'),
-                    source_ip,
-                    attack_data.get('source_port'),
-                    attack_data.get('target_port'),
-                    attack_data.get('simulated_port'),
-                    attack_data.get('service', 'unknown'),
-                    attack_data.get('payload', '')[:5000],
-                    attack_data.get('payload_size', 0),
-                    attack_data.get('severity', 'low'),
-                    attack_data.get('user_agent', ''),
-                    attack_data.get('connection_id')
-                ))
-                
-                attack_id = cursor.lastrowid
+                attack_id = self._insert_attack(cursor, attack_data, timestamp, raw_payload)
+                self._start_attacker_flush()
 
-                # Enrich IP information (ASN, org, country, vpn guess)
+                # Enrich IP information (ASN, org, country, vpn guess) - looked up once per IP
+                enrich = None
                 try:
-                    enrich = self._enrich_ip(source_ip)
+                    enrich = self.attackers.get_enrichment(source_ip)
+                    if enrich is None:
+                        enrich = self._enrich_ip(source_ip)
+                        self.attackers.set_enrichment(source_ip, enrich)
                     if enrich:
                         cursor.execute('''
                             UPDATE attacks SET asn = ?, org = ?, country = ?, is_vpn = ? WHERE id = ?
                         ''', (enrich.get('asn'), enrich.get('org'), enrich.get('country'), 1 if enrich.get('is_vpn') else 0, attack_id))
-                        # Update ip_tracking with enrichment
-                        cursor.execute('''
-                            UPDATE ip_tracking SET asn = ?, org = ?, country = ?, is_vpn = ? WHERE ip_address = ?
-                        ''', (enrich.get('asn'), enrich.get('org'), enrich.get('country'), 1 if enrich.get('is_vpn') else 0, source_ip))
                 except Exception as e:
                     print(f"[!] Enrichment error: {e}")
                 
-                # Update IP tracking
-                cursor.execute('''
-                    INSERT INTO ip_tracking (ip_address, first_seen, last_seen, total_attacks)
-                    VALUES (?, ?, ?, 1)
-                    ON CONFLICT(ip_address) DO UPDATE SET
-                        last_seen = ?,
-                        total_attacks = total_attacks + 1,
-                        threat_level = CASE
-                            WHEN total_attacks + 1 >= 50 THEN 'critical'
-                            WHEN total_attacks + 1 >= 20 THEN 'high'
-                            WHEN total_attacks + 1 >= 5 THEN 'medium'
-                            ELSE 'low'
-                        END
-                ''', (source_ip, timestamp, timestamp, timestamp))
-                
-                # Create alert for high severity
-                if attack_data.get('severity') == 'high':
-                    cursor.execute('''
-                        INSERT INTO alerts (timestamp, alert_type, source_ip, message, severity, attack_id)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (
-                        timestamp,
-                        attack_data.get('type', 'unknown'),
-                        source_ip,
-                        f"High severity attack from {source_ip}",
-                        'high',
-                        attack_id
-                    ))
+                # Create or extend an aggregated alert
+                self._process_alert(cursor, attack_data, source_ip, timestamp, attack_id)
                 
                 conn.commit()
                 conn.close()
                 
                 # Log to file
                 self._log_to_file(attack_data)
+
+                for hook in self._store_hooks:
+                    try:
+                        hook(attack_data, enrich)
+                    except Exception as e:
+                        print(f"[!] Store hook error: {e}")
                 
                 return attack_id
                 
             except Exception as e:
                 print(f"[!] Logging error: {e}")
                 return None
-    
+
+    def _insert_attack(self, cursor, attack_data, timestamp, raw_payload=None):
+        """Insert one attacks row and account it in memory (caller holds self.lock)"""
+        source_ip = attack_data.get('source_ip', 'unknown')
+
+        # Sessionize before the insert so the row carries its session id
+        session_id = self.sessions.observe(attack_data) if self.track_sessions else None
+
+        payload = attack_data.get('payload', '')[:5000]
+        cluster_id = self._assign_cluster(attack_data, payload, parse_timestamp(timestamp))
+        payload_codec, payload_blob = None, None
+        if self.payload_codec and raw_payload:
+            payload_codec, payload_blob = self.payload_codec.compress(raw_payload)
+            payload = payload[:self.PAYLOAD_PREVIEW_CHARS]
+
+        cursor.execute('''
+            INSERT INTO attacks (
+                timestamp, type, source_ip, source_port, target_port,
+                simulated_port, service, payload, payload_size, severity,
+                user_agent, connection_id, payload_blob, payload_codec, sample_rate,
+                session_id, threat_feeds, sensor_id, event_id, asn, org, country, is_vpn,
+                cluster_id, credentials, commands
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            timestamp,
+            attack_data.get('type', 'connection_attempt'),
+            source_ip,
+            attack_data.get('source_port'),
+            attack_data.get('target_port'),
+            attack_data.get('simulated_port'),
+            attack_data.get('service', 'unknown'),
+            payload,
+            attack_data.get('payload_size', 0),
+            attack_data.get('severity', 'low'),
+            attack_data.get('user_agent', ''),
+            attack_data.get('connection_id'),
+            payload_blob,
+            payload_codec,
+            attack_data.get('sample_rate') or 1.0,
+            session_id,
+            ','.join(attack_data.get('threat_feeds') or ()) or None,
+            attack_data.get('sensor_id'),
+            attack_data.get('event_id'),
+            attack_data.get('asn'),
+            attack_data.get('org'),
+            attack_data.get('country'),
+            1 if attack_data.get('is_vpn') else 0,
+            cluster_id,
+            json.dumps(attack_data['credentials']) if attack_data.get('credentials') else None,
+            json.dumps(attack_data['commands']) if attack_data.get('commands') else None
+        ))
+
+        # Update the in-memory attacker table (flushed to ip_tracking in batches)
+        self.attackers.record(
+            source_ip,
+            attack_data.get('target_port'),
+            attack_data.get('service'),
+            attack_data.get('severity', 'low')
+        )
+        return cursor.lastrowid
+
+    def import_attacks(self, events):
+        """Bulk-load attacks shipped by remote sensors in one transaction (collector.py)
+
+        Events carry sensor_id/event_id; ones already stored are skipped.
+        Enrichment shipped with an event is kept as is (no lookups here).
+        Returns (inserted, duplicates).
+        """
+        with self.lock:
+            try:
+                conn = self._get_connection()
+                cursor = conn.cursor()
+                seen = set()
+                for sensor_id in {e.get('sensor_id') for e in events}:
+                    ids = [e.get('event_id') for e in events if e.get('sensor_id') == sensor_id]
+                    for i in range(0, len(ids), 500):
+                        chunk = ids[i:i + 500]
+                        rows = cursor.execute(
+                            f"SELECT event_id FROM attacks WHERE sensor_id = ? AND event_id IN ({','.join('?' * len(chunk))})",
+                            [sensor_id] + chunk
+                        ).fetchall()
+                        seen.update((sensor_id, r[0]) for r in rows)
+
+                inserted = []
+                for attack_data in events:
+                    key = (attack_data.get('sensor_id'), attack_data.get('event_id'))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    timestamp = attack_data.get('timestamp') or datetime.now().isoformat()
+                    source_ip = attack_data.get('source_ip', 'unknown')
+                    attack_id = self._insert_attack(cursor, attack_data, timestamp)
+                    if attack_data.get('country') or attack_data.get('org'):
+                        self.attackers.set_enrichment(source_ip, {k: attack_data.get(k) for k in
+                                                                  ('asn', 'org', 'country', 'is_vpn')})
+                    self._process_alert(cursor, attack_data, source_ip, timestamp, attack_id)
+                    inserted.append(attack_data)
+                conn.commit()
+                conn.close()
+                if inserted:
+                    self._start_attacker_flush()
+                    with open(self.log_file, 'a', encoding='utf-8') as f:
+                        f.writelines(json.dumps(a, default=str) + '\n' for a in inserted)
+                return len(inserted), len(events) - len(inserted)
+            except Exception as e:
+                print(f"[!] Import error: {e}")
+                raise
+
+    def _process_alert(self, cursor, attack_data, source_ip, timestamp, attack_id):
+        """Run the event through the alert aggregator (caller holds self.lock)"""
+        alert_type = attack_data.get('type', 'unknown')
+        decision = self.alert_aggregator.observe(source_ip, alert_type, attack_data.get('severity', 'low'))
+        if decision is not None:
+            self._write_alert(cursor, decision, alert_type, source_ip, timestamp, attack_id)
+
+    def _write_alert(self, cursor, decision, alert_type, source_ip, timestamp, attack_id):
+        """Insert a new aggregated alert or extend the open one"""
+        action, group = decision
+        last_seen = format_epoch(group.last_seen)
+        if action == 'update':
+            # The database is authoritative: an alert acknowledged by another process
+            # (dashboard vs capture daemon) is not extended, the occurrence opens a new one
+            cursor.execute('''
+                UPDATE alerts SET occurrence_count = ?, last_seen = ?, attack_id = COALESCE(?, attack_id)
+                WHERE id = ? AND is_acknowledged = 0
+            ''', (group.count, last_seen, attack_id, group.alert_id))
+            if cursor.rowcount:
+                return
+            self._pending_alerts = max(0, self._pending_alerts - 1)
+            group.count = 1
+            group.first_seen = group.last_seen
+
+        rule = group.rule
+        cursor.execute('''
+            INSERT INTO alerts (timestamp, alert_type, source_ip, message, severity, attack_id,
+                                occurrence_count, first_seen, last_seen, rule)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            timestamp,
+            alert_type,
+            source_ip,
+            rule.message.format(source_ip=source_ip, alert_type=alert_type, count=group.count),
+            rule.severity,
+            attack_id,
+            group.count,
+            format_epoch(group.first_seen),
+            last_seen,
+            rule.name
+        ))
+        group.alert_id = cursor.lastrowid
+        self._pending_alerts += 1
+
+    def count_attack(self, attack_data):
+        """Account an event whose full row was sampled out
+
+        Attacker counters and alert aggregation still see every event;
+        only the attacks row and the JSON log line are skipped.
+        """
+        source_ip = attack_data.get('source_ip', 'unknown')
+        with self.lock:
+            try:
+                self.attackers.record(
+                    source_ip,
+                    attack_data.get('target_port'),
+                    attack_data.get('service'),
+                    attack_data.get('severity', 'low')
+                )
+                if self.track_sessions:
+                    self.sessions.observe(attack_data)
+                self._start_attacker_flush()
+
+                alert_type = attack_data.get('type', 'unknown')
+                decision = self.alert_aggregator.observe(source_ip, alert_type, attack_data.get('severity', 'low'))
+                if decision is not None:
+                    conn = self._get_connection()
+                    timestamp = attack_data.get('timestamp', datetime.now().isoformat())
+                    self._write_alert(conn.cursor(), decision, alert_type, source_ip, timestamp, None)
+                    conn.commit()
+                    conn.close()
+            except Exception as e:
+                print(f"[!] Counting error: {e}")
+
     def _log_to_file(self, attack_data):
         """Log attack to JSON file"""
         try:
@@ -251,6 +786,21 @@ class HoneypotLogger:
         except Exception:
             return None
     
+    def get_attack_rows(self, limit=1000000):
+        """Newest attacks as analytics rows, oldest first
+        (timestamp, source_ip, target_port, service, type, severity, sample_rate)"""
+        try:
+            conn = self._get_connection()
+            rows = conn.execute('''
+                SELECT timestamp, source_ip, target_port, service, type, severity, sample_rate
+                FROM (SELECT * FROM attacks ORDER BY id DESC LIMIT ?) ORDER BY id
+            ''', (limit,)).fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            print(f"[!] Error loading attack rows: {e}")
+            return []
+
     def get_recent_attacks(self, limit=100):
         """Get recent attacks"""
         try:
@@ -259,15 +809,17 @@ class HoneypotLogger:
             
             cursor.execute('''
                 SELECT id, timestamp, type, source_ip, source_port, target_port,
-                       service, payload, severity, connection_id
+                       service, payload, severity, connection_id, threat_feeds
                 FROM attacks 
                 ORDER BY timestamp DESC 
                 LIMIT ?
             ''', (limit,))
             
             columns = ['id', 'timestamp', 'type', 'source_ip', 'source_port', 
-                      'target_port', 'service', 'payload', 'severity', 'connection_id']
+                      'target_port', 'service', 'payload', 'severity', 'connection_id', 'threat_feeds']
             attacks = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            for attack in attacks:
+                attack['threat_feeds'] = attack['threat_feeds'].split(',') if attack['threat_feeds'] else []
             
             conn.close()
             return attacks
@@ -275,7 +827,401 @@ class HoneypotLogger:
         except Exception as e:
             print(f"[!] Error retrieving attacks: {e}")
             return []
-    
+
+    def get_attacks_seq(self):
+        """Highest attack id ever assigned (AUTOINCREMENT counter, never reused after deletes)"""
+        try:
+            conn = self._get_connection()
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'attacks'").fetchone()
+            conn.close()
+            return row[0] if row else 0
+        except Exception as e:
+            print(f"[!] Error reading attack sequence: {e}")
+            return None
+
+    def get_attacks_after(self, attack_id, limit=100000):
+        """Attacks with an id above attack_id, oldest first (at most limit rows)"""
+        try:
+            conn = self._get_connection()
+            cursor = conn.execute('''
+                SELECT id, timestamp, type, source_ip, source_port, target_port,
+                       service, payload, severity, connection_id, threat_feeds, sample_rate
+                FROM attacks WHERE id > ? ORDER BY id LIMIT ?
+            ''', (attack_id, limit))
+            columns = [c[0] for c in cursor.description]
+            attacks = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            conn.close()
+            for attack in attacks:
+                attack['threat_feeds'] = attack['threat_feeds'].split(',') if attack['threat_feeds'] else []
+            return attacks
+        except Exception as e:
+            print(f"[!] Error retrieving attacks: {e}")
+            return []
+
+    def save_snapshot(self, name, attacks_seq, data):
+        """Store a named JSON snapshot taken at attack id attacks_seq"""
+        try:
+            conn = self._get_connection()
+            conn.execute('''
+                INSERT OR REPLACE INTO snapshots (name, saved_at, attacks_seq, data) VALUES (?, ?, ?, ?)
+            ''', (name, time.time(), attacks_seq, json.dumps(data, separators=(',', ':'))))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"[!] Error saving snapshot {name}: {e}")
+            return False
+
+    def get_snapshot(self, name):
+        """{'saved_at', 'attacks_seq', 'data'} or None"""
+        try:
+            conn = self._get_connection()
+            row = conn.execute('SELECT saved_at, attacks_seq, data FROM snapshots WHERE name = ?',
+                               (name,)).fetchone()
+            conn.close()
+            if row is None:
+                return None
+            return {'saved_at': row[0], 'attacks_seq': row[1], 'data': json.loads(row[2])}
+        except Exception as e:
+            print(f"[!] Error loading snapshot {name}: {e}")
+            return None
+
+    def get_sessions(self, limit=50, source_ip=None, open_only=False):
+        """Session summaries, newest first"""
+        self.flush_sessions()
+        try:
+            conn = self._get_connection()
+            where, params = [], []
+            if source_ip:
+                where.append('source_ip = ?')
+                params.append(source_ip)
+            if open_only:
+                where.append('is_open = 1')
+            sql = f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions"
+            if where:
+                sql += ' WHERE ' + ' AND '.join(where)
+            sql += ' ORDER BY start_time DESC LIMIT ?'
+            rows = conn.execute(sql, params + [limit]).fetchall()
+            conn.close()
+            return [_session_dict(row) for row in rows]
+        except Exception as e:
+            print(f"[!] Error retrieving sessions: {e}")
+            return []
+
+    def get_session(self, session_id, event_limit=500):
+        """One session summary with its stored events in order"""
+        self.flush_sessions()
+        try:
+            conn = self._get_connection()
+            row = conn.execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE session_id = ?",
+                (session_id,)).fetchone()
+            if row is None:
+                conn.close()
+                return None
+            columns = ['id', 'timestamp', 'type', 'source_port', 'target_port', 'service',
+                       'payload', 'severity', 'sample_rate']
+            events = conn.execute('''
+                SELECT id, timestamp, type, source_port, target_port, service, payload, severity, sample_rate
+                FROM attacks WHERE session_id = ? ORDER BY id LIMIT ?
+            ''', (session_id, event_limit)).fetchall()
+            conn.close()
+            session = _session_dict(row)
+            session['events'] = [dict(zip(columns, e)) for e in events]
+            return session
+        except Exception as e:
+            print(f"[!] Error retrieving session {session_id}: {e}")
+            return None
+
+    def backfill_sessions(self, gap=None, batch=5000):
+        """Rebuild the sessions table (and attacks.session_id) from historical attacks"""
+        builder = SessionBuilder(gap=gap or self.sessions.gap, max_open=10 ** 9)
+        attacks = 0
+        with self.lock:
+            conn = self._get_connection()
+            conn.execute('DELETE FROM sessions')
+            # julianday() orders both stored timestamp formats correctly
+            cursor = conn.execute('''
+                SELECT id, timestamp, source_ip, target_port, service, type, severity, sample_rate
+                FROM attacks ORDER BY julianday(timestamp), id
+            ''')
+            while True:
+                chunk = cursor.fetchmany(batch)
+                if not chunk:
+                    break
+                assignments = []
+                ts = None
+                for attack_id, timestamp, source_ip, port, service, etype, severity, rate in chunk:
+                    ts = parse_timestamp(timestamp)
+                    if ts is None:
+                        continue
+                    event = {'source_ip': source_ip, 'target_port': port, 'service': service,
+                             'type': etype, 'severity': severity}
+                    weight = max(1, int(round(1.0 / (rate or 1.0))))
+                    assignments.append((builder.observe(event, now=ts, weight=weight), attack_id))
+                attacks += len(chunk)
+                if ts is not None:
+                    builder.expire(now=ts)
+                conn.executemany('UPDATE attacks SET session_id = ? WHERE id = ?', assignments)
+                self._upsert_sessions(conn, builder.drain_dirty())
+            # Sessions still within the gap of now stay open
+            builder.expire()
+            self._upsert_sessions(conn, builder.drain_dirty())
+            conn.commit()
+            sessions = conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+            conn.close()
+
+            self.sessions.clear()
+        self._load_open_sessions()
+        return {'attacks': attacks, 'sessions': sessions}
+
+    def get_clusters(self, limit=50, order='size', min_events=1):
+        """Payload cluster summaries, largest (order='size') or most recently seen first"""
+        self.flush_clusters()
+        try:
+            conn = self._get_connection()
+            order_by = 'last_seen DESC' if order == 'recent' else 'event_count DESC'
+            rows = conn.execute(
+                f"SELECT {', '.join(CLUSTER_COLUMNS)} FROM payload_clusters "
+                f"WHERE event_count >= ? ORDER BY {order_by} LIMIT ?", (min_events, limit)).fetchall()
+            total = conn.execute('SELECT COUNT(*) FROM payload_clusters').fetchone()[0]
+            conn.close()
+            return {'total': total, 'clusters': [_cluster_dict(row) for row in rows]}
+        except Exception as e:
+            print(f"[!] Error retrieving clusters: {e}")
+            return {'total': 0, 'clusters': []}
+
+    def get_cluster(self, cluster_id, event_limit=100):
+        """One cluster summary with its top sources and newest stored events"""
+        self.flush_clusters()
+        try:
+            conn = self._get_connection()
+            row = conn.execute(
+                f"SELECT {', '.join(CLUSTER_COLUMNS)} FROM payload_clusters WHERE cluster_id = ?",
+                (cluster_id,)).fetchone()
+            if row is None:
+                conn.close()
+                return None
+            sources = conn.execute('''
+                SELECT source_ip, COUNT(*) FROM attacks WHERE cluster_id = ?
+                GROUP BY source_ip ORDER BY COUNT(*) DESC
+            ''', (cluster_id,)).fetchall()
+            columns = ['id', 'timestamp', 'type', 'source_ip', 'target_port', 'service', 'payload', 'severity']
+            events = conn.execute('''
+                SELECT id, timestamp, type, source_ip, target_port, service, payload, severity
+                FROM attacks WHERE cluster_id = ? ORDER BY id DESC LIMIT ?
+            ''', (cluster_id, event_limit)).fetchall()
+            conn.close()
+            cluster = _cluster_dict(row)
+            cluster['sources'] = len(sources)
+            cluster['top_sources'] = [{'ip': ip, 'count': count} for ip, count in sources[:20]]
+            cluster['events'] = [dict(zip(columns, e)) for e in events]
+            return cluster
+        except Exception as e:
+            print(f"[!] Error retrieving cluster {cluster_id}: {e}")
+            return None
+
+    def backfill_clusters(self, batch=5000):
+        """Rebuild the payload_clusters table (and attacks.cluster_id) from stored payloads"""
+        index = ClusterIndex(threshold=self.clusters.threshold, max_clusters=10 ** 9)
+        attacks = 0
+        with self.lock:
+            conn = self._get_connection()
+            conn.execute('DELETE FROM payload_clusters')
+            conn.execute('UPDATE attacks SET cluster_id = NULL WHERE cluster_id IS NOT NULL')
+            cursor = conn.execute('''
+                SELECT id, timestamp, type, service, payload, payload_blob, payload_codec, sample_rate
+                FROM attacks WHERE payload != '' OR payload_blob IS NOT NULL ORDER BY id
+            ''')
+            while True:
+                chunk = cursor.fetchmany(batch)
+                if not chunk:
+                    break
+                assignments = []
+                for attack_id, timestamp, etype, service, payload, blob, codec, rate in chunk:
+                    if blob is not None:
+                        try:
+                            payload = decode_payload(self._payload_reader.decompress(codec, blob))[:5000]
+                        except Exception:
+                            pass  # keep the stored preview
+                    event = {'type': etype, 'service': service}
+                    weight = max(1, int(round(1.0 / (rate or 1.0))))
+                    cluster_id = index.assign(event, payload or '', now=parse_timestamp(timestamp), weight=weight)
+                    if cluster_id is not None:
+                        assignments.append((cluster_id, attack_id))
+                attacks += len(assignments)
+                conn.executemany('UPDATE attacks SET cluster_id = ? WHERE id = ?', assignments)
+                self._upsert_clusters(conn, index.drain_dirty())
+            conn.commit()
+            clusters = conn.execute('SELECT COUNT(*) FROM payload_clusters').fetchone()[0]
+            conn.close()
+
+            self.clusters.clear()
+            self._clusters_loaded = False
+        return {'attacks': attacks, 'clusters': clusters}
+
+    def get_credentials(self, limit=50, service=None):
+        """Most tried username/password pairs captured by the service emulators"""
+        where = 'AND a.service = ?' if service else ''
+        params = ((service,) if service else ()) + (limit,)
+        try:
+            conn = self._get_connection()
+            rows = conn.execute(f'''
+                SELECT json_extract(c.value, '$.username') AS username,
+                       json_extract(c.value, '$.password') AS password,
+                       a.service, COUNT(*), COUNT(DISTINCT a.source_ip), MAX(a.timestamp)
+                FROM attacks a, json_each(a.credentials) c
+                WHERE a.credentials IS NOT NULL {where}
+                GROUP BY username, password, a.service
+                ORDER BY COUNT(*) DESC LIMIT ?
+            ''', params).fetchall()
+            total = conn.execute(f'''
+                SELECT COALESCE(SUM(json_array_length(a.credentials)), 0) FROM attacks a
+                WHERE a.credentials IS NOT NULL {where}
+            ''', params[:-1]).fetchone()[0]
+            conn.close()
+            columns = ['username', 'password', 'service', 'attempts', 'sources', 'last_seen']
+            return {'total': total, 'credentials': [dict(zip(columns, row)) for row in rows]}
+        except Exception as e:
+            print(f"[!] Error retrieving credentials: {e}")
+            return {'total': 0, 'credentials': []}
+
+    def save_scan_job(self, job):
+        """Insert or replace a finished scan job (dict from ScanJob.to_dict)"""
+        try:
+            conn = self._get_connection()
+            conn.execute(f"""
+                INSERT OR REPLACE INTO scan_jobs ({', '.join(SCAN_JOB_COLUMNS)}, results)
+                VALUES ({', '.join('?' * (len(SCAN_JOB_COLUMNS) + 1))})
+            """, [json.dumps(job.get(c)) if c in ('ports', 'diff') else job[c] for c in SCAN_JOB_COLUMNS]
+                 + [json.dumps(job.get('results', []))])
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"[!] Error saving scan job {job.get('job_id')}: {e}")
+            return False
+
+    def get_scan_jobs(self, limit=50):
+        """Stored scan jobs without their results, newest first"""
+        try:
+            conn = self._get_connection()
+            rows = conn.execute(f"SELECT {', '.join(SCAN_JOB_COLUMNS)} FROM scan_jobs "
+                                "ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+            conn.close()
+            return [_scan_job_dict(row) for row in rows]
+        except Exception as e:
+            print(f"[!] Error retrieving scan jobs: {e}")
+            return []
+
+    def get_scan_job(self, job_id):
+        """One stored scan job with its results"""
+        try:
+            conn = self._get_connection()
+            row = conn.execute(f"SELECT {', '.join(SCAN_JOB_COLUMNS)}, results FROM scan_jobs "
+                               "WHERE job_id = ?", (job_id,)).fetchone()
+            conn.close()
+            if row is None:
+                return None
+            job = _scan_job_dict(row[:-1])
+            job['results'] = json.loads(row[-1]) if row[-1] else []
+            return job
+        except Exception as e:
+            print(f"[!] Error retrieving scan job {job_id}: {e}")
+            return None
+
+    def get_scan_state(self, first_key, last_key):
+        """(host, port, state, first_seen, last_seen, last_change) rows for a host_key range"""
+        try:
+            conn = self._get_connection()
+            rows = conn.execute('''
+                SELECT host, port, state, first_seen, last_seen, last_change FROM scan_results
+                WHERE host_key BETWEEN ? AND ?
+            ''', (first_key, last_key)).fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            print(f"[!] Error retrieving scan state: {e}")
+            return []
+
+    def save_scan_state(self, rows):
+        """Upsert (host, host_key, port, state, first_seen, last_seen, last_change) rows"""
+        try:
+            conn = self._get_connection()
+            conn.executemany('''
+                INSERT INTO scan_results (host, host_key, port, state, first_seen, last_seen, last_change)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(host_key, port) DO UPDATE SET
+                    state = excluded.state, last_seen = excluded.last_seen, last_change = excluded.last_change
+            ''', rows)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"[!] Error saving scan state: {e}")
+            return False
+
+    def get_scan_results(self, network, open_only=False, limit=5000):
+        """Known hosts of a range with their last seen port states (ValueError for a bad range)"""
+        key_range = network_key_range(network)
+        try:
+            conn = self._get_connection()
+            rows = conn.execute('''
+                SELECT host, port, state, first_seen, last_seen, last_change FROM scan_results
+                WHERE host_key BETWEEN ? AND ? ORDER BY host_key, port
+            ''', key_range).fetchall()
+            conn.close()
+        except Exception as e:
+            print(f"[!] Error retrieving scan results: {e}")
+            return []
+        hosts = {}
+        for host, port, state, first_seen, last_seen, last_change in rows:
+            entry = hosts.setdefault(host, {'host': host, 'state': None, 'ports': []})
+            if port == 0:
+                entry.update(state=state, first_seen=format_epoch(first_seen),
+                             last_seen=format_epoch(last_seen), last_change=format_epoch(last_change))
+            elif not open_only or state == 'open':
+                entry['ports'].append({'port': port, 'state': state, 'last_seen': format_epoch(last_seen),
+                                       'last_change': format_epoch(last_change)})
+        results = list(hosts.values())
+        if open_only:
+            results = [h for h in results if h['ports']]
+        return results[:limit]
+
+    def get_attack_payload(self, attack_id):
+        """Get the full payload of one attack, decompressing it only on request"""
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT payload, payload_size, payload_blob, payload_codec
+                FROM attacks WHERE id = ?
+            ''', (attack_id,))
+            row = cursor.fetchone()
+            conn.close()
+
+            if row is None:
+                return None
+
+            payload, payload_size, blob, codec = row
+            if blob is None:
+                return {'id': attack_id, 'payload': payload or '', 'payload_size': payload_size,
+                        'codec': None, 'stored_size': len((payload or '').encode('utf-8'))}
+
+            raw = self._payload_reader.decompress(codec, blob)
+            return {
+                'id': attack_id,
+                'payload': decode_payload(raw),
+                'payload_hex': raw.hex(),
+                'payload_size': payload_size,
+                'codec': codec,
+                'stored_size': len(blob)
+            }
+
+        except Exception as e:
+            print(f"[!] Error retrieving payload for attack id {attack_id}: {e}")
+            return None
+
     def get_statistics(self):
         """Get comprehensive statistics"""
         try:
@@ -284,44 +1230,44 @@ class HoneypotLogger:
             
             stats = {}
             
-            cursor.execute('SELECT COUNT(*) FROM attacks')
-            stats['total_attacks'] = cursor.fetchone()[0]
+            # Sampled rows stand for 1/sample_rate events each
+            cursor.execute('SELECT CAST(ROUND(SUM(1.0 / COALESCE(sample_rate, 1.0))) AS INTEGER) FROM attacks')
+            stats['total_attacks'] = cursor.fetchone()[0] or 0
             
             cursor.execute('SELECT COUNT(DISTINCT source_ip) FROM attacks')
             stats['unique_ips'] = cursor.fetchone()[0]
             
             cursor.execute('''
-                SELECT type, COUNT(*) as count FROM attacks 
+                SELECT type, CAST(ROUND(SUM(1.0 / COALESCE(sample_rate, 1.0))) AS INTEGER) as count FROM attacks 
                 GROUP BY type ORDER BY count DESC
             ''')
             stats['attacks_by_type'] = dict(cursor.fetchall())
             
             cursor.execute('''
-                SELECT target_port, COUNT(*) as count FROM attacks 
+                SELECT target_port, CAST(ROUND(SUM(1.0 / COALESCE(sample_rate, 1.0))) AS INTEGER) as count FROM attacks 
                 GROUP BY target_port ORDER BY count DESC LIMIT 10
             ''')
             stats['attacks_by_port'] = dict(cursor.fetchall())
             
             cursor.execute('''
-                SELECT severity, COUNT(*) as count FROM attacks GROUP BY severity
+                SELECT severity, CAST(ROUND(SUM(1.0 / COALESCE(sample_rate, 1.0))) AS INTEGER) as count FROM attacks GROUP BY severity
             ''')
             stats['attacks_by_severity'] = dict(cursor.fetchall())
             
             cursor.execute('''
-                SELECT source_ip, COUNT(*) as count FROM attacks 
+                SELECT source_ip, CAST(ROUND(SUM(1.0 / COALESCE(sample_rate, 1.0))) AS INTEGER) as count FROM attacks 
                 GROUP BY source_ip ORDER BY count DESC LIMIT 10
             ''')
             stats['top_attackers'] = [{'ip': r[0], 'count': r[1]} for r in cursor.fetchall()]
             
             cursor.execute('''
-                SELECT strftime('%H', timestamp) as hour, COUNT(*) as count
+                SELECT strftime('%H', timestamp) as hour, CAST(ROUND(SUM(1.0 / COALESCE(sample_rate, 1.0))) AS INTEGER) as count
                 FROM attacks WHERE timestamp >= datetime('now', '-24 hours')
                 GROUP BY hour ORDER BY hour
             ''')
             stats['hourly_attacks'] = dict(cursor.fetchall())
             
-            cursor.execute('SELECT COUNT(*) FROM alerts WHERE is_acknowledged = 0')
-            stats['pending_alerts'] = cursor.fetchone()[0]
+            stats['pending_alerts'] = self._pending_alerts
             
             conn.close()
             return stats
@@ -330,6 +1276,28 @@ class HoneypotLogger:
             print(f"[!] Error getting statistics: {e}")
             return {}
     
+    def get_top_attackers(self, limit=20):
+        """Top attackers by decaying threat score (served from memory)"""
+        return self.attackers.top(limit)
+
+    def get_pending_alert_count(self):
+        """Number of unacknowledged alerts (O(1), maintained in memory)"""
+        return self._pending_alerts
+
+    def refresh_pending_alerts(self):
+        """Recount pending alerts (alerts were created by another process)"""
+        self._load_pending_alerts()
+        return self._pending_alerts
+
+    def observe_attack(self, attack_data):
+        """Update the in-memory attacker table for an attack logged by another process"""
+        self.attackers.record(
+            attack_data.get('source_ip', 'unknown'),
+            attack_data.get('target_port'),
+            attack_data.get('service'),
+            attack_data.get('severity', 'low')
+        )
+
     def get_alerts(self, limit=50):
         """Get unacknowledged alerts"""
         try:
@@ -337,12 +1305,14 @@ class HoneypotLogger:
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, timestamp, alert_type, source_ip, message, severity
+                SELECT id, timestamp, alert_type, source_ip, message, severity,
+                       occurrence_count, first_seen, last_seen, rule
                 FROM alerts WHERE is_acknowledged = 0
                 ORDER BY timestamp DESC LIMIT ?
             ''', (limit,))
             
-            columns = ['id', 'timestamp', 'alert_type', 'source_ip', 'message', 'severity']
+            columns = ['id', 'timestamp', 'alert_type', 'source_ip', 'message', 'severity',
+                       'occurrence_count', 'first_seen', 'last_seen', 'rule']
             alerts = [dict(zip(columns, row)) for row in cursor.fetchall()]
             
             conn.close()
@@ -362,6 +1332,14 @@ class HoneypotLogger:
             columns = [d[0] for d in cursor.description]
             attacks = [dict(zip(columns, row)) for row in cursor.fetchall()]
             conn.close()
+
+            # Exports carry the full payload, so compressed rows are expanded here
+            columns = [c for c in columns if c not in ('payload_blob', 'payload_codec')]
+            for a in attacks:
+                blob = a.pop('payload_blob', None)
+                codec = a.pop('payload_codec', None)
+                if blob is not None:
+                    a['payload'] = decode_payload(self._payload_reader.decompress(codec, blob))
             
             if format == 'json':
                 return json.dumps(attacks, indent=2, default=str)
@@ -386,8 +1364,18 @@ class HoneypotLogger:
             cursor.execute('DELETE FROM attacks')
             cursor.execute('DELETE FROM ip_tracking')
             cursor.execute('DELETE FROM alerts')
+            cursor.execute('DELETE FROM sessions')
+            cursor.execute('DELETE FROM payload_clusters')
+            cursor.execute('DELETE FROM snapshots')
             conn.commit()
             conn.close()
+
+            with self.lock:
+                self.alert_aggregator.forget()
+                self._pending_alerts = 0
+                self.attackers.clear()
+                self.sessions.clear()
+                self.clusters.clear()
             
             with open(self.log_file, 'w') as f:
                 f.write('')
@@ -400,16 +1388,57 @@ class HoneypotLogger:
 
     def acknowledge_alert(self, alert_id):
         """Mark an alert as acknowledged"""
+        return self.acknowledge_alerts(alert_ids=[alert_id]) is not None
+
+    def acknowledge_alerts(self, alert_ids=None, source_ip=None, alert_type=None):
+        """Bulk acknowledge alerts by id list and/or source/type filter
+
+        With no arguments every pending alert is acknowledged.
+        Returns the number of alerts acknowledged, or None on error.
+        """
+        with self.lock:
+            try:
+                where = ['is_acknowledged = 0']
+                params = []
+                if alert_ids:
+                    where.append(f"id IN ({','.join('?' * len(alert_ids))})")
+                    params.extend(alert_ids)
+                if source_ip:
+                    where.append('source_ip = ?')
+                    params.append(source_ip)
+                if alert_type:
+                    where.append('alert_type = ?')
+                    params.append(alert_type)
+
+                conn = self._get_connection()
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT id FROM alerts WHERE {' AND '.join(where)}", params)
+                ids = [r[0] for r in cursor.fetchall()]
+                if ids:
+                    cursor.executemany('UPDATE alerts SET is_acknowledged = 1 WHERE id = ?',
+                                       [(i,) for i in ids])
+                conn.commit()
+                conn.close()
+
+                # Acknowledged groups are closed; new occurrences open a fresh alert
+                self.alert_aggregator.forget(ids)
+                self._pending_alerts = max(0, self._pending_alerts - len(ids))
+                return len(ids)
+            except Exception as e:
+                print(f"[!] Error acknowledging alerts: {e}")
+                return None
+
+    def find_event(self, event_id, sensor_id=None):
+        """Row id of the attack stored under (sensor_id, event_id), None if there is none"""
         try:
             conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute('UPDATE alerts SET is_acknowledged = 1 WHERE id = ?', (alert_id,))
-            conn.commit()
+            row = conn.execute('SELECT id FROM attacks WHERE sensor_id IS ? AND event_id = ?',
+                               (sensor_id, event_id)).fetchone()
             conn.close()
-            return True
+            return row[0] if row else None
         except Exception as e:
-            print(f"[!] Error acknowledging alert: {e}")
-            return False
+            print(f"[!] Error looking up event {event_id}: {e}")
+            return None
 
     def delete_attack(self, attack_id):
         """Delete an attack record by id"""
@@ -423,3 +1452,31 @@ class HoneypotLogger:
         except Exception as e:
             print(f"[!] Error deleting attack id {attack_id}: {e}")
             return False
+
+
+SCAN_JOB_COLUMNS = ('job_id', 'target', 'ports', 'status', 'created', 'started', 'finished',
+                    'hosts_total', 'hosts_done', 'active_hosts', 'probes', 'error', 'incremental', 'diff')
+
+
+def _scan_job_dict(row):
+    job = dict(zip(SCAN_JOB_COLUMNS, row))
+    job['ports'] = json.loads(job['ports']) if job['ports'] else None
+    job['diff'] = json.loads(job['diff']) if job['diff'] else None
+    job['incremental'] = bool(job['incremental'])
+    return job
+
+
+def _session_dict(row):
+    session = dict(zip(SESSION_COLUMNS, row))
+    for key in ('ports', 'services', 'types'):
+        session[key] = json.loads(session[key]) if session[key] else ([] if key != 'types' else {})
+    session['is_open'] = bool(session['is_open'])
+    return session
+
+
+def _cluster_dict(row):
+    cluster = dict(zip(CLUSTER_COLUMNS, row))
+    del cluster['signature']
+    for key in ('services', 'types'):
+        cluster[key] = json.loads(cluster[key]) if cluster[key] else {}
+    return cluster
@@ -1,121 +1,485 @@
 """
 Network Scanner - Scans network for active hosts and open ports
+Non-blocking asyncio connect engine: thousands of probes in flight, a global
+rate limit, and per-host timeouts adapted from measured round-trip times
 """
+import asyncio
+import errno
+import ipaddress
+import queue
 import socket
 import threading
-from concurrent.futures import ThreadPoolExecutor
 import time
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# connect_ex() results: still connecting / refused (Windows reports WSA codes)
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK)}
+_REFUSED = {errno.ECONNREFUSED, getattr(errno, 'WSAECONNREFUSED', errno.ECONNREFUSED)}
+
+# Liveness probes: any answer - including a refused connection - means the host is up
+DISCOVERY_PORTS = (80, 443)
+NETWORK_PORTS = [22, 80, 443, 3389, 8080]
+MAX_NETWORK_ADDRESSES = 65536  # /16 (IPv4) or /112 (IPv6)
+
+# While a host has no RTT sample yet, in-flight probes re-check their deadline this often
+COLD_RECHECK = 0.1
+
+
+def network_hosts(network):
+    """Host addresses of a CIDR range (ValueError if invalid or larger than /16)"""
+    net = ipaddress.ip_network(network.strip(), strict=False)
+    if net.num_addresses > MAX_NETWORK_ADDRESSES:
+        raise ValueError(f"{network} is too large (at most {MAX_NETWORK_ADDRESSES} addresses, i.e. a /16)")
+    return [str(ip) for ip in net.hosts()] or [str(net.network_address)]
+
+
+def _default_concurrency():
+    """In-flight probes, kept below the open file limit"""
+    if resource is None:
+        return 500  # select() on Windows is limited to 512 sockets
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return 2000
+    return max(50, min(2000, soft - 128))
+
+
+class _RttTimer:
+    """Per-host retransmission timeout (RFC 6298 smoothing of connect RTTs)"""
+
+    __slots__ = ('srtt', 'rttvar', 'initial', 'floor', 'ceiling')
+
+    def __init__(self, initial, floor, ceiling):
+        self.srtt = None
+        self.rttvar = None
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+
+    def observe(self, rtt):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self, attempt=0):
+        """Timeout for the attempt-th try (doubles on every retransmit)"""
+        if self.srtt is None:
+            base = self.initial
+        else:
+            base = min(self.ceiling, max(self.floor, self.srtt + 4 * self.rttvar))
+        return min(self.ceiling, base * (2 ** attempt))
+
+
+class _RateLimiter:
+    """Global probe pacing: each acquire() reserves the next 1/rate slot"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 class NetworkScanner:
-    def __init__(self):
-        """Initialize network scanner"""
-        self.timeout = 1
-        self.max_workers = 50
-    
+    """
+    TCP connect scanner:
+    - One event loop, `concurrency` probe workers pulling (host, port)
+      pairs, non-blocking sockets (no thread per probe)
+    - Optional global rate limit in probes per second
+    - Per-host adaptive timeout: starts at `timeout`, then follows the
+      host's smoothed connect RTT (connect and RST replies both count);
+      silent probes are retransmitted `retries` times with doubled timeouts
+    - Port states: open, closed (RST - host is up), filtered (no answer),
+      unreachable
+    """
+
+    def __init__(self, timeout=1.0, concurrency=None, rate=None, retries=1, min_timeout=0.05):
+        """Initialize network scanner (timeouts in seconds, rate in probes/second)"""
+        self.timeout = timeout
+        self.concurrency = concurrency or _default_concurrency()
+        self.rate = rate
+        self.retries = retries
+        self.min_timeout = min_timeout
+        self.stats = {'probes': 0, 'retransmits': 0, 'hosts_total': 0, 'hosts_done': 0}
+
     def scan(self, target):
         """Scan a network or host"""
         print(f"\n[*] Scanning: {target}")
-        
-        # Check if single host or network
+
+        # Check if single host or network (CIDR)
         if '/' in target:
             return self.scan_network(target)
         else:
             return self.scan_host(target)
-    
+
     def scan_host(self, host, ports=None):
         """Scan a single host for open ports"""
+        return self._run(self.scan_host_async(host, ports))
+
+    def scan_network(self, network, ports=None):
+        """Scan a network range (CIDR, up to /16) for active hosts"""
+        return self._run(self.scan_network_async(network, ports))
+
+    @staticmethod
+    def _run(coro):
+        """Run on a selector loop (the engine needs add_writer, which Windows' proactor lacks)"""
+        loop = asyncio.SelectorEventLoop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    async def scan_host_async(self, host, ports=None):
         if ports is None:
             # Common ports
-            ports = [21, 22, 23, 25, 53, 80, 110, 143, 443, 445, 
+            ports = [21, 22, 23, 25, 53, 80, 110, 143, 443, 445,
                     3306, 3389, 5432, 5900, 8080, 8443]
-        
+
         results = {
             'host': host,
             'open_ports': [],
             'scan_time': time.time()
         }
-        
+
         print(f"[*] Scanning {host}...")
-        
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(self._check_port, host, port): port 
-                      for port in ports}
-            
-            for future in futures:
-                port = futures[future]
-                if future.result():
-                    service = self._get_service(port)
-                    results['open_ports'].append({
-                        'port': port,
-                        'service': service
-                    })
-                    print(f"  [+] Port {port} ({service}) - OPEN")
-        
+
+        self.stats['hosts_total'] += 1
+        timers = {}
+        states = await self._probe_all(((host, port) for port in ports), timers)
+        self.stats['hosts_done'] += 1
+        for port in ports:
+            if states.get((host, port)) == 'open':
+                service = self._get_service(port)
+                results['open_ports'].append({
+                    'port': port,
+                    'service': service
+                })
+                print(f"  [+] Port {port} ({service}) - OPEN")
+
+        results['closed_ports'] = sum(1 for port in ports if states.get((host, port)) == 'closed')
+        results['filtered_ports'] = sum(1 for port in ports if states.get((host, port)) == 'filtered')
+        timer = timers.get(host)
+        results['rtt_ms'] = round(timer.srtt * 1000, 2) if timer and timer.srtt is not None else None
+        results['duration'] = round(time.time() - results['scan_time'], 3)
         return results
-    
-    def scan_network(self, network):
-        """Scan a network range for active hosts"""
-        # Simple implementation - scan 192.168.1.0/24 as example
-        base_ip = '.'.join(network.split('.')[:-1])
-        
+
+    def stream_network(self, network, ports=None):
+        """Yield each active host's result as soon as it is complete (scan runs on a helper thread)"""
+        results = queue.Queue()
+        done = object()
+        state = {}
+
+        def run():
+            async def pump():
+                state['task'] = asyncio.current_task()
+                async for host in self.iter_network_async(network, ports):
+                    results.put(host)
+            loop = state['loop'] = asyncio.SelectorEventLoop()
+            try:
+                loop.run_until_complete(pump())
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                results.put(e)
+            finally:
+                loop.close()
+                results.put(done)
+
+        thread = threading.Thread(target=run, name='scanner', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer went away (e.g. HTTP client disconnected): stop probing
+            task = state.get('task')
+            if task is not None and thread.is_alive():
+                state['loop'].call_soon_threadsafe(task.cancel)
+
+    async def scan_network_async(self, network, ports=None):
         results = {
             'network': network,
             'active_hosts': [],
             'scan_time': time.time()
         }
-        
-        print(f"[*] Scanning network {network}...")
-        
-        active_hosts = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(self._ping_host, f"{base_ip}.{i}"): i 
-                      for i in range(1, 255)}
-            
-            for future in futures:
-                host = future.result()
-                if host:
-                    active_hosts.append(host)
-                    print(f"  [+] Active host: {host}")
-        
-        # Scan each active host for open ports
-        for host in active_hosts:
-            host_info = self.scan_host(host, ports=[22, 80, 443, 3389, 8080])
-            results['active_hosts'].append(host_info)
-        
+        async for host in self.iter_network_async(network, ports):
+            results['active_hosts'].append(host)
+        results['active_hosts'].sort(key=lambda h: ipaddress.ip_address(h['host']))
+        results['duration'] = round(time.time() - results['scan_time'], 3)
         return results
-    
-    def _check_port(self, host, port):
-        """Check if a port is open"""
+
+    async def iter_network_async(self, network, ports=None, cache=None):
+        """Async generator of active host results, in completion order (cache: see scan_cache.ScanCache)"""
+        hosts = network_hosts(network)
+        print(f"[*] Scanning network {network} ({len(hosts)} hosts)...")
+
+        found = asyncio.Queue()
+        task = asyncio.ensure_future(self._sweep(hosts, ports or NETWORK_PORTS, found.put_nowait, cache))
+        task.add_done_callback(lambda _: found.put_nowait(None))
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(self.timeout)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            return result == 0
-        except:
-            return False
-    
-    def _ping_host(self, host):
-        """Check if host is active (using port 80 as a simple check)"""
+            while True:
+                host = await found.get()
+                if host is None:
+                    break
+                yield host
+            task.result()
+        finally:
+            task.cancel()
+
+    async def _sweep(self, hosts, ports, on_host, cache=None):
+        """
+        Discovery and port scanning share one work queue: a host that answers
+        a discovery probe has its port probes queued ahead of further
+        discovery, and is reported as soon as its last probe completes.
+        With a cache, hosts known to be up skip discovery and only stale
+        ports are probed; hosts recently seen down are skipped. A cached-up
+        host counts as alive only once one of its probes answers; if none
+        does, discovery probes decide whether it is recorded down.
+        """
+        timers = {}
+        states = {}
+        pending = {}  # host -> probes still outstanding
+        alive = set()
+        revalidate = set()  # cached-up hosts with no answer yet this run
+        cached = {}  # host -> {port: state} answered from the cache
+        scan_time = time.time()
+        self.stats['hosts_total'] += len(hosts)
+
+        def finish(host):
+            self.stats['hosts_done'] += 1
+            probed = {p: states.pop((host, p)) for p in set(ports) | set(DISCOVERY_PORTS) if (host, p) in states}
+            fresh = cached.pop(host, {})
+            if cache is not None:
+                # Only what was probed this run is recorded (cached entries keep their last_seen)
+                cache.record(host, host in alive, probed if host in alive else {})
+            if host in alive:
+                alive.discard(host)
+                on_host(self._host_result(host, ports, {**fresh, **probed}, timers, scan_time, len(fresh)))
+            timers.pop(host, None)
+
+        def on_result(host, port, state):
+            states[(host, port)] = state
+            more = []
+            if host not in alive and state in ('open', 'closed') and (port in DISCOVERY_PORTS or host in revalidate):
+                alive.add(host)
+                print(f"  [+] Active host: {host}")
+                if host in revalidate:
+                    revalidate.discard(host)  # its stale ports are already queued
+                else:
+                    fresh = cached.get(host, {})
+                    more = [(host, p) for p in ports
+                            if p not in DISCOVERY_PORTS and p not in fresh and (host, p) not in states]
+            pending[host] += len(more) - 1
+            if not pending[host] and host in revalidate:
+                # Every stale port was filtered: confirm liveness before recording the host up
+                revalidate.discard(host)
+                more = [(host, p) for p in DISCOVERY_PORTS if (host, p) not in states]
+                pending[host] = len(more)
+            if not pending[host]:
+                del pending[host]
+                finish(host)
+            return more
+
+        def targets():
+            for host in hosts:
+                mode, fresh = cache.plan(host, ports) if cache is not None else ('full', {})
+                if mode == 'skip':
+                    self.stats['hosts_done'] += 1
+                    continue
+                if mode == 'ports':
+                    stale = [p for p in ports if p not in fresh]
+                    if not stale:
+                        self.stats['hosts_done'] += 1
+                        on_host(self._host_result(host, ports, fresh, timers, scan_time, len(fresh)))
+                        continue
+                    revalidate.add(host)
+                    cached[host] = fresh
+                    pending[host] = len(stale)
+                    for port in stale:
+                        yield host, port
+                    continue
+                pending[host] = len(DISCOVERY_PORTS)
+                for port in DISCOVERY_PORTS:
+                    yield host, port
+
+        await self._probe_all(targets(), timers, on_result)
+
+    def _host_result(self, host, ports, states, timers, scan_time, cached_ports=0):
+        """Result for one host; states: {port: state}"""
+        open_ports = [{'port': p, 'service': self._get_service(p)}
+                      for p in ports if states.get(p) == 'open']
+        for entry in open_ports:
+            print(f"  [+] {host} port {entry['port']} ({entry['service']}) - OPEN")
+        timer = timers.get(host)
+        return {
+            'host': host,
+            'open_ports': open_ports,
+            'scan_time': scan_time,
+            'rtt_ms': round(timer.srtt * 1000, 2) if timer and timer.srtt is not None else None,
+            'cached_ports': cached_ports
+        }
+
+    # ---------- engine ----------
+
+    async def _probe_all(self, targets, timers, on_result=None):
+        """
+        Probe (host, port) pairs with bounded concurrency, returns {(host, port): state}.
+        on_result(host, port, state) may return follow-up pairs; they are
+        probed before the remaining targets.
+        """
+        limiter = _RateLimiter(self.rate)
+        states = {}
+        addresses = {}
+        targets = iter(targets)
+        followups = deque()
+        in_flight = 0
+        waiting = 0
+        idle = asyncio.Condition()
+
+        async def next_target():
+            nonlocal waiting
+            while True:
+                if followups:
+                    return followups.popleft()
+                pair = next(targets, None)
+                if pair is not None:
+                    return pair
+                if not in_flight:
+                    return None
+                # Targets exhausted but running probes may still queue follow-ups
+                async with idle:
+                    if not followups and in_flight:
+                        waiting += 1
+                        try:
+                            await idle.wait()
+                        finally:
+                            waiting -= 1
+
+        async def worker():
+            nonlocal in_flight
+            while True:
+                pair = await next_target()
+                if pair is None:
+                    break
+                host, port = pair
+                in_flight += 1
+                try:
+                    if host not in addresses:
+                        # Resolved once; workers probing the same host await the same task
+                        addresses[host] = asyncio.ensure_future(self._resolve(host))
+                    address = await addresses[host]
+                    timer = timers.get(host)
+                    if timer is None:
+                        timer = timers[host] = _RttTimer(self.timeout, self.min_timeout, self.timeout * 4)
+                    state = await self._probe(address, port, timer, limiter)
+                finally:
+                    in_flight -= 1
+                if on_result is None:
+                    states[pair] = state
+                else:
+                    followups.extend(on_result(host, port, state) or ())
+                if waiting and (followups or not in_flight):
+                    async with idle:
+                        # Wake one worker per follow-up, or all of them once the last probe is done
+                        idle.notify(len(followups) if in_flight else waiting)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return states
+
+    async def _resolve(self, host):
+        """(family, address) for a host name or literal, ('error', None) if it does not resolve"""
+        try:
+            ip = ipaddress.ip_address(host)
+            return (socket.AF_INET6 if ip.version == 6 else socket.AF_INET), str(ip)
+        except ValueError:
+            pass  # a name: resolve off-loop
+        loop = asyncio.get_running_loop()
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(0.5)
-            result = sock.connect_ex((host, 80))
-            sock.close()
-            if result == 0:
-                return host
-            # Try port 443 as well
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(0.5)
-            result = sock.connect_ex((host, 443))
-            sock.close()
-            if result == 0:
-                return host
-        except:
-            pass
-        return None
-    
+            info = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            return info[0][0], info[0][4][0]
+        except (socket.gaierror, UnicodeError):
+            return 'error', None
+
+    async def _probe(self, address, port, timer, limiter):
+        """One TCP connect probe with adaptive timeout and retransmits"""
+        family, ip = address
+        if family == 'error':
+            return 'unreachable'
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            await limiter.wait()
+            self.stats['probes'] += 1
+            if attempt:
+                self.stats['retransmits'] += 1
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            start = loop.time()
+            try:
+                # Fast path: loopback/LAN connects and refusals often complete immediately
+                err = sock.connect_ex((ip, port))
+                if err in _IN_PROGRESS:
+                    err = await self._wait_connect(loop, sock, timer, attempt, start)
+            finally:
+                sock.close()
+            if err is None:
+                continue
+            if err == 0 or err in _REFUSED:
+                timer.observe(loop.time() - start)
+                return 'open' if err == 0 else 'closed'
+            return 'unreachable'
+        return 'filtered'
+
+    async def _wait_connect(self, loop, sock, timer, attempt, start):
+        """Wait for a pending connect; returns SO_ERROR, or None on timeout"""
+        fd = sock.fileno()
+        done = loop.create_future()
+        handle = None
+
+        def on_writable():
+            if not done.done():
+                done.set_result(sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR))
+
+        def on_deadline():
+            nonlocal handle
+            if done.done():
+                return
+            # The deadline follows the timer, which sibling probes may have warmed meanwhile
+            remaining = start + timer.timeout(attempt) - loop.time()
+            if remaining <= 0:
+                done.set_result(None)
+            else:
+                handle = loop.call_later(remaining if timer.srtt is not None else min(remaining, COLD_RECHECK),
+                                         on_deadline)
+
+        loop.add_writer(fd, on_writable)
+        on_deadline()
+        try:
+            return await done
+        finally:
+            loop.remove_writer(fd)
+            if handle is not None:
+                handle.cancel()
+
     def _get_service(self, port):
         """Get service name for port"""
         services = {
@@ -0,0 +1,336 @@
+"""
+Payload Clusters - Campaign grouping by payload similarity
+Payloads are normalized (addresses, hosts, numbers, hex and random tokens masked),
+reduced to MinHash signatures and indexed with LSH, so variants of one exploit
+land in one cluster and assigning an event costs the same with 10 or 100k clusters
+
+Usage (assign clusters to historical attacks):
+    python payload_clusters.py --backfill [--db database/honeypot.db]
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+from timestamps import format_epoch, parse_timestamp
+
+np = None  # numpy, imported with the first signature (see _numpy)
+
+# Masks applied to the lowercased payload, in order; each pattern runs only when
+# its guard substring occurs (most payloads contain no UUID, URL or e-mail)
+_MASKS = (
+    ('-', re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'), '<uuid>'),
+    (':', re.compile(r'(?m)^(host|origin|referer)[ \t]*:.*$'), r'\1: <host>'),
+    ('://', re.compile(r'(?<=://)[^/\s?#"\']+'), '<host>'),
+    ('.', re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<ip>'),
+    ('@', re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+'), '<email>'),
+)
+# Words containing digits: random tokens, hex strings, else each number masked
+_DIGIT_WORD = re.compile(r'[\w-]*\d[\w-]*')
+_HEX = re.compile(r'(?:0x)?[0-9a-f]{8,}')
+_DIGITS = re.compile(r'\d+')
+_TOKEN = re.compile(r'<\w+>|\w+|[^\w\s]')
+
+SHINGLE_TOKENS = 3
+MAX_TOKENS = 1024  # longer payloads are signed on their first tokens
+MAX_SAMPLE = 300
+
+CLUSTER_COLUMNS = ('cluster_id', 'signature', 'sample', 'first_seen', 'last_seen', 'event_count',
+                   'services', 'types')
+
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+def _mask_word(match):
+    word = match.group()
+    if len(word) >= 16 and not word.isdigit() and any(c.isalpha() for c in word):
+        return '<token>'
+    if _HEX.fullmatch(word):
+        return '<hex>'
+    return _DIGITS.sub('<n>', word)
+
+
+def normalize(payload):
+    """Payload with the parts that vary between copies of one exploit masked"""
+    text = payload.lower()
+    for guard, pattern, mask in _MASKS:
+        if guard in text:
+            text = pattern.sub(mask, text)
+    return _DIGIT_WORD.sub(_mask_word, text)
+
+
+def shingle_hashes(payload):
+    """Distinct 64-bit hashes of the normalized payload's overlapping 3-token shingles"""
+    tokens = _TOKEN.findall(normalize(payload))[:MAX_TOKENS]
+    if not tokens:
+        return None
+    _numpy()
+    # crc32 is stable across processes (signatures are stored), unlike hash()
+    h = np.fromiter((zlib.crc32(t.encode('utf-8', 'surrogateescape')) for t in tokens),
+                    dtype=np.uint64, count=len(tokens))
+    if len(h) < SHINGLE_TOKENS:
+        return np.unique(h)
+    # Order-sensitive combination of consecutive token hashes (uint64 arithmetic wraps)
+    return np.unique(h[:-2] * np.uint64(0x9E3779B97F4A7C15) + h[1:-1] * np.uint64(0xC2B2AE3D27D4EB4F) + h[2:])
+
+
+class PayloadCluster:
+    """Running summary of one cluster; the founding payload's signature represents it"""
+
+    __slots__ = ('cluster_id', 'signature', 'sample', 'first_seen', 'last_seen', 'events',
+                 'services', 'types', 'keys')
+
+    def __init__(self, signature, sample, now):
+        self.cluster_id = hashlib.blake2b(signature.tobytes(), digest_size=8).hexdigest()
+        self.signature = signature
+        self.sample = sample[:MAX_SAMPLE]
+        self.first_seen = now
+        self.last_seen = now
+        self.events = 0
+        self.services = Counter()
+        self.types = Counter()
+        self.keys = []  # LSH buckets pointing at this cluster
+
+    def add(self, attack_data, now, weight=1):
+        self.last_seen = max(self.last_seen, now)
+        self.events += weight
+        if attack_data.get('service'):
+            self.services[attack_data['service']] += weight
+        self.types[attack_data.get('type', 'connection_attempt')] += weight
+
+    @classmethod
+    def from_row(cls, row):
+        values = dict(zip(CLUSTER_COLUMNS, row))
+        first_seen, last_seen = parse_timestamp(values['first_seen']), parse_timestamp(values['last_seen'])
+        if first_seen is None or last_seen is None or not values['signature']:
+            return None
+        cluster = cls(_numpy().frombuffer(values['signature'], dtype=np.uint32), values['sample'] or '', first_seen)
+        cluster.cluster_id = values['cluster_id']
+        cluster.last_seen = last_seen
+        cluster.events = values['event_count'] or 0
+        cluster.services = Counter(json.loads(values['services'] or '{}'))
+        cluster.types = Counter(json.loads(values['types'] or '{}'))
+        return cluster
+
+    def to_row(self):
+        """Row for the payload_clusters table (same column order as CLUSTER_COLUMNS)"""
+        return (
+            self.cluster_id,
+            self.signature.tobytes(),
+            self.sample,
+            format_epoch(self.first_seen),
+            format_epoch(self.last_seen),
+            self.events,
+            json.dumps(dict(self.services)),
+            json.dumps(dict(self.types))
+        )
+
+
+class ClusterIndex:
+    """
+    Incremental campaign clustering:
+    - assign() signs the payload with `num_perm` MinHash values and looks up
+      its `bands` LSH buckets; the candidate cluster most similar to it
+      (estimated Jaccard >= `threshold`) takes the event, otherwise the
+      event founds a new cluster
+    - Per-event cost is one signature plus `bands` dict lookups, independent
+      of the number of clusters; the last `cache_size` distinct payloads keep
+      their signatures, and events without a payload are not clustered
+    - Members less than `drift` similar to their cluster also index their
+      buckets, so a cluster follows a campaign that mutates gradually; past
+      `max_keys` buckets per cluster the oldest drift buckets are released
+    - At most `max_clusters` clusters stay indexed (least recently seen ones
+      are dropped from memory, their rows remain); once the index is full, a
+      cluster founded again is reloaded through `loader(cluster_id)` so its
+      counts continue instead of restarting
+    - Changed clusters are collected for batched upserts (drain_dirty)
+    """
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.5, drift=0.8, max_clusters=50000,
+                 cache_size=4096, seed=1, max_keys=None, loader=None):
+        """Initialize index; num_perm must be a multiple of bands, loader(cluster_id) returns a row or None"""
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.drift = drift
+        self.max_clusters = max_clusters
+        self.max_keys = max_keys or bands * 8
+        self.loader = loader
+        self.cache_size = cache_size
+        # Hash family h_i(x) = (a_i * x + b_i) mod 2^64 >> 32, fixed seed so stored signatures stay comparable
+        rng = random.Random(seed)
+        self._params = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(num_perm)]
+        self._a = self._b = None
+        self.clusters = OrderedDict()
+        self.buckets = {}
+        self.dirty = {}
+        self._flushing = {}  # clusters handed to the last drain_dirty()
+        self._recent = OrderedDict()  # payload -> signature; bots resend identical payloads
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, loader=None):
+        return cls(threshold=float(os.environ.get('SENTINEL_CLUSTER_THRESHOLD', 0.5)),
+                   max_clusters=int(os.environ.get('SENTINEL_CLUSTER_MAX', 50000)), loader=loader)
+
+    def signature(self, payload):
+        """MinHash signature (uint32 array) of a payload, None when it has no tokens"""
+        with self.lock:
+            signature = self._recent.get(payload)
+            if signature is not None:
+                self._recent.move_to_end(payload)
+                return signature
+        hashes = shingle_hashes(payload)
+        if hashes is None:
+            return None
+        if self._a is None:
+            self._a = np.array([a for a, _ in self._params], dtype=np.uint64)
+            self._b = np.array([b for _, b in self._params], dtype=np.uint64)
+        # uint64 arithmetic wraps, i.e. is mod 2^64
+        signature = ((np.multiply.outer(self._a, hashes) + self._b[:, None]) >> np.uint64(32)).min(axis=1)
+        signature = signature.astype(np.uint32)
+        with self.lock:
+            self._recent[payload] = signature
+            if len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+        return signature
+
+    def _band_keys(self, signature):
+        rows = self.num_perm // self.bands
+        raw = signature.tobytes()
+        width = rows * 4
+        return [(band, raw[band * width:(band + 1) * width]) for band in range(self.bands)]
+
+    def _similarity(self, sig_a, sig_b):
+        return int(np.count_nonzero(sig_a == sig_b)) / self.num_perm
+
+    def _index(self, cluster, keys):
+        for key in keys:
+            if key not in self.buckets:
+                self.buckets[key] = cluster.cluster_id
+                cluster.keys.append(key)
+        excess = len(cluster.keys) - self.max_keys
+        if excess > 0:
+            # Oldest drift buckets go first; the first `bands` (founding payload) stay
+            stale = cluster.keys[self.bands:self.bands + excess]
+            del cluster.keys[self.bands:self.bands + excess]
+            self._drop_keys(cluster, stale)
+
+    def _drop_keys(self, cluster, keys):
+        for key in keys:
+            if self.buckets.get(key) == cluster.cluster_id:
+                del self.buckets[key]
+
+    def _drop(self, cluster):
+        self._drop_keys(cluster, cluster.keys)
+        cluster.keys = []
+
+    def _reload(self, cluster_id):
+        """Cluster dropped from memory: its unflushed state, else its stored row"""
+        cluster = self.dirty.get(cluster_id) or self._flushing.get(cluster_id)
+        if cluster is None and self.loader is not None and len(self.clusters) >= self.max_clusters:
+            try:
+                row = self.loader(cluster_id)
+            except Exception as e:
+                print(f"[!] Cluster reload error: {e}")
+                row = None
+            cluster = PayloadCluster.from_row(row) if row else None
+        return cluster
+
+    def assign(self, attack_data, payload=None, now=None, weight=1):
+        """Cluster id for the event's payload (None if it has none)"""
+        payload = attack_data.get('payload') if payload is None else payload
+        if not payload or payload.isspace():
+            return None
+        signature = self.signature(payload)
+        if signature is None:
+            return None
+        now = now if now is not None else time.time()
+        keys = self._band_keys(signature)
+        with self.lock:
+            hits = Counter(self.buckets[k] for k in keys if k in self.buckets)
+            best, best_sim = None, 0.0
+            for cluster_id, _ in hits.most_common():
+                cluster = self.clusters[cluster_id]
+                sim = self._similarity(signature, cluster.signature)
+                if sim > best_sim:
+                    best, best_sim = cluster, sim
+            if best is None or best_sim < self.threshold:
+                best = PayloadCluster(signature, payload, now)
+                # Ids are derived from the signature: an identical signature joins that cluster
+                best = self.clusters.get(best.cluster_id) or self._reload(best.cluster_id) or best
+            if best.cluster_id not in self.clusters:
+                self.clusters[best.cluster_id] = best
+                self._index(best, keys)
+                if len(self.clusters) > self.max_clusters:
+                    _, oldest = self.clusters.popitem(last=False)
+                    self._drop(oldest)
+            else:
+                self.clusters.move_to_end(best.cluster_id)
+                if best_sim < self.drift:
+                    self._index(best, keys)
+            best.add(attack_data, now, weight)
+            self.dirty[best.cluster_id] = best
+            return best.cluster_id
+
+    def load_rows(self, rows):
+        """Index clusters from payload_clusters rows (oldest last_seen first)"""
+        with self.lock:
+            for row in sorted(rows, key=lambda r: r[4] or ''):
+                cluster = PayloadCluster.from_row(row)
+                if cluster is None or cluster.signature.size != self.num_perm:
+                    continue
+                self.clusters[cluster.cluster_id] = cluster
+                self._index(cluster, self._band_keys(cluster.signature))
+            while len(self.clusters) > self.max_clusters:
+                _, oldest = self.clusters.popitem(last=False)
+                self._drop(oldest)
+
+    def drain_dirty(self):
+        """Rows of all clusters changed since the last drain"""
+        with self.lock:
+            # Kept until the next drain so a reload does not read a row before it is written
+            self._flushing, self.dirty = self.dirty, {}
+            return [c.to_row() for c in self._flushing.values()]
+
+    def clear(self):
+        with self.lock:
+            self.clusters.clear()
+            self._recent.clear()
+            self.buckets.clear()
+            self.dirty = {}
+            self._flushing = {}
+
+    def __len__(self):
+        return len(self.clusters)
+
+
+if __name__ == '__main__':
+    import argparse
+    from logger_module import HoneypotLogger
+
+    parser = argparse.ArgumentParser(description='Assign payload clusters to historical attacks')
+    parser.add_argument('--db', default='database/honeypot.db')
+    parser.add_argument('--backfill', action='store_true', help='Rebuild payload_clusters and attacks.cluster_id')
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.error('nothing to do (use --backfill)')
+    logger = HoneypotLogger(db_path=args.db)
+    start = time.perf_counter()
+    result = logger.backfill_clusters()
+    print(f"[✓] Grouped {result['attacks']} payloads into {result['clusters']} clusters "
+          f"in {time.perf_counter() - start:.1f}s")
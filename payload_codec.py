@@ -0,0 +1,111 @@
+"""
+Payload Codec - Compressed storage for raw captured payload bytes
+Supports zlib (always available) and zstd with an optional trained dictionary
+"""
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+class PayloadCodec:
+    """
+    Payload compressor used by the logger's BLOB storage mode:
+    - Keeps raw bytes intact (no lossy UTF-8 decoding)
+    - zlib codec from the standard library
+    - zstd codec with an optional trained dictionary
+    - Codec tag stored per row so mixed databases stay readable
+    """
+
+    def __init__(self, codec='zlib', level=None, dict_path=None):
+        """Initialize codec ('zlib' or 'zstd')"""
+        codec = (codec or 'zlib').lower()
+        if codec == 'zstd' and zstandard is None:
+            print("[!] zstandard not installed - falling back to zlib payload compression")
+            codec = 'zlib'
+        if codec not in ('zlib', 'zstd'):
+            raise ValueError(f"Unknown payload codec: {codec}")
+
+        self.codec = codec
+        self.level = level if level is not None else (6 if codec == 'zlib' else 9)
+        self.dictionary = None
+        self.tag = codec
+
+        self._compressor = None
+        self._decompressors = {}
+
+        if codec == 'zstd':
+            if dict_path and os.path.exists(dict_path):
+                with open(dict_path, 'rb') as f:
+                    self.dictionary = zstandard.ZstdCompressionDict(f.read())
+                self.tag = f"zstd-dict:{self.dictionary.dict_id()}"
+                self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary)
+                self._decompressors[self.tag] = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+            else:
+                self._compressor = zstandard.ZstdCompressor(level=self.level)
+
+    def compress(self, data):
+        """Compress raw bytes, returns (codec_tag, blob)"""
+        if isinstance(data, str):
+            data = data.encode('utf-8', errors='surrogateescape')
+        if self.codec == 'zstd':
+            return self.tag, self._compressor.compress(data)
+        return self.tag, zlib.compress(data, self.level)
+
+    def decompress(self, codec_tag, blob):
+        """Decompress a stored BLOB according to its codec tag"""
+        if blob is None:
+            return b''
+        blob = bytes(blob)
+        if not codec_tag or codec_tag == 'raw':
+            return blob
+        if codec_tag == 'zlib':
+            return zlib.decompress(blob)
+        if codec_tag.startswith('zstd'):
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd-compressed payloads")
+            if codec_tag not in self._decompressors:
+                if codec_tag != 'zstd':
+                    raise RuntimeError(f"Payload was compressed with dictionary {codec_tag} which is not loaded")
+                self._decompressors[codec_tag] = zstandard.ZstdDecompressor()
+            return self._decompressors[codec_tag].decompress(blob)
+        raise ValueError(f"Unknown payload codec tag: {codec_tag}")
+
+    @staticmethod
+    def train_dictionary(samples, out_path, dict_size=16384):
+        """Train a zstd dictionary from sample payloads and save it to disk"""
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to train a payload dictionary")
+        samples = [s.encode('utf-8', errors='surrogateescape') if isinstance(s, str) else bytes(s)
+                   for s in samples if s]
+        dictionary = zstandard.train_dictionary(dict_size, samples)
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        with open(out_path, 'wb') as f:
+            f.write(dictionary.as_bytes())
+        print(f"[✓] Trained payload dictionary {dictionary.dict_id()} from {len(samples)} samples -> {out_path}")
+        return dictionary.dict_id()
+
+
+def decode_payload(data):
+    """Decode raw payload bytes for display without losing non-UTF-8 bytes"""
+    return data.decode('utf-8', errors='backslashreplace')
+
+
+if __name__ == '__main__':
+    # Train a zstd dictionary from payloads already stored in the database
+    import argparse
+    import sqlite3
+
+    parser = argparse.ArgumentParser(description='Train a zstd payload dictionary')
+    parser.add_argument('--db', default='database/honeypot.db')
+    parser.add_argument('--out', default='database/payloads.zdict')
+    parser.add_argument('--size', type=int, default=16384)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    rows = conn.execute("SELECT payload FROM attacks WHERE payload IS NOT NULL AND payload != ''").fetchall()
+    conn.close()
+    PayloadCodec.train_dictionary([r[0] for r in rows], args.out, dict_size=args.size)
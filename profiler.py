@@ -0,0 +1,306 @@
+"""
+Profiler - On-demand diagnostics for a running sensor
+Time-boxed sampling profiles of all threads, tracemalloc snapshots and diffs,
+and thread counts per subsystem. Nothing runs (or is traced) until requested.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+
+# Thread name prefix -> subsystem (threads are named where they are created)
+THREAD_SUBSYSTEMS = (
+    ('MainThread', 'main'),
+    ('listener-', 'listener'),
+    ('bus-', 'event_bus'),
+    ('capture-ingest', 'ingest'),
+    ('trap-ingest', 'ingest'),
+    ('scan-expiry', 'scan_detector'),
+    ('attacker-flush', 'logger'),
+    ('analytics-seed', 'analytics'),
+    ('scan-job', 'scanner'),
+    ('threat-intel', 'threat_intel'),
+    ('state-snapshot', 'state'),
+    ('shipper', 'federation'),
+    ('collector', 'federation'),
+    ('profiler', 'profiler'),
+)
+
+# Fallback for unnamed threads: first matching module in the thread's stack
+MODULE_SUBSYSTEMS = (
+    ('event_emitter', 'emitter'),
+    ('socketio', 'socketio'),
+    ('engineio', 'socketio'),
+    ('simple_websocket', 'socketio'),
+    ('werkzeug', 'http'),
+    ('socketserver', 'http'),
+)
+
+MAX_PROFILE_SECONDS = 60
+
+
+def _frame_label(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}.{code.co_name}"
+
+
+def _stack(frame):
+    """Frame labels from outermost to innermost"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def classify_thread(thread, frame=None):
+    """Subsystem a thread belongs to, from its name or (unnamed threads) its stack"""
+    for prefix, subsystem in THREAD_SUBSYSTEMS:
+        if thread.name.startswith(prefix):
+            return subsystem
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace('\\', '/')
+        for marker, subsystem in MODULE_SUBSYSTEMS:
+            if f"/{marker}" in filename:
+                return subsystem
+        frame = frame.f_back
+    return 'other'
+
+
+def thread_census():
+    """Live threads grouped by subsystem"""
+    frames = sys._current_frames()
+    threads = []
+    counts = Counter()
+    for thread in threading.enumerate():
+        subsystem = classify_thread(thread, frames.get(thread.ident))
+        counts[subsystem] += 1
+        threads.append({'name': thread.name, 'ident': thread.ident, 'daemon': thread.daemon,
+                        'subsystem': subsystem})
+    return {'total': len(threads), 'by_subsystem': dict(counts.most_common()), 'threads': threads}
+
+
+def process_uptime():
+    """Seconds since this process was created, None where the platform does not tell"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+            times = [wintypes.FILETIME() for _ in range(4)]
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), *map(ctypes.byref, times)):
+                return None
+            created = (times[0].dwHighDateTime << 32 | times[0].dwLowDateTime) / 1e7 - 11644473600
+            return time.time() - created
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTimer:
+    """
+    Startup phase timings:
+    - mark(phase) records the time since the previous mark
+    - Phases count from process creation when the OS reports it (so the
+      first one includes interpreter start and imports), else from the
+      timer's creation
+    - done() stamps the total time to serving and prints the breakdown
+    """
+
+    def __init__(self):
+        uptime = process_uptime()
+        self.from_process_start = uptime is not None
+        self.origin = time.perf_counter() - (uptime or 0)
+        self.last = self.origin
+        self.phases = {}
+        self.total_ms = None
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self.last) * 1000, 1)
+        self.last = now
+
+    def done(self, name='startup'):
+        self.total_ms = round((time.perf_counter() - self.origin) * 1000, 1)
+        breakdown = ', '.join(f"{k} {v:g}" for k, v in self.phases.items())
+        print(f"[✓] {name.capitalize()}: {self.total_ms:g} ms ({breakdown})")
+
+    def summary(self):
+        return {'total_ms': self.total_ms, 'phases': dict(self.phases),
+                'from_process_start': self.from_process_start}
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler:
+    - Every `interval` seconds reads every thread's Python stack
+      (sys._current_frames) and counts identical stacks
+    - Runs only for the requested duration on the calling thread; one
+      profile at a time, zero cost when idle
+    - Results as collapsed stacks ("root;frame;frame count", the input
+      format of flamegraph.pl / speedscope) or a nested flamegraph tree
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last = None
+
+    def run(self, seconds=5.0, interval=0.01, group='subsystem'):
+        """Sample for `seconds`; stacks are rooted at the thread's subsystem or name"""
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError('A profile is already running')
+        try:
+            seconds = max(0.1, min(float(seconds), MAX_PROFILE_SECONDS))
+            interval = max(0.001, float(interval))
+            me = threading.get_ident()
+            stacks = Counter()
+            per_thread = Counter()
+            samples = 0
+            start = time.perf_counter()
+            deadline = start + seconds
+            while True:
+                names = {t.ident: t for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    thread = names.get(ident)
+                    name = thread.name if thread else str(ident)
+                    root = classify_thread(thread, frame) if thread and group == 'subsystem' else name
+                    stacks[(root,) + tuple(_stack(frame))] += 1
+                    per_thread[name] += 1
+                samples += 1
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                time.sleep(min(interval, deadline - now))
+            elapsed = time.perf_counter() - start
+
+            self.last = {
+                'started': datetime.now().isoformat(timespec='seconds'),
+                'seconds': round(elapsed, 3),
+                'interval': interval,
+                'samples': samples,
+                'group': group,
+                'threads': dict(per_thread.most_common()),
+                'stacks': stacks
+            }
+            return self.last
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def collapsed(profile):
+        """Brendan Gregg collapsed-stack text"""
+        return '\n'.join(f"{';'.join(stack)} {count}"
+                         for stack, count in profile['stacks'].most_common()) + '\n'
+
+    @staticmethod
+    def flamegraph(profile):
+        """Nested {name, value, children} tree (d3-flame-graph format)"""
+        root = {'name': 'all', 'value': 0, 'children': {}}
+        for stack, count in profile['stacks'].items():
+            node = root
+            node['value'] += count
+            for label in stack:
+                node = node['children'].setdefault(label, {'name': label, 'value': 0, 'children': {}})
+                node['value'] += count
+
+        def finish(node):
+            node['children'] = sorted((finish(c) for c in node['children'].values()),
+                                      key=lambda c: c['value'], reverse=True)
+            return node
+        return finish(root)
+
+    @staticmethod
+    def summary(profile, limit=30):
+        """JSON-friendly profile: hottest stacks and innermost frames"""
+        own = Counter()
+        for stack, count in profile['stacks'].items():
+            own[stack[-1]] += count
+        return {
+            **{k: v for k, v in profile.items() if k != 'stacks'},
+            'top_frames': [{'frame': f, 'samples': c} for f, c in own.most_common(limit)],
+            'top_stacks': [{'stack': list(s), 'samples': c} for s, c in profile['stacks'].most_common(limit)]
+        }
+
+
+class MemoryTracker:
+    """
+    tracemalloc control:
+    - Tracing is off until the first snapshot (tracemalloc slows every
+      allocation while it is on) and can be stopped again
+    - Keeps the last `keep` snapshots by id for top() and diff()
+    """
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    )
+
+    def __init__(self, keep=5):
+        self.keep = keep
+        self.snapshots = {}
+        self.lock = threading.Lock()
+        self._next_id = 1
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, int(frames)))
+
+    def stop(self):
+        with self.lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+
+    def snapshot(self, frames=1):
+        """Take a snapshot (starting tracing if needed); returns its id and summary"""
+        started = not tracemalloc.is_tracing()
+        self.start(frames)
+        snap = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            snap_id = self._next_id
+            self._next_id += 1
+            self.snapshots[snap_id] = (datetime.now().isoformat(timespec='seconds'), snap)
+            while len(self.snapshots) > self.keep:
+                del self.snapshots[min(self.snapshots)]
+        return {'id': snap_id, 'tracing_started': started,
+                'traced_mb': round(current / 1048576, 2), 'peak_mb': round(peak / 1048576, 2)}
+
+    def list(self):
+        with self.lock:
+            return [{'id': i, 'taken': taken} for i, (taken, _) in sorted(self.snapshots.items())]
+
+    def _get(self, snap_id):
+        with self.lock:
+            entry = self.snapshots.get(snap_id)
+        if entry is None:
+            raise KeyError(f"Unknown snapshot {snap_id}")
+        return entry[1]
+
+    def top(self, snap_id, key_type='lineno', limit=25):
+        stats = self._get(snap_id).statistics(key_type)
+        return [{'where': str(s.traceback), 'size_kb': round(s.size / 1024, 1), 'count': s.count}
+                for s in stats[:limit]]
+
+    def diff(self, base_id, target_id, key_type='lineno', limit=25):
+        """Largest allocation changes from base to target"""
+        stats = self._get(target_id).compare_to(self._get(base_id), key_type)
+        return [{'where': str(s.traceback), 'size_diff_kb': round(s.size_diff / 1024, 1),
+                 'size_kb': round(s.size / 1024, 1), 'count_diff': s.count_diff}
+                for s in stats[:limit]]
@@ -0,0 +1,594 @@
+"""
+Protocol Handlers - Stateful service emulators for the honeypot listeners
+One handler per connection, fed bytes as they arrive and answering like the real
+service (SSH ident, Telnet login, FTP, Redis RESP, MySQL handshake, HTTP) so
+clients get far enough to send credentials and commands
+"""
+import base64
+import os
+import re
+import struct
+from urllib.parse import parse_qs
+
+MAX_ITEMS = 50          # credentials / commands kept per connection
+MAX_BUFFER = 65536      # unparsed bytes before the connection is given up
+MAX_FIELD = 500         # longest recorded username, password or command
+
+# Fields of login forms that carry a username / password
+_USER_FIELDS = ('username', 'user', 'login', 'log', 'email', 'uname', 'usr')
+_PASS_FIELDS = ('password', 'pass', 'pwd', 'passwd', 'pw')
+
+
+def _text(data):
+    if isinstance(data, (bytes, bytearray)):
+        data = bytes(data).decode('utf-8', errors='replace')
+    return data[:MAX_FIELD]
+
+
+class ProtocolHandler:
+    """
+    Per-connection emulator base:
+    - greeting() is sent when the connection opens; feed(data) consumes
+      client bytes (any split) and returns the reply bytes, possibly b''
+    - Parsers keep partial input in self.buffer until a full unit arrives
+    - `done` asks the server to close once the replies are flushed
+    - Captured credentials and commands are bounded (MAX_ITEMS each)
+    """
+
+    def __init__(self, port=None, peer=None):
+        self.port = port
+        self.peer = peer
+        self.buffer = bytearray()
+        self.credentials = []
+        self.commands = []
+        self.done = False
+
+    def greeting(self):
+        return b''
+
+    def feed(self, data):
+        """Consume client bytes, return the reply (input after `done` is ignored)"""
+        if self.done:
+            return b''
+        self.buffer += data
+        if len(self.buffer) > MAX_BUFFER:
+            self.buffer.clear()
+            self.done = True
+            return b''
+        return self.process()
+
+    def process(self):
+        """Parse as much of self.buffer as is complete (subclasses)"""
+        return b''
+
+    def record_credential(self, username, password, **extra):
+        if len(self.credentials) < MAX_ITEMS:
+            credential = {'username': _text(username) if username is not None else None,
+                          'password': _text(password) if password is not None else None}
+            credential.update(extra)
+            self.credentials.append(credential)
+
+    def record_command(self, command):
+        if len(self.commands) < MAX_ITEMS:
+            self.commands.append(_text(command))
+        else:
+            self.done = True
+
+    def summary(self):
+        return {'credentials': self.credentials, 'commands': self.commands}
+
+    def _lines(self):
+        """Complete lines from the buffer (CR, LF and CRLF all end a line)"""
+        while True:
+            match = re.search(rb'\r\n|\r\x00|\n|\r(?=.)', self.buffer, re.S)
+            if match is None:
+                return
+            line = bytes(self.buffer[:match.start()])
+            del self.buffer[:match.end()]
+            yield line.decode('utf-8', errors='replace')
+
+
+class PassiveHandler(ProtocolHandler):
+    """Services without an emulator: optional static banner, then listen only"""
+
+    def __init__(self, port=None, peer=None, banner=b''):
+        super().__init__(port, peer)
+        self.banner = banner
+
+    def greeting(self):
+        return self.banner
+
+    def process(self):
+        self.buffer.clear()
+        return b''
+
+
+class SSHHandler(ProtocolHandler):
+    """SSH identification exchange: records the client version and its KEXINIT algorithms"""
+
+    IDENT = b"SSH-2.0-OpenSSH_7.4p1 Ubuntu-10\r\n"
+
+    def __init__(self, port=None, peer=None):
+        super().__init__(port, peer)
+        self.client_ident = None
+
+    def greeting(self):
+        return self.IDENT
+
+    def process(self):
+        if self.client_ident is None:
+            end = self.buffer.find(b'\n')
+            if end < 0:
+                return b''
+            self.client_ident = _text(self.buffer[:end].rstrip(b'\r'))
+            del self.buffer[:end + 1]
+            self.record_command(self.client_ident)
+            if not self.client_ident.startswith('SSH-'):
+                self.done = True
+                return b'Protocol mismatch.\r\n'
+        # Binary packet: uint32 length, byte padding, payload (KEXINIT = 20)
+        if len(self.buffer) < 6:
+            return b''
+        length = struct.unpack('!I', self.buffer[:4])[0]
+        if length > MAX_BUFFER:
+            self.done = True
+            return b''
+        if len(self.buffer) < 4 + length:
+            return b''
+        payload = bytes(self.buffer[5:4 + length - self.buffer[4]])
+        if payload[:1] == b'\x14' and len(payload) >= 21:
+            lists = []
+            offset = 17
+            for _ in range(3):  # kex, host key, ciphers client->server
+                if offset + 4 > len(payload):
+                    break
+                size = struct.unpack('!I', payload[offset:offset + 4])[0]
+                lists.append(_text(payload[offset + 4:offset + 4 + size]))
+                offset += 4 + size
+            self.record_command('KEXINIT ' + ' | '.join(lists))
+        # No key exchange (and so no password prompt) without host keys: stop here
+        self.done = True
+        return b''
+
+
+def _strip_telnet(buffer, resume=0):
+    """Remove IAC negotiation from the buffer; returns (text bytes, bytes consumed, resume)
+
+    An unterminated subnegotiation stops the scan; `resume` is where the
+    search for its IAC SE continues once more bytes arrive.
+    """
+    out = bytearray()
+    i = 0
+    while i < len(buffer):
+        byte = buffer[i]
+        if byte != 255:
+            out.append(byte)
+            i += 1
+            continue
+        if i + 1 >= len(buffer):
+            break
+        cmd = buffer[i + 1]
+        if cmd == 255:          # escaped 0xff
+            out.append(255)
+            i += 2
+        elif cmd == 250:        # subnegotiation up to IAC SE
+            end = buffer.find(b'\xff\xf0', max(i + 2, resume - 1))
+            if end < 0:
+                return out, i, len(buffer) - i
+            i = end + 2
+        elif 251 <= cmd <= 254:  # WILL / WONT / DO / DONT option
+            if i + 2 >= len(buffer):
+                break
+            i += 3
+        else:
+            i += 2
+    return out, i, 0
+
+
+class TelnetHandler(ProtocolHandler):
+    """Telnet login prompt followed by a fake Windows command shell"""
+
+    BANNER = b"\r\n\r\nWelcome to Microsoft Telnet Service\r\n\r\nlogin: "
+
+    def __init__(self, port=None, peer=None):
+        super().__init__(port, peer)
+        self.state = 'login'
+        self.username = None
+        self.pending = bytearray()
+        self.resume = 0  # scan offset into pending (open subnegotiation)
+
+    def greeting(self):
+        return self.BANNER
+
+    def feed(self, data):
+        if self.done:
+            return b''
+        self.pending += data
+        if len(self.pending) > MAX_BUFFER:
+            self.pending.clear()
+            self.done = True
+            return b''
+        text, consumed, self.resume = _strip_telnet(self.pending, self.resume)
+        del self.pending[:consumed]
+        return super().feed(bytes(text))
+
+    def _prompt(self):
+        return f"\r\nC:\\Users\\{self.username}>".encode('utf-8', errors='replace')
+
+    def process(self):
+        reply = bytearray()
+        for line in self._lines():
+            line = line.strip()
+            if self.state == 'login':
+                if not line:
+                    reply += b"login: "
+                    continue
+                self.username = line
+                self.state = 'password'
+                reply += b"\r\npassword: "
+            elif self.state == 'password':
+                self.record_credential(self.username, line)
+                self.state = 'shell'
+                reply += b"\r\n*===============================================================\r\n"
+                reply += b"Microsoft Telnet Server.\r\n*===============================================================\r\n"
+                reply += self._prompt()
+            else:
+                if not line:
+                    reply += self._prompt()
+                    continue
+                self.record_command(line)
+                command = line.split()[0].lower()
+                if command in ('exit', 'logout', 'quit'):
+                    self.done = True
+                    break
+                if command == 'whoami':
+                    reply += f"\r\nwin-srv01\\{self.username}\r\n".encode('utf-8', errors='replace')
+                elif command in ('ver', 'uname'):
+                    reply += b"\r\nMicrosoft Windows [Version 10.0.17763.1282]\r\n"
+                elif command in ('cd', 'echo'):
+                    reply += ("\r\n" + line[len(command):].strip() + "\r\n").encode('utf-8', errors='replace')
+                else:
+                    reply += (f"\r\n'{command}' is not recognized as an internal or external command,\r\n"
+                              f"operable program or batch file.\r\n").encode('utf-8', errors='replace')
+                reply += self._prompt()
+            if self.done:
+                break
+        return bytes(reply)
+
+
+class FTPHandler(ProtocolHandler):
+    """FTP control channel: USER/PASS are recorded and always refused"""
+
+    BANNER = b"220 Microsoft FTP Service\r\n"
+    REPLIES = {
+        'SYST': b"215 Windows_NT\r\n",
+        'FEAT': b"211-Extended features supported:\r\n SIZE\r\n MDTM\r\n211 END\r\n",
+        'NOOP': b"200 NOOP command successful.\r\n",
+        'AUTH': b"534 Local policy on server does not allow TLS secure connections.\r\n",
+        'OPTS': b"200 OPTS UTF8 command successful - UTF8 encoding now ON.\r\n",
+    }
+
+    def __init__(self, port=None, peer=None):
+        super().__init__(port, peer)
+        self.username = None
+
+    def greeting(self):
+        return self.BANNER
+
+    def process(self):
+        reply = bytearray()
+        for line in self._lines():
+            line = line.strip()
+            if not line:
+                continue
+            verb, _, arg = line.partition(' ')
+            verb = verb.upper()
+            self.record_command(f"PASS {'*' * len(arg)}" if verb == 'PASS' else line)
+            if verb == 'USER':
+                self.username = arg
+                reply += f"331 Password required for {arg}.\r\n".encode('utf-8', errors='replace')
+            elif verb == 'PASS':
+                self.record_credential(self.username, arg)
+                reply += b"530 User cannot log in.\r\n"
+            elif verb == 'QUIT':
+                reply += b"221 Goodbye.\r\n"
+                self.done = True
+                break
+            else:
+                reply += self.REPLIES.get(verb, b"530 Please login with USER and PASS.\r\n")
+            if self.done:
+                break
+        return bytes(reply)
+
+
+def _resp_bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    data = value.encode('utf-8') if isinstance(value, str) else value
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class RedisHandler(ProtocolHandler):
+    """Redis 5 speaking RESP (arrays of bulk strings) and inline commands; AUTH always succeeds"""
+
+    INFO = ("# Server\r\nredis_version:5.0.7\r\nredis_mode:standalone\r\nos:Linux 4.15.0-112-generic x86_64\r\n"
+            "arch_bits:64\r\ntcp_port:6379\r\nuptime_in_days:43\r\n\r\n# Clients\r\nconnected_clients:1\r\n\r\n"
+            "# Memory\r\nused_memory:874936\r\nused_memory_human:854.43K\r\n\r\n"
+            "# Replication\r\nrole:master\r\nconnected_slaves:0\r\n\r\n# Keyspace\r\ndb0:keys=3,expires=0,avg_ttl=0\r\n")
+    OK_COMMANDS = {'SET', 'SELECT', 'FLUSHALL', 'FLUSHDB', 'SAVE', 'BGSAVE', 'SLAVEOF', 'REPLICAOF',
+                   'MODULE', 'CLIENT', 'EXPIRE', 'DEL', 'HSET', 'LPUSH', 'SETEX'}
+
+    def _parse(self):
+        """Next complete command as a list of strings, None if incomplete"""
+        buf = self.buffer
+        if not buf:
+            return None
+        if buf[:1] != b'*':
+            end = buf.find(b'\n')
+            if end < 0:
+                return None
+            line = bytes(buf[:end]).rstrip(b'\r')
+            del buf[:end + 1]
+            return [_text(part) for part in line.split()]
+        end = buf.find(b'\r\n')
+        if end < 0:
+            return None
+        try:
+            count = int(buf[1:end])
+        except ValueError:
+            self.done = True
+            return None
+        pos = end + 2
+        args = []
+        for _ in range(max(count, 0)):
+            end = buf.find(b'\r\n', pos)
+            if end < 0 or buf[pos:pos + 1] != b'$':
+                if end >= 0:
+                    self.done = True  # not a bulk string: not a Redis client
+                return None
+            try:
+                size = int(buf[pos + 1:end])
+            except ValueError:
+                self.done = True
+                return None
+            start = end + 2
+            if len(buf) < start + size + 2:
+                return None
+            args.append(_text(buf[start:start + size]))
+            pos = start + size + 2
+        del buf[:pos]
+        return args
+
+    def process(self):
+        reply = bytearray()
+        while not self.done:
+            args = self._parse()
+            if args is None:
+                break
+            if not args:
+                continue
+            self.record_command(' '.join(args))
+            reply += self._reply(args[0].upper(), args[1:])
+        return bytes(reply)
+
+    def _reply(self, command, args):
+        if command == 'PING':
+            return _resp_bulk(args[0]) if args else b"+PONG\r\n"
+        if command == 'AUTH':
+            self.record_credential(args[0] if len(args) > 1 else None, args[-1] if args else '')
+            return b"+OK\r\n"
+        if command == 'INFO':
+            return _resp_bulk(self.INFO)
+        if command == 'CONFIG':
+            if args and args[0].upper() == 'GET' and len(args) > 1:
+                return b"*2\r\n" + _resp_bulk(args[1]) + _resp_bulk('')
+            return b"+OK\r\n"
+        if command == 'QUIT':
+            self.done = True
+            return b"+OK\r\n"
+        if command in self.OK_COMMANDS:
+            return b"+OK\r\n"
+        if command == 'GET':
+            return _resp_bulk(None)
+        if command in ('KEYS', 'COMMAND', 'SCAN'):
+            return b"*0\r\n" if command != 'SCAN' else b"*2\r\n$1\r\n0\r\n*0\r\n"
+        if command in ('DBSIZE', 'EXISTS'):
+            return b":0\r\n"
+        arg_text = ' '.join(f"`{a}`," for a in args[:3])
+        return f"-ERR unknown command `{command.lower()}`, with args beginning with: {arg_text}\r\n".encode('utf-8')
+
+
+# MySQL capability flags: protocol 4.1, secure connection and plugin auth, but
+# no CLIENT_SSL (0x0800), so clients send the login in the clear
+_MYSQL_CAPS = 0x000BA7DF
+_CLIENT_CONNECT_WITH_DB = 0x0008
+_CLIENT_SECURE_CONNECTION = 0x8000
+_CLIENT_PLUGIN_AUTH = 0x00080000
+_CLIENT_PLUGIN_AUTH_LENENC = 0x00200000
+
+
+class MySQLHandler(ProtocolHandler):
+    """MySQL 5.7 handshake v10; records the login (user, auth hash, database) and denies it"""
+
+    VERSION = b"5.7.32-0ubuntu0.18.04.1"
+    _thread_id = 0
+
+    def __init__(self, port=None, peer=None):
+        super().__init__(port, peer)
+        MySQLHandler._thread_id += 1
+        self.salt = bytes(b % 94 + 33 for b in os.urandom(20))  # printable, no NUL
+
+    def greeting(self):
+        payload = (b'\x0a' + self.VERSION + b'\x00'
+                   + struct.pack('<I', MySQLHandler._thread_id)
+                   + self.salt[:8] + b'\x00'
+                   + struct.pack('<H', _MYSQL_CAPS & 0xFFFF)
+                   + b'\x21' + struct.pack('<H', 0x0002)
+                   + struct.pack('<H', _MYSQL_CAPS >> 16)
+                   + bytes([21]) + b'\x00' * 10
+                   + self.salt[8:] + b'\x00'
+                   + b'mysql_native_password\x00')
+        return self._packet(0, payload)
+
+    @staticmethod
+    def _packet(seq, payload):
+        return struct.pack('<I', len(payload))[:3] + bytes([seq]) + payload
+
+    def process(self):
+        if len(self.buffer) < 4:
+            return b''
+        length = int.from_bytes(self.buffer[:3], 'little')
+        if length > MAX_BUFFER or length < 32:
+            self.done = True  # not a HandshakeResponse41
+            return b''
+        if len(self.buffer) < 4 + length:
+            return b''
+        seq = self.buffer[3]
+        packet = bytes(self.buffer[4:4 + length])
+        del self.buffer[:4 + length]
+        self.done = True
+
+        caps = struct.unpack('<I', packet[:4])[0]
+        pos = 32
+        end = packet.find(b'\x00', pos)
+        if end < 0:
+            return b''
+        username = _text(packet[pos:end])
+        pos = end + 1
+        if caps & _CLIENT_PLUGIN_AUTH_LENENC and pos < len(packet):
+            size = packet[pos]
+            pos += 1
+        elif caps & _CLIENT_SECURE_CONNECTION and pos < len(packet):
+            size = packet[pos]
+            pos += 1
+        else:
+            end = packet.find(b'\x00', pos)
+            size = (end if end >= 0 else len(packet)) - pos
+        auth = packet[pos:pos + size]
+        pos += size + (0 if caps & (_CLIENT_SECURE_CONNECTION | _CLIENT_PLUGIN_AUTH_LENENC) else 1)
+        database = None
+        if caps & _CLIENT_CONNECT_WITH_DB and pos < len(packet):
+            end = packet.find(b'\x00', pos)
+            database = _text(packet[pos:end if end >= 0 else len(packet)])
+        # Only the scrambled hash travels on the wire (the password itself cannot be recovered)
+        self.record_credential(username, None, auth_hash=auth.hex(), database=database)
+        self.record_command(f"LOGIN {username}" + (f" db={database}" if database else ''))
+
+        using = 'YES' if auth else 'NO'
+        message = f"Access denied for user '{username}'@'{self.peer or 'localhost'}' (using password: {using})"
+        error = b'\xff' + struct.pack('<H', 1045) + b'#28000' + message.encode('utf-8', errors='replace')
+        return self._packet((seq + 1) & 0xFF, error)
+
+
+# Simulated port -> (Server header, body of /)
+HTTP_PROFILES = {
+    80: ('Apache/2.4.41 (Ubuntu)',
+         '<html><head><title>Welcome</title></head><body><h1>It works!</h1></body></html>'),
+    443: ('nginx/1.18.0',
+          '<html><head><title>Welcome to nginx!</title></head><body><h1>Welcome to nginx!</h1></body></html>'),
+    8080: ('Apache-Coyote/1.1', '<html><body><h1>Apache Tomcat</h1></body></html>'),
+}
+_REQUEST_LINE = re.compile(r'^([A-Z]{3,10}) (\S+) HTTP/(\d\.\d)$')
+
+
+class HTTPHandler(ProtocolHandler):
+    """HTTP/1.x with keep-alive; records request lines, Basic auth and login form fields"""
+
+    def __init__(self, port=None, peer=None):
+        super().__init__(port, peer)
+        self.server, self.index = HTTP_PROFILES.get(port, HTTP_PROFILES[80])
+
+    def process(self):
+        reply = bytearray()
+        while not self.done and self.buffer:
+            if self.buffer[:1] == b'\x16':
+                self.record_command('TLS handshake')  # HTTPS port: no TLS termination here
+                self.done = True
+                break
+            end = self.buffer.find(b'\r\n\r\n')
+            sep = 4
+            if end < 0:
+                end, sep = self.buffer.find(b'\n\n'), 2
+            if end < 0:
+                break
+            head = bytes(self.buffer[:end]).decode('latin-1').replace('\r\n', '\n').split('\n')
+            headers = {}
+            for line in head[1:]:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            try:
+                body_size = int(headers.get('content-length', 0))
+            except ValueError:
+                body_size = 0
+            if body_size > MAX_BUFFER:
+                self.done = True
+                break
+            if len(self.buffer) < end + sep + body_size:
+                break
+            body = bytes(self.buffer[end + sep:end + sep + body_size])
+            del self.buffer[:end + sep + body_size]
+            reply += self._respond(head[0].strip(), headers, body)
+        return bytes(reply)
+
+    def _respond(self, request_line, headers, body):
+        match = _REQUEST_LINE.match(request_line)
+        if match is None:
+            self.record_command(request_line)
+            self.done = True
+            return self._response(400, 'Bad Request', '<html><body><h1>400 Bad Request</h1></body></html>')
+        method, target, version = match.groups()
+        self.record_command(f"{method} {target}")
+
+        auth = headers.get('authorization', '')
+        if auth.lower().startswith('basic '):
+            try:
+                username, _, password = base64.b64decode(auth[6:].strip()).decode('utf-8', 'replace').partition(':')
+                self.record_credential(username, password, scheme='basic')
+            except ValueError:
+                pass
+        if method == 'POST' and body:
+            fields = {k.lower(): v[0] for k, v in parse_qs(body.decode('utf-8', 'replace')).items()}
+            password = next((fields[f] for f in _PASS_FIELDS if f in fields), None)
+            if password is not None:
+                username = next((fields[f] for f in _USER_FIELDS if f in fields), None)
+                self.record_credential(username, password, scheme='form')
+
+        connection = headers.get('connection', '').lower()
+        if version == '1.0' and connection != 'keep-alive' or connection == 'close':
+            self.done = True
+        path = target.split('?', 1)[0]
+        if path in ('/', '/index.html'):
+            return self._response(200, 'OK', self.index)
+        return self._response(404, 'Not Found', '<html><body><h1>404 Not Found</h1></body></html>')
+
+    def _response(self, status, reason, body):
+        body = body.encode('utf-8')
+        return (f"HTTP/1.1 {status} {reason}\r\nServer: {self.server}\r\nContent-Type: text/html\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'close' if self.done else 'keep-alive'}\r\n\r\n"
+                ).encode('latin-1') + body
+
+
+# Service name (HoneypotServer._get_service_name) -> handler class
+HANDLERS = {
+    'SSH': SSHHandler,
+    'Telnet': TelnetHandler,
+    'FTP': FTPHandler,
+    'HTTP': HTTPHandler,
+    'HTTPS': HTTPHandler,
+    'HTTP-Proxy': HTTPHandler,
+    'MySQL': MySQLHandler,
+    'Redis': RedisHandler,
+}
+
+
+def register_handler(service, handler_class):
+    """Emulate `service` with handler_class (a ProtocolHandler subclass)"""
+    HANDLERS[service] = handler_class
+
+
+def create_handler(service, port=None, peer=None, handlers=None):
+    """Handler for a new connection; services without an emulator get a PassiveHandler"""
+    handler_class = (handlers or HANDLERS).get(service)
+    if handler_class is None:
+        return PassiveHandler(port, peer)
+    return handler_class(port, peer)
@@ -0,0 +1,76 @@
+"""
+Ring Buffer - Fixed-capacity recent event store with sequence numbers
+Lets dashboards catch up with only the events they have not seen yet
+"""
+import threading
+
+
+class EventRing:
+    """
+    Thread-safe ring buffer of recent events:
+    - O(1) append (no list shifting), fixed memory
+    - Each event is tagged with a monotonic 'seq' number
+    - since(seq) returns only newer events, flagging gaps when the
+      requested cursor has already been overwritten
+    """
+
+    def __init__(self, capacity=1000):
+        """Initialize ring with a fixed capacity"""
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._seq = 0
+        self._oldest = 1
+        self.lock = threading.Lock()
+
+    @property
+    def last_seq(self):
+        """Sequence number of the newest event (0 when nothing was appended yet)"""
+        return self._seq
+
+    def append(self, event):
+        """Store event, tag it with its sequence number and return it"""
+        with self.lock:
+            self._seq += 1
+            event['seq'] = self._seq
+            self._slots[self._seq % self.capacity] = event
+            if self._seq - self._oldest >= self.capacity:
+                self._oldest = self._seq - self.capacity + 1
+            return self._seq
+
+    def _range(self, first, last):
+        return [self._slots[s % self.capacity] for s in range(first, last + 1)]
+
+    def latest(self, n=50):
+        """Newest n events, oldest first"""
+        with self.lock:
+            first = max(self._oldest, self._seq - n + 1)
+            return self._range(first, self._seq)
+
+    def since(self, seq, limit=None):
+        """Events with a sequence number greater than seq, oldest first
+
+        Returns dict with 'events', 'last_seq' and 'truncated' (True when
+        events after seq were already overwritten or cut by limit).
+        """
+        with self.lock:
+            first = max(seq + 1, self._oldest)
+            truncated = seq + 1 < self._oldest and seq < self._seq
+            last = self._seq
+            if limit is not None and last - first + 1 > limit:
+                # Keep the newest events; the client only needs the tail
+                first = last - limit + 1
+                truncated = True
+            return {
+                'events': self._range(first, last) if first <= last else [],
+                'last_seq': self._seq,
+                'truncated': truncated
+            }
+
+    def clear(self):
+        """Drop all events (sequence numbers keep increasing)"""
+        with self.lock:
+            self._slots = [None] * self.capacity
+            self._oldest = self._seq + 1
+
+    def __len__(self):
+        return self._seq - self._oldest + 1
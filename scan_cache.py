@@ -0,0 +1,106 @@
+"""
+Scan Cache - Remembered network scan state
+Last seen state per host and port, so repeat scans of a range only re-probe
+what is stale and can report what appeared or disappeared since the last run
+"""
+import ipaddress
+import os
+import time
+
+HOST_PORT = 0  # port 0 rows hold host liveness ('up' / 'down')
+
+
+def host_key(host):
+    """Sortable key: a CIDR range is one contiguous key range"""
+    ip = ipaddress.ip_address(host)
+    return f"{ip.version}:{int(ip):0{8 if ip.version == 4 else 32}x}"
+
+
+def network_key_range(network):
+    net = ipaddress.ip_network(network.strip(), strict=False)
+    return host_key(net.network_address), host_key(net.broadcast_address)
+
+
+class ScanCache:
+    """
+    Per-run view of the scan_results table for one range:
+    - plan(host, ports) decides what an incremental run probes: nothing for
+      a host seen down less than `dead_ttl` ago, only stale ports for a host
+      seen up less than `ttl` ago, everything otherwise
+    - record() stores the outcome and collects changes against the previous
+      state: hosts up/down, ports opened/closed (diff())
+    - Writes are batched through the logger (flush())
+    """
+
+    def __init__(self, logger, network, incremental=False, ttl=3600, dead_ttl=21600, batch=5000):
+        self.logger = logger
+        self.network = network
+        self.incremental = incremental
+        self.ttl = ttl
+        self.dead_ttl = dead_ttl
+        self.batch = batch
+        self.now = time.time()
+        self.previous = {}  # host -> {port: (state, first_seen, last_seen, last_change)}
+        for host, port, state, first_seen, last_seen, last_change in logger.get_scan_state(
+                *network_key_range(network)):
+            self.previous.setdefault(host, {})[port] = (state, first_seen, last_seen, last_change)
+        self.pending = []
+        self.changes = {'hosts_up': [], 'hosts_down': [], 'ports_opened': [], 'ports_closed': []}
+        self.skipped_hosts = 0
+
+    @classmethod
+    def from_env(cls, logger, network, incremental=False):
+        return cls(logger, network, incremental,
+                   ttl=float(os.environ.get('SENTINEL_SCAN_TTL', 3600)),
+                   dead_ttl=float(os.environ.get('SENTINEL_SCAN_DEAD_TTL', 21600)))
+
+    def plan(self, host, ports):
+        """('skip' | 'ports' | 'full', {port: cached state still fresh})"""
+        known = self.previous.get(host)
+        if not self.incremental or not known or HOST_PORT not in known:
+            return 'full', {}
+        state, _, last_seen, _ = known[HOST_PORT]
+        if state == 'down':
+            if self.now - last_seen < self.dead_ttl:
+                self.skipped_hosts += 1
+                return 'skip', {}
+            return 'full', {}
+        if self.now - last_seen >= self.ttl:
+            return 'full', {}
+        fresh = {p: known[p][0] for p in ports
+                 if p in known and self.now - known[p][2] < self.ttl}
+        return 'ports', fresh
+
+    def record(self, host, alive, states):
+        """Store a finished host: liveness plus the state of every port probed this run"""
+        now = time.time()
+        known = self.previous.get(host, {})
+        was = known.get(HOST_PORT, (None,))[0]
+        if alive and was != 'up':
+            self.changes['hosts_up'].append(host)
+        elif not alive and was == 'up':
+            self.changes['hosts_down'].append(host)
+        rows = {HOST_PORT: 'up' if alive else 'down'}
+        rows.update(states)
+        for port, state in rows.items():
+            old = known.get(port)
+            if port != HOST_PORT and alive:
+                was_open = old is not None and old[0] == 'open'
+                if state == 'open' and not was_open:
+                    self.changes['ports_opened'].append({'host': host, 'port': port})
+                elif state != 'open' and was_open:
+                    self.changes['ports_closed'].append({'host': host, 'port': port, 'state': state})
+            first_seen = old[1] if old else now
+            last_change = old[3] if old and old[0] == state else now
+            self.pending.append((host, host_key(host), port, state, first_seen, now, last_change))
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        rows, self.pending = self.pending, []
+        if rows:
+            self.logger.save_scan_state(rows)
+
+    def diff(self):
+        return {**{k: list(v) for k, v in self.changes.items()}, 'skipped_hosts': self.skipped_hosts,
+                'previous_hosts': sum(1 for h in self.previous.values() if h.get(HOST_PORT, ('',))[0] == 'up')}
@@ -0,0 +1,283 @@
+"""
+Scan Detector - Streaming cross-port scan detection
+Watches connections per source across all honeypot ports in time-bucketed
+sliding windows and summarizes each sweep as a single port_scan event
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+
+class _Bucket:
+    __slots__ = ('start', 'pairs')
+
+    def __init__(self, start):
+        self.start = start
+        self.pairs = set()
+
+
+class _Sweep:
+    """Accumulated summary of one detected scan"""
+
+    __slots__ = ('scan_id', 'kind', 'first_seen', 'last_seen', 'ports', 'targets', 'connections', 'probes')
+
+    def __init__(self, scan_id, kind, first_seen):
+        self.scan_id = scan_id
+        self.kind = kind
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.ports = set()
+        self.targets = set()
+        self.connections = 0
+        self.probes = 0  # empty connections tagged with scan_id (count-only when sampling)
+
+
+class _SourceState:
+    """Sliding window for one source: buckets of (target, port) pairs + distinct counters"""
+
+    __slots__ = ('buckets', 'pair_counts', 'ports_per_target', 'targets_per_port',
+                 'last_seen', 'sweep')
+
+    def __init__(self, now):
+        self.buckets = deque()
+        self.pair_counts = {}
+        self.ports_per_target = {}
+        self.targets_per_port = {}
+        self.last_seen = now
+        self.sweep = None
+
+
+def _inc(counter, key):
+    counter[key] = counter.get(key, 0) + 1
+    return counter[key]
+
+
+def _dec(counter, key):
+    n = counter[key] - 1
+    if n:
+        counter[key] = n
+    else:
+        del counter[key]
+
+
+class ScanDetector:
+    """
+    Cross-port scan detector:
+    - Vertical scan: one source touches >= vertical_threshold distinct
+      ports of one target within the window
+    - Horizontal scan: one source touches the same port on
+      >= horizontal_threshold distinct targets within the window
+    - O(1) amortized per connection: each (target, port) pair enters and
+      leaves a bucket once; distinct counts are maintained incrementally
+    - Bounded state: at most max_sources sources (least recently seen are
+      evicted), idle sources expire after the window
+    - A sweep is reported once, as a synthetic port_scan event, after the
+      source has been idle for `idle` seconds
+    """
+
+    def __init__(self, on_scan=None, window=60.0, bucket=5.0, vertical_threshold=4,
+                 horizontal_threshold=3, idle=None, max_sources=50000):
+        """Initialize detector (times in seconds); on_scan(event) receives port_scan events"""
+        self.on_scan = on_scan
+        self.window = window
+        self.bucket = bucket
+        self.vertical_threshold = vertical_threshold
+        self.horizontal_threshold = horizontal_threshold
+        self.idle = idle if idle is not None else window / 2
+        self.max_sources = max_sources
+        self.sources = OrderedDict()
+        self.lock = threading.Lock()
+        self._scan_ids = 0
+        self._thread = None
+        self.stats = {'connections': 0, 'scans': 0, 'evicted': 0}
+
+    @classmethod
+    def from_env(cls, on_scan=None):
+        """Detector tuned by SENTINEL_SCAN_WINDOW / SENTINEL_SCAN_PORTS / SENTINEL_SCAN_TARGETS"""
+        return cls(
+            on_scan=on_scan,
+            window=float(os.environ.get('SENTINEL_SCAN_WINDOW', 60)),
+            vertical_threshold=int(os.environ.get('SENTINEL_SCAN_PORTS', 4)),
+            horizontal_threshold=int(os.environ.get('SENTINEL_SCAN_TARGETS', 3))
+        )
+
+    # ---------- window maintenance ----------
+
+    def _expire_buckets(self, state, now):
+        horizon = now - self.window
+        while state.buckets and state.buckets[0].start <= horizon:
+            for target, port in state.buckets.popleft().pairs:
+                pair = (target, port)
+                if state.pair_counts[pair] == 1:
+                    del state.pair_counts[pair]
+                    _dec(state.ports_per_target, target)
+                    _dec(state.targets_per_port, port)
+                else:
+                    state.pair_counts[pair] -= 1
+
+    def observe(self, attack_data, now=None):
+        """Feed one connection; returns the active scan id for this source, or None"""
+        now = now if now is not None else time.time()
+        source_ip = attack_data.get('source_ip', 'unknown')
+        target = attack_data.get('target_ip') or '*'
+        port = attack_data.get('target_port')
+        finished = []
+
+        with self.lock:
+            self.stats['connections'] += 1
+            state = self.sources.get(source_ip)
+            if state is None:
+                state = _SourceState(now)
+                self.sources[source_ip] = state
+                if len(self.sources) > self.max_sources:
+                    evicted_ip, evicted = self.sources.popitem(last=False)
+                    self.stats['evicted'] += 1
+                    if evicted.sweep is not None:
+                        finished.append((evicted_ip, evicted.sweep))
+            else:
+                self.sources.move_to_end(source_ip)
+                if state.sweep is not None and now - state.last_seen > self.idle:
+                    # Previous sweep ended before this connection
+                    finished.append((source_ip, state.sweep))
+                    state.sweep = None
+            state.last_seen = now
+
+            # Add (target, port) to the current time bucket
+            start = now - (now % self.bucket)
+            if not state.buckets or state.buckets[-1].start != start:
+                state.buckets.append(_Bucket(start))
+            bucket = state.buckets[-1]
+            pair = (target, port)
+            if pair not in bucket.pairs:
+                bucket.pairs.add(pair)
+                if _inc(state.pair_counts, pair) == 1:
+                    _inc(state.ports_per_target, target)
+                    _inc(state.targets_per_port, port)
+            self._expire_buckets(state, now)
+
+            # Classify
+            sweep = state.sweep
+            if sweep is None:
+                vertical = state.ports_per_target.get(target, 0) >= self.vertical_threshold
+                horizontal = state.targets_per_port.get(port, 0) >= self.horizontal_threshold
+                if vertical or horizontal:
+                    self._scan_ids += 1
+                    kind = 'mixed' if vertical and horizontal else ('vertical' if vertical else 'horizontal')
+                    sweep = _Sweep(self._scan_ids, kind, now)
+                    # Seed the sweep with everything still in the window
+                    for t, p in state.pair_counts:
+                        sweep.targets.add(t)
+                        sweep.ports.add(p)
+                    sweep.first_seen = state.buckets[0].start
+                    sweep.connections = len(state.pair_counts) - 1
+                    state.sweep = sweep
+            elif sweep.kind != 'mixed':
+                if (sweep.kind == 'vertical' and state.targets_per_port.get(port, 0) >= self.horizontal_threshold) or \
+                   (sweep.kind == 'horizontal' and state.ports_per_target.get(target, 0) >= self.vertical_threshold):
+                    sweep.kind = 'mixed'
+
+            scan_id = None
+            if sweep is not None:
+                sweep.ports.add(port)
+                sweep.targets.add(target)
+                sweep.connections += 1
+                if not attack_data.get('payload_size'):
+                    sweep.probes += 1
+                sweep.last_seen = now
+                scan_id = sweep.scan_id
+
+        for ip, done in finished:
+            self._emit(ip, done)
+        return scan_id
+
+    def expire(self, now=None):
+        """Close sweeps of idle sources and drop sources idle longer than the window"""
+        now = now if now is not None else time.time()
+        finished = []
+        expired = []
+        with self.lock:
+            # Sources are kept in last-seen order: stop at the first active one
+            for ip, state in self.sources.items():
+                idle_for = now - state.last_seen
+                if idle_for <= self.idle:
+                    break
+                if state.sweep is not None:
+                    finished.append((ip, state.sweep))
+                    state.sweep = None
+                if idle_for > self.window:
+                    expired.append(ip)
+            for ip in expired:
+                del self.sources[ip]
+        for ip, done in finished:
+            self._emit(ip, done)
+        return len(finished)
+
+    def start(self, interval=1.0):
+        """Run expire() periodically in a background thread (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._expiry_loop, args=(interval,), name='scan-expiry', daemon=True)
+        self._thread.start()
+
+    def _expiry_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.expire()
+            except Exception as e:
+                print(f"[!] Scan expiry error: {e}")
+
+    # ---------- reporting ----------
+
+    def _emit(self, source_ip, sweep):
+        self.stats['scans'] += 1
+        event = self.summarize(source_ip, sweep)
+        print(f"\n🔭 PORT SCAN: {source_ip} {sweep.kind} sweep of {len(sweep.ports)} ports "
+              f"on {len(sweep.targets)} target(s), {sweep.connections} connections")
+        if self.on_scan:
+            self.on_scan(event)
+
+    def summarize(self, source_ip, sweep):
+        """Synthetic port_scan event for a finished sweep"""
+        ports = sorted(p for p in sweep.ports if p is not None)
+        targets = sorted(t for t in sweep.targets if t != '*')
+        duration = round(sweep.last_seen - sweep.first_seen, 1)
+        wide = len(ports) >= 2 * self.vertical_threshold or sweep.kind == 'mixed'
+        return {
+            'type': 'port_scan',
+            'source_ip': source_ip,
+            'source_port': 0,
+            'target_port': ports[0] if ports else 0,
+            'target_ip': targets[0] if len(targets) == 1 else None,
+            'service': 'Port-Scan',
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'severity': 'high' if wide else 'medium',
+            'payload': (f"{sweep.kind.capitalize()} scan: {len(ports)} ports on {max(1, len(targets))} target(s), "
+                        f"{sweep.connections} connections in {duration}s; ports {','.join(map(str, ports))}"),
+            'payload_size': 0,
+            'user_agent': '',
+            'connection_id': 0,
+            'scan_id': sweep.scan_id,
+            'scan_kind': sweep.kind,
+            'ports': ports,
+            'targets': targets,
+            'connections': sweep.connections,
+            'probes': sweep.probes,
+            'first_seen': datetime.fromtimestamp(sweep.first_seen).strftime('%Y-%m-%d %H:%M:%S'),
+            'last_seen': datetime.fromtimestamp(sweep.last_seen).strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': duration
+        }
+
+    def active_scans(self):
+        """Sweeps still in progress"""
+        with self.lock:
+            return [{'source_ip': ip, 'scan_id': s.sweep.scan_id, 'kind': s.sweep.kind,
+                     'ports': len(s.sweep.ports), 'targets': len(s.sweep.targets),
+                     'connections': s.sweep.connections}
+                    for ip, s in self.sources.items() if s.sweep is not None]
+
+    def clear(self):
+        with self.lock:
+            self.sources.clear()
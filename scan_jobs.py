@@ -0,0 +1,249 @@
+"""
+Scan Jobs - Background network scans
+Scans run on a bounded pool of daemon worker threads (one event loop each) instead of
+inside HTTP requests; progress and partial results are pushed as they arrive
+and finished jobs are persisted
+"""
+import asyncio
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from network_scanner import NetworkScanner, network_hosts
+from scan_cache import ScanCache
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class ScanJob:
+    """One submitted scan and its (partial) results"""
+
+    __slots__ = ('job_id', 'target', 'ports', 'status', 'created', 'started', 'finished',
+                 'hosts_total', 'hosts_done', 'probes', 'results', 'error', 'cancel_requested',
+                 'unsent', 'incremental', 'diff')
+
+    FINISHED = ('done', 'cancelled', 'failed')
+
+    def __init__(self, target, ports=None, incremental=False):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.target = target
+        self.ports = ports
+        self.incremental = incremental
+        self.status = 'queued'
+        self.created = _now()
+        self.started = None
+        self.finished = None
+        self.hosts_total = 0
+        self.hosts_done = 0
+        self.probes = 0
+        self.results = []
+        self.error = None
+        self.cancel_requested = False
+        self.unsent = []
+        self.diff = None
+
+    @property
+    def is_network(self):
+        return '/' in self.target
+
+    def to_dict(self, results=True):
+        job = {
+            'job_id': self.job_id,
+            'target': self.target,
+            'ports': self.ports,
+            'status': self.status,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'hosts_total': self.hosts_total,
+            'hosts_done': self.hosts_done,
+            'active_hosts': len(self.results),
+            'probes': self.probes,
+            'error': self.error,
+            'incremental': self.incremental,
+            'diff': self.diff
+        }
+        if results:
+            job['results'] = list(self.results)
+        return job
+
+
+class ScanJobManager:
+    """
+    Scan job runner:
+    - submit() validates the target and queues the scan; at most `workers`
+      scans run at once and at most `max_pending` wait (RuntimeError beyond)
+    - Every `progress_interval` seconds a running job reports progress plus
+      the hosts found since the last report through on_event('scan_progress', ...)
+    - Jobs can be cancelled while queued or running; partial results are kept
+    - Finished jobs are written to the logger's scan_jobs table; the last
+      `keep` stay in memory
+    - Range scans update the scan_results table (scan_cache.ScanCache); an
+      incremental job re-probes only stale entries, and every range job
+      reports a diff against the previously known state
+    """
+
+    def __init__(self, logger=None, on_event=None, workers=2, max_pending=16, keep=50,
+                 progress_interval=0.5):
+        self.logger = logger
+        self.on_event = on_event
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep = keep
+        self.progress_interval = progress_interval
+        self.queue = queue.Queue()
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self._threads = []
+
+    @classmethod
+    def from_env(cls, logger=None, on_event=None):
+        return cls(logger, on_event,
+                   workers=int(os.environ.get('SENTINEL_SCAN_WORKERS', 2)),
+                   max_pending=int(os.environ.get('SENTINEL_SCAN_QUEUE', 16)))
+
+    def submit(self, target, ports=None, incremental=False):
+        """Queue a scan of a host or CIDR range; ValueError for a bad target"""
+        target = (target or '').strip()
+        if not target:
+            raise ValueError('No target given')
+        if '/' in target:
+            network_hosts(target)  # validates the range and its size up front
+        job = ScanJob(target, ports, incremental=bool(incremental))
+        with self.lock:
+            pending = sum(1 for j in self.jobs.values() if j.status == 'queued')
+            if pending >= self.max_pending:
+                raise RuntimeError(f"Too many queued scans ({pending}), try again later")
+            self.jobs[job.job_id] = job
+            self._start_workers()
+        self.queue.put(job)
+        self._emit(job)
+        return job
+
+    def get(self, job_id):
+        """Job dict from memory, or from the database once evicted"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self.logger.get_scan_job(job_id) if self.logger else None
+
+    def list(self, limit=50):
+        """Active and recent jobs (without results), newest first"""
+        with self.lock:
+            jobs = [j.to_dict(results=False) for j in reversed(self.jobs.values())]
+        seen = {j['job_id'] for j in jobs}
+        if self.logger and len(jobs) < limit:
+            jobs += [j for j in self.logger.get_scan_jobs(limit) if j['job_id'] not in seen]
+        return jobs[:limit]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; False if unknown or already finished"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in ScanJob.FINISHED:
+                return False
+            job.cancel_requested = True
+            if job.status == 'running':
+                return True  # the job's progress loop stops the scan
+            job.status = 'cancelled'  # still queued: the worker skips it
+        job.finished = _now()
+        self._finish(job)
+        return True
+
+    # ---------- worker ----------
+
+    def _start_workers(self):
+        """Start worker threads on first use (daemon: a long scan never blocks shutdown)"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"scan-job-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                if job.status != 'queued':
+                    continue
+                job.status = 'running'
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"[!] Scan job {job.job_id} error: {e}")
+
+    def _run(self, job):
+        job.started = _now()
+        self._emit(job)
+        scanner = NetworkScanner()
+        try:
+            scanner._run(self._scan(job, scanner))
+            job.status = 'cancelled' if job.cancel_requested else 'done'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished = _now()
+        self._update(job, scanner)
+        self._finish(job)
+
+    async def _scan(self, job, scanner):
+        task = asyncio.ensure_future(self._collect(job, scanner))
+        while not task.done():
+            await asyncio.wait({task}, timeout=self.progress_interval)
+            if job.cancel_requested and not task.done():
+                task.cancel()
+            self._progress(job, scanner)
+        if not task.cancelled():
+            task.result()
+
+    async def _collect(self, job, scanner):
+        if job.is_network:
+            cache = ScanCache.from_env(self.logger, job.target, job.incremental) if self.logger else None
+            try:
+                async for host in scanner.iter_network_async(job.target, job.ports, cache):
+                    job.results.append(host)
+                    job.unsent.append(host)
+            finally:
+                # Cancelled runs keep what they recorded; the diff covers the hosts scanned
+                if cache is not None:
+                    cache.flush()
+                    job.diff = cache.diff()
+        else:
+            host = await scanner.scan_host_async(job.target, job.ports)
+            job.results.append(host)
+            job.unsent.append(host)
+
+    def _update(self, job, scanner):
+        job.hosts_total = scanner.stats['hosts_total']
+        job.hosts_done = scanner.stats['hosts_done']
+        job.probes = scanner.stats['probes']
+
+    def _progress(self, job, scanner):
+        self._update(job, scanner)
+        new_hosts, job.unsent = job.unsent, []
+        self._emit(job, new_hosts)
+
+    def _finish(self, job):
+        if self.logger:
+            self.logger.save_scan_job(job.to_dict())
+        new_hosts, job.unsent = job.unsent, []
+        self._emit(job, new_hosts)
+        with self.lock:
+            finished = [j for j in self.jobs if self.jobs[j].status in ScanJob.FINISHED]
+            for job_id in finished[:max(0, len(finished) - self.keep)]:
+                del self.jobs[job_id]
+
+    def _emit(self, job, new_hosts=()):
+        if self.on_event is None:
+            return
+        event = job.to_dict(results=False)
+        event['new_hosts'] = list(new_hosts)
+        try:
+            self.on_event('scan_progress', event)
+        except Exception as e:
+            print(f"[!] Scan job event error: {e}")
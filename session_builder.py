@@ -0,0 +1,192 @@
+"""
+Session Builder - Streaming attacker session reconstruction
+Groups events from the same source into sessions separated by an inactivity gap
+
+Usage (rebuild sessions from historical attacks):
+    python session_builder.py --backfill [--db database/honeypot.db] [--gap 900]
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from alert_pipeline import SEVERITY_RANK
+from timestamps import format_epoch, parse_timestamp
+
+
+class AttackSession:
+    """Running summary of one session"""
+
+    __slots__ = ('session_id', 'source_ip', 'start', 'end', 'events', 'ports', 'services',
+                 'types', 'max_severity', 'is_open')
+
+    def __init__(self, source_ip, now):
+        self.session_id = f"{source_ip}-{int(now * 1000)}"
+        self.source_ip = source_ip
+        self.start = now
+        self.end = now
+        self.events = 0
+        self.ports = set()
+        self.services = set()
+        self.types = {}
+        self.max_severity = 'low'
+        self.is_open = True
+
+    def add(self, attack_data, now, weight=1):
+        self.end = max(self.end, now)
+        self.events += weight
+        port = attack_data.get('target_port')
+        if port is not None:
+            self.ports.add(port)
+        for p in attack_data.get('ports') or ():
+            self.ports.add(p)
+        if attack_data.get('service'):
+            self.services.add(attack_data['service'])
+        etype = attack_data.get('type', 'connection_attempt')
+        self.types[etype] = self.types.get(etype, 0) + weight
+        severity = attack_data.get('severity', 'low')
+        if SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(self.max_severity, 0):
+            self.max_severity = severity
+
+    @classmethod
+    def from_row(cls, row):
+        values = dict(zip(SESSION_COLUMNS, row))
+        start, end = parse_timestamp(values['start_time']), parse_timestamp(values['end_time'])
+        if start is None or end is None:
+            return None
+        session = cls(values['source_ip'], start)
+        session.session_id = values['session_id']
+        session.end = end
+        session.events = values['event_count'] or 0
+        session.ports = set(json.loads(values['ports'] or '[]'))
+        session.services = set(json.loads(values['services'] or '[]'))
+        session.types = json.loads(values['types'] or '{}')
+        session.max_severity = values['max_severity'] or 'low'
+        return session
+
+    def to_row(self):
+        """Row for the sessions table (same column order as SESSION_COLUMNS)"""
+        return (
+            self.session_id,
+            self.source_ip,
+            format_epoch(self.start),
+            format_epoch(self.end),
+            round(self.end - self.start, 3),
+            self.events,
+            json.dumps(sorted(self.ports, key=str)),
+            json.dumps(sorted(self.services)),
+            json.dumps(self.types),
+            self.max_severity,
+            1 if self.is_open else 0
+        )
+
+
+SESSION_COLUMNS = ('session_id', 'source_ip', 'start_time', 'end_time', 'duration', 'event_count',
+                   'ports', 'services', 'types', 'max_severity', 'is_open')
+
+
+class SessionBuilder:
+    """
+    Incremental sessionizer:
+    - One open session per source; an event more than `gap` seconds after
+      the previous one from that source starts a new session
+    - O(1) per event; open sessions are bounded (least recently active
+      ones are closed first)
+    - Changed sessions are collected for batched upserts (drain_dirty)
+    """
+
+    def __init__(self, gap=900.0, max_open=50000):
+        """Initialize builder; gap is the inactivity timeout in seconds"""
+        self.gap = gap
+        self.max_open = max_open
+        self.open = OrderedDict()
+        self.dirty = {}
+        self.lock = threading.Lock()
+
+    def _close(self, session):
+        session.is_open = False
+        self.dirty[session.session_id] = session
+
+    def observe(self, attack_data, now=None, weight=1):
+        """Assign event to its session, returns the session id"""
+        now = now if now is not None else time.time()
+        source_ip = attack_data.get('source_ip', 'unknown')
+        with self.lock:
+            session = self.open.get(source_ip)
+            if session is not None and now - session.end > self.gap:
+                del self.open[source_ip]
+                self._close(session)
+                session = None
+            if session is None:
+                session = AttackSession(source_ip, now)
+                self.open[source_ip] = session
+                if len(self.open) > self.max_open:
+                    _, oldest = self.open.popitem(last=False)
+                    self._close(oldest)
+            else:
+                self.open.move_to_end(source_ip)
+            session.add(attack_data, now, weight)
+            self.dirty[session.session_id] = session
+            return session.session_id
+
+    def expire(self, now=None):
+        """Close sessions idle for longer than the gap"""
+        now = now if now is not None else time.time()
+        closed = 0
+        with self.lock:
+            while self.open:
+                ip, session = next(iter(self.open.items()))
+                if now - session.end <= self.gap:
+                    break
+                del self.open[ip]
+                self._close(session)
+                closed += 1
+        return closed
+
+    def load_rows(self, rows):
+        """Resume open sessions from sessions-table rows"""
+        with self.lock:
+            for row in sorted(rows, key=lambda r: r[3]):
+                session = AttackSession.from_row(row)
+                if session is not None:
+                    self.open[session.source_ip] = session
+
+    def drain_dirty(self):
+        """Rows of all sessions changed since the last drain"""
+        with self.lock:
+            sessions, self.dirty = list(self.dirty.values()), {}
+            return [s.to_row() for s in sessions]
+
+    def close_all(self):
+        with self.lock:
+            for session in self.open.values():
+                self._close(session)
+            self.open.clear()
+
+    def clear(self):
+        with self.lock:
+            self.open.clear()
+            self.dirty = {}
+
+    def __len__(self):
+        return len(self.open)
+
+
+if __name__ == '__main__':
+    import argparse
+    from logger_module import HoneypotLogger
+
+    parser = argparse.ArgumentParser(description='Rebuild attacker sessions from historical attacks')
+    parser.add_argument('--db', default='database/honeypot.db')
+    parser.add_argument('--gap', type=float, default=float(os.environ.get('SENTINEL_SESSION_GAP', 900)))
+    parser.add_argument('--backfill', action='store_true', help='Rebuild the sessions table from the attacks table')
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.error('nothing to do (use --backfill)')
+    logger = HoneypotLogger(db_path=args.db)
+    start = time.perf_counter()
+    result = logger.backfill_sessions(gap=args.gap)
+    print(f"[✓] Rebuilt {result['sessions']} sessions from {result['attacks']} attacks "
+          f"in {time.perf_counter() - start:.1f}s")
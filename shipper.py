@@ -0,0 +1,330 @@
+"""
+Shipper - Batched event shipping from a sensor to a central collector
+Stored attacks are batched into compressed, checksummed frames and sent to
+collector.py over TCP; frames the collector has not acknowledged are kept in
+an on-disk spool and resent once it is reachable again
+"""
+import atexit
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+
+from event_bus import encode_frame, parse_address, read_frame
+from payload_codec import PayloadCodec
+
+MAGIC = b'SSF1'
+FRAME_HEADER = struct.Struct('!4sBII')  # magic, codec, body bytes, CRC-32 of the body
+CODECS = ('zlib', 'zstd')
+MAX_FRAME = 64 * 1024 * 1024
+
+# Attacker enrichment shipped with each event, so the collector needs no lookups
+ENRICHMENT_FIELDS = ('asn', 'org', 'country', 'is_vpn')
+
+_decoder = PayloadCodec('zlib')
+
+
+def collector_token():
+    """Shared secret from SENTINEL_COLLECTOR_TOKEN (None when unset)"""
+    return os.environ.get('SENTINEL_COLLECTOR_TOKEN') or None
+
+
+class FrameChecksumError(ValueError):
+    """Frame body does not match its CRC (the stream itself is still in sync)"""
+
+
+def encode_batch(sensor_id, batch_id, events, codec):
+    """One frame: header + compressed JSON {'sensor_id', 'batch_id', 'events'}"""
+    body = json.dumps({'sensor_id': sensor_id, 'batch_id': batch_id, 'events': events},
+                      default=str, separators=(',', ':')).encode('utf-8')
+    _, blob = codec.compress(body)
+    return FRAME_HEADER.pack(MAGIC, CODECS.index(codec.codec), len(blob), zlib.crc32(blob)) + blob
+
+
+def read_batch(reader):
+    """Read and verify one frame from a buffered reader, None on EOF
+
+    Raises FrameChecksumError for a damaged body, ValueError when the
+    stream is not a shipper stream.
+    """
+    header = reader.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    magic, codec, length, crc = FRAME_HEADER.unpack(header)
+    if magic != MAGIC or codec >= len(CODECS):
+        raise ValueError('Not a shipper frame')
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame too large: {length} bytes")
+    blob = reader.read(length)
+    if len(blob) < length:
+        return None
+    if zlib.crc32(blob) != crc:
+        raise FrameChecksumError('Frame checksum mismatch')
+    return json.loads(_decoder.decompress(CODECS[codec], blob))
+
+
+class EventShipper:
+    """
+    Sensor-side federation link:
+    - submit() (a HoneypotLogger store hook) copies each stored attack into
+      the open batch, stamped with sensor_id and an event_id unique to this
+      sensor; O(1), never blocks the ingest writer
+    - With a token (SENTINEL_COLLECTOR_TOKEN) each connection opens with the
+      event bus hello frame
+    - A sender thread closes the batch every `batch_size` events or
+      `flush_interval` seconds and sends it as one frame; the next frame
+      goes out once the collector acknowledged the previous one
+    - Frames that cannot be delivered (collector down, no ack within
+      `ack_timeout`, rejected) are written to the spool directory and resent
+      oldest first after reconnecting; beyond `max_spool_bytes` the oldest
+      spooled frames are dropped
+    - A frame the collector rejects `max_rejections` times is moved to the
+      spool's rejected/ directory so it no longer holds up the frames behind it
+    - Events still pending at exit are spooled
+    """
+
+    def __init__(self, address, sensor_id=None, spool_dir='database/spool', batch_size=500,
+                 flush_interval=1.0, ack_timeout=10.0, max_pending=100000,
+                 max_spool_bytes=512 * 1024 * 1024, codec='zlib', max_rejections=3, token=None):
+        self.address = address
+        self.token = token or collector_token()
+        self.sensor_id = sensor_id or socket.gethostname()
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ack_timeout = ack_timeout
+        self.max_pending = max_pending
+        self.max_spool_bytes = max_spool_bytes
+        self.max_rejections = max_rejections
+        self.rejected_dir = os.path.join(spool_dir, 'rejected')
+        self.codec = PayloadCodec(codec)
+        # Event and batch ids: <run>-<n>, run = start time in ms + pid (sorts by age)
+        self.run_id = f"{int(time.time() * 1000):012x}-{os.getpid():x}"
+        self.lock = threading.Lock()
+        self.pending = []
+        self.outbox = deque()  # (batch_id, frame) not yet acknowledged
+        self.stats = {'submitted': 0, 'dropped': 0, 'frames_sent': 0, 'events_sent': 0,
+                      'duplicates': 0, 'retries': 0, 'spooled': 0, 'spool_dropped': 0,
+                      'rejected': 0}
+        self.connected = False
+        self.last_error = None
+        self._seq = 0
+        self._batches = 0
+        self._sock = None
+        self._reader = None
+        self._retry_at = 0
+        self._backoff = 0.5
+        self._rejections = {}  # batch_id -> times the collector rejected it
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        os.makedirs(spool_dir, exist_ok=True)
+        self.spool_bytes = sum(os.path.getsize(p) for p in self._spool_files())
+
+    @classmethod
+    def from_env(cls):
+        """Shipper for SENTINEL_COLLECTOR (tcp:host:port), or None when federation is off"""
+        address = os.environ.get('SENTINEL_COLLECTOR')
+        if not address:
+            return None
+        return cls(address,
+                   sensor_id=os.environ.get('SENTINEL_SENSOR_ID'),
+                   spool_dir=os.environ.get('SENTINEL_SHIP_SPOOL', 'database/spool'),
+                   batch_size=int(os.environ.get('SENTINEL_SHIP_BATCH', 500)),
+                   max_spool_bytes=int(float(os.environ.get('SENTINEL_SHIP_SPOOL_MB', 512)) * 1024 * 1024),
+                   codec=os.environ.get('SENTINEL_SHIP_CODEC', 'zlib'))
+
+    def submit(self, attack_data, enrichment=None):
+        """Queue one stored attack for shipping; False when the backlog is full"""
+        event = {k: v for k, v in attack_data.items() if k != 'seq'}
+        if enrichment:
+            event.update((k, enrichment.get(k)) for k in ENRICHMENT_FIELDS)
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                self.stats['dropped'] += 1
+                return False
+            self._seq += 1
+            event['sensor_id'] = self.sensor_id
+            event['event_id'] = f"{self.run_id}-{self._seq}"
+            self.pending.append(event)
+            self.stats['submitted'] += 1
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self._wake.set()
+        return True
+
+    def start(self):
+        """Start the sender thread and the spool-at-exit hook (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='shipper', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        print(f"[✓] Shipping events as sensor '{self.sensor_id}' to {self.address}")
+
+    def close(self):
+        """Stop sending; unsent events and frames go to the spool"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.ack_timeout)  # let an in-flight frame finish
+        self._cut()
+        self._spill()
+        self._disconnect()
+
+    def status(self):
+        with self.lock:
+            pending = len(self.pending)
+        return dict(self.stats, sensor_id=self.sensor_id, collector=self.address, connected=self.connected,
+                    pending=pending, outbox=len(self.outbox), spool_frames=len(self._spool_files()),
+                    spool_bytes=self.spool_bytes, last_error=self.last_error)
+
+    # ---------- sender ----------
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped:
+                break
+            self._cut()
+            if not self.outbox and not self.spool_bytes:
+                continue
+            if not self.connected and not self._connect():
+                self._spill()
+                continue
+            try:
+                self._send_spooled()
+                while self.outbox and not self._stopped:
+                    batch_id, frame = self.outbox[0]
+                    try:
+                        self._send(frame)
+                    except RuntimeError:
+                        if not self._give_up(batch_id, frame):
+                            raise
+                    self.outbox.popleft()
+            except (OSError, ValueError, RuntimeError) as e:
+                self.last_error = str(e)
+                self.stats['retries'] += 1
+                print(f"[!] Shipping to {self.address} failed: {e} - spooling")
+                self._disconnect()
+                self._retry_at = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, 30.0)
+                self._spill()
+
+    def _cut(self):
+        """Close pending events into frames on the outbox"""
+        with self.lock:
+            events, self.pending = self.pending, []
+        for i in range(0, len(events), self.batch_size):
+            self._batches += 1
+            batch_id = f"{self.run_id}-{self._batches:08d}"
+            self.outbox.append((batch_id, encode_batch(self.sensor_id, batch_id, events[i:i + self.batch_size],
+                                                       self.codec)))
+
+    def _connect(self):
+        if time.monotonic() < self._retry_at:
+            return False
+        family, sockaddr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.ack_timeout)
+        try:
+            sock.connect(sockaddr)
+            if self.token:
+                sock.sendall(encode_frame({'kind': 'hello', 'token': self.token}))
+        except OSError as e:
+            sock.close()
+            self.last_error = str(e)
+            self._retry_at = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, 30.0)
+            return False
+        self._sock, self._reader = sock, sock.makefile('rb')
+        self.connected = True
+        self._backoff = 0.5
+        print(f"[✓] Connected to collector at {self.address}")
+        return True
+
+    def _disconnect(self):
+        self.connected = False
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _send(self, frame):
+        """Send one frame and wait for its ack (RuntimeError if the collector rejects it)"""
+        self._sock.sendall(frame)
+        reply = read_frame(self._reader)
+        if reply is None:
+            raise ConnectionError('Collector closed the connection')
+        if not reply.get('ok'):
+            raise RuntimeError(f"Collector rejected frame: {reply.get('error')}")
+        self.stats['frames_sent'] += 1
+        self.stats['events_sent'] += reply.get('inserted', 0)
+        self.stats['duplicates'] += reply.get('duplicates', 0)
+
+    # ---------- spool ----------
+
+    def _spool_files(self):
+        return [os.path.join(self.spool_dir, name) for name in sorted(os.listdir(self.spool_dir))
+                if name.endswith('.frame')]
+
+    def _send_spooled(self):
+        for path in self._spool_files():
+            if self._stopped:
+                return
+            with open(path, 'rb') as f:
+                frame = f.read()
+            try:
+                self._send(frame)
+            except RuntimeError:
+                if not self._give_up(os.path.basename(path)[:-len('.frame')], frame):
+                    raise
+            os.remove(path)
+            self.spool_bytes -= len(frame)
+
+    def _give_up(self, batch_id, frame):
+        """Count a rejection; once a frame reached max_rejections, keep it under rejected/ and return True"""
+        rejections = self._rejections.get(batch_id, 0) + 1
+        if rejections < self.max_rejections:
+            self._rejections[batch_id] = rejections
+            return False
+        self._rejections.pop(batch_id, None)
+        self.stats['rejected'] += 1
+        print(f"[!] Collector rejected frame {batch_id} {rejections} times - moved to {self.rejected_dir}")
+        try:
+            os.makedirs(self.rejected_dir, exist_ok=True)
+            with open(os.path.join(self.rejected_dir, f"{batch_id}.frame"), 'wb') as f:
+                f.write(frame)
+        except OSError as e:
+            print(f"[!] Could not keep rejected frame {batch_id}: {e}")
+        return True
+
+    def _spill(self):
+        """Move unacknowledged frames from memory to the spool directory"""
+        while self.outbox:
+            batch_id, frame = self.outbox.popleft()
+            path = os.path.join(self.spool_dir, f"{batch_id}.frame")
+            try:
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(frame)
+                os.replace(path + '.tmp', path)
+            except OSError as e:
+                print(f"[!] Spool write failed, dropping frame {batch_id}: {e}")
+                self.stats['spool_dropped'] += 1
+                continue
+            self.spool_bytes += len(frame)
+            self.stats['spooled'] += 1
+        if self.spool_bytes > self.max_spool_bytes:
+            for path in self._spool_files():
+                if self.spool_bytes <= self.max_spool_bytes:
+                    break
+                self.spool_bytes -= os.path.getsize(path)
+                os.remove(path)
+                self.stats['spool_dropped'] += 1
@@ -0,0 +1,252 @@
+"""
+Sketches - Bounded-memory, mergeable stream summaries
+HyperLogLog (distinct count), Count-Min (frequencies) and Space-Saving (top-K)
+"""
+import hashlib
+import heapq
+import itertools
+import math
+
+
+def hash64(item):
+    """Stable 64-bit hash (same value in every process, so sketches can be merged)"""
+    if not isinstance(item, bytes):
+        item = str(item).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """
+    Distinct counter:
+    - 2^p one-byte registers (p=14: 16 KB, ~0.8% standard error)
+    - add() is O(1); merge() takes the register-wise max
+    """
+
+    def __init__(self, p=14):
+        """Initialize with 2^p registers (4 <= p <= 18)"""
+        if not 4 <= p <= 18:
+            raise ValueError('HyperLogLog precision must be between 4 and 18')
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self._rest_bits = 64 - p
+        self._rest_mask = (1 << self._rest_bits) - 1
+        self._inv_pow = [2.0 ** -i for i in range(self._rest_bits + 2)]
+        if self.m >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    @property
+    def std_error(self):
+        """Relative standard error of count()"""
+        return 1.04 / math.sqrt(self.m)
+
+    def add_hash(self, h):
+        """Add a precomputed hash64(); returns True if the estimate may have changed"""
+        idx = h >> self._rest_bits
+        rank = self._rest_bits - (h & self._rest_mask).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+            return True
+        return False
+
+    def add(self, item):
+        return self.add_hash(hash64(item))
+
+    def count(self):
+        """Estimated number of distinct items"""
+        inv = self._inv_pow
+        estimate = self.alpha * self.m * self.m / sum(map(inv.__getitem__, self.registers))
+        if estimate <= 2.5 * self.m:
+            zeros = self.registers.count(0)
+            if zeros:
+                # Small range: linear counting is more accurate
+                estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """Fold another sketch with the same precision into this one"""
+        if other.p != self.p:
+            raise ValueError('Cannot merge HyperLogLogs with different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def clear(self):
+        self.registers = bytearray(self.m)
+
+    def to_dict(self):
+        return {'p': self.p, 'registers': self.registers.hex()}
+
+    @classmethod
+    def from_dict(cls, data):
+        hll = cls(p=data['p'])
+        hll.registers = bytearray.fromhex(data['registers'])
+        return hll
+
+
+class CountMinSketch:
+    """
+    Frequency estimator:
+    - depth x width counters, never underestimates
+    - Overestimate <= (e / width) * total with probability 1 - e^-depth
+    - merge() adds the counter tables
+    """
+
+    def __init__(self, width=2048, depth=4):
+        """Initialize with depth rows of width counters"""
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def confidence(self):
+        return 1.0 - math.exp(-self.depth)
+
+    def _indexes(self, h):
+        # Double hashing: the k-th row uses h1 + k*h2
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + k * h2) % self.width for k in range(self.depth)]
+
+    def add_hash(self, h, n=1):
+        """Add n to a precomputed hash64()"""
+        self.total += n
+        h1, h2, width = h & 0xFFFFFFFF, (h >> 32) | 1, self.width
+        for row in self.rows:
+            row[h1 % width] += n
+            h1 += h2
+
+    def add(self, item, n=1):
+        return self.add_hash(hash64(item), n)
+
+    def estimate(self, item):
+        return min(row[i] for row, i in zip(self.rows, self._indexes(hash64(item))))
+
+    def error_bound(self):
+        """Maximum overestimate of estimate() at the stated confidence"""
+        return int(math.ceil(self.epsilon * self.total))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Cannot merge count-min sketches with different dimensions')
+        for row, other_row in zip(self.rows, other.rows):
+            row[:] = map(int.__add__, row, other_row)
+        self.total += other.total
+        return self
+
+    def clear(self):
+        self.rows = [[0] * self.width for _ in range(self.depth)]
+        self.total = 0
+
+    def to_dict(self):
+        return {'width': self.width, 'depth': self.depth, 'total': self.total, 'rows': self.rows}
+
+    @classmethod
+    def from_dict(cls, data):
+        cms = cls(width=data['width'], depth=data['depth'])
+        cms.rows = [list(r) for r in data['rows']]
+        cms.total = data['total']
+        return cms
+
+
+class SpaceSaving:
+    """
+    Top-K heavy hitters (Metwally et al.):
+    - Tracks at most k items as {item: [count, error]}
+    - count overestimates the true frequency by at most error
+    - Any item with true frequency > total / k is guaranteed to be tracked
+    - Lazy min-heap of counts: O(log k) amortized eviction
+    """
+
+    def __init__(self, k=64):
+        """Initialize with capacity for k monitored items"""
+        self.k = k
+        self.counters = {}
+        self.total = 0
+        self._heap = []
+        self._tick = itertools.count()
+
+    def _rebuild_heap(self):
+        self._heap = [(c[0], next(self._tick), item) for item, c in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def _min_entry(self):
+        """Heap entries hold a past (lower) count; refresh until the top is current"""
+        heap, counters = self._heap, self.counters
+        while True:
+            count, _, item = heap[0]
+            current = counters[item][0]
+            if current == count:
+                return heap[0]
+            heapq.heapreplace(heap, (current, next(self._tick), item))
+
+    def add(self, item, n=1):
+        """Count n occurrences of item, returns its (over)estimated count"""
+        self.total += n
+        entry = self.counters.get(item)
+        if entry is not None:
+            entry[0] += n
+            return entry[0]
+        if len(self.counters) < self.k:
+            self.counters[item] = [n, 0]
+            heapq.heappush(self._heap, (n, next(self._tick), item))
+            return n
+        # Replace the smallest counter; its count becomes the newcomer's error
+        floor, _, victim = self._min_entry()
+        del self.counters[victim]
+        self.counters[item] = [floor + n, floor]
+        heapq.heapreplace(self._heap, (floor + n, next(self._tick), item))
+        return floor + n
+
+    def load(self, counts):
+        """Replace the summary with exact {item: count} totals (keeps the k largest)"""
+        ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:self.k]
+        self.counters = {item: [c, 0] for item, c in ranked}
+        self.total = sum(counts.values())
+        self._rebuild_heap()
+
+    def min_count(self):
+        """Upper bound on the frequency of any untracked item"""
+        if len(self.counters) < self.k:
+            return 0
+        return self._min_entry()[0]
+
+    def top(self, n=10):
+        """[(item, count, error)] by count, highest first"""
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+        return [(item, c[0], c[1]) for item, c in ranked]
+
+    def merge(self, other):
+        """Combine two summaries (untracked items are bounded by each side's min count)"""
+        floor_self, floor_other = self.min_count(), other.min_count()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            a = self.counters.get(item, [floor_self, floor_self])
+            b = other.counters.get(item, [floor_other, floor_other])
+            merged[item] = [a[0] + b[0], a[1] + b[1]]
+        ranked = sorted(merged.items(), key=lambda kv: kv[1][0], reverse=True)[:self.k]
+        self.counters = dict(ranked)
+        self.total += other.total
+        self._rebuild_heap()
+        return self
+
+    def clear(self):
+        self.counters = {}
+        self.total = 0
+        self._heap = []
+
+    def to_dict(self):
+        return {'k': self.k, 'total': self.total, 'counters': [[i, c[0], c[1]] for i, c in self.counters.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        ss = cls(k=data['k'])
+        ss.counters = {i: [c, e] for i, c, e in data['counters']}
+        ss.total = data['total']
+        ss._rebuild_heap()
+        return ss
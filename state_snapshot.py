@@ -0,0 +1,137 @@
+"""
+State Snapshot - Warm restarts for the dashboard process
+Live counters and the recent-event buffer are saved to the snapshots table and
+restored on startup instead of recomputed with full scans of the attacks table
+"""
+import atexit
+import os
+import threading
+import time
+
+from timestamps import parse_timestamp
+
+SNAPSHOT_NAME = 'dashboard'
+
+
+def _epoch_hour(timestamp):
+    """Epoch hour of a stored timestamp (None if unparsable)"""
+    ts = parse_timestamp(timestamp)
+    return int(ts // 3600) if ts is not None else None
+
+
+class StateSnapshot:
+    """
+    Dashboard warm-start state:
+    - save() stores LiveStats.state() and the newest `recent` events together
+      with the attacks id high-water mark at that moment
+    - restore() loads them back; rows stored since (by the capture daemon, or
+      after the last periodic save) are replayed on top, up to `max_replay`
+    - Without a usable snapshot (first start, cleared or replaced database,
+      too many rows to replay) restore() returns False and the caller seeds
+      from the database as before
+    - A daemon thread saves every `interval` seconds while events arrive, and
+      once more at exit; every save is skipped while `busy()` reports
+      unwritten events (an older snapshot plus replay stays exact)
+    - saves=False never stores a snapshot, for processes whose counters can
+      include events not in the attacks table yet (the dashboard on the
+      event bus counts daemon events before the daemon stores them)
+    """
+
+    def __init__(self, logger, live_stats, ring, interval=60, recent=100, max_replay=100000, busy=None,
+                 saves=True):
+        self.logger = logger
+        self.live_stats = live_stats
+        self.ring = ring
+        self.interval = interval
+        self.recent = recent
+        self.max_replay = max_replay
+        self.busy = busy
+        self.saves = saves
+        self.saved_seq = None  # ring position covered by the stored snapshot
+        self.status = {'restored': False, 'replayed': 0, 'saves': 0, 'last_save': None, 'saving': saves}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, logger, live_stats, ring, busy=None, saves=True):
+        return cls(logger, live_stats, ring, busy=busy, saves=saves,
+                   interval=float(os.environ.get('SENTINEL_STATE_INTERVAL', 60)),
+                   max_replay=int(os.environ.get('SENTINEL_STATE_REPLAY', 100000)))
+
+    def restore(self):
+        """Load the stored snapshot (plus rows written after it); False if there is none usable"""
+        snapshot = self.logger.get_snapshot(SNAPSHOT_NAME)
+        current = self.logger.get_attacks_seq()
+        if snapshot is None or current is None:
+            return False
+        behind = current - snapshot['attacks_seq']
+        if behind < 0 or behind > self.max_replay:
+            print(f"[*] State snapshot unusable ({behind:+d} attacks since it was saved) - seeding from the database")
+            return False
+        data = snapshot['data']
+        try:
+            self.live_stats.restore(data['live_stats'])
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[!] State snapshot unreadable ({e}) - seeding from the database")
+            self.live_stats.reset()
+            return False
+        for event in data['recent']:
+            self.ring.append(event)
+        replayed = self.logger.get_attacks_after(snapshot['attacks_seq'], behind) if behind else []
+        for attack in replayed:
+            rate = attack.pop('sample_rate', None) or 1.0
+            self.live_stats.record(attack, n=max(1, round(1 / rate)), hour=_epoch_hour(attack['timestamp']))
+            self.ring.append(attack)
+        self.saved_seq = self.ring.last_seq
+        self.status.update(restored=True, replayed=len(replayed), snapshot_age=round(time.time() - snapshot['saved_at']))
+        print(f"[✓] State restored from snapshot ({len(replayed)} newer attacks replayed)")
+        return True
+
+    def seed_recent(self, limit=None):
+        """Fill the recent-event buffer from the database (no snapshot available)"""
+        for attack in reversed(self.logger.get_recent_attacks(limit or self.recent)):
+            self.ring.append(attack)
+        self.saved_seq = self.ring.last_seq
+
+    def save(self, force=False):
+        """Store the current state; skipped when nothing changed since the last save"""
+        if not self.saves or (self.busy is not None and self.busy()):
+            return False  # queued rows would be counted twice on replay
+        with self._lock:
+            last_seq = self.ring.last_seq
+            if not force and last_seq == self.saved_seq:
+                return False
+            attacks_seq = self.logger.get_attacks_seq()
+            if attacks_seq is None:
+                return False
+            data = {
+                'live_stats': self.live_stats.state(),
+                'recent': [_plain(e) for e in self.ring.latest(self.recent) if e is not None]
+            }
+            if not self.logger.save_snapshot(SNAPSHOT_NAME, attacks_seq, data):
+                return False
+            self.saved_seq = last_seq
+            self.status['saves'] += 1
+            self.status['last_save'] = time.time()
+            return True
+
+    def start(self):
+        """Start periodic saves and the save at exit (idempotent)"""
+        if self._thread is not None or not self.saves:
+            return
+        self._thread = threading.Thread(target=self._loop, name='state-snapshot', daemon=True)
+        self._thread.start()
+        atexit.register(self.save)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.save()
+            except Exception as e:
+                print(f"[!] State snapshot error: {e}")
+
+
+def _plain(event):
+    """Event without its ring sequence number (reassigned on restore)"""
+    return {k: v for k, v in event.items() if k != 'seq'}
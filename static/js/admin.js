@@ -7,6 +7,12 @@ document.addEventListener('DOMContentLoaded', function () {
     document.getElementById('exportCsv').addEventListener('click', () => window.location = '/api/export/csv');
     document.getElementById('clearAll').addEventListener('click', clearAllData);
     document.getElementById('reloadLogs').addEventListener('click', loadLogs);
+    loadThreads();
+    document.getElementById('profileBtn').addEventListener('click', runProfile);
+    document.getElementById('memSnapBtn').addEventListener('click', takeMemorySnapshot);
+    document.getElementById('memDiffBtn').addEventListener('click', diffMemory);
+    const ackAll = document.getElementById('ackAllAlerts');
+    if (ackAll) ackAll.addEventListener('click', () => ackAlerts({ all: true }));
 
     // Search and filter handlers
     const searchInput = document.getElementById('searchInput');
@@ -19,28 +25,35 @@ document.addEventListener('DOMContentLoaded', function () {
 try {
     const adminSocket = io();
     adminSocket.on('connect', () => { console.log('Admin socket connected'); });
-    adminSocket.on('new_attack', (attack) => {
-        // Prepend new attack to UI
-        const tbody = document.getElementById('attacksBody');
-        if (tbody) {
-            const tr = document.createElement('tr');
-            tr.innerHTML = `<td>${attack.timestamp || new Date().toISOString()}</td><td>${attack.source_ip}</td><td>${attack.target_port}</td><td>${attack.service}</td><td><span class="badge">${attack.type}</span></td><td><button class="btn danger" data-id="${attack.id || ''}">Delete</button></td>`;
-            tbody.insertBefore(tr, tbody.firstChild);
-            // attach delete handler
-            const btn = tr.querySelector('button[data-id]');
-            if (btn) { btn.addEventListener('click', () => { const id = btn.getAttribute('data-id'); if (!confirm('Delete attack id ' + id + '?')) return; fetch('/api/admin/delete_attack', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ id: parseInt(id) }) }).then(r => r.json()).then(resp => { if (resp.status === 'success') { tr.remove(); loadStats(); alert('Deleted') } else alert('Failed: ' + resp.message) }) }) }
-        }
-        loadStats();
+    adminSocket.on('attack_batch', (batch) => {
+        (batch.events || []).forEach(prependAttackRow);
+        adminSocket.emit('attack_batch_ack', { seq: batch.seq });
     });
+    subscribeLiveStats(adminSocket, renderStats);
 } catch (e) { console.warn('Socket init failed for admin:', e) }
 
+function prependAttackRow(attack) {
+    // Prepend new attack to UI
+    const tbody = document.getElementById('attacksBody');
+    if (tbody) {
+        const tr = document.createElement('tr');
+        tr.innerHTML = `<td>${attack.timestamp || new Date().toISOString()}</td><td>${attack.source_ip}</td><td>${attack.target_port}</td><td>${attack.service}</td><td><span class="badge">${attack.type}</span></td><td><button class="btn danger" data-id="${attack.id || ''}">Delete</button></td>`;
+        tbody.insertBefore(tr, tbody.firstChild);
+        // attach delete handler
+        const btn = tr.querySelector('button[data-id]');
+        if (btn) { btn.addEventListener('click', () => { const id = btn.getAttribute('data-id'); if (!confirm('Delete attack id ' + id + '?')) return; fetch('/api/admin/delete_attack', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ id: parseInt(id) }) }).then(r => r.json()).then(resp => { if (resp.status === 'success') { tr.remove(); loadStats(); alert('Deleted') } else alert('Failed: ' + resp.message) }) }) }
+    }
+}
+
+function renderStats(data) {
+    document.getElementById('totalAttacks').textContent = data.total_attacks || 0;
+    document.getElementById('uniqueIps').textContent = data.unique_ips || 0;
+    document.getElementById('portScans').textContent = data.port_scans || 0;
+    document.getElementById('connections').textContent = data.connection_attempts || 0;
+}
+
 function loadStats() {
-    fetch('/api/stats').then(r => r.json()).then(data => {
-        document.getElementById('totalAttacks').textContent = data.total_attacks || 0;
-        document.getElementById('uniqueIps').textContent = data.unique_ips || 0;
-        document.getElementById('portScans').textContent = data.port_scans || 0;
-        document.getElementById('connections').textContent = data.connection_attempts || 0;
-    }).catch(e => console.error(e));
+    fetch('/api/stats').then(r => r.json()).then(renderStats).catch(e => console.error(e));
 }
 
 function loadAttacks() {
@@ -90,7 +103,18 @@ function renderAdminPage() {
         const tr = ev.currentTarget.closest('tr');
         const detail = tr.nextElementSibling;
         if (!detail) return;
-        if (detail.style.display === 'none') { detail.style.display = 'table-row'; ev.currentTarget.textContent = 'Close'; }
+        if (detail.style.display === 'none') {
+            detail.style.display = 'table-row'; ev.currentTarget.textContent = 'Close';
+            // full payload is fetched lazily (may be stored compressed)
+            if (!detail.dataset.loaded) {
+                fetch('/api/database/attacks/' + id + '/payload').then(r => r.json()).then(p => {
+                    if (p.payload === undefined) return;
+                    const a = (window.adminAttacks || []).find(x => String(x.id) === String(id)) || {};
+                    detail.querySelector('pre').textContent = JSON.stringify(Object.assign({}, a, { payload: p.payload, payload_codec: p.codec }), null, 2);
+                    detail.dataset.loaded = '1';
+                }).catch(e => console.warn('payload fetch failed', e));
+            }
+        }
         else { detail.style.display = 'none'; ev.currentTarget.textContent = 'Details'; }
     }));
     // attach copy handlers
@@ -115,7 +139,9 @@ function loadAlerts() {
         data.alerts.forEach(a => {
             const div = document.createElement('div');
             div.style.marginBottom = '8px';
-            div.innerHTML = `<div style="display:flex;justify-content:space-between;align-items:center"><div><strong>${a.alert_type}</strong> <span class="small">${a.timestamp}</span><div class="small">${a.source_ip} — ${a.message}</div></div><div><button class="btn" data-ack="${a.id}">Acknowledge</button></div></div>`;
+            const count = a.occurrence_count > 1 ? ` <span class="badge high">×${a.occurrence_count}</span>` : '';
+            const span = a.occurrence_count > 1 ? `<div class="small">${a.first_seen} → ${a.last_seen}</div>` : '';
+            div.innerHTML = `<div style="display:flex;justify-content:space-between;align-items:center"><div><strong>${a.alert_type}</strong>${count} <span class="small">${a.timestamp}</span><div class="small">${a.source_ip} — ${a.message}</div>${span}</div><div><button class="btn" data-ack="${a.id}">Acknowledge</button> <button class="btn" data-ack-ip="${a.source_ip}">All from IP</button></div></div>`;
             el.appendChild(div);
         });
         el.querySelectorAll('button[data-ack]').forEach(b => b.addEventListener('click', (ev) => {
@@ -123,9 +149,18 @@ function loadAlerts() {
             fetch('/api/admin/ack_alert', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ id: parseInt(id) }) })
                 .then(r => r.json()).then(resp => { if (resp.status === 'success') { loadAlerts(); alert('Acknowledged') } else alert('Failed: ' + resp.message) })
         }));
+        el.querySelectorAll('button[data-ack-ip]').forEach(b => b.addEventListener('click', (ev) => {
+            ackAlerts({ source_ip: ev.currentTarget.getAttribute('data-ack-ip') });
+        }));
     }).catch(e => { console.error(e); document.getElementById('alertsList').innerHTML = '<div class="small">Error loading alerts</div>' });
 }
 
+function ackAlerts(filter) {
+    fetch('/api/admin/ack_alerts', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(filter) })
+        .then(r => r.json()).then(resp => { if (resp.status === 'success') { loadAlerts(); alert('Acknowledged ' + resp.acknowledged + ' alert(s)') } else alert('Failed: ' + resp.message) })
+        .catch(e => alert('Error: ' + e));
+}
+
 function loadLogs() {
     const lines = parseInt(document.getElementById('linesInput').value || 200);
     fetch('/api/admin/logs?lines=' + lines).then(r => r.json()).then(data => {
@@ -136,6 +171,51 @@ function loadLogs() {
     }).catch(e => { console.error(e); document.getElementById('logBox').textContent = 'Error loading logs' });
 }
 
+// Diagnostics: thread census, sampling profile, tracemalloc snapshots
+function showDiag(lines) {
+    const box = document.getElementById('diagBox');
+    box.textContent = '';
+    lines.forEach(l => { const p = document.createElement('div'); p.textContent = l; box.appendChild(p); });
+}
+
+function loadThreads() {
+    fetch('/api/admin/threads').then(r => r.json()).then(data => {
+        const parts = Object.entries(data.by_subsystem || {}).map(([k, v]) => `${k}: ${v}`);
+        document.getElementById('threadBox').textContent = `${data.total} threads — ${parts.join(', ')}`;
+    }).catch(e => console.error(e));
+}
+
+function runProfile() {
+    const btn = document.getElementById('profileBtn');
+    btn.disabled = true;
+    showDiag(['Profiling for 5s...']);
+    fetch('/api/admin/profile?seconds=5').then(r => r.json()).then(data => {
+        if (data.status === 'error') { showDiag([data.message]); return; }
+        showDiag([`${data.samples} samples over ${data.seconds}s (download collapsed stacks: /api/admin/profile?format=collapsed)`]
+            .concat(data.top_frames.map(f => `${f.samples}\t${f.frame}`)));
+        loadThreads();
+    }).catch(e => showDiag(['Error: ' + e])).finally(() => { btn.disabled = false; });
+}
+
+function takeMemorySnapshot() {
+    fetch('/api/admin/memory/snapshot', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: '{}' })
+        .then(r => r.json()).then(data => {
+            window.memSnapshotId = data.id;
+            document.getElementById('memDiffBtn').disabled = false;
+            showDiag([`Snapshot #${data.id}: ${data.traced_mb} MB traced${data.tracing_started ? ' (tracing just started)' : ''}`]
+                .concat(data.top.map(t => `${t.size_kb} KB\t${t.count}\t${t.where}`)));
+        }).catch(e => showDiag(['Error: ' + e]));
+}
+
+function diffMemory() {
+    if (!window.memSnapshotId) return;
+    fetch('/api/admin/memory/diff?base=' + window.memSnapshotId).then(r => r.json()).then(data => {
+        if (data.status === 'error') { showDiag([data.message]); return; }
+        showDiag([`Growth since snapshot #${data.base}:`]
+            .concat(data.diff.map(d => `${d.size_diff_kb > 0 ? '+' : ''}${d.size_diff_kb} KB\t${d.count_diff}\t${d.where}`)));
+    }).catch(e => showDiag(['Error: ' + e]));
+}
+
 function clearAllData() {
     if (!confirm('Clear ALL data (database + logs)?')) return;
     fetch('/api/clear_stats', { method: 'POST', headers: { 'Content-Type': 'application/json' } }).then(r => r.json()).then(resp => { if (resp.status === 'success') { loadAttacks(); loadAlerts(); loadLogs(); loadStats(); alert('Cleared') } else alert('Failed') }).catch(e => alert('Error: ' + e));
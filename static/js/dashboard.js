@@ -15,14 +15,18 @@ document.addEventListener('DOMContentLoaded', function () {
     loadStats();
     loadAttackInfo();
 
-    // Refresh stats every 3 seconds
-    setInterval(loadStats, 3000);
+    // Counters are pushed by the server (snapshot on connect, deltas afterwards)
+    subscribeLiveStats(socket, renderCounters);
     // Refresh attack info every 10 seconds
     setInterval(loadAttackInfo, 10000);
     // signal that dashboard JS loaded and attached handlers
     try { window.__dashboard_js_loaded = true } catch (e) { }
 });
 
+// Sequence cursors: newest attack rendered and last batch frame received
+let lastSeq = 0;
+let lastFrame = 0;
+
 // Client-side pagination state
 let attacksList = [];
 let attacksPage = 1;
@@ -94,19 +98,26 @@ function setupEventListeners() {
     socket.on('connect', function () {
         console.log('Connected to server');
         document.getElementById('status').style.background = '#00c851';
+        // After a reconnect, fetch only the attacks we missed
+        if (lastSeq > 0) catchUp();
     });
 
     socket.on('disconnect', function () {
         console.log('Disconnected from server');
     });
 
-    socket.on('new_attack', function (data) {
-        console.log('New attack received:', data);
-        addAttackToTable(data);
-        updateStats();
-        updateChart();
+    // Attacks arrive as batched frames; render once per frame, then ack it
+    socket.on('attack_batch', function (batch) {
+        const events = batch.events || [];
+        // Overflowed or skipped frames mean we missed attacks: fetch them by cursor
+        const missed = batch.overflow > 0 || (lastFrame && batch.seq > lastFrame + 1);
+        lastFrame = batch.seq;
+        if (missed) catchUp();
+        else addAttacksToTable(events);
+        updateChart(batch.count || events.length);
         // Show notification
-        showAttackNotification(data);
+        if (events.length) showAttackNotification(events[events.length - 1], batch.count || events.length);
+        socket.emit('attack_batch_ack', { seq: batch.seq });
     });
 }
 
@@ -128,8 +139,8 @@ function loadAttackInfo() {
         .catch(error => console.error('Error loading attack info:', error));
 }
 
-// Show attack notification
-function showAttackNotification(attack) {
+// Show attack notification (total > 1 when the frame carried several attacks)
+function showAttackNotification(attack, total) {
     // Create notification element
     const notification = document.createElement('div');
     notification.className = 'attack-notification';
@@ -147,7 +158,7 @@ function showAttackNotification(attack) {
         max-width: 350px;
     `;
     notification.innerHTML = `
-        <strong>🚨 Attack Detected!</strong><br>
+        <strong>🚨 ${total > 1 ? total + ' Attacks Detected!' : 'Attack Detected!'}</strong><br>
         <small>From: ${attack.source_ip}:${attack.source_port || 'N/A'}<br>
         Port: ${attack.target_port} (${attack.service || 'Unknown'})<br>
         Type: ${attack.type || 'connection_attempt'}</small>
@@ -272,16 +283,22 @@ function stopHoneypot() {
         });
 }
 
-// Load Statistics
+// Render stat counters
+function renderCounters(data) {
+    // Animate counters for nicer UX
+    animateCounter(document.getElementById('totalAttacks'), data.total_attacks || 0);
+    animateCounter(document.getElementById('uniqueIps'), data.unique_ips || 0);
+    animateCounter(document.getElementById('portScans'), data.port_scans || 0);
+    animateCounter(document.getElementById('connections'), data.connection_attempts || 0);
+}
+
+// Load Statistics (initial page load only; live updates arrive over Socket.IO)
 function loadStats() {
     fetch('/api/stats')
         .then(response => response.json())
         .then(data => {
-            // Animate counters for nicer UX
-            animateCounter(document.getElementById('totalAttacks'), data.total_attacks || 0);
-            animateCounter(document.getElementById('uniqueIps'), data.unique_ips || 0);
-            animateCounter(document.getElementById('portScans'), data.port_scans || 0);
-            animateCounter(document.getElementById('connections'), data.connection_attempts || 0);
+            renderCounters(data);
+            lastSeq = data.recent_seq || 0;
 
             if (data.recent_attacks && data.recent_attacks.length > 0) {
                 // update local list and render page 1
@@ -340,10 +357,22 @@ function updateAttacksTable(attacks) {
     renderAttacksPage(attacksPage);
 }
 
-function addAttackToTable(attack) {
-    // When real-time attack arrives, prepend to the list and refresh current page
-    attacksList.unshift(attack);
-    if (attacksList.length > 1000) attacksList.pop();
+// Fetch attacks newer than lastSeq from the server's ring buffer
+function catchUp() {
+    fetch('/api/recent?since=' + lastSeq)
+        .then(response => response.json())
+        .then(data => {
+            if (data.last_seq < lastSeq) { loadStats(); return; } // server restarted
+            addAttacksToTable(data.events || []);
+        })
+        .catch(error => console.error('Error catching up:', error));
+}
+
+function addAttacksToTable(attacks) {
+    // When a real-time batch arrives, prepend it to the list and refresh current page once
+    attacks = attacks.filter(a => !a.seq || a.seq > lastSeq);
+    attacks.forEach(attack => { attacksList.unshift(attack); if (attack.seq) lastSeq = attack.seq; });
+    if (attacksList.length > 1000) attacksList.length = 1000;
     renderAttacksPage(attacksPage);
 }
 
@@ -457,10 +486,10 @@ function initializeChart() {
 }
 
 // Update Chart
-function updateChart() {
+function updateChart(count) {
     const now = new Date().toLocaleTimeString();
     chartData.labels.push(now);
-    chartData.data.push((chartData.data[chartData.data.length - 1] || 0) + 1);
+    chartData.data.push((chartData.data[chartData.data.length - 1] || 0) + (count || 1));
 
     // Keep only last 20 data points
     if (chartData.labels.length > 20) {
@@ -471,10 +500,6 @@ function updateChart() {
     attackChart.update();
 }
 
-function updateStats() {
-    loadStats();
-}
-
 // UI debug helper: enable by adding ?ui_debug=1 to URL or set localStorage.uiDebug = '1'
 (function () {
     try {
@@ -0,0 +1,35 @@
+// Live statistics pushed by the server: a full 'stats_snapshot' on connect,
+// then 'stats_delta' messages carrying only the counters that changed.
+function subscribeLiveStats(socket, onChange) {
+    const state = {
+        total_attacks: 0, unique_ips: 0, port_scans: 0, connection_attempts: 0, pending_alerts: 0,
+        attacks_by_type: {}, attacks_by_port: {}, attacks_by_severity: {}, hourly_attacks: {},
+        top_attackers: [], unique_ips_exact: true
+    };
+    const groups = ['attacks_by_type', 'attacks_by_port', 'attacks_by_severity', 'hourly_attacks'];
+
+    socket.on('stats_snapshot', function (snap) {
+        Object.assign(state, snap);
+        onChange(state, snap);
+    });
+
+    socket.on('stats_delta', function (delta) {
+        if (delta.totals) Object.assign(state, delta.totals);
+        groups.forEach(g => {
+            if (!delta[g]) return;
+            Object.keys(delta[g]).forEach(k => {
+                if (delta[g][k]) state[g][k] = delta[g][k];
+                else delete state[g][k];
+            });
+        });
+        if (delta.top_attackers) state.top_attackers = delta.top_attackers;
+        if (delta.estimates) {
+            // Server switched to sketch-based counting (error bounds attached)
+            state.estimates = delta.estimates;
+            state.unique_ips_exact = false;
+        }
+        onChange(state, delta);
+    });
+
+    return state;
+}
@@ -0,0 +1,63 @@
+"""
+Alert aggregator tests - rule selection, thresholds and windows
+
+Usage:
+    python -m pytest -q tests/test_alert_pipeline.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_pipeline import AlertAggregator
+
+
+def feed(aggregator, events, ip='1.1.1.1'):
+    """observe() each (alert_type, severity, now), storing inserts like the logger does"""
+    decisions = []
+    for n, (alert_type, severity, now) in enumerate(events):
+        decision = aggregator.observe(ip, alert_type, severity, now)
+        if decision is not None and decision[0] == 'insert':
+            decision[1].alert_id = n + 1
+        decisions.append(decision and (decision[0], decision[1].rule.name, decision[1].count))
+    return decisions
+
+
+def test_high_events_alert_after_a_low_group_opened():
+    decisions = feed(AlertAggregator(), [('brute_force', 'low', 0), ('brute_force', 'high', 1),
+                                         ('brute_force', 'high', 2)])
+    assert decisions == [None, ('insert', 'high_severity', 1), ('update', 'high_severity', 2)]
+
+
+def test_burst_threshold_within_window():
+    decisions = feed(AlertAggregator(), [('brute_force', 'low', t) for t in range(10)])
+    assert decisions[:9] == [None] * 9
+    assert decisions[9] == ('insert', 'brute_force_burst', 10)
+
+
+def test_burst_spread_past_the_window_does_not_alert():
+    decisions = feed(AlertAggregator(), [('brute_force', 'low', t * 20) for t in range(10)])
+    assert decisions == [None] * 10
+
+
+def test_closed_window_opens_a_new_alert():
+    decisions = feed(AlertAggregator(), [('sql_injection', 'high', 0), ('sql_injection', 'high', 100),
+                                         ('sql_injection', 'high', 1000)])
+    assert [d[0] for d in decisions] == ['insert', 'update', 'insert']
+
+
+def test_unmatched_events_are_ignored():
+    aggregator = AlertAggregator()
+    assert feed(aggregator, [('connection_attempt', 'low', 0)]) == [None]
+    assert not aggregator.groups
+
+
+def test_forget_and_group_limit():
+    aggregator = AlertAggregator(max_groups=2)
+    for n, ip in enumerate(('1.1.1.1', '2.2.2.2', '3.3.3.3')):
+        aggregator.observe(ip, 'scan', 'high', n)[1].alert_id = n + 1
+    assert [key[0] for key in aggregator.groups] == ['2.2.2.2', '3.3.3.3']
+    aggregator.forget([2])
+    assert len(aggregator.groups) == 1
+    aggregator.forget()
+    assert not aggregator.groups
@@ -0,0 +1,61 @@
+"""
+Ingest pipeline tests - submit never blocks, overflow and deferred counts
+
+Usage:
+    python -m pytest -q tests/test_ingest.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import IngestPipeline, SamplingPolicy
+
+
+def stalled_pipeline(**kwargs):
+    """Pipeline whose writer is stuck in its first row until release is set"""
+    release = threading.Event()
+    stored, counted = [], []
+
+    def handler(event, raw_payload):
+        release.wait(5)
+        stored.append(event['n'])
+
+    pipeline = IngestPipeline(handler, maxsize=2, count_handler=lambda e: counted.append(e['n']),
+                              max_deferred=100, **kwargs)
+    return pipeline, release, stored, counted
+
+
+def test_full_queue_does_not_block_and_counts_on_the_writer():
+    pipeline, release, stored, counted = stalled_pipeline()
+    started = time.monotonic()
+    results = [pipeline.submit({'n': n}) for n in range(10)]
+    assert time.monotonic() - started < 0.2
+    assert not pipeline.idle()
+    # The writer holds one row and the queue two more; the rest wait to be counted
+    assert results.count(True) in (2, 3) and counted == []
+    release.set()
+    pipeline.join()
+    assert len(stored) + len(counted) == 10
+    assert pipeline.stats['dropped'] == pipeline.stats['deferred'] == len(counted)
+
+
+def test_priority_rows_use_the_overflow_queue():
+    pipeline, release, stored, counted = stalled_pipeline(sampler=SamplingPolicy(), overflow_size=3)
+    for n in range(10):
+        pipeline.submit({'n': n, 'severity': 'critical'})
+    release.set()
+    pipeline.join()
+    assert pipeline.stats['overflow'] == 3
+    assert len(stored) == 10 - pipeline.stats['dropped'] and len(counted) == pipeline.stats['dropped']
+
+
+def test_count_only_events_are_never_stored():
+    pipeline, release, stored, counted = stalled_pipeline(sampler=SamplingPolicy())
+    release.set()
+    for n in range(5):
+        pipeline.submit({'n': n, 'scan_id': 'scan-1', 'payload_size': 0})
+    pipeline.join()
+    assert stored == [] and sorted(counted) == list(range(5))
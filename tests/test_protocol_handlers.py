@@ -0,0 +1,137 @@
+"""
+Protocol handler parser tests - split input and malformed input per emulator
+
+Usage:
+    python -m pytest -q tests/test_protocol_handlers.py
+"""
+import base64
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from protocol_handlers import (MAX_BUFFER, FTPHandler, HTTPHandler, MySQLHandler, RedisHandler,
+                               SSHHandler, TelnetHandler, create_handler, PassiveHandler)
+
+
+def _kexinit():
+    payload = b'\x14' + b'\x00' * 16
+    for names in (b'curve25519-sha256', b'ssh-rsa', b'aes128-ctr'):
+        payload += struct.pack('!I', len(names)) + names
+    packet = bytes([4]) + payload + b'\x00' * 4
+    return struct.pack('!I', len(packet)) + packet
+
+
+def _mysql_login(user=b'root', database=b'mysql'):
+    caps = 0x0200 | 0x8000 | 0x0008 | 0x80000
+    body = (struct.pack('<IIB', caps, 1 << 24, 33) + b'\x00' * 23 + user + b'\x00'
+            + bytes([20]) + b'\x5a' * 20 + database + b'\x00' + b'mysql_native_password\x00')
+    return struct.pack('<I', len(body))[:3] + b'\x01' + body
+
+
+def _resp(*args):
+    return b'*%d\r\n' % len(args) + b''.join(b'$%d\r\n%s\r\n' % (len(a), a) for a in args)
+
+
+SESSIONS = {
+    SSHHandler: b'SSH-2.0-libssh2_1.9.0\r\n' + _kexinit(),
+    TelnetHandler: b'\xff\xfd\x01\xff\xfa\x18\x00xterm\xff\xf0root\r\nadmin123\r\nwhoami\r\nexit\r\n',
+    FTPHandler: b'USER admin\r\nPASS secret\r\nSYST\r\nQUIT\r\n',
+    RedisHandler: _resp(b'AUTH', b'foobared') + b'PING\r\n' + _resp(b'CONFIG', b'SET', b'dir', b'/tmp') + _resp(b'QUIT'),
+    MySQLHandler: _mysql_login(),
+    HTTPHandler: (b'GET / HTTP/1.1\r\nAuthorization: Basic ' + base64.b64encode(b'tomcat:s3cret') + b'\r\n\r\n'
+                  b'POST /login HTTP/1.1\r\nContent-Length: 31\r\nConnection: close\r\n\r\n'
+                  b'username=admin&password=letmein'),
+}
+
+
+def run(handler_class, data, chunk):
+    handler = handler_class(80, '127.0.0.1')
+    reply = handler.greeting()
+    for i in range(0, len(data), chunk):
+        reply += handler.feed(data[i:i + chunk])
+    return handler, reply
+
+
+@pytest.mark.parametrize('handler_class', list(SESSIONS), ids=lambda c: c.__name__)
+@pytest.mark.parametrize('chunk', [1, 3, 7])
+def test_split_input_matches_whole(handler_class, chunk):
+    script = SESSIONS[handler_class]
+    whole, whole_reply = run(handler_class, script, len(script))
+    split, split_reply = run(handler_class, script, chunk)
+    assert split.summary() == whole.summary()
+    assert split.done and whole.done
+    if handler_class is not MySQLHandler:  # greeting carries a random salt
+        assert split_reply == whole_reply
+
+
+def test_captures():
+    assert run(TelnetHandler, SESSIONS[TelnetHandler], 5)[0].credentials == [{'username': 'root', 'password': 'admin123'}]
+    assert run(FTPHandler, SESSIONS[FTPHandler], 5)[0].credentials == [{'username': 'admin', 'password': 'secret'}]
+    assert run(RedisHandler, SESSIONS[RedisHandler], 5)[0].credentials == [{'username': None, 'password': 'foobared'}]
+    mysql = run(MySQLHandler, SESSIONS[MySQLHandler], 5)[0].credentials[0]
+    assert (mysql['username'], mysql['database'], mysql['auth_hash']) == ('root', 'mysql', '5a' * 20)
+    http = run(HTTPHandler, SESSIONS[HTTPHandler], 5)[0]
+    assert [(c['username'], c['password']) for c in http.credentials] == [('tomcat', 's3cret'), ('admin', 'letmein')]
+    ssh = run(SSHHandler, SESSIONS[SSHHandler], 5)[0]
+    assert ssh.commands == ['SSH-2.0-libssh2_1.9.0', 'KEXINIT curve25519-sha256 | ssh-rsa | aes128-ctr']
+
+
+def test_telnet_unterminated_subnegotiation_is_bounded():
+    handler = TelnetHandler()
+    handler.feed(b'\xff\xfa\x18')
+    start = time.perf_counter()
+    for _ in range(MAX_BUFFER // 4096 + 2):
+        handler.feed(b'A' * 4096)
+        if handler.done:
+            break
+    assert handler.done
+    assert len(handler.pending) <= MAX_BUFFER + 4096
+    assert time.perf_counter() - start < 1
+
+
+def test_telnet_subnegotiation_split_across_chunks():
+    handler = TelnetHandler()
+    for piece in (b'\xff\xfa\x18\x00xt', b'erm\xff', b'\xf0ro', b'ot\r\n'):
+        handler.feed(piece)
+    assert handler.username == 'root' and not handler.pending
+
+
+@pytest.mark.parametrize('handler_class, junk', [
+    (SSHHandler, b'GET / HTTP/1.0\r\n\r\n'),
+    (SSHHandler, b'SSH-2.0-x\r\n\xff\xff\xff\xff\x00\x00'),
+    (RedisHandler, b'*2\r\n:1\r\n:2\r\n'),
+    (RedisHandler, b'*x\r\n'),
+    (MySQLHandler, b'\x85\xa6\x03\x00\x00\x00\x00\x01\x21\x00\x00\x00root\x00'),
+    (MySQLHandler, b'\x05\x00\x00\x01short'),
+    (HTTPHandler, b'\x16\x03\x01\x00\x05hello'),
+    (HTTPHandler, b'not http at all\r\n\r\n'),
+    (HTTPHandler, b'POST / HTTP/1.1\r\nContent-Length: 999999999\r\n\r\n'),
+])
+def test_malformed_input_ends_session(handler_class, junk):
+    handler, _ = run(handler_class, junk, 4)
+    assert handler.done
+
+
+@pytest.mark.parametrize('handler_class', [FTPHandler, RedisHandler, HTTPHandler, PassiveHandler],
+                         ids=lambda c: c.__name__)
+def test_unterminated_input_is_bounded(handler_class):
+    handler = handler_class()
+    for _ in range(MAX_BUFFER // 4096 + 2):
+        handler.feed(b'A' * 4096)
+    assert handler.done or handler_class is PassiveHandler
+    assert len(handler.buffer) <= MAX_BUFFER + 4096
+
+
+def test_command_limit_ends_session():
+    handler, _ = run(FTPHandler, b'NOOP\r\n' * 100, 64)
+    assert handler.done and len(handler.commands) == 50
+
+
+def test_create_handler_falls_back_to_passive():
+    assert isinstance(create_handler('MongoDB'), PassiveHandler)
+    assert isinstance(create_handler('FTP'), FTPHandler)
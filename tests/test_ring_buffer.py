@@ -0,0 +1,69 @@
+"""
+Event ring tests - sequence cursors, wrap-around and gap flags
+
+Usage:
+    python -m pytest -q tests/test_ring_buffer.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ring_buffer import EventRing
+
+
+def filled(capacity, count):
+    ring = EventRing(capacity)
+    for n in range(count):
+        ring.append({'n': n})
+    return ring
+
+
+def seqs(result):
+    return [e['seq'] for e in result['events']]
+
+
+def test_append_tags_monotonic_sequence_numbers():
+    ring = EventRing(4)
+    assert ring.last_seq == 0 and len(ring) == 0
+    assert [ring.append({}) for _ in range(3)] == [1, 2, 3]
+    assert ring.last_seq == 3 and len(ring) == 3
+
+
+def test_since_returns_only_newer_events():
+    ring = filled(8, 5)
+    result = ring.since(2)
+    assert seqs(result) == [3, 4, 5] and result['last_seq'] == 5 and not result['truncated']
+    assert ring.since(5) == {'events': [], 'last_seq': 5, 'truncated': False}
+
+
+def test_wrap_around_keeps_the_newest_capacity_events():
+    ring = filled(4, 10)
+    assert len(ring) == 4
+    assert [e['seq'] for e in ring.latest(100)] == [7, 8, 9, 10]
+    assert [e['n'] for e in ring.latest(2)] == [8, 9]
+
+
+def test_overwritten_cursor_is_flagged_truncated():
+    ring = filled(4, 10)
+    result = ring.since(3)
+    assert seqs(result) == [7, 8, 9, 10] and result['truncated']
+    # The oldest kept event's predecessor is not a gap
+    result = ring.since(6)
+    assert seqs(result) == [7, 8, 9, 10] and not result['truncated']
+
+
+def test_limit_keeps_the_tail():
+    ring = filled(8, 6)
+    result = ring.since(0, limit=2)
+    assert seqs(result) == [5, 6] and result['truncated']
+
+
+def test_clear_keeps_counting():
+    ring = filled(4, 3)
+    ring.clear()
+    assert len(ring) == 0 and ring.latest() == []
+    assert ring.since(3)['events'] == []
+    ring.append({})
+    result = ring.since(3)
+    assert seqs(result) == [4] and not result['truncated']
@@ -0,0 +1,75 @@
+"""
+Scan detector tests - thresholds, sweep seeding and the summary's sampling weight
+
+Usage:
+    python -m pytest -q tests/test_scan_detector.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import SamplingPolicy
+from scan_detector import ScanDetector
+
+
+def sweep(detector, ports, target='10.0.0.1', ip='6.6.6.6', start=0.0, payload_size=0):
+    """Feed one connection per port (0.1 s apart), returns the scan ids"""
+    return [detector.observe({'source_ip': ip, 'target_ip': target, 'target_port': port,
+                              'payload_size': payload_size}, now=start + i * 0.1)
+            for i, port in enumerate(ports)]
+
+
+def test_vertical_threshold():
+    ids = sweep(ScanDetector(vertical_threshold=4), [22, 23, 80, 443, 3306])
+    assert ids[:3] == [None] * 3
+    assert ids[3] is not None and ids[4] == ids[3]
+
+
+def test_horizontal_threshold():
+    detector = ScanDetector(horizontal_threshold=3)
+    ids = [detector.observe({'source_ip': '6.6.6.6', 'target_ip': f"10.0.0.{i}", 'target_port': 22}, now=i)
+           for i in range(4)]
+    assert ids[:2] == [None, None] and ids[2] is not None
+
+
+def test_repeats_of_one_port_are_not_a_scan():
+    assert sweep(ScanDetector(), [22] * 20) == [None] * 20
+
+
+def test_summary_counts_seeded_connections_but_weighs_only_tagged_probes():
+    events = []
+    detector = ScanDetector(on_scan=events.append, vertical_threshold=4)
+    sweep(detector, range(1000, 1020))
+    detector.expire(now=1000)
+    (event,) = events
+    # 3 connections before detection (stored in full) + 17 tagged probes
+    assert (event['connections'], event['probes'], len(event['ports'])) == (20, 17, 20)
+    rate, priority = SamplingPolicy().decide(event)
+    assert round(1 / rate) == 17 and priority
+
+
+def test_probes_with_payload_are_not_weighted():
+    events = []
+    detector = ScanDetector(on_scan=events.append, vertical_threshold=4)
+    sweep(detector, range(1000, 1010), payload_size=12)
+    detector.expire(now=1000)
+    assert events[0]['connections'] == 10 and events[0]['probes'] == 0
+
+
+def test_sweep_reported_once_after_idle():
+    events = []
+    detector = ScanDetector(on_scan=events.append, window=60, idle=30)
+    sweep(detector, range(1000, 1010))
+    assert detector.expire(now=10) == 0
+    assert detector.expire(now=40) == 1
+    assert detector.expire(now=80) == 0
+    assert len(events) == 1 and not detector.sources
+
+
+def test_source_limit_reports_evicted_sweeps():
+    events = []
+    detector = ScanDetector(on_scan=events.append, max_sources=1)
+    sweep(detector, range(1000, 1010), ip='6.6.6.6')
+    detector.observe({'source_ip': '7.7.7.7', 'target_port': 22}, now=2)
+    assert [e['source_ip'] for e in events] == ['6.6.6.6'] and detector.stats['evicted'] == 1
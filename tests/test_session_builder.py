@@ -0,0 +1,87 @@
+"""
+Session builder tests - inactivity gaps, expiry, the open-session bound and resume
+
+Usage:
+    python -m pytest -q tests/test_session_builder.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_builder import AttackSession, SessionBuilder
+
+BASE = 1700000000.0
+
+
+def event(ip='6.6.6.6', port=22, severity='low', attack_type='brute_force'):
+    return {'source_ip': ip, 'target_port': port, 'service': 'SSH', 'severity': severity, 'type': attack_type}
+
+
+def test_events_within_the_gap_share_a_session():
+    builder = SessionBuilder(gap=60)
+    ids = {builder.observe(event(port=p), now=BASE + i * 59) for i, p in enumerate((22, 23, 80))}
+    assert len(ids) == 1
+    (session,) = builder.open.values()
+    assert session.events == 3 and session.ports == {22, 23, 80} and session.end - session.start == 118
+
+
+def test_gap_starts_a_new_session_and_closes_the_old_one():
+    builder = SessionBuilder(gap=60)
+    first = builder.observe(event(), now=BASE)
+    builder.drain_dirty()
+    second = builder.observe(event(), now=BASE + 61)
+    assert first != second
+    rows = {row[0]: row for row in builder.drain_dirty()}
+    assert rows[first][-1] == 0 and rows[second][-1] == 1
+
+
+def test_gap_is_measured_from_the_last_event():
+    builder = SessionBuilder(gap=60)
+    ids = {builder.observe(event(), now=BASE + t) for t in (0, 50, 100, 150)}
+    assert len(ids) == 1
+
+
+def test_sources_are_independent():
+    builder = SessionBuilder(gap=60)
+    a = builder.observe(event('1.1.1.1'), now=BASE)
+    b = builder.observe(event('2.2.2.2'), now=BASE)
+    assert a != b and len(builder) == 2
+
+
+def test_expire_closes_idle_sessions_only():
+    builder = SessionBuilder(gap=60)
+    builder.observe(event('1.1.1.1'), now=BASE)
+    builder.observe(event('2.2.2.2'), now=BASE + 50)
+    assert builder.expire(now=BASE + 61) == 1
+    assert list(builder.open) == ['2.2.2.2']
+
+
+def test_open_session_bound_closes_the_least_recently_active():
+    builder = SessionBuilder(gap=60, max_open=2)
+    builder.observe(event('1.1.1.1'), now=BASE)
+    builder.observe(event('2.2.2.2'), now=BASE + 1)
+    builder.observe(event('1.1.1.1'), now=BASE + 2)
+    builder.observe(event('3.3.3.3'), now=BASE + 3)
+    assert list(builder.open) == ['1.1.1.1', '3.3.3.3']
+
+
+def test_weight_and_max_severity():
+    builder = SessionBuilder()
+    builder.observe(event(severity='high', attack_type='sql_injection'), now=BASE)
+    builder.observe(event(), now=BASE + 1, weight=5)
+    (session,) = builder.open.values()
+    assert session.events == 6 and session.max_severity == 'high'
+    assert session.types == {'sql_injection': 1, 'brute_force': 5}
+
+
+def test_resumed_session_continues_across_restart():
+    builder = SessionBuilder(gap=60)
+    session_id = builder.observe(event(), now=BASE)
+    rows = builder.drain_dirty()
+    assert AttackSession.from_row(rows[0]).session_id == session_id
+
+    resumed = SessionBuilder(gap=60)
+    resumed.load_rows(rows)
+    assert resumed.observe(event(), now=BASE + 30) == session_id
+    assert resumed.observe(event(), now=BASE + 200) != session_id
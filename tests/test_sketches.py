@@ -0,0 +1,90 @@
+"""
+Sketch tests - HyperLogLog, Count-Min and Space-Saving stay within their error bounds
+
+Usage:
+    python -m pytest -q tests/test_sketches.py
+"""
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sketches import CountMinSketch, HyperLogLog, SpaceSaving
+
+
+def zipf_stream(n, items=2000, seed=7):
+    """n draws from a skewed (Zipf-like) distribution over items"""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(items)]
+    return [f"10.0.{i // 256}.{i % 256}" for i in rng.choices(range(items), weights, k=n)]
+
+
+@pytest.mark.parametrize('distinct', [100, 5000, 50000])
+def test_hll_within_four_standard_errors(distinct):
+    hll = HyperLogLog(p=12)
+    for i in range(distinct):
+        hll.add(f"ip-{i}")
+        hll.add(f"ip-{i}")  # repeats do not count
+    assert abs(hll.count() - distinct) <= 4 * hll.std_error * distinct
+
+
+def test_hll_merge_equals_union():
+    a, b, union = HyperLogLog(p=10), HyperLogLog(p=10), HyperLogLog(p=10)
+    for i in range(3000):
+        (a if i % 2 else b).add(i)
+        union.add(i)
+    assert a.merge(b).registers == union.registers
+    assert HyperLogLog.from_dict(a.to_dict()).count() == union.count()
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(p=11))
+
+
+def test_cms_never_underestimates_and_respects_epsilon():
+    stream = zipf_stream(20000)
+    cms = CountMinSketch(width=512, depth=4)
+    for item in stream:
+        cms.add(item)
+    exact = Counter(stream)
+    bound = cms.error_bound()
+    over = [cms.estimate(item) - count for item, count in exact.items()]
+    assert min(over) >= 0
+    # Each estimate is within the bound with probability 1 - e^-depth (~98%)
+    assert sum(o > bound for o in over) <= (1 - cms.confidence) * len(over) * 2 + 1
+
+
+def test_cms_merge_adds_counts():
+    a, b = CountMinSketch(width=64, depth=3), CountMinSketch(width=64, depth=3)
+    a.add('x', 5)
+    b.add('x', 7)
+    assert a.merge(b).estimate('x') >= 12 and a.total == 12
+
+
+def test_space_saving_tracks_heavy_hitters_with_bounded_error():
+    stream = zipf_stream(20000)
+    ss = SpaceSaving(k=50)
+    for item in stream:
+        ss.add(item)
+    exact = Counter(stream)
+    for item, count in exact.items():
+        if count > ss.total / ss.k:
+            assert item in ss.counters
+    for item, (count, error) in ss.counters.items():
+        assert count - error <= exact[item] <= count
+    assert all(exact[item] <= ss.min_count() for item in exact if item not in ss.counters)
+
+
+def test_space_saving_merge_keeps_the_bounds():
+    stream = zipf_stream(20000, seed=11)
+    halves = SpaceSaving(k=50), SpaceSaving(k=50)
+    for n, item in enumerate(stream):
+        halves[n % 2].add(item)
+    merged = halves[0].merge(halves[1])
+    exact = Counter(stream)
+    assert merged.total == len(stream)
+    for item, (count, error) in merged.counters.items():
+        assert count - error <= exact[item] <= count
+    assert [item for item, _, _ in merged.top(3)] == [item for item, _ in exact.most_common(3)]
@@ -0,0 +1,76 @@
+"""
+Trap matcher tests - match precedence, fallback patterns and group references
+
+Usage:
+    python -m pytest -q tests/test_trap_rules.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trap_rules import TrapMatcher
+
+RULES = [
+    {'name': 'env', 'match': 'exact', 'pattern': '/.env'},
+    {'name': 'wp', 'match': 'prefix', 'pattern': '/wp-'},
+    {'name': 'wp-admin', 'match': 'prefix', 'pattern': '/wp-admin/'},
+    {'name': 'php', 'match': 'glob', 'pattern': '/wp-*.php'},
+    {'name': 'any-php', 'match': 'regex', 'pattern': r'\.php$'},
+    {'name': 'git', 'match': 'regex', 'pattern': r'/\.git/'},
+    {'name': 'dup', 'match': 'regex', 'pattern': r'/(\w+)/\1\b'},
+    {'name': 'named-dup', 'match': 'regex', 'pattern': r'/(?P<seg>[a-z]+)-(?P=seg)$'},
+    {'name': 'sql', 'match': 'glob', 'pattern': '*.sql'},
+]
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return TrapMatcher(RULES)
+
+
+@pytest.mark.parametrize('path,expected', [
+    ('/.env', 'env'),
+    ('/.env.bak', None),                  # exact rules match the whole path only
+    ('/wp-admin/setup', 'wp-admin'),      # the longest prefix wins
+    ('/wp-login.php', 'wp'),              # same anchor: the earlier rule wins
+    ('/index.php', 'any-php'),            # no anchor: unanchored fallback regex
+    ('/repo/.git/config', 'git'),
+    ('/dump/backup.sql', 'sql'),
+    ('/dump/backup.sql.gz', None),        # globs are anchored at both ends
+    ('/static/app.js', None),
+])
+def test_precedence(matcher, path, expected):
+    rule = matcher.match(path)
+    assert (rule.name if rule else None) == expected
+
+
+def test_anchored_rules_beat_fallback_patterns():
+    matcher = TrapMatcher([{'name': 'php', 'match': 'regex', 'pattern': r'\.php$'},
+                           {'name': 'admin', 'match': 'prefix', 'pattern': '/admin'}])
+    assert matcher.match('/admin/index.php').name == 'admin'
+
+
+def test_fallback_order_between_combined_and_separate_rules():
+    matcher = TrapMatcher([{'name': 'dup', 'match': 'regex', 'pattern': r'(\w)\1'},
+                           {'name': 'php', 'match': 'regex', 'pattern': r'\.php$'}])
+    assert matcher.match('/aa.php').name == 'dup'
+    assert matcher.match('/ab.php').name == 'php'
+
+
+@pytest.mark.parametrize('path,expected', [
+    ('/foo/foo', 'dup'),
+    ('/foo/bar', None),
+    ('/abc-abc', 'named-dup'),
+    ('/abc-abd', None),
+])
+def test_group_references(matcher, path, expected):
+    rule = matcher.match(path)
+    assert (rule.name if rule else None) == expected
+
+
+def test_group_reference_rules_are_not_combined(matcher):
+    assert {r.name for r in matcher._separate} == {'dup', 'named-dup'}
+    assert {r.name for r in matcher._combined} == {'any-php', 'git', 'sql'}
@@ -0,0 +1,438 @@
+"""
+Threat Intel - Known-bad source matching for the capture path
+Compiles IP/CIDR feed files into sorted, merged integer interval arrays in one
+mmap-able file (shared by every process through the page cache) and answers
+"which feeds list this address" with a binary search.
+
+Usage:
+    python threat_intel.py compile                  # feeds/ -> database/threat_intel.bin
+    python threat_intel.py compile --feeds feeds --out database/threat_intel.bin
+    python threat_intel.py lookup 203.0.113.7
+"""
+import argparse
+import json
+import mmap
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+MAGIC = b'STI1'
+HEADER = struct.Struct('<4sIIII')  # magic, feeds, v4 intervals, v6 intervals, meta bytes
+MAX_FEEDS = 64  # one bit per feed in the uint64 masks
+FEED_SUFFIXES = ('.txt', '.list', '.netset', '.ipset', '.csv')
+SEVERITY_ORDER = ['low', 'medium', 'high']
+LOW64 = 2 ** 64 - 1
+
+
+def escalate_severity(severity, feeds):
+    """A listed source raises the severity one level"""
+    if not feeds or severity not in SEVERITY_ORDER:
+        return severity
+    return SEVERITY_ORDER[min(SEVERITY_ORDER.index(severity) + 1, len(SEVERITY_ORDER) - 1)]
+
+
+def parse_entry(text):
+    """'1.2.3.4', '1.2.3.0/24' or an IPv6 equivalent -> (version, first, last); None if not an address"""
+    addr, _, prefix = text.partition('/')
+    try:
+        if ':' in addr:
+            version, bits, value = 6, 128, int.from_bytes(socket.inet_pton(socket.AF_INET6, addr), 'big')
+        else:
+            version, bits, value = 4, 32, int.from_bytes(socket.inet_aton(addr), 'big')
+            if addr.count('.') != 3:
+                return None  # inet_aton also accepts shorthand like '10.1'
+        length = int(prefix) if prefix else bits
+    except (OSError, ValueError):
+        return None
+    if not 0 <= length <= bits:
+        return None
+    host_bits = bits - length
+    first = value >> host_bits << host_bits
+    return version, first, first | ((1 << host_bits) - 1)
+
+
+def read_feed(path):
+    """Entries of one feed file: one address/CIDR per line (first field), # and ; comments"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.split('#', 1)[0].split(';', 1)[0].strip()
+            if not line:
+                continue
+            entry = parse_entry(line.replace(',', ' ').split()[0])
+            if entry is not None:
+                yield entry
+
+
+def _read_columns(path):
+    """One feed as IPv4 first/last columns plus a list of IPv6 (first, last) pairs"""
+    first4, last4, v6 = array('Q'), array('Q'), []
+    for version, first, last in read_feed(path):
+        if version == 4:
+            first4.append(first)
+            last4.append(last)
+        else:
+            v6.append((first, last))
+    return first4, last4, v6
+
+
+def _merge_feed(intervals):
+    """Union of one feed's intervals, sorted and disjoint"""
+    intervals.sort()
+    merged = []
+    for first, last in intervals:
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1][1] = last
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def _combine(per_feed):
+    """Disjoint (first, last, mask) intervals over all feeds; adjacent equal masks merged"""
+    if len(per_feed) == 1:
+        bit, merged = per_feed[0]
+        return [(first, last, 1 << bit) for first, last in merged]
+    events = []
+    for bit, merged in per_feed:
+        flag = 1 << bit
+        for first, last in merged:
+            events.append((first, flag))
+            events.append((last + 1, flag))  # per-feed intervals are disjoint: XOR toggles
+    events.sort()
+    out = []
+    mask = 0
+    i = 0
+    while i < len(events):
+        pos = events[i][0]
+        while i < len(events) and events[i][0] == pos:
+            mask ^= events[i][1]
+            i += 1
+        if out and out[-1][1] is None:
+            out[-1][1] = pos - 1
+        if mask:
+            if out and out[-1][2] == mask and out[-1][1] == pos - 1:
+                out[-1][1] = None  # extend the previous interval
+            else:
+                out.append([pos, None, mask])
+    return [tuple(iv) for iv in out]
+
+
+def _combine_v4(per_feed):
+    """Vectorized _merge_feed + _combine for IPv4 columns -> (first, last, mask) numpy arrays"""
+    import numpy as np
+
+    positions, flags = [], []
+    for bit, first, last in per_feed:
+        first = np.frombuffer(first, dtype=np.uint64).astype(np.int64)
+        last = np.frombuffer(last, dtype=np.uint64).astype(np.int64)
+        order = np.argsort(first, kind='stable')
+        first, last = first[order], last[order]
+        # Union: a new interval starts where first is past everything seen so far (+1: adjacent merge)
+        reach = np.maximum.accumulate(last)
+        starts = np.flatnonzero(np.r_[True, first[1:] > reach[:-1] + 1])
+        ends = np.r_[starts[1:], len(first)] - 1
+        positions += [first[starts], reach[ends] + 1]
+        flags.append(np.full(2 * len(starts), 1 << bit, dtype=np.uint64))
+    positions = np.concatenate(positions)
+    flags = np.concatenate(flags)
+    order = np.argsort(positions, kind='stable')
+    positions, masks = positions[order], np.bitwise_xor.accumulate(flags[order])
+    # Mask in force after the last event at each distinct position
+    last_at = np.flatnonzero(np.r_[positions[1:] != positions[:-1], True])
+    pos, mask = positions[last_at], masks[last_at]
+    keep = np.flatnonzero(mask[:-1] != 0)
+    first, last, mask = pos[keep], pos[keep + 1] - 1, mask[keep]
+    # Neighbouring segments listed by the same feeds become one interval
+    new = np.r_[True, (mask[1:] != mask[:-1]) | (first[1:] != last[:-1] + 1)]
+    group = np.flatnonzero(new)
+    ends = np.r_[group[1:], len(first)] - 1
+    return first[group], last[ends], mask[group]
+
+
+def compile_feeds(feed_dir, out_path):
+    """Compile every feed file in feed_dir into out_path (written atomically); returns the meta dict"""
+    files = sorted((e for e in os.scandir(feed_dir) if e.is_file() and e.name.lower().endswith(FEED_SUFFIXES)),
+                   key=lambda e: e.name) if os.path.isdir(feed_dir) else []
+    if len(files) > MAX_FEEDS:
+        raise ValueError(f"At most {MAX_FEEDS} feeds are supported ({len(files)} found in {feed_dir})")
+    start = time.perf_counter()
+    names = []
+    per_v4, per_v6 = [], []
+    entries = 0
+    for bit, entry in enumerate(files):
+        names.append(os.path.splitext(entry.name)[0])
+        first4, last4, v6 = _read_columns(entry.path)
+        entries += len(first4) + len(v6)
+        if first4:
+            per_v4.append((bit, first4, last4))
+        if v6:
+            per_v6.append((bit, _merge_feed(v6)))
+    if per_v4:
+        v4_first, v4_last, v4_mask = _combine_v4(per_v4)
+        v4_columns = [v4_first.astype('uint32').tobytes(), v4_last.astype('uint32').tobytes(),
+                      v4_mask.astype('uint64').tobytes()]
+    else:
+        v4_first, v4_columns = (), [b'', b'', b'']
+    v6 = _combine(per_v6) if per_v6 else []
+
+    meta = {
+        'feeds': names,
+        'byteorder': sys.byteorder,
+        'entries': entries,
+        'compiled': time.time(),
+        'sources': {e.name: e.stat().st_mtime for e in files}
+    }
+    meta_bytes = json.dumps(meta).encode('utf-8')
+    parts = [HEADER.pack(MAGIC, len(names), len(v4_first), len(v6), len(meta_bytes)), meta_bytes]
+    parts.append(b'\0' * (-sum(map(len, parts)) % 8))
+    parts += v4_columns[:2]
+    parts.append(b'\0' * (-sum(map(len, parts)) % 8))
+    parts.append(v4_columns[2])
+    for column in (lambda iv: iv[0] >> 64, lambda iv: iv[0] & LOW64,
+                   lambda iv: iv[1] >> 64, lambda iv: iv[1] & LOW64, lambda iv: iv[2]):
+        parts.append(array('Q', map(column, v6)).tobytes())
+
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        for part in parts:
+            f.write(part)
+    os.replace(tmp, out_path)  # readers see the old or the new file, never a partial one
+    meta.update(intervals_v4=len(v4_first), intervals_v6=len(v6), seconds=round(time.perf_counter() - start, 3))
+    return meta
+
+
+class _U128Keys:
+    """Sequence view over (hi, lo) uint64 columns for bisect"""
+
+    __slots__ = ('hi', 'lo')
+
+    def __init__(self, hi, lo):
+        self.hi = hi
+        self.lo = lo
+
+    def __len__(self):
+        return len(self.hi)
+
+    def __getitem__(self, i):
+        return self.hi[i] << 64 | self.lo[i]
+
+
+class IntervalTable:
+    """One compiled file, mapped read-only; immutable once loaded"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.stat.st_size else b''
+        view = memoryview(self.buffer)
+        magic, n_feeds, n4, n6, meta_len = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled threat intel file")
+        offset = HEADER.size
+        self.meta = json.loads(bytes(view[offset:offset + meta_len]))
+        if self.meta.get('byteorder') != sys.byteorder:
+            raise ValueError(f"{path} was compiled on a {self.meta.get('byteorder')}-endian machine")
+        self.feeds = self.meta['feeds']
+        offset += meta_len
+        offset += -offset % 8
+
+        def take(code, count):
+            nonlocal offset
+            size = struct.calcsize(code) * count
+            column = view[offset:offset + size].cast(code)
+            offset += size
+            return column
+
+        self.v4_first, self.v4_last = take('I', n4), take('I', n4)
+        offset += -offset % 8
+        self.v4_mask = take('Q', n4)
+        hi, lo = take('Q', n6), take('Q', n6)
+        self.v6_first = _U128Keys(hi, lo)
+        self.v6_last = _U128Keys(take('Q', n6), take('Q', n6))
+        self.v6_mask = take('Q', n6)
+        self._names = {}
+
+    def __len__(self):
+        return len(self.v4_first) + len(self.v6_first)
+
+    def names(self, mask):
+        """Feed names for a bit mask (memoized: few distinct masks exist)"""
+        names = self._names.get(mask)
+        if names is None:
+            names = self._names[mask] = tuple(n for bit, n in enumerate(self.feeds) if mask >> bit & 1)
+        return names
+
+    def lookup(self, ip):
+        """Bit mask of the feeds listing ip (0 if none or not an address)"""
+        try:
+            if ':' in ip:
+                value = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+                first, last, masks = self.v6_first, self.v6_last, self.v6_mask
+            else:
+                if ip.count('.') != 3:
+                    return 0
+                value = int.from_bytes(socket.inet_aton(ip), 'big')
+                first, last, masks = self.v4_first, self.v4_last, self.v4_mask
+        except (OSError, TypeError, ValueError):
+            return 0
+        i = bisect_right(first, value) - 1
+        if i >= 0 and value <= last[i]:
+            return masks[i]
+        return 0
+
+
+class ThreatIntel:
+    """
+    Blocklist matcher:
+    - match(ip) returns the names of the feeds listing ip: O(log n) binary
+      search over the mapped interval arrays, no per-entry Python objects
+    - The compiled file is recompiled when a feed file changes and reloaded
+      when the file is replaced (by this or another process); the new table
+      is swapped in with one reference assignment, lookups never block
+    - Without feeds every lookup is a cheap no-op
+    """
+
+    def __init__(self, feed_dir='feeds', path='database/threat_intel.bin', check_interval=30.0,
+                 auto_compile=True):
+        self.feed_dir = feed_dir
+        self.path = path
+        self.check_interval = check_interval
+        self.auto_compile = auto_compile
+        self.table = None
+        self.loaded_at = None
+        self.lookups = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.refresh()
+
+    @classmethod
+    def from_env(cls):
+        return cls(feed_dir=os.environ.get('SENTINEL_THREAT_FEEDS', 'feeds'),
+                   path=os.environ.get('SENTINEL_THREAT_DB', 'database/threat_intel.bin'),
+                   check_interval=float(os.environ.get('SENTINEL_THREAT_RELOAD', 30)))
+
+    def match(self, ip):
+        """Names of the feeds listing ip (empty tuple if none)"""
+        table = self.table
+        if table is None or not ip:
+            return ()
+        self.lookups += 1
+        mask = table.lookup(ip)
+        if not mask:
+            return ()
+        self.hits += 1
+        return table.names(mask)
+
+    def tag(self, attack_data):
+        """Add threat_feeds to an attack record and escalate its severity if the source is listed"""
+        feeds = self.match(attack_data.get('source_ip'))
+        if feeds:
+            attack_data['threat_feeds'] = list(feeds)
+            attack_data['severity'] = escalate_severity(attack_data.get('severity', 'low'), feeds)
+        return feeds
+
+    # ---------- reload ----------
+
+    def _feeds_changed(self, table):
+        """Feed files added, removed or modified since the table was compiled"""
+        if not os.path.isdir(self.feed_dir):
+            return False
+        current = {e.name: e.stat().st_mtime for e in os.scandir(self.feed_dir)
+                   if e.is_file() and e.name.lower().endswith(FEED_SUFFIXES)}
+        if table is None:
+            return bool(current)
+        return current != table.meta.get('sources')
+
+    def _file_changed(self, table):
+        if not os.path.exists(self.path):
+            return False
+        if table is None:
+            return True
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns) != \
+            (table.stat.st_ino, table.stat.st_size, table.stat.st_mtime_ns)
+
+    def refresh(self):
+        """Load the compiled file if it was replaced, recompile if feeds changed; True if swapped"""
+        with self.lock:
+            current = self.table
+            try:
+                table = IntervalTable(self.path) if self._file_changed(current) else current
+                if self._feeds_changed(table):
+                    if not self.auto_compile:
+                        if table is not current:
+                            print("[!] Threat intel feeds changed; run `python threat_intel.py compile`")
+                    else:
+                        meta = compile_feeds(self.feed_dir, self.path)
+                        print(f"[✓] Threat intel compiled: {len(meta['feeds'])} feeds, "
+                              f"{meta['entries']:,} entries in {meta['seconds']}s")
+                        table = IntervalTable(self.path)
+            except Exception as e:
+                print(f"[!] Threat intel load error: {e}")
+                return False
+            if table is current:
+                return False
+            # The old table's mapping is released once in-flight lookups drop it
+            self.table = table
+            self.loaded_at = time.time()
+            print(f"[✓] Threat intel loaded: {len(table):,} intervals from {len(table.feeds)} feeds")
+            return True
+
+    def start(self):
+        """Background check for changed feeds / compiled file every check_interval seconds"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._reload_loop, name='threat-intel-reload', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _reload_loop(self):
+        while not self._stop.wait(self.check_interval):
+            self.refresh()
+
+    def status(self):
+        table = self.table
+        return {
+            'loaded': table is not None,
+            'loaded_at': self.loaded_at,
+            'feeds': list(table.feeds) if table else [],
+            'entries': table.meta.get('entries', 0) if table else 0,
+            'intervals_v4': len(table.v4_first) if table else 0,
+            'intervals_v6': len(table.v6_first) if table else 0,
+            'lookups': self.lookups,
+            'hits': self.hits
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile threat intel feeds or look up addresses')
+    sub = parser.add_subparsers(dest='command', required=True)
+    comp = sub.add_parser('compile', help='Compile feed files into the mmap-able interval file')
+    comp.add_argument('--feeds', default=os.environ.get('SENTINEL_THREAT_FEEDS', 'feeds'))
+    comp.add_argument('--out', default=os.environ.get('SENTINEL_THREAT_DB', 'database/threat_intel.bin'))
+    look = sub.add_parser('lookup', help='Feeds listing the given addresses')
+    look.add_argument('ips', nargs='+')
+    look.add_argument('--db', default=os.environ.get('SENTINEL_THREAT_DB', 'database/threat_intel.bin'))
+    args = parser.parse_args()
+
+    if args.command == 'compile':
+        meta = compile_feeds(args.feeds, args.out)
+        print(f"[✓] {len(meta['feeds'])} feeds, {meta['entries']:,} entries -> "
+              f"{meta['intervals_v4']:,} IPv4 / {meta['intervals_v6']:,} IPv6 intervals "
+              f"in {meta['seconds']}s ({args.out})")
+    else:
+        table = IntervalTable(args.db)
+        for ip in args.ips:
+            mask = table.lookup(ip)
+            print(f"{ip}: {', '.join(table.names(mask)) if mask else '-'}")
@@ -0,0 +1,20 @@
+"""
+Timestamps - Conversion between epoch seconds and the stored timestamp text
+Tables store local time as 'YYYY-MM-DD HH:MM:SS'; older rows may hold isoformat
+"""
+from datetime import datetime
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def format_epoch(ts):
+    """Format an epoch timestamp like the rest of the database"""
+    return datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(text):
+    """Epoch seconds for the stored timestamp formats, None if text is not one"""
+    try:
+        return datetime.fromisoformat(str(text).replace('Z', '')).timestamp()
+    except (TypeError, ValueError):
+        return None
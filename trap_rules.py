@@ -0,0 +1,205 @@
+"""
+Trap Rules - Compiled decoy path matcher
+Exact, prefix, glob and regex rules indexed in a character trie,
+so a lookup costs O(len(path)) no matter how many rules are loaded
+"""
+import fnmatch
+import json
+import os
+import re
+
+
+# Decoy paths served before trap rules were configurable
+DEFAULT_TRAP_RULES = [
+    {'match': 'exact', 'pattern': p, 'severity': 'high', 'tags': ['decoy']}
+    for p in ('/admin', '/admin/', '/administrator', '/wp-admin', '/wp-login.php',
+              '/phpmyadmin', '/phpMyAdmin', '/.env', '/config.php', '/backup.sql',
+              '/api/v1/users', '/api/v1/admin')
+]
+
+MATCH_KINDS = ('exact', 'prefix', 'glob', 'regex')
+_GLOB_META = re.compile(r'[*?\[]')
+_REGEX_META = re.compile(r'[.^$*+?{}\[\]\\|()]')
+# Group references (\1, (?P=name), (?(1)...)) would point at the wrong group inside a combined alternation
+_GROUP_REF = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]|\(\?P=|\(\?\(')
+
+
+class TrapRule:
+    """One decoy route: how to match the path, and what a hit means"""
+
+    __slots__ = ('name', 'match', 'pattern', 'severity', 'tags', 'order', 'regex')
+
+    def __init__(self, pattern, match='exact', severity='high', tags=None, name=None, order=0):
+        if match not in MATCH_KINDS:
+            raise ValueError(f"Unknown trap rule match type: {match}")
+        self.name = name or f"{match}:{pattern}"
+        self.match = match
+        self.pattern = pattern
+        self.severity = severity
+        self.tags = list(tags or [])
+        self.order = order
+        if match == 'glob':
+            # Anchored at both ends: a glob describes the whole path, even where it is searched
+            self.regex = re.compile(r'\A' + fnmatch.translate(pattern))
+        elif match == 'regex':
+            self.regex = re.compile(pattern)
+        else:
+            self.regex = None
+
+    def literal_prefix(self):
+        """Longest literal text every matching path must start with"""
+        if self.match in ('exact', 'prefix'):
+            return self.pattern
+        if self.match == 'glob':
+            m = _GLOB_META.search(self.pattern)
+            return self.pattern[:m.start()] if m else self.pattern
+        # Only anchored regexes without top-level alternation have a usable literal prefix
+        if not self.pattern.startswith('^') or _has_top_level_alternation(self.pattern):
+            return ''
+        body = self.pattern[1:]
+        m = _REGEX_META.search(body)
+        literal = body[:m.start()] if m else body
+        if m and body[m.start()] in '*?{' and literal:
+            # The quantifier applies to the last literal character
+            literal = literal[:-1]
+        return literal
+
+    def to_dict(self):
+        return {'name': self.name, 'match': self.match, 'pattern': self.pattern,
+                'severity': self.severity, 'tags': self.tags}
+
+
+def _has_top_level_alternation(pattern):
+    depth, escaped = 0, False
+    for ch in pattern:
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            return True
+    return False
+
+
+class _Node:
+    __slots__ = ('children', 'exact', 'prefix', 'patterns')
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None
+        self.prefix = None
+        self.patterns = []
+
+
+class TrapMatcher:
+    """
+    Trap path matcher:
+    - Exact and prefix rules resolve with a single trie walk
+    - Glob and regex rules hang off the trie node of their literal prefix,
+      so only rules whose prefix matches the path are ever tested
+    - Unanchored regexes without a literal prefix are combined into one
+      alternation tested last (rules with group references are tested on
+      their own, since combining renumbers groups)
+    - Most specific match wins: exact, then the longest prefix/pattern
+      anchor, then file order
+    """
+
+    def __init__(self, rules=None):
+        """Compile rule dicts (defaults to DEFAULT_TRAP_RULES)"""
+        self.rules = [TrapRule(order=i, **r) for i, r in enumerate(DEFAULT_TRAP_RULES if rules is None else rules)]
+        self.root = _Node()
+        self._fallback = []
+        self._fallback_re = None
+        self._combined = []  # fallback rules in _fallback_re, by group index
+        self._separate = []  # fallback rules tested one by one
+
+        for rule in self.rules:
+            literal = rule.literal_prefix()
+            if rule.match in ('glob', 'regex') and not literal:
+                self._fallback.append(rule)
+                continue
+            node = self.root
+            for ch in literal:
+                node = node.children.setdefault(ch, _Node())
+            if rule.match == 'exact':
+                node.exact = node.exact or rule
+            elif rule.match == 'prefix':
+                node.prefix = node.prefix or rule
+            else:
+                node.patterns.append(rule)
+
+        for rule in self._fallback:
+            (self._separate if _GROUP_REF.search(rule.regex.pattern) else self._combined).append(rule)
+        if self._combined:
+            try:
+                self._fallback_re = re.compile('|'.join(
+                    f"(?P<_r{i}>{rule.regex.pattern})" for i, rule in enumerate(self._combined)))
+            except re.error:
+                # Patterns that cannot be combined (inline flags, group names) are tried one by one
+                self._combined, self._separate = [], self._fallback
+
+    @classmethod
+    def from_file(cls, path):
+        """Load rules from a JSON file ({'rules': [...]} or a plain list)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(rules=data.get('rules', []) if isinstance(data, dict) else data)
+
+    @classmethod
+    def from_env(cls):
+        """Load rules from SENTINEL_TRAP_RULES (default trap_rules.json), else the built-in decoys"""
+        path = os.environ.get('SENTINEL_TRAP_RULES', 'trap_rules.json')
+        if path and os.path.exists(path):
+            try:
+                matcher = cls.from_file(path)
+                print(f"[✓] Loaded {len(matcher.rules)} trap rules from {path}")
+                return matcher
+            except Exception as e:
+                print(f"[!] Invalid trap rules file {path}: {e}")
+        return cls()
+
+    def match(self, path):
+        """Return the TrapRule for path, or None"""
+        node = self.root
+        candidates = []
+        if node.prefix or node.patterns:
+            candidates.append(node)
+        for ch in path:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            if node.prefix or node.patterns:
+                candidates.append(node)
+        else:
+            if node.exact is not None:
+                return node.exact
+
+        # Deepest (most specific) anchor first
+        for node in reversed(candidates):
+            best = None
+            for rule in node.patterns:
+                if (best is None or rule.order < best.order) and rule.regex.match(path):
+                    best = rule
+            if node.prefix is not None and (best is None or node.prefix.order < best.order):
+                best = node.prefix
+            if best is not None:
+                return best
+
+        best = None
+        if self._fallback_re is not None:
+            m = self._fallback_re.search(path)
+            if m:
+                best = self._combined[int(m.lastgroup[2:])]
+        for rule in self._separate:
+            if best is not None and best.order < rule.order:
+                break
+            if rule.regex.search(path):
+                return rule
+        return best
+
+    def __len__(self):
+        return len(self.rules)